@@ -3,6 +3,9 @@
 import pandas as pd
 import time
 from .bingx_client import BingXClient
+from modules.bars.resampler import TimeframeResampler, interval_to_ms
+from modules.utils.market_snapshot import MarketSnapshot
+from modules.utils.result_cache import window_key
 
 
 class DataFeed:
@@ -10,9 +13,10 @@ class DataFeed:
     Унифицированный загрузчик данных для модулей
     """
 
-    def __init__(self, config, ws_manager=None):
+    def __init__(self, config, ws_manager=None, bar_builder=None):
         self.config = config
         self.ws_manager = ws_manager
+        self.bar_builder = bar_builder  # Activity-бары из потока сделок (опционально)
         # Поддержка обоих вариантов названия secret key
         secret_key = getattr(config, 'BINGX_API_SECRET', None) or getattr(config, 'BINGX_SECRET_KEY', None)
         self.client = BingXClient(
@@ -23,6 +27,17 @@ class DataFeed:
         self.symbol = config.get_symbol_for_api() if hasattr(config, 'get_symbol_for_api') else getattr(config, 'SYMBOL', 'BTC-USDT')
         self.timeframe = getattr(config, 'TIMEFRAME', '15m')
         self.last_fetch_timestamp = None
+        # HTF из базовой серии: согласованные границы и без REST-запроса на каждый цикл
+        self.local_htf = getattr(config, 'LOCAL_HTF_RESAMPLING', True)
+        self.resamplers = {}  # interval -> TimeframeResampler
+        self._base_ohlcv = None  # последний базовый OHLCV (self.timeframe)
+        # Версия базового OHLCV: растёт, только когда окно свечей изменилось
+        self.ohlcv_version = 0
+        self._ohlcv_key = None
+        # Версии HTF OHLCV по интервалам (та же логика, что и у базового)
+        self.htf_versions = {}
+        self._htf_keys = {}
+        self.last_snapshot = None
 
     def _get_klines(self, symbol, interval, limit):
         klines = self.client.get_klines(symbol, interval, limit)
@@ -72,15 +87,63 @@ class DataFeed:
         """
         if limit is None:
             limit = getattr(self.config, 'KLINE_LIMIT', 100)
-        return self._get_klines(self.symbol, self.timeframe, limit)
+        df = self._get_klines(self.symbol, self.timeframe, limit)
+        key = window_key(df, self.symbol, self.timeframe)
+        if key != self._ohlcv_key:
+            self._ohlcv_key = key
+            self.ohlcv_version += 1
+        self._base_ohlcv = df
+        return df
 
     async def get_ohlcv_tf(self, interval: str, limit=None):
         """
         OHLCV для другого таймфрейма (HTF)
+
+        Если интервал кратен базовому, свечи собираются локально из последнего
+        базового OHLCV; REST нужен только для истории глубже базового буфера
+        (первый вызов или разрыв в данных).
         """
         if limit is None:
             limit = getattr(self.config, 'HTF_LIMIT', 200)
-        return self._get_klines(self.symbol, interval, limit)
+        df = self._resample_local(interval, limit)
+        if df is None:
+            df = self._get_klines(self.symbol, interval, limit)
+        key = window_key(df, self.symbol, interval)
+        if key != self._htf_keys.get(interval):
+            self._htf_keys[interval] = key
+            self.htf_versions[interval] = self.htf_versions.get(interval, 0) + 1
+        return df
+
+    def _resample_local(self, interval, limit):
+        """HTF из базовой серии или None, если локальный ресэмплинг невозможен"""
+        base = self._base_ohlcv
+        if not self.local_htf or base is None or len(base) < 2 or interval_to_ms(interval) is None:
+            return None
+        resampler = self.resamplers.get(interval)
+        if resampler is None:
+            resampler = TimeframeResampler(interval, maxlen=max(limit * 2, 500))
+            if not resampler.can_resample(self.timeframe):
+                return None
+            self.resamplers[interval] = resampler
+        history = None
+        if resampler.needs_history(base):
+            history = self._get_klines(self.symbol, interval, limit)
+        resampler.update(base, history_df=history)
+        return resampler.to_dataframe(last=limit)
+
+    def get_activity_bars(self, last=None):
+        """
+        Activity-бары (tick/volume/dollar/imbalance), собранные из WS сделок
+
+        Args:
+            last: количество последних баров (None = все)
+
+        Returns:
+            DataFrame в формате OHLCV (пустой, если построитель не подключен)
+        """
+        if not self.bar_builder:
+            return pd.DataFrame()
+        return self.bar_builder.to_dataframe(last=last)
 
     async def get_orderbook(self, limit=20):
         """
@@ -175,19 +238,71 @@ class DataFeed:
         
         return []
 
+    async def capture_snapshot(self, htf_intervals=()):
+        """
+        Согласованный снимок рынка для цикла анализа
+
+        Сначала загружаются свечи (REST, с ожиданием), затем буферы WS
+        читаются одним синхронным блоком: сделки и стакан соответствуют
+        одному моменту. Без WS сделки и стакан берутся из REST (без
+        номеров последовательности — в id снимка идёт хэш их содержимого).
+
+        Args:
+            htf_intervals: таймфреймы HTF, попадающие в снимок (например HTF_1, HTF_2)
+
+        Returns:
+            MarketSnapshot
+        """
+        ohlcv = await self.get_ohlcv()
+        htf = {}
+        if not ohlcv.empty:
+            htf = {interval: await self.get_ohlcv_tf(interval) for interval in htf_intervals}
+
+        ws = self.ws_manager.capture() if self.ws_manager else {}
+        captured_at = int(time.time() * 1000)
+        trades, trade_seq = ws.get("trades"), ws.get("trade_seq")
+        orderbook, book_seq = ws.get("orderbook"), ws.get("book_seq")
+        if not trades:
+            trades, trade_seq = await self.get_trades(), None
+        if not orderbook:
+            orderbook, book_seq = await self.get_orderbook(), None
+
+        activity, activity_version = None, None
+        if self.bar_builder:
+            activity = self.get_activity_bars(last=len(ohlcv) or None)
+            activity_version = self.bar_builder.store.version
+
+        snapshot = MarketSnapshot(
+            symbol=self.symbol,
+            captured_at=captured_at,
+            ohlcv=ohlcv,
+            htf=htf,
+            trades=trades,
+            orderbook=orderbook,
+            activity=activity,
+            ohlcv_version=self.ohlcv_version,
+            htf_versions={interval: self.htf_versions[interval] for interval in htf},
+            trade_seq=trade_seq,
+            book_seq=book_seq,
+            activity_version=activity_version,
+            source_ts={
+                "ohlcv": int(ohlcv["timestamp"].iloc[-1]) if not ohlcv.empty else None,
+                "trades": trades[-1].get("timestamp") if trades else None,
+                "orderbook": orderbook.get("timestamp") if orderbook else None
+            }
+        )
+        self.last_fetch_timestamp = captured_at
+        self.last_snapshot = snapshot
+        return snapshot
+
     async def get_latest_data(self):
         """
         Получение всех последних данных
         
         Returns:
-            Dict со всеми данными
-        """
-        self.last_fetch_timestamp = int(time.time() * 1000)
-        return {
-            "ohlcv": await self.get_ohlcv(),
-            "orderbook": await self.get_orderbook(),
-            "trades": await self.get_trades()
-        }
+            MarketSnapshot (доступ как к dict: ohlcv, orderbook, trades)
+        """
+        return await self.capture_snapshot()
     
     def get_fetch_timestamp(self):
         """
@@ -4,6 +4,7 @@ import asyncio
 import websockets
 import json
 import logging
+import time
 import zlib
 from collections import deque
 
@@ -19,7 +20,9 @@ class WebSocketManager:
       - depth: market.depth (level: 5/20)
     Данные хранятся в буферах:
       - self.trades: deque[{price, volume, side, timestamp}]
-      - self.orderbook: dict {bids, asks, avg_bid, avg_ask}
+      - self.orderbook: dict {bids, asks, avg_bid, avg_ask, timestamp}
+    Номера последовательности: trade_seq — сколько сделок принято всего
+    (последняя сделка буфера), book_seq — сколько обновлений стакана.
     """
 
     def __init__(self, config):
@@ -32,7 +35,10 @@ class WebSocketManager:
 
         # Буферы
         self.trades = deque(maxlen=getattr(config, "WS_TRADES_BUFFER", 1000))
-        self.orderbook = {}
+        self.orderbook = {}  # Заменяется целиком при обновлении, на месте не меняется
+        self.trade_seq = 0
+        self.book_seq = 0
+        self._trade_listeners = []  # Подписчики на поток сделок (bar builders и т.п.)
 
         # Таски
         self._tasks = []
@@ -69,7 +75,60 @@ class WebSocketManager:
         """Возвращает последний стакан"""
         return self.orderbook.copy() if self.orderbook else {}
 
+    def capture(self):
+        """
+        Согласованный снимок буферов WS (без await — атомарно для event loop)
+
+        Сделки копируются один раз (deque продолжает пополняться), стакан
+        отдаётся по ссылке.
+
+        Returns:
+            dict: trades, trade_seq (первый, последний) или None, orderbook, book_seq или None
+        """
+        trades = list(self.trades)
+        return {
+            "trades": trades,
+            "trade_seq": (self.trade_seq - len(trades) + 1, self.trade_seq) if trades else None,
+            "orderbook": self.orderbook,
+            "book_seq": self.book_seq if self.orderbook else None
+        }
+
+    def add_trade_listener(self, callback):
+        """
+        Подписка на каждую сделку из WS (например, BarBuilder.add_trade)
+
+        Args:
+            callback: функция(trade_dict), вызывается синхронно при получении сделки
+        """
+        self._trade_listeners.append(callback)
+
     # ------------------ Вспомогательные ------------------ #
+    def _ingest_trade(self, t):
+        """Нормализует сырую сделку BingX, кладёт в буфер и уведомляет подписчиков"""
+        price = float(t.get("p", t.get("price", 0)) or 0)
+        vol = float(t.get("v", t.get("qty", 0)) or 0)
+        side = t.get("S", t.get("side", ""))
+        if side in (True, False):
+            side = "sell" if side else "buy"
+        elif side == "BUY":
+            side = "buy"
+        elif side == "SELL":
+            side = "sell"
+        ts = t.get("T", t.get("timestamp", t.get("time", 0)))
+        trade = {
+            "price": price,
+            "volume": vol,
+            "side": side,
+            "timestamp": ts
+        }
+        self.trades.append(trade)
+        self.trade_seq += 1
+        for callback in self._trade_listeners:
+            try:
+                callback(trade)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика сделок: {e}")
+
     def _decode_message(self, raw):
         """
         Декодирует сообщение WS. BingX может слать gzip-сжатые бинарные фреймы.
@@ -127,39 +186,9 @@ class WebSocketManager:
                         # Список сделок
                         if isinstance(data, list):
                             for t in data:
-                                price = float(t.get("p", t.get("price", 0)) or 0)
-                                vol = float(t.get("v", t.get("qty", 0)) or 0)
-                                side = t.get("S", t.get("side", ""))
-                                if side in (True, False):
-                                    side = "sell" if side else "buy"
-                                elif side == "BUY":
-                                    side = "buy"
-                                elif side == "SELL":
-                                    side = "sell"
-                                ts = t.get("T", t.get("timestamp", t.get("time", 0)))
-                                self.trades.append({
-                                    "price": price,
-                                    "volume": vol,
-                                    "side": side,
-                                    "timestamp": ts
-                                })
+                                self._ingest_trade(t)
                         elif isinstance(data, dict):
-                            price = float(data.get("p", data.get("price", 0)) or 0)
-                            vol = float(data.get("v", data.get("qty", 0)) or 0)
-                            side = data.get("S", data.get("side", ""))
-                            if side in (True, False):
-                                side = "sell" if side else "buy"
-                            elif side == "BUY":
-                                side = "buy"
-                            elif side == "SELL":
-                                side = "sell"
-                            ts = data.get("T", data.get("timestamp", data.get("time", 0)))
-                            self.trades.append({
-                                "price": price,
-                                "volume": vol,
-                                "side": side,
-                                "timestamp": ts
-                            })
+                            self._ingest_trade(data)
             except asyncio.CancelledError:
                 break
             except Exception as e:
@@ -207,8 +236,11 @@ class WebSocketManager:
                                 "bids": [(float(b[0]), float(b[1])) for b in bids],
                                 "asks": [(float(a[0]), float(a[1])) for a in asks],
                                 "avg_bid": avg_bid,
-                                "avg_ask": avg_ask
+                                "avg_ask": avg_ask,
+                                # Время биржи, если есть в сообщении, иначе время получения
+                                "timestamp": int(data.get("T") or msg.get("ts") or time.time() * 1000)
                             }
+                            self.book_seq += 1
             except asyncio.CancelledError:
                 break
             except Exception as e:
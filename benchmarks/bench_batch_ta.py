@@ -0,0 +1,42 @@
+"""
+Бенчмарк пакетного TA: analyze_batch по матрицам vs цикл TAEngine.analyze по символам
+Запуск: python benchmarks/bench_batch_ta.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.ta_engine import TAEngine
+from modules.ta_engine.batch import analyze_batch, stack_ohlcv
+from tests.helpers import make_ohlcv
+
+SYMBOL_COUNTS = [10, 100, 500]
+CANDLES = 200
+
+
+def timeit(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'symbols':>8} | {'batch':>10} | {'loop':>10} | {'speedup':>8}")
+    print("-" * 46)
+    engine = TAEngine(incremental=False)
+    for count in SYMBOL_COUNTS:
+        frames = {f"SYM{i}": make_ohlcv(CANDLES, seed=i) for i in range(count)}
+        symbols, m = stack_ohlcv(frames)
+        batch = timeit(lambda: analyze_batch(m["open"], m["high"], m["low"], m["close"], symbols))
+        loop = timeit(lambda: [engine.analyze(df) for df in frames.values()])
+        print(f"{count:>8} | {batch * 1000:>8.2f}ms | {loop * 1000:>8.2f}ms | {loop / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Бенчмарк HistoricalPhaseAnalyzer: векторная версия vs исходная построчная
+Запуск: python benchmarks/bench_historical_phases.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.market_structure.historical_phase_analyzer import HistoricalPhaseAnalyzer
+from tests.helpers import ReferenceHistoricalPhaseAnalyzer, make_phase_ohlcv
+
+SIZES = [200, 20_000]
+
+
+def timeit(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'candles':>10} | {'vectorized':>12} | {'reference':>12} | {'speedup':>8}")
+    print("-" * 52)
+    for n in SIZES:
+        df = make_phase_ohlcv(n)
+        vec = timeit(lambda: HistoricalPhaseAnalyzer().analyze_historical_phases(df))
+        ref = timeit(lambda: ReferenceHistoricalPhaseAnalyzer().analyze_historical_phases(df), repeat=1)
+        print(f"{n:>10} | {vec * 1000:>10.2f}ms | {ref * 1000:>10.2f}ms | {ref / vec:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
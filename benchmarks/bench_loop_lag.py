@@ -0,0 +1,89 @@
+"""
+Бенчмарк задержки event loop во время анализа: прогон графа прямо в
+корутине vs AnalysisWorker в потоке и в отдельном процессе
+Запуск: python benchmarks/bench_loop_lag.py
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.bars import resample_ohlcv
+from modules.pipeline import AnalysisSession, AnalysisWorker, LoopLagMonitor, set_switch_interval
+from tests.helpers import make_ohlcv
+
+CYCLES = 8
+SWITCH_INTERVAL_MS = 1
+
+
+def cycle_inputs(df, end):
+    history = df.iloc[:end]
+    return {
+        "ohlcv": history.iloc[-100:],
+        "htf1_df": resample_ohlcv(history, "1h"),
+        "htf2_df": resample_ohlcv(history, "4h"),
+        "trades": None,
+        "orderbook": None,
+        "activity_df": None,
+        "data_quality": None
+    }
+
+
+def quiet_session():
+    """Сессия без логов и print движков (в spawn-процессе logging.disable не наследуется)"""
+    logging.disable(logging.WARNING)
+    sys.stdout = open(os.devnull, "w")
+    return AnalysisSession()
+
+
+async def measure(mode, inputs):
+    """Средняя длительность цикла и задержка loop (p99/max, мс)"""
+    if mode == "inline":
+        session = AnalysisSession()
+        run = lambda item: asyncio.sleep(0, session.run(item))
+    else:
+        worker = AnalysisWorker(quiet_session if mode == "process" else AnalysisSession, mode=mode)
+        await worker.call("cache_stats")  # старт сессии (и процесса) вне замера
+        run = worker.run
+
+    monitor = LoopLagMonitor(interval=0.002).start()
+    started = time.perf_counter()
+    for item in inputs:
+        await run(item)
+        await asyncio.sleep(0.01)
+    elapsed = (time.perf_counter() - started) / len(inputs) - 0.01
+    await monitor.stop()
+    if mode != "inline":
+        worker.shutdown()
+    return elapsed, monitor.stats()
+
+
+async def baseline():
+    """Задержка пустого loop (шум таймеров и планировщика ОС)"""
+    monitor = LoopLagMonitor(interval=0.002).start()
+    await asyncio.sleep(1)
+    await monitor.stop()
+    return monitor.stats()
+
+
+def main():
+    logging.disable(logging.WARNING)
+    set_switch_interval(SWITCH_INTERVAL_MS)
+    df = make_ohlcv(100 + 150 * CYCLES, seed=1)
+    inputs = [cycle_inputs(df, 100 + 150 * (i + 1)) for i in range(CYCLES)]
+
+    idle = asyncio.run(baseline())
+    print(f"idle loop: p99 {idle['p99_ms']:.1f}ms, max {idle['max_ms']:.1f}ms (cpu: {os.cpu_count()})")
+    print(f"{'mode':>8} | {'cycle':>8} | {'lag p99':>8} | {'lag max':>8}")
+    print("-" * 42)
+    for mode in ("inline", "thread", "process"):
+        elapsed, lag = asyncio.run(measure(mode, inputs))
+        print(f"{mode:>8} | {elapsed * 1000:>6.0f}ms | {lag['p99_ms']:>6.1f}ms | {lag['max_ms']:>6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Бенчмарк detect_stop_clusters: векторная версия vs исходная построчная
+Запуск: python benchmarks/bench_stop_clusters.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.liquidity.stop_clusters import detect_stop_clusters
+from tests.helpers import make_ohlcv, reference_detect_stop_clusters, NOW_TS
+
+SIZES = [100, 10_000, 1_000_000]
+REFERENCE_MAX_SIZE = 10_000  # построчная версия на 1M свечей идёт десятки минут
+
+
+def timeit(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'candles':>10} | {'vectorized':>12} | {'reference':>12} | {'speedup':>8}")
+    print("-" * 52)
+    for n in SIZES:
+        df = make_ohlcv(n)
+        vec = timeit(lambda: detect_stop_clusters(df, current_ts=NOW_TS))
+        if n <= REFERENCE_MAX_SIZE:
+            ref = timeit(lambda: reference_detect_stop_clusters(df, current_ts=NOW_TS), repeat=1)
+            print(f"{n:>10} | {vec * 1000:>10.2f}ms | {ref * 1000:>10.2f}ms | {ref / vec:>7.1f}x")
+        else:
+            print(f"{n:>10} | {vec * 1000:>10.2f}ms | {'—':>12} | {'—':>8}")
+
+
+if __name__ == "__main__":
+    main()
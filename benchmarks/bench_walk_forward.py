@@ -0,0 +1,44 @@
+"""
+Бенчмарк walk-forward бэктеста: стоимость шага на инкрементальных движках
+vs пакетный пересчёт окна, оценка прогона года 15m свечей
+Запуск: python benchmarks/bench_walk_forward.py
+"""
+
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.backtest import WalkForwardBacktester
+from tests.helpers import make_ohlcv
+
+CANDLE_COUNTS = [500, 2000]
+YEAR_15M = 365 * 24 * 4
+
+
+def timeit(fn, repeat=1):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    # Пайплайн логирует каждое решение — в бенчмарке это шум
+    logging.disable(logging.WARNING)
+    print(f"{'candles':>8} | {'incremental':>12} | {'batch':>10} | {'speedup':>8} | {'year 15m':>9}")
+    print("-" * 60)
+    for count in CANDLE_COUNTS:
+        df = make_ohlcv(count + 99, seed=3)
+        incremental = timeit(lambda: WalkForwardBacktester().run(df))
+        batch = timeit(lambda: WalkForwardBacktester(incremental=False).run(df))
+        year_min = incremental / count * YEAR_15M / 60
+        print(f"{count:>8} | {incremental:>10.2f}s | {batch:>8.2f}s | {batch / incremental:>7.1f}x | {year_min:>6.1f}min")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ import logging
 import asyncio
 from telegram import Update
 from telegram.ext import ContextTypes
+from modules.pipeline import SIGNAL_TARGETS, REPORT_TARGETS, LatestResults
 
 logger = logging.getLogger(__name__)
 
@@ -13,25 +14,79 @@ class BotHandlers:
     Обработчики команд Telegram бота
     """
 
-    def __init__(self, bot, decision_engine, data_feed, liquidity_engine, 
-                 svd_engine, market_structure_engine, ta_engine, health_monitor=None,
-                 historical_phase_analyzer=None, global_trend_analyzer=None):
+    def __init__(self, bot, data_feed, analysis_worker, health_monitor=None):
+        """
+        Args:
+            bot: telegram.Bot
+            data_feed: DataFeed
+            analysis_worker: AnalysisWorker — сессия анализа, общая с основным циклом
+                (движки, кэш результатов, граф стадий)
+            health_monitor: HealthMonitor
+        """
         self.bot = bot
-        self.decision_engine = decision_engine
         self.data_feed = data_feed
-        self.liquidity_engine = liquidity_engine
-        self.svd_engine = svd_engine
-        self.market_structure_engine = market_structure_engine
-        self.ta_engine = ta_engine
+        self.analysis_worker = analysis_worker
         self.health_monitor = health_monitor
-        self.historical_phase_analyzer = historical_phase_analyzer
-        self.global_trend_analyzer = global_trend_analyzer
+        self.config = getattr(data_feed, "config", None)
         self.last_signal = None  # Храним последний сигнал
+        # Последние прогоны (основной цикл публикует свои): команды отвечают из них,
+        # пока данные свежее SLA, одновременные команды ждут один пересчёт
+        self.results = LatestResults(self._run_analysis)
+        # SLA по умолчанию не короче интервала анализа (см. Config.SIGNAL_MAX_AGE_SECONDS)
+        default_max_age = getattr(self.config, "ANALYSIS_INTERVAL", 180) * 1.5
+        self.signal_max_age = getattr(self.config, "SIGNAL_MAX_AGE_SECONDS", default_max_age)
+        self.analysis_max_age = getattr(self.config, "ANALYSIS_MAX_AGE_SECONDS", default_max_age)
 
     def set_last_signal(self, signal):
         """Сохраняет последний сигнал"""
         self.last_signal = signal
 
+    def publish_result(self, snapshot, run, targets):
+        """Прогон основного цикла — источник ответов команд (см. LatestResults)"""
+        self.results.publish(snapshot, run, targets)
+
+    async def _serve(self, update, targets, max_age, progress_text):
+        """
+        Результат для команды: свежий из LatestResults или пересчёт
+
+        Сообщение о начале анализа отправляется, только если готового
+        результата нет.
+
+        Returns:
+            ServedResult
+        """
+        if self.results.latest(targets, max_age) is None:
+            await update.message.reply_text(progress_text)
+        return await self.results.get(targets, max_age=max_age)
+
+    @staticmethod
+    def _freshness_line(served):
+        """Строка о задержке ответа и возрасте данных"""
+        source = {"cache": "готовый результат", "computed": "новый расчёт", "coalesced": "общий расчёт"}[served.source]
+        return (f"⏱ Ответ за {served.latency_seconds:.1f}с ({source}), "
+                f"данные {served.age_seconds:.0f}с назад, снимок {served.snapshot.snapshot_id}")
+
+    async def _run_analysis(self, targets):
+        """
+        Снимок рынка + прогон графа анализа до targets в воркере анализа
+        (окна, уже посчитанные основным циклом, берутся из кэша сессии)
+
+        Returns:
+            (MarketSnapshot, PipelineRun) или (MarketSnapshot, None), если нет OHLCV
+        """
+        market_data = await self.data_feed.capture_snapshot((
+            getattr(self.config, "HTF_1_INTERVAL", "1h"), getattr(self.config, "HTF_2_INTERVAL", "4h")
+        ))
+        if market_data["ohlcv"].empty:
+            return market_data, None
+        run = await self.analysis_worker.run(
+            market_data.analysis_inputs(), targets=targets, snapshot_id=market_data.snapshot_id
+        )
+        missing = [name for name in targets if name not in run]
+        if missing:
+            raise RuntimeError(f"анализ не завершён ({', '.join(missing)}): {'; '.join(f'{k}: {v}' for k, v in run.errors.items())}")
+        return market_data, run
+
     async def handle_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработка команды /start"""
         message = """
@@ -57,39 +112,19 @@ class BotHandlers:
         await update.message.reply_text(message.strip())
 
     async def handle_signal(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработка команды /signal - выполняет анализ и отправляет результат"""
-        await update.message.reply_text("⏳ Выполняю анализ рынка...")
-        
+        """Обработка команды /signal - отвечает свежим анализом (готовым или новым)"""
         try:
-            # Получаем данные
-            market_data = await self.data_feed.get_latest_data()
+            # Результат основного цикла, если он свежее SLA; иначе анализ тем же графом
+            served = await self._serve(update, SIGNAL_TARGETS, self.signal_max_age, "⏳ Выполняю анализ рынка...")
+            market_data, run = served.snapshot, served.run
             
-            if market_data["ohlcv"].empty:
+            if run is None:
                 await update.message.reply_text("❌ Ошибка: Нет данных OHLCV")
                 return
             
-            # Выполняем анализ
-            structure_data = self.market_structure_engine.analyze(market_data["ohlcv"])
-            liquidity_data = self.liquidity_engine.analyze(market_data["ohlcv"], structure_data)
-            
-            # SVD анализ
-            if market_data.get("trades") and market_data.get("orderbook"):
-                svd_data = self.svd_engine.analyze(market_data["trades"], market_data["orderbook"])
-            else:
-                svd_data = {"intent": "unclear", "confidence": 0}
-            
-            # TA анализ
-            ta_data = self.ta_engine.analyze(market_data["ohlcv"])
-            
-            # Decision (передаем текущую цену)
-            current_price = market_data["ohlcv"]["close"].iloc[-1]
-            signal = self.decision_engine.analyze(
-                liquidity_data,
-                svd_data,
-                structure_data,
-                ta_data,
-                current_price=current_price
-            )
+            structure_data, liquidity_data = run["structure"], run["liquidity"]
+            svd_data, ta_data = run["svd"], run["ta"]
+            signal = run["decision"]
             
             # Сохраняем последний сигнал
             self.set_last_signal(signal)
@@ -127,6 +162,8 @@ class BotHandlers:
 {detailed_explanation}
 
 💡 Используйте /analysis для полного глубокого анализа с прогнозами
+
+{self._freshness_line(served)}
             """
             
             await update.message.reply_text(message.strip())
@@ -137,61 +174,24 @@ class BotHandlers:
 
     async def handle_analysis(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработка команды /analysis - полный детальный анализ"""
-        await update.message.reply_text("⏳ Выполняю глубокий анализ рынка...")
-        
         try:
-            from modules.ai_explanations.deep_analyzer import DeepMarketAnalyzer
-            
-            market_data = await self.data_feed.get_latest_data()
+            # Анализ и глубокий отчёт (HTF фазы, глобальный тренд) — тем же графом в воркере анализа
+            served = await self._serve(
+                update, REPORT_TARGETS, self.analysis_max_age, "⏳ Выполняю глубокий анализ рынка..."
+            )
+            market_data, run = served.snapshot, served.run
             
-            if market_data["ohlcv"].empty:
+            if run is None:
                 await update.message.reply_text("❌ Ошибка: Нет данных")
                 return
             
-            structure_data = self.market_structure_engine.analyze(market_data["ohlcv"])
-            liquidity_data = self.liquidity_engine.analyze(market_data["ohlcv"], structure_data)
-            
-            # Получаем HTF данные для исторического анализа
-            from config import Config
-            config = Config()
-            htf1_df = await self.data_feed.get_ohlcv_tf(config.HTF_1_INTERVAL)
-            htf2_df = await self.data_feed.get_ohlcv_tf(config.HTF_2_INTERVAL)
-            htf1_struct = self.market_structure_engine.analyze(htf1_df) if not htf1_df.empty else {"trend": "unknown"}
-            htf2_struct = self.market_structure_engine.analyze(htf2_df) if not htf2_df.empty else {"trend": "unknown"}
-            
-            # Исторический анализ фаз на HTF
-            htf1_phases = {}
-            htf2_phases = {}
-            global_trend = {}
-            if self.historical_phase_analyzer and self.global_trend_analyzer:
-                if not htf1_df.empty:
-                    htf1_phases = self.historical_phase_analyzer.analyze_historical_phases(htf1_df, timeframe_name="HTF1 (1h)")
-                if not htf2_df.empty:
-                    htf2_phases = self.historical_phase_analyzer.analyze_historical_phases(htf2_df, timeframe_name="HTF2 (4h)")
-                global_trend = self.global_trend_analyzer.analyze_global_trend(
-                    htf1_struct, htf2_struct, htf1_phases, htf2_phases
-                )
-            
-            if market_data.get("trades") and market_data.get("orderbook"):
-                svd_data = self.svd_engine.analyze(market_data["trades"], market_data["orderbook"])
-            else:
-                svd_data = {"intent": "unclear", "confidence": 0}
-            
-            ta_data = self.ta_engine.analyze(market_data["ohlcv"])
-            signal = self.decision_engine.analyze(liquidity_data, svd_data, structure_data, ta_data)
+            structure_data, liquidity_data = run["structure"], run["liquidity"]
+            svd_data, ta_data = run["svd"], run["ta"]
+            signal = run["decision"]
+            deep_report = run["deep_report"]
             
             current_price = market_data["ohlcv"]["close"].iloc[-1]
             
-            # Глубокий анализ (передаём исторические фазы и глобальный тренд)
-            deep_analyzer = DeepMarketAnalyzer()
-            deep_report = deep_analyzer.generate_full_report(
-                liquidity_data, structure_data, svd_data, ta_data, current_price, 
-                decision_result=signal,
-                htf1_phases=htf1_phases,
-                htf2_phases=htf2_phases,
-                global_trend=global_trend
-            )
-            
             # Формируем глубокий отчет
             message_parts = []
             
@@ -248,7 +248,20 @@ class BotHandlers:
                     
                     message_parts.append(f"{role_emoji} ${price:.2f} ({distance:.2f}%) - {role}")
                     message_parts.append(f"   {direction_text}, swept {count}x{time_info} - стопы собраны")
-            
+
+            # Незаполненные FVG / OB рядом с ценой
+            imbalance_zones = liq_analysis.get("imbalance_zones", [])
+            if imbalance_zones:
+                message_parts.append("")
+                message_parts.append("🧲 НЕЗАПОЛНЕННЫЕ ЗОНЫ (FVG / OB):")
+                for zone in imbalance_zones[:5]:
+                    zone_emoji = "🟢" if zone["type"] == "bullish" else "🔴"
+                    fill_text = f", заполнено {zone['fill_pct'] * 100:.0f}%" if zone["status"] == "partial" else ""
+                    message_parts.append(
+                        f"{zone_emoji} {zone['source'].upper()} ${zone['low']:.2f}-${zone['high']:.2f} "
+                        f"({zone['role']}, {zone['distance_pct']:.2f}%{fill_text})"
+                    )
+
             message_parts.append("")
             
             # Прогноз движения цены
@@ -324,7 +337,18 @@ class BotHandlers:
                     message_parts.append(f"   Текущая фаза: {current_phase_4h} (длительность: {duration_4h:.1f}ч)")
                     message_parts.append(f"   Всего фаз в истории: {phase_count_4h}")
                     message_parts.append("")
-            
+
+            # Activity-бары из потока сделок (если построитель подключен)
+            activity = deep_report.get("activity_bars")
+            if activity:
+                message_parts.append(f"📦 ACTIVITY-БАРЫ ({activity['bars']}):")
+                message_parts.append(f"   Структура: {activity['trend']}, изменение {activity['change_pct']:+.2f}%")
+                if activity["buy_share"] is not None:
+                    message_parts.append(f"   Доля покупок: {activity['buy_share']:.0%}")
+                if activity["avg_trades"] is not None:
+                    message_parts.append(f"   Сделок на бар: {activity['avg_trades']:.0f}")
+                message_parts.append("")
+
             # Действия умных денег
             message_parts.append("🧠 ДЕЙСТВИЯ УМНЫХ ДЕНЕГ:")
             smart_money_text = deep_report["smart_money"]
@@ -370,6 +394,8 @@ class BotHandlers:
             message_parts.append(f"• CVD (накопительная): {svd_data.get('cvd', 0):.2f}")
             message_parts.append(f"• CVD slope: {svd_data.get('cvd_slope', 0):.2f}")
             message_parts.append(f"• RSI: {ta_data.get('rsi', 0):.1f}")
+            message_parts.append("")
+            message_parts.append(self._freshness_line(served))
             
             # Отправляем сообщение (разбиваем если слишком длинное)
             full_message = "\n".join(message_parts)
@@ -425,6 +451,35 @@ class BotHandlers:
    Доступно: {status['system']['memory_available_mb']:.0f}MB
 
 ❌ Ошибки: {status['error_count']}
+        """
+        # Метрики кэша — из последнего прогона: вызов воркера ждал бы идущий анализ
+        pipeline = status.get("pipeline")
+        cache = pipeline.get("cache") if pipeline else None
+        if cache:
+            message += f"""
+🗄 КЭШ АНАЛИЗА:
+   Hit rate: {cache['hit_rate']:.1%} ({cache['hits']}/{cache['hits'] + cache['misses']})
+   Записей: {cache['size']}, вытеснено: {cache['evictions']}
+        """
+        served = self.results.stats()
+        message += f"""
+💬 ОТВЕТЫ КОМАНД:
+   Готовых: {served['cache']}, новых расчётов: {served['computed']}, общих: {served['coalesced']}
+        """
+        if pipeline:
+            slowest = sorted(pipeline["stages"].items(), key=lambda item: -item[1])[:3]
+            message += f"""
+⏱ ГРАФ АНАЛИЗА: {pipeline['elapsed_ms']:.0f}ms (снимок {pipeline.get('snapshot_id') or '—'})
+   Дольше всего: {', '.join(f'{name} {ms:.0f}ms' for name, ms in slowest)}
+   Ошибки стадий: {status['stage_errors']}
+        """
+        loop_lag = status.get("loop_lag")
+        if loop_lag and loop_lag["samples"]:
+            worker = self.analysis_worker.stats()
+            message += f"""
+🔁 EVENT LOOP:
+   Задержка: p99 {loop_lag['p99_ms']:.1f}ms, max {loop_lag['max_ms']:.1f}ms
+   Анализ ({worker['mode']}): в очереди {worker['pending']}, перезапусков {worker['restarts']}
         """
         await update.message.reply_text(message.strip())
 
@@ -449,6 +504,7 @@ class BotHandlers:
 Бот автоматически отправляет уведомления о важных событиях:
 • Смена фазы (execution, distribution)
 • Разворот CVD (accumulating ↔ distributing)
+• Токсичный поток ордеров (VPIN)
 • Сильные сигналы (confidence >= 7.0)
         """
         await update.message.reply_text(message.strip())
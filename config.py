@@ -96,6 +96,29 @@ class Config:
     HTF_1_INTERVAL: str = os.getenv("HTF_1_INTERVAL", "1h")
     HTF_2_INTERVAL: str = os.getenv("HTF_2_INTERVAL", "4h")
     HTF_LIMIT: int = int(os.getenv("HTF_LIMIT", "200"))
+    # Собирать HTF из базовых свечей (REST только для истории глубже буфера)
+    LOCAL_HTF_RESAMPLING: bool = os.getenv("LOCAL_HTF_RESAMPLING", "True").lower() == "true"
+    # Размер LRU-кэша результатов анализа (общий для основного цикла и команд бота)
+    ANALYSIS_CACHE_SIZE: int = int(os.getenv("ANALYSIS_CACHE_SIZE", "64"))
+    # Инкрементальная структура рынка (только закрытые свечи, скользящая статистика swing'ов).
+    # Результат отличается от пакетного пересчёта окна, поэтому по умолчанию выключена
+    INCREMENTAL_STRUCTURE: bool = os.getenv("INCREMENTAL_STRUCTURE", "False").lower() == "true"
+    # Потоков для независимых стадий графа анализа (1 — последовательно)
+    ANALYSIS_WORKERS: int = int(os.getenv("ANALYSIS_WORKERS", "4"))
+    # Где идёт анализ: "process" (отдельный процесс, не делит GIL с event loop) или "thread"
+    ANALYSIS_OFFLOAD: str = os.getenv("ANALYSIS_OFFLOAD", "process")
+    # Интервал переключения GIL, мс (только ANALYSIS_OFFLOAD=thread: меньше — быстрее отклик event loop)
+    ANALYSIS_SWITCH_INTERVAL_MS: float = float(os.getenv("ANALYSIS_SWITCH_INTERVAL_MS", "1"))
+    # Как часто состояние индикаторов TA пишется на диск, с (плюс при остановке воркера анализа)
+    TA_STATE_SAVE_INTERVAL: float = float(os.getenv("TA_STATE_SAVE_INTERVAL", "300"))
+    # SLA свежести ответов команд, с: моложе — ответ из последнего прогона, старше — пересчёт.
+    # По умолчанию полтора интервала анализа: прогон основного цикла покрывает /signal
+    # до следующего прогона с запасом на время самого цикла (SLA короче интервала
+    # превращает большинство /signal в пересчёт)
+    SIGNAL_MAX_AGE_SECONDS: float = float(os.getenv("SIGNAL_MAX_AGE_SECONDS", str(UPDATE_INTERVAL * 1.5)))
+    # deep_report основной цикл не считает: готовый ответ /analysis — предыдущий /analysis
+    # младше SLA (или идущий расчёт); при пересчёте окна свечей основного цикла берутся из кэша
+    ANALYSIS_MAX_AGE_SECONDS: float = float(os.getenv("ANALYSIS_MAX_AGE_SECONDS", str(UPDATE_INTERVAL * 1.5)))
     
     # ============================================
     # TRADINGVIEW WEBHOOK
@@ -131,6 +154,14 @@ class Config:
     WS_BASE_URL: str = os.getenv("WS_BASE_URL", "wss://open-api-swap.bingx.com/swap-market")
     WS_DEPTH_LEVEL: int = int(os.getenv("WS_DEPTH_LEVEL", "20"))
     WS_TRADES_BUFFER: int = int(os.getenv("WS_TRADES_BUFFER", "1000"))
+
+    # ============================================
+    # ACTIVITY BARS (бары по активности из потока сделок)
+    # ============================================
+    # Тип: tick / volume / dollar / tick_imbalance / volume_imbalance / dollar_imbalance (пусто = выключено)
+    ACTIVITY_BAR_TYPE: str = os.getenv("ACTIVITY_BAR_TYPE", "")
+    ACTIVITY_BAR_THRESHOLD: float = float(os.getenv("ACTIVITY_BAR_THRESHOLD", "100"))
+    ACTIVITY_BARS_MAXLEN: int = int(os.getenv("ACTIVITY_BARS_MAXLEN", "5000"))
     
     def __init__(self):
         """Инициализация и создание необходимых директорий"""
@@ -153,6 +184,16 @@ class Config:
         
         # Trap Engine Settings
         self.TRAP_SCORE_THRESHOLD = float(os.getenv('TRAP_SCORE_THRESHOLD', '3.0'))  # Минимальный score для детекции trap
+        
+        # Decision Settings
+        self.MIN_CONFIDENCE_TO_TRADE = float(os.getenv('MIN_CONFIDENCE_TO_TRADE', '4.0'))  # Ниже — принудительный WAIT
+        
+        # SVD Settings
+        self.SVD_CVD_THRESHOLD = float(os.getenv('SVD_CVD_THRESHOLD', '5.0'))  # Значимый общий CVD
+        self.SVD_CVD_SLOPE_THRESHOLD = float(os.getenv('SVD_CVD_SLOPE_THRESHOLD', '0.5'))  # Значимый CVD slope
+        self.SVD_CVD_REVERSAL_THRESHOLD = float(os.getenv('SVD_CVD_REVERSAL_THRESHOLD', '1.5'))  # Slope против CVD = разворот
+        self.SVD_DELTA_TIER_SCALE = float(os.getenv('SVD_DELTA_TIER_SCALE', '1.0'))  # Масштаб порогов дельты в SVD score
+        self.SVD_VELOCITY_TIER_SCALE = float(os.getenv('SVD_VELOCITY_TIER_SCALE', '1.0'))  # Масштаб порогов скорости в SVD score
     
     @property
     def analysis_interval(self) -> int:
@@ -4,20 +4,19 @@ SmartMoneyAI v3 - Главная точка входа
 """
 
 import asyncio
+import functools
 import logging
+import os
 from config import Config
 from api.websocket_manager import WebSocketManager
 from api.data_feed import DataFeed
-from modules.liquidity.liquidity_engine import LiquidityEngine
-from modules.svd.svd_engine import SVDEngine
-from modules.market_structure.market_structure_engine import MarketStructureEngine
-from modules.market_structure.historical_phase_analyzer import HistoricalPhaseAnalyzer
-from modules.market_structure.global_trend_analyzer import GlobalTrendAnalyzer
-from modules.ta_engine.ta_engine import TAEngine
-from modules.decision.decision_engine import DecisionEngine
 from modules.utils.data_validator import DataQualityValidator
 from modules.utils.healthcheck import HealthMonitor
 from modules.alerts import AlertManager
+from modules.bars import BarBuilder
+from modules.pipeline import (
+    AnalysisSession, AnalysisWorker, LoopLagMonitor, MAIN_TARGETS, set_switch_interval
+)
 from bot.notifications import NotificationManager
 from bot.handlers import BotHandlers
 from telegram import Bot
@@ -42,11 +41,36 @@ async def main():
     # Инициализация компонентов
     config = Config()
     ws_manager = WebSocketManager(config)
-    data_feed = DataFeed(config, ws_manager=ws_manager)
+    
+    # Activity-бары из потока сделок (volume/tick/dollar/imbalance)
+    bar_builder = None
+    if config.ACTIVITY_BAR_TYPE:
+        bar_builder = BarBuilder(
+            bar_type=config.ACTIVITY_BAR_TYPE,
+            threshold=config.ACTIVITY_BAR_THRESHOLD,
+            maxlen=config.ACTIVITY_BARS_MAXLEN
+        )
+        ws_manager.add_trade_listener(bar_builder.add_trade)
+        logger.info(f"📊 Activity-бары включены: {config.ACTIVITY_BAR_TYPE} (threshold={config.ACTIVITY_BAR_THRESHOLD})")
+    
+    data_feed = DataFeed(config, ws_manager=ws_manager, bar_builder=bar_builder)
     notification_manager = NotificationManager(config)
     data_validator = DataQualityValidator(config)
     health_monitor = HealthMonitor()
-    alert_manager = AlertManager()  # Менеджер алертов для важных событий
+    alert_manager = AlertManager()  # Форматирование алертов (проверки идут в сессии анализа)
+    
+    # Модули анализа, кэш результатов и граф стадий живут в сессии воркера:
+    # CPU-работа не блокирует event loop (WebSocket ping/pong, команды бота),
+    # основной цикл и команды бота работают с одним состоянием движков
+    if config.ANALYSIS_OFFLOAD == "thread":
+        # Анализ в потоке делит GIL с event loop; процессу интервал не нужен
+        set_switch_interval(config.ANALYSIS_SWITCH_INTERVAL_MS)
+    ta_state_path = os.path.join(config.CACHE_DIR, "ta_indicators.json")
+    analysis_worker = AnalysisWorker(
+        functools.partial(AnalysisSession, config, symbol=data_feed.symbol, state_path=ta_state_path),
+        mode=config.ANALYSIS_OFFLOAD
+    )
+    logger.info(f"🧵 Анализ вынесен из event loop (режим: {config.ANALYSIS_OFFLOAD})")
     
     # Инициализация Telegram бота
     bot_token = config.TELEGRAM_BOT_TOKEN
@@ -57,28 +81,13 @@ async def main():
             bot = Bot(token=bot_token)
             notification_manager.set_bot(bot)
             
-            # Инициализация модулей анализа (для handlers)
-            liquidity_engine = LiquidityEngine()
-            svd_engine = SVDEngine()
-            market_structure_engine = MarketStructureEngine()
-            historical_phase_analyzer = HistoricalPhaseAnalyzer()
-            global_trend_analyzer = GlobalTrendAnalyzer()
-            ta_engine = TAEngine()
-            decision_engine = DecisionEngine(config)
-            
             # Инициализация обработчиков команд
             application = Application.builder().token(bot_token).build()
             handlers = BotHandlers(
-                bot, 
-                decision_engine,
+                bot,
                 data_feed,
-                liquidity_engine,
-                svd_engine,
-                market_structure_engine,
-                ta_engine,
-                health_monitor=health_monitor,
-                historical_phase_analyzer=historical_phase_analyzer,
-                global_trend_analyzer=global_trend_analyzer
+                analysis_worker,
+                health_monitor=health_monitor
             )
             
             # Регистрация команд
@@ -115,13 +124,9 @@ async def main():
     else:
         logger.warning("TELEGRAM_BOT_TOKEN не установлен. Бот не будет работать.")
     
-    # Инициализация модулей анализа (если бот не запущен, создаем здесь)
-    if not bot_token or not application:
-        liquidity_engine = LiquidityEngine()
-        svd_engine = SVDEngine()
-        market_structure_engine = MarketStructureEngine()
-        ta_engine = TAEngine()
-        decision_engine = DecisionEngine(config)
+    # Задержка event loop — в /health и логе статуса
+    loop_lag_monitor = LoopLagMonitor().start()
+    health_monitor.set_loop_lag_monitor(loop_lag_monitor)
     
     # Запуск WebSocket подписок
     await ws_manager.start()
@@ -129,9 +134,9 @@ async def main():
     # Основной цикл обработки
     try:
         while True:
-            # Получение данных
-            market_data = await data_feed.get_latest_data()
-            fetch_timestamp = data_feed.get_fetch_timestamp()
+            # Снимок рынка: свечи (базовые и HTF), сделки и стакан одного момента
+            market_data = await data_feed.capture_snapshot((config.HTF_1_INTERVAL, config.HTF_2_INTERVAL))
+            fetch_timestamp = market_data.captured_at
             
             if market_data["ohlcv"].empty:
                 logger.warning("Нет данных OHLCV")
@@ -157,106 +162,43 @@ async def main():
                 await asyncio.sleep(config.analysis_interval)
                 continue
             
-            # Анализ через модули: Liquidity → SVD → Structure → TA → Decision
+            # Анализ: граф стадий Structure/TA/HTF → Liquidity/SVD → Decision → Alerts
             try:
-                # 1. Market Structure
-                structure_data = market_structure_engine.analyze(market_data["ohlcv"])
-                # HTF bias (1h/4h по умолчанию)
-                htf1_df = await data_feed.get_ohlcv_tf(config.HTF_1_INTERVAL)
-                htf2_df = await data_feed.get_ohlcv_tf(config.HTF_2_INTERVAL)
-                htf1_struct = market_structure_engine.analyze(htf1_df) if not htf1_df.empty else {"trend": "unknown"}
-                htf2_struct = market_structure_engine.analyze(htf2_df) if not htf2_df.empty else {"trend": "unknown"}
-                # HTF liquidity
-                htf1_liq = liquidity_engine.analyze(htf1_df, htf1_struct) if not htf1_df.empty else {}
-                htf2_liq = liquidity_engine.analyze(htf2_df, htf2_struct) if not htf2_df.empty else {}
-                
-                # НОВОЕ: Исторический анализ фаз накопления/распределения на HTF
-                htf1_phases = historical_phase_analyzer.analyze_historical_phases(htf1_df, timeframe_name="HTF1 (1h)") if not htf1_df.empty else {}
-                htf2_phases = historical_phase_analyzer.analyze_historical_phases(htf2_df, timeframe_name="HTF2 (4h)") if not htf2_df.empty else {}
-                
-                # НОВОЕ: Глобальный тренд на основе HTF
-                global_trend = global_trend_analyzer.analyze_global_trend(
-                    htf1_struct, htf2_struct, htf1_phases, htf2_phases
+                # Результаты на тех же окнах свечей берутся из кэша (HTF обычно не меняется между циклами)
+                run = await analysis_worker.run(
+                    market_data.analysis_inputs(validation_result),
+                    targets=MAIN_TARGETS,
+                    snapshot_id=market_data.snapshot_id
                 )
-                
-                # 2. TA (сначала, чтобы получить ATR для нормировки)
-                ta_data = ta_engine.analyze(market_data["ohlcv"])
-                atr_pct = ta_data.get("atr_pct", None)
-                
-                # 3. Liquidity
-                liquidity_data = liquidity_engine.analyze(market_data["ohlcv"], structure_data)
-                
-                # 4. SVD (требует trades, orderbook и ATR для нормировки)
-                if market_data.get("trades") and market_data.get("orderbook"):
-                    svd_data = svd_engine.analyze(market_data["trades"], market_data["orderbook"], atr_pct=atr_pct)
-                else:
-                    svd_data = {"intent": "unclear", "confidence": 0}
-                
-                # 5. Decision (передаем текущую цену, HTF контекст и качество данных)
-                current_price = market_data["ohlcv"]["close"].iloc[-1]
-                signal = decision_engine.analyze(
-                    liquidity_data,
-                    svd_data,
-                    structure_data,
-                    ta_data,
-                    current_price=current_price,
-                    htf_context={
-                        "htf1": htf1_struct.get("trend", "unknown"),
-                        "htf2": htf2_struct.get("trend", "unknown"),
-                    },
-                    htf_liquidity={
-                        "htf1": htf1_liq.get("direction", {}) if htf1_liq else {},
-                        "htf2": htf2_liq.get("direction", {}) if htf2_liq else {},
-                    },
-                    data_quality=validation_result
-                )
-                
-                # Добавляем текущую цену в signals для расчета уровней
-                # (временное решение, лучше передавать в analyze)
-                if "current_price" not in signal:
-                    signal["current_price"] = current_price
-                
-                # Сохранение последнего сигнала для handlers
+                health_monitor.record_pipeline(run.summary())
+                for stage_name, error in run.errors.items():
+                    logger.warning(f"⚠️ Стадия {stage_name} завершилась ошибкой: {error}")
+                    health_monitor.record_error()
+                logger.debug("⏱ Стадии: " + ", ".join(f"{name}={sec * 1000:.0f}ms" for name, sec in run.timings.items()))
+                if "decision" not in run:
+                    raise RuntimeError(f"Решение не получено (ошибки стадий: {run.errors}, пропущены: {run.skipped})")
+                
+                structure_data = run["structure"]
+                liquidity_data = run["liquidity"]
+                svd_data = run["svd"]
+                ta_data = run["ta"]
+                signal = run["decision"]
+                
+                # Сохранение последнего сигнала и прогона для команд бота
                 if handlers:
                     handlers.set_last_signal(signal)
+                    handlers.publish_result(market_data, run, MAIN_TARGETS)
                 
                 # Логирование всех сигналов для отладки
                 signal_type = signal.get("signal", "UNKNOWN")
                 confidence = signal.get("confidence", 0)
-                logger.info(f"📊 Сгенерирован сигнал: {signal_type} (confidence: {confidence:.1f}/10)")
+                logger.info(f"📊 Сгенерирован сигнал: {signal_type} (confidence: {confidence:.1f}/10, анализ {run.elapsed * 1000:.0f}ms, снимок {run.snapshot_id})")
                 
                 # Записываем в healthcheck
                 health_monitor.record_signal(signal_type)
                 
-                # Проверка важных событий и генерация алертов
-                alerts = []
-                
-                # 1. Проверка смены фазы
-                phase_alert = alert_manager.check_phase_change(
-                    svd_data.get("phase", "discovery"),
-                    svd_data.get("phase_info", {})
-                )
-                if phase_alert:
-                    alerts.append(phase_alert)
-                
-                # 2. Проверка разворота CVD
-                cvd_alert = alert_manager.check_cvd_reversal(svd_data)
-                if cvd_alert:
-                    alerts.append(cvd_alert)
-                
-                # 3. Проверка execution фазы
-                execution_alert = alert_manager.check_execution_phase(
-                    svd_data.get("phase", "discovery"),
-                    svd_data,
-                    signal
-                )
-                if execution_alert:
-                    alerts.append(execution_alert)
-                
-                # 4. Проверка сильного сигнала
-                strong_signal_alert = alert_manager.check_strong_signal(signal)
-                if strong_signal_alert:
-                    alerts.append(strong_signal_alert)
+                # Алерты важных событий (смена фазы, разворот CVD, execution, VPIN, сильный сигнал)
+                alerts = run.get("alerts", [])
                 
                 # Отправка алертов в Telegram
                 if alerts and handlers:
@@ -300,6 +242,8 @@ async def main():
         logger.info("Остановка системы...")
     finally:
         await ws_manager.stop()
+        await loop_lag_monitor.stop()
+        analysis_worker.shutdown()
         if application:
             await application.updater.stop()
             await application.stop()
@@ -5,6 +5,7 @@
 """
 
 from modules.utils.trend_strength import (
+    TrendStrengthEngine,
     calculate_trend_strength,
     analyze_pullback_vs_reversal,
     count_liquidity_targets
@@ -116,8 +117,53 @@ class DeepMarketAnalyzer:
             
             analysis["swept_levels"].append(swept_info)
 
+        # Незаполненные FVG / order block'и — магниты и зоны реакции цены
+        analysis["imbalance_zones"] = self.analyze_imbalance_zones(structure_data, current_price)
+
         return analysis
 
+    def analyze_imbalance_zones(self, structure_data, current_price, max_distance_pct=5.0):
+        """
+        Активные (не заполненные) FVG и order block'и рядом с ценой
+
+        Args:
+            structure_data: результат MarketStructureEngine (fvg_active / orderblocks_active)
+            current_price: текущая цена
+            max_distance_pct: максимальное расстояние до зоны, %
+
+        Returns:
+            list: зоны по расстоянию от цены — source, type, low/high, status, fill_pct,
+                  role (above/below/inside), distance_pct
+        """
+        zones = []
+        if not current_price:
+            return zones
+        for source, key in (("fvg", "fvg_active"), ("orderblock", "orderblocks_active")):
+            for zone in structure_data.get(key, []):
+                low, high = zone["low"], zone["high"]
+                if low > current_price:
+                    role, distance = "above", low - current_price
+                elif high < current_price:
+                    role, distance = "below", current_price - high
+                else:
+                    role, distance = "inside", 0.0
+                distance_pct = distance / current_price * 100
+                if distance_pct > max_distance_pct:
+                    continue
+                zones.append({
+                    "source": source,
+                    "type": zone["type"],
+                    "low": low,
+                    "high": high,
+                    "status": zone.get("status", "active"),
+                    "fill_pct": zone.get("fill_pct", 0.0),
+                    "role": role,
+                    "distance_pct": distance_pct
+                })
+
+        zones.sort(key=lambda z: z["distance_pct"])
+        return zones
+
     def generate_price_movement_forecast(self, liquidity_data, structure_data, svd_data, current_price, liquidity_analysis):
         """
         Генерация прогноза движения цены к ликвидности
@@ -144,7 +190,9 @@ class DeepMarketAnalyzer:
         df = structure_data.get("df")
         
         # Анализ силы тренда на НЕСКОЛЬКИХ периодах (используем все доступные свечи!)
-        trend_analysis = calculate_trend_strength(df, lookback=20, multi_period=True) if df is not None else {
+        # Префиксные суммы считаются один раз и для силы тренда, и для pullback/reversal
+        trend_engine = TrendStrengthEngine(df) if df is not None else None
+        trend_analysis = calculate_trend_strength(df, lookback=20, multi_period=True, engine=trend_engine) if df is not None else {
             "direction": "neutral",
             "strength": 0.0,
             "momentum": 0.0,
@@ -156,7 +204,7 @@ class DeepMarketAnalyzer:
         
         # Проверяем pullback vs reversal
         pullback_analysis = analyze_pullback_vs_reversal(
-            df, trend_analysis["direction"], lookback=50
+            df, trend_analysis["direction"], lookback=50, engine=trend_engine
         ) if df is not None and trend_analysis["direction"] != "neutral" else {
             "is_pullback": False,
             "is_reversal": False
@@ -977,7 +1025,8 @@ class DeepMarketAnalyzer:
         return analysis
 
     def generate_full_report(self, liquidity_data, structure_data, svd_data, ta_data, current_price, 
-                            decision_result=None, htf1_phases=None, htf2_phases=None, global_trend=None):
+                            decision_result=None, htf1_phases=None, htf2_phases=None, global_trend=None,
+                            activity_df=None, activity_structure=None):
         """
         Генерация полного глубокого отчета
         
@@ -985,6 +1034,8 @@ class DeepMarketAnalyzer:
             htf1_phases: исторические фазы для HTF1 (1h)
             htf2_phases: исторические фазы для HTF2 (4h)
             global_trend: глобальный тренд на основе HTF
+            activity_df: activity-бары из потока сделок (None — построитель не подключен)
+            activity_structure: структура рынка по activity-барам
         """
         # Анализ ликвидности
         liquidity_analysis = self.analyze_liquidity_zones(liquidity_data, structure_data, current_price)
@@ -1016,6 +1067,35 @@ class DeepMarketAnalyzer:
             "smart_money": smart_money,
             "scenarios": scenarios,
             "recommendations": recommendations,
-            "historical_phases": historical_analysis
+            "historical_phases": historical_analysis,
+            "activity_bars": self.analyze_activity_bars(activity_df, activity_structure)
+        }
+
+    def analyze_activity_bars(self, activity_df, activity_structure=None, window=20):
+        """
+        Сводка по activity-барам (tick/volume/dollar/imbalance)
+
+        Args:
+            activity_df: OHLCV activity-баров с buy_volume / sell_volume / trades
+            activity_structure: результат MarketStructureEngine по этим барам
+            window: число последних баров для потока
+
+        Returns:
+            dict: bars, trend, avg_trades, buy_share, change_pct — или None без баров
+        """
+        if activity_df is None or activity_df.empty:
+            return None
+        recent = activity_df.iloc[-window:]
+        volume = recent["volume"].sum()
+        buy_share = None
+        if "buy_volume" in recent.columns and volume > 0:
+            buy_share = float(recent["buy_volume"].sum() / volume)
+        first_open = recent["open"].iloc[0]
+        return {
+            "bars": len(activity_df),
+            "trend": (activity_structure or {}).get("trend", "unknown"),
+            "avg_trades": float(recent["trades"].mean()) if "trades" in recent.columns else None,
+            "buy_share": buy_share,
+            "change_pct": float((recent["close"].iloc[-1] - first_open) / first_open * 100) if first_open else 0.0
         }
 
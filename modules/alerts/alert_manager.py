@@ -22,6 +22,7 @@ class AlertManager:
         self.last_phase = None
         self.last_cvd_intent = None
         self.last_execution_alert_time = None
+        self.last_toxicity_alert_time = None
         self.cooldown_minutes = 15  # Минимум 15 минут между похожими алертами
     
     def check_phase_change(self, current_phase, phase_info):
@@ -163,6 +164,47 @@ class AlertManager:
         
         return alert
     
+    def check_flow_toxicity(self, svd_data):
+        """
+        Проверяет токсичность потока ордеров (VPIN) и генерирует алерт
+        
+        Args:
+            svd_data: данные SVD engine (ключ "vpin")
+        
+        Returns:
+            dict: алерт или None
+        """
+        vpin_data = svd_data.get("vpin") or {}
+        if not vpin_data.get("toxic"):
+            return None
+        
+        # Cooldown для алертов токсичности
+        if self.last_toxicity_alert_time:
+            elapsed = (datetime.now() - self.last_toxicity_alert_time).total_seconds() / 60
+            if elapsed < self.cooldown_minutes:
+                return None
+        
+        vpin = vpin_data.get("vpin", 0)
+        cdf = vpin_data.get("vpin_cdf", 0)
+        intent = svd_data.get("intent", "unclear")
+        
+        alert = {
+            "type": "flow_toxicity",
+            "severity": "critical" if cdf >= 0.99 else "high",
+            "vpin": vpin,
+            "vpin_cdf": cdf,
+            "intent": intent,
+            "timestamp": datetime.now(),
+            "message": f"☣️ ТОКСИЧНЫЙ ПОТОК: VPIN={vpin:.2f} (выше {cdf:.0%} истории), intent: {intent}"
+        }
+        
+        self.last_toxicity_alert_time = datetime.now()
+        self.last_alerts.append(alert)
+        
+        logger.warning(f"🚨 АЛЕРТ: Токсичность потока VPIN={vpin:.2f}, CDF={cdf:.2f}")
+        
+        return alert
+    
     def check_strong_signal(self, signal_data):
         """
         Проверяет сильный сигнал (confidence >= 7.0)
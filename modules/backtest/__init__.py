@@ -0,0 +1,29 @@
+"""
+Backtest - walk-forward проигрывание истории через полный пайплайн решений
+Исполнение сигналов с комиссиями и проскальзыванием, статистика сделок
+и параллельный подбор порогов
+"""
+
+from .walk_forward import WalkForwardBacktester
+from .execution import ExecutionSimulator, build_order, parse_levels, parse_price
+from .stats import summarize_trades, equity_curve, max_drawdown_pct
+from .sweep import (
+    ParameterSweep, SweepResultStore, DEFAULT_SPACE, grid_candidates, random_candidates, params_id
+)
+
+__all__ = [
+    'WalkForwardBacktester',
+    'ExecutionSimulator',
+    'build_order',
+    'parse_levels',
+    'parse_price',
+    'summarize_trades',
+    'equity_curve',
+    'max_drawdown_pct',
+    'ParameterSweep',
+    'SweepResultStore',
+    'DEFAULT_SPACE',
+    'grid_candidates',
+    'random_candidates',
+    'params_id'
+]
@@ -0,0 +1,274 @@
+# modules/backtest/execution.py
+
+"""
+Симуляция исполнения сигналов DecisionEngine по свечам
+Уровни сигнала (entry_zone / targets / invalidation) приходят строками
+("$95.10 - $96.00", "$101.50 (ATH)"), разбираются в числа и исполняются
+как лимитный вход, частичные тейки по целям и стоп по инвалидации.
+"""
+
+import re
+
+PRICE_PATTERN = re.compile(r"\$?\s*(-?\d[\d,]*(?:\.\d+)?)")
+
+
+def parse_price(text):
+    """
+    Первая цена из строки уровня ("$101.50 (ATH)" -> 101.5)
+
+    Returns:
+        float или None
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = PRICE_PATTERN.search(str(text))
+    return float(match.group(1).replace(",", "")) if match else None
+
+
+def parse_levels(levels):
+    """
+    Числовые уровни из signal["levels"]
+
+    Returns:
+        {"entry_zone": (low, high) или None, "targets": [float], "invalidation": float или None}
+    """
+    levels = levels or {}
+    entry_zone = None
+    zone = levels.get("entry_zone")
+    if zone:
+        prices = [float(p.replace(",", "")) for p in PRICE_PATTERN.findall(str(zone))]
+        if prices:
+            entry_zone = (min(prices), max(prices))
+    targets = [price for price in (parse_price(t) for t in levels.get("targets") or []) if price is not None]
+    return {
+        "entry_zone": entry_zone,
+        "targets": targets,
+        "invalidation": parse_price(levels.get("invalidation"))
+    }
+
+
+def build_order(signal, entry_fill="edge"):
+    """
+    Лимитная заявка по сигналу
+
+    Args:
+        signal: результат DecisionEngine.analyze
+        entry_fill: "edge" — край зоны ближе к текущей цене (верх зоны для BUY,
+            низ для SELL), "mid" — середина зоны
+
+    Returns:
+        (order, None) или (None, причина отказа)
+    """
+    direction = signal.get("signal")
+    if direction not in ("BUY", "SELL"):
+        return None, "no_direction"
+    levels = parse_levels(signal.get("levels"))
+    zone, stop = levels["entry_zone"], levels["invalidation"]
+    if zone is None or stop is None or not levels["targets"]:
+        return None, "no_levels"
+
+    if entry_fill == "mid":
+        entry = (zone[0] + zone[1]) / 2
+    else:
+        entry = zone[1] if direction == "BUY" else zone[0]
+
+    # Цели — только по ходу сделки, ближайшая первой
+    if direction == "BUY":
+        targets = sorted(t for t in levels["targets"] if t > entry)
+        valid = stop < entry
+    else:
+        targets = sorted((t for t in levels["targets"] if t < entry), reverse=True)
+        valid = stop > entry
+    if not valid or not targets:
+        return None, "invalid_levels"
+
+    return {
+        "direction": direction,
+        "entry": entry,
+        "stop": stop,
+        "targets": targets,
+        "confidence": signal.get("confidence", 0)
+    }, None
+
+
+class ExecutionSimulator:
+    """
+    Исполнение заявок по OHLC свечам (одна позиция одновременно).
+
+    Правила:
+      - вход лимиткой: BUY исполняется, когда low <= entry (по open при гэпе ниже),
+        SELL — когда high >= entry; заявка снимается через entry_timeout свечей
+        или если свеча открылась за стопом;
+      - внутри свечи порядок high/low неизвестен, поэтому стоп проверяется первым,
+        а на свече входа проверяется только стоп;
+      - позиция делится поровну между целями, стоп остаётся на invalidation;
+      - вход, стоп и выход по таймауту — рыночные (со slippage), цели — лимитные;
+      - комиссия fee_pct берётся с оборота каждой стороны.
+    """
+
+    def __init__(self, fee_pct=0.04, slippage_pct=0.02, entry_timeout=4, max_holding=96):
+        """
+        Args:
+            fee_pct: комиссия на сторону, % от оборота
+            slippage_pct: проскальзывание рыночных исполнений, %
+            entry_timeout: сколько свечей ждать исполнения входа
+            max_holding: максимум свечей в позиции (0 — без ограничения)
+        """
+        self.fee_pct = fee_pct
+        self.slippage_pct = slippage_pct
+        self.entry_timeout = entry_timeout
+        self.max_holding = max_holding
+        self.reset()
+
+    def reset(self):
+        self.order = None
+        self.position = None
+        self.counts = {"submitted": 0, "filled": 0, "expired": 0, "invalidated": 0}
+
+    @property
+    def busy(self):
+        """Есть активная заявка или позиция"""
+        return self.order is not None or self.position is not None
+
+    def _slip(self, price, direction, entering):
+        """Цена рыночного исполнения с проскальзыванием против нас"""
+        adverse = (direction == "BUY") == entering
+        return price * (1 + self.slippage_pct / 100) if adverse else price * (1 - self.slippage_pct / 100)
+
+    def submit(self, order, index, timestamp):
+        """Выставляет заявку, сформированную на закрытии свечи index"""
+        self.order = dict(order, signal_index=index, signal_time=timestamp)
+        self.counts["submitted"] += 1
+
+    def on_candle(self, index, timestamp, open_, high, low, close):
+        """
+        Обрабатывает следующую свечу
+
+        Returns:
+            dict закрытой сделки или None
+        """
+        if self.order is not None:
+            self._try_fill(index, timestamp, open_, low, high)
+            if self.position is not None:
+                # Свеча входа: достоверно известен только стоп
+                return self._check_stop(index, timestamp, open_, high, low, entry_candle=True)
+            return None
+        if self.position is None:
+            return None
+
+        trade = self._check_stop(index, timestamp, open_, high, low)
+        if trade is None:
+            trade = self._check_targets(index, timestamp, open_, high, low)
+        if trade is None and self.max_holding and index - self.position["entry_index"] >= self.max_holding:
+            trade = self._exit_rest(index, timestamp, self._slip(close, self.position["direction"], False), "timeout")
+        return trade
+
+    def _try_fill(self, index, timestamp, open_, low, high):
+        order = self.order
+        direction, entry, stop = order["direction"], order["entry"], order["stop"]
+        if (direction == "BUY" and open_ <= stop) or (direction == "SELL" and open_ >= stop):
+            self.order = None
+            self.counts["invalidated"] += 1
+            return
+        if direction == "BUY" and low <= entry:
+            price = min(open_, entry)
+        elif direction == "SELL" and high >= entry:
+            price = max(open_, entry)
+        else:
+            if index - order["signal_index"] >= self.entry_timeout:
+                self.order = None
+                self.counts["expired"] += 1
+            return
+
+        fill = self._slip(price, direction, True)
+        self.position = dict(
+            order, entry_index=index, entry_time=timestamp, entry_price=fill,
+            remaining=1.0, exits=[], targets_left=list(order["targets"])
+        )
+        self.order = None
+        self.counts["filled"] += 1
+
+    def _check_stop(self, index, timestamp, open_, high, low, entry_candle=False):
+        position = self.position
+        direction, stop = position["direction"], position["stop"]
+        if direction == "BUY":
+            if low > stop:
+                return None
+            price = open_ if open_ < stop and not entry_candle else stop
+        else:
+            if high < stop:
+                return None
+            price = open_ if open_ > stop and not entry_candle else stop
+        return self._exit_rest(index, timestamp, self._slip(price, direction, False), "stop")
+
+    def _check_targets(self, index, timestamp, open_, high, low):
+        position = self.position
+        direction = position["direction"]
+        share = 1.0 / len(position["targets"])
+        while position["targets_left"]:
+            target = position["targets_left"][0]
+            if direction == "BUY" and high >= target:
+                price = max(open_, target)
+            elif direction == "SELL" and low <= target:
+                price = min(open_, target)
+            else:
+                break
+            position["targets_left"].pop(0)
+            if not position["targets_left"]:
+                return self._exit_rest(index, timestamp, price, "target")
+            position["exits"].append((share, price))
+            position["remaining"] -= share
+        return None
+
+    def _exit_rest(self, index, timestamp, price, reason):
+        """Закрывает остаток позиции и возвращает сделку"""
+        position = self.position
+        position["exits"].append((position["remaining"], price))
+        self.position = None
+        return self._trade(position, index, timestamp, reason)
+
+    def _trade(self, position, index, timestamp, reason):
+        direction, entry = position["direction"], position["entry_price"]
+        sign = 1 if direction == "BUY" else -1
+        exit_price = sum(share * price for share, price in position["exits"])
+        gross_pct = sum(share * sign * (price - entry) / entry for share, price in position["exits"]) * 100
+        # Оборот: вход (1) + выходы по их ценам относительно входа
+        fees_pct = self.fee_pct * (1 + sum(share * price / entry for share, price in position["exits"]))
+        pnl_pct = gross_pct - fees_pct
+        risk_pct = abs(entry - position["stop"]) / entry * 100
+        return {
+            "direction": direction,
+            "confidence": position["confidence"],
+            "signal_index": position["signal_index"],
+            "signal_time": position["signal_time"],
+            "entry_index": position["entry_index"],
+            "entry_time": position["entry_time"],
+            "entry_price": entry,
+            "stop": position["stop"],
+            "targets": position["targets"],
+            "exit_index": index,
+            "exit_time": timestamp,
+            "exit_price": exit_price,
+            "exit_reason": reason,
+            "targets_hit": len(position["targets"]) - len(position["targets_left"]),
+            "holding_candles": index - position["entry_index"],
+            "gross_pct": gross_pct,
+            "fees_pct": fees_pct,
+            "pnl_pct": pnl_pct,
+            "risk_pct": risk_pct,
+            "r_multiple": pnl_pct / risk_pct if risk_pct > 0 else 0.0
+        }
+
+    def close(self, index, timestamp, price, reason="end_of_data"):
+        """
+        Закрывает позицию по рынку (конец данных) и снимает заявку
+
+        Returns:
+            dict сделки или None
+        """
+        self.order = None
+        if self.position is None:
+            return None
+        return self._exit_rest(index, timestamp, self._slip(price, self.position["direction"], False), reason)
@@ -0,0 +1,79 @@
+# modules/backtest/stats.py
+
+"""
+Агрегированная статистика сделок бэктеста
+"""
+
+import numpy as np
+
+
+def equity_curve(trades, initial=1.0):
+    """
+    Кривая капитала при реинвестировании всего капитала в каждую сделку
+
+    Returns:
+        np.ndarray длины len(trades) + 1 (первое значение — initial)
+    """
+    pnl = np.array([t["pnl_pct"] for t in trades], dtype=np.float64)
+    return initial * np.concatenate([[1.0], np.cumprod(1 + pnl / 100)])
+
+
+def max_drawdown_pct(equity):
+    """Максимальная просадка кривой капитала, %"""
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    return float(((peaks - equity) / peaks).max() * 100)
+
+
+def _group_stats(pnl):
+    """Базовые метрики по массиву pnl_pct"""
+    wins = pnl[pnl > 0]
+    losses = pnl[pnl <= 0]
+    loss_sum = -losses.sum()
+    return {
+        "trades": int(len(pnl)),
+        "wins": int(len(wins)),
+        "losses": int(len(losses)),
+        "win_rate": float(len(wins) / len(pnl)) if len(pnl) else 0.0,
+        "avg_pnl_pct": float(pnl.mean()) if len(pnl) else 0.0,
+        "total_pnl_pct": float(pnl.sum()),
+        "profit_factor": float(wins.sum() / loss_sum) if loss_sum > 0 else (float("inf") if len(wins) else 0.0)
+    }
+
+
+def summarize_trades(trades):
+    """
+    Агрегированная статистика по сделкам
+
+    Args:
+        trades: список сделок ExecutionSimulator
+
+    Returns:
+        dict: win rate, доходность, profit factor, просадка, R, разбивка по направлению и причинам выхода
+    """
+    pnl = np.array([t["pnl_pct"] for t in trades], dtype=np.float64)
+    stats = _group_stats(pnl)
+    equity = equity_curve(trades)
+    wins, losses = pnl[pnl > 0], pnl[pnl <= 0]
+
+    exit_reasons = {}
+    for trade in trades:
+        exit_reasons[trade["exit_reason"]] = exit_reasons.get(trade["exit_reason"], 0) + 1
+
+    stats.update({
+        "total_return_pct": float((equity[-1] - 1) * 100),
+        "max_drawdown_pct": max_drawdown_pct(equity),
+        "avg_win_pct": float(wins.mean()) if len(wins) else 0.0,
+        "avg_loss_pct": float(losses.mean()) if len(losses) else 0.0,
+        "avg_r": float(np.mean([t["r_multiple"] for t in trades])) if trades else 0.0,
+        "fees_pct": float(sum(t["fees_pct"] for t in trades)),
+        "avg_holding_candles": float(np.mean([t["holding_candles"] for t in trades])) if trades else 0.0,
+        "by_direction": {
+            direction: _group_stats(np.array([t["pnl_pct"] for t in trades if t["direction"] == direction], dtype=np.float64))
+            for direction in ("BUY", "SELL")
+        },
+        "exit_reasons": exit_reasons
+    })
+    return stats
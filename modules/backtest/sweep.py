@@ -0,0 +1,425 @@
+# modules/backtest/sweep.py
+
+"""
+Параллельный подбор порогов пайплайна на walk-forward бэктесте
+Признаки (структура, TA, ликвидность, HTF) от перебираемых порогов не
+зависят: они считаются один раз и кэшируются на диск, а процессы пула
+проигрывают только SVD + Decision + исполнение для каждого набора
+параметров. Результаты дописываются частями в каталог (parquet при
+наличии pyarrow, иначе CSV); повторный запуск пропускает наборы,
+посчитанные на той же истории и с теми же настройками бэктеста.
+
+Пул рассчитан на start method "fork" (Linux): признаки наследуются
+процессами без копирования. Без fork (macOS / Windows) каждый процесс
+получает признаки через pickle.
+"""
+
+import hashlib
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import random
+from itertools import product
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from modules.svd.svd_engine import SVDEngine
+from modules.decision.decision_engine import DecisionEngine
+from .walk_forward import WalkForwardBacktester
+
+logger = logging.getLogger(__name__)
+
+# Пространство поиска по умолчанию: список — дискретные значения, кортеж (low, high) — диапазон
+DEFAULT_SPACE = {
+    "TRAP_SCORE_THRESHOLD": [2.0, 3.0, 4.0, 5.0],
+    "CRITICAL_CONFLICT_THRESHOLD": [1, 2, 3],
+    "MIN_CONFIDENCE_TO_TRADE": [3.0, 4.0, 5.0, 6.0],
+    "SVD_CVD_THRESHOLD": [3.0, 5.0, 8.0],
+    "SVD_CVD_SLOPE_THRESHOLD": [0.3, 0.5, 1.0],
+    "SVD_CVD_REVERSAL_THRESHOLD": [1.0, 1.5, 2.0],
+    "SVD_DELTA_TIER_SCALE": [0.5, 1.0, 2.0],
+    "SVD_VELOCITY_TIER_SCALE": [0.5, 1.0, 2.0]
+}
+
+# Ключи признаков, которые SVD / Decision / Trap / Behavior не читают — в общий набор не попадают
+UNUSED_FEATURE_KEYS = {
+    "structure": ("fvg", "orderblocks", "fvg_active", "orderblocks_active"),
+    "liquidity": ("anchored_profiles", "touched_levels", "swept_levels", "volume_profile")
+}
+
+METRIC_COLUMNS = (
+    "trades", "wins", "win_rate", "total_return_pct", "total_pnl_pct", "profit_factor",
+    "max_drawdown_pct", "avg_pnl_pct", "avg_r", "fees_pct", "avg_holding_candles"
+)
+
+
+# ------------------ Пространство параметров ------------------ #
+def grid_candidates(space):
+    """
+    Все комбинации дискретных значений
+
+    Args:
+        space: {параметр: [значения]}
+
+    Returns:
+        list of dict
+    """
+    names = list(space)
+    for name in names:
+        if not isinstance(space[name], list):
+            raise ValueError(f"Для сетки нужен список значений: {name}")
+    return [dict(zip(names, combo)) for combo in product(*(space[name] for name in names))]
+
+
+def _sample(rng, values):
+    if isinstance(values, list):
+        return rng.choice(values)
+    low, high = values
+    if isinstance(low, int) and isinstance(high, int):
+        return rng.randint(low, high)
+    return rng.uniform(low, high)
+
+
+def random_candidates(space, n, seed=0):
+    """
+    n случайных наборов: список — выбор значения, (low, high) — равномерно в диапазоне
+
+    Returns:
+        list of dict
+    """
+    rng = random.Random(seed)
+    return [{name: _sample(rng, values) for name, values in space.items()} for _ in range(n)]
+
+
+def _perturb(rng, values, current, scale):
+    """Соседнее значение: ±1 позиция в списке или гаусс с сигмой scale от диапазона"""
+    if isinstance(values, list):
+        index = values.index(current) if current in values else rng.randrange(len(values))
+        return values[min(max(index + rng.choice((-1, 0, 1)), 0), len(values) - 1)]
+    low, high = values
+    value = min(max(rng.gauss(current, (high - low) * scale), low), high)
+    return int(round(value)) if isinstance(low, int) and isinstance(high, int) else value
+
+
+def params_id(params):
+    """Стабильный id набора параметров (ключ для возобновления)"""
+    payload = json.dumps({k: float(v) for k, v in sorted(params.items())}, sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+def params_config(base_config, params):
+    """Config-объект: настройки base_config, поверх — перебираемые параметры"""
+    values = {name: getattr(base_config, name) for name in dir(base_config) if name.isupper()} if base_config else {}
+    values.update(params)
+    return SimpleNamespace(**values)
+
+
+def compact_features(step):
+    """Признаки свечи без ключей, не влияющих на решение (экономия памяти пула)"""
+    step = dict(step)
+    for key, unused in UNUSED_FEATURE_KEYS.items():
+        step[key] = {name: value for name, value in step[key].items() if name not in unused}
+    return step
+
+
+# ------------------ Хранилище результатов ------------------ #
+def _parquet_available():
+    return importlib.util.find_spec("pyarrow") is not None or importlib.util.find_spec("fastparquet") is not None
+
+
+class SweepResultStore:
+    """
+    Результаты подбора частями в каталоге: part-00000.parquet (или .csv без pyarrow).
+    Каждая часть пишется атомарно (tmp + os.replace), поэтому прерванный
+    запуск теряет только несохранённый буфер.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.extension = "parquet" if _parquet_available() else "csv"
+
+    def _parts(self):
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("part-") and name.endswith((".parquet", ".csv"))
+        )
+
+    def load(self, results_key=None):
+        """
+        Сохранённые результаты (DataFrame)
+
+        Args:
+            results_key: отпечаток истории и настроек бэктеста — только строки,
+                посчитанные с ним (None — все строки)
+        """
+        frames = []
+        for name in self._parts():
+            path = os.path.join(self.directory, name)
+            frames.append(pd.read_parquet(path) if name.endswith(".parquet") else pd.read_csv(path))
+        results = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if results_key is None or results.empty:
+            return results
+        if "results_key" not in results.columns:
+            return results.iloc[:0]
+        return results[results["results_key"] == results_key].reset_index(drop=True)
+
+    def done_ids(self, results_key=None):
+        """id уже посчитанных наборов (с отпечатком results_key)"""
+        results = self.load(results_key)
+        return set(results["run_id"]) if "run_id" in results.columns else set()
+
+    def append(self, rows):
+        """Сохраняет пачку строк новой частью"""
+        if not rows:
+            return
+        path = os.path.join(self.directory, f"part-{len(self._parts()):05d}.{self.extension}")
+        tmp_path = f"{path}.tmp"
+        frame = pd.DataFrame(rows)
+        if self.extension == "parquet":
+            frame.to_parquet(tmp_path, index=False)
+        else:
+            frame.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+
+# ------------------ Оценка набора параметров ------------------ #
+def evaluate_params(shared, params):
+    """
+    Прогон одного набора параметров по общим признакам
+
+    Args:
+        shared: {"df", "features", "backtester", "base_config", "results_key"}
+        params: {параметр: значение}
+
+    Returns:
+        dict: строка результата (run_id, results_key, параметры, метрики)
+    """
+    config = params_config(shared["base_config"], params)
+    result = shared["backtester"].replay(shared["df"], shared["features"], SVDEngine(config), DecisionEngine(config))
+    stats = result["stats"]
+    row = {"run_id": params_id(params), "results_key": shared.get("results_key"), **params}
+    row.update({name: stats[name] for name in METRIC_COLUMNS})
+    row.update({f"signals_{name.lower()}": count for name, count in result["signals"].items()})
+    row["orders_filled"] = result["orders"]["filled"]
+    row["elapsed_sec"] = result["elapsed_sec"]
+    return row
+
+
+# Общие данные процесса пула (наследуются при fork, без копирования через pickle)
+_worker_shared = {}
+
+
+def _init_worker(shared):
+    _worker_shared.update(shared)
+    # Пайплайн логирует каждое решение — в воркерах это только шум
+    logging.disable(logging.WARNING)
+
+
+def _evaluate_in_worker(params):
+    return evaluate_params(_worker_shared, params)
+
+
+class ParameterSweep:
+    """
+    Подбор порогов на одной истории: сетка, случайный поиск или адаптивный
+    случайный поиск (сужение вокруг лучших наборов по раундам).
+
+    Признаки считаются один раз (кэш features.pkl в output_dir), наборы
+    параметров раздаются пулу из workers процессов.
+    """
+
+    def __init__(self, df, output_dir, backtester=None, base_config=None, trades=None, orderbooks=None,
+                 workers=None, flush_every=16):
+        """
+        Args:
+            df: история OHLCV
+            output_dir: каталог результатов и кэша признаков
+            backtester: WalkForwardBacktester (окна, комиссии, исполнение)
+            base_config: Config с неперебираемыми настройками
+            trades / orderbooks: записанные сделки и стаканы для SVD (опционально)
+            workers: число процессов (по умолчанию все ядра)
+            flush_every: сколько строк копить перед записью части
+        """
+        self.df = df.reset_index(drop=True)
+        self.output_dir = output_dir
+        self.backtester = backtester or WalkForwardBacktester(config=base_config)
+        self.base_config = base_config
+        self.trades = trades
+        self.orderbooks = orderbooks
+        self.workers = workers or os.cpu_count() or 1
+        self.flush_every = flush_every
+        self.store = SweepResultStore(output_dir)
+        self.features = None
+        self.last_evaluated = 0
+        self._results_key = None
+
+    def _features_key(self):
+        """Отпечаток истории и настроек признаков (кэш не используется при их изменении)"""
+        digest = hashlib.blake2b(digest_size=16)
+        columns = ["timestamp", "open", "high", "low", "close", "volume"]
+        digest.update(np.ascontiguousarray(self.df[columns].to_numpy(dtype=np.float64)).tobytes())
+        bt = self.backtester
+        settings = (bt.window, bt.htf_window, bt.htf_intervals, bt.trades_limit, bt.incremental,
+                    len(self.trades or ()), len(self.orderbooks or ()))
+        digest.update(repr(settings).encode())
+        return digest.hexdigest()
+
+    def results_key(self):
+        """
+        Отпечаток, с которым сохраняются результаты: признаки + исполнение
+        (комиссии, проскальзывание, таймауты) + неперебираемые настройки base_config.
+        Строки с другим отпечатком при возобновлении не используются.
+        """
+        if self._results_key is None:
+            bt = self.backtester
+            sim = bt.simulator
+            base = self.base_config
+            config_values = sorted(
+                (name, repr(getattr(base, name))) for name in dir(base)
+                if name.isupper() and not callable(getattr(base, name))
+            ) if base is not None else []
+            settings = (self._features_key(), sim.fee_pct, sim.slippage_pct, sim.entry_timeout, sim.max_holding,
+                        bt.entry_fill, config_values)
+            self._results_key = hashlib.blake2b(repr(settings).encode(), digest_size=8).hexdigest()
+        return self._results_key
+
+    def prepare(self):
+        """Считает (или загружает из кэша) общие признаки"""
+        if self.features is not None:
+            return self.features
+        path = os.path.join(self.output_dir, "features.pkl")
+        key = self._features_key()
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                cached = pickle.load(f)
+            if cached.get("key") == key:
+                self.features = cached["features"]
+                return self.features
+
+        self.features = [compact_features(step) for step in self.backtester.iter_features(self.df, self.trades, self.orderbooks)]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"key": key, "features": self.features}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return self.features
+
+    def run(self, candidates):
+        """
+        Считает наборы, которых ещё нет в хранилище
+
+        Args:
+            candidates: список наборов параметров
+
+        Returns:
+            DataFrame всех сохранённых результатов
+        """
+        key = self.results_key()
+        current = self.store.load(key)
+        done = set(current["run_id"]) if "run_id" in current.columns else set()
+        stale = len(self.store.load()) - len(current)
+        if stale:
+            logger.warning(f"Подбор параметров: {stale} строк в {self.output_dir} посчитаны на другой истории "
+                           f"или с другими настройками — не используются")
+        pending, seen = [], set(done)
+        for params in candidates:
+            run_id = params_id(params)
+            if run_id not in seen:
+                seen.add(run_id)
+                pending.append(params)
+        self.last_evaluated = 0
+        if not pending:
+            return self.store.load(key)
+
+        shared = {"df": self.df, "features": self.prepare(), "backtester": self.backtester,
+                  "base_config": self.base_config, "results_key": key}
+        logger.info(f"Подбор параметров: {len(pending)} наборов ({len(done)} уже посчитано), процессов: {self.workers}")
+        buffer = []
+        try:
+            if self.workers == 1:
+                results = (evaluate_params(shared, params) for params in pending)
+                self._collect(results, buffer)
+            else:
+                # fork: процессы наследуют признаки без сериализации
+                methods = multiprocessing.get_all_start_methods()
+                if "fork" not in methods:
+                    logger.warning("Подбор параметров: start method fork недоступен — признаки "
+                                   "копируются в каждый процесс через pickle (память и время старта)")
+                context = multiprocessing.get_context("fork" if "fork" in methods else None)
+                with context.Pool(self.workers, initializer=_init_worker, initargs=(shared,)) as pool:
+                    self._collect(pool.imap_unordered(_evaluate_in_worker, pending), buffer)
+        finally:
+            # Прерванный запуск сохраняет всё посчитанное
+            self.store.append(buffer)
+        return self.store.load(key)
+
+    def _collect(self, results, buffer):
+        for row in results:
+            buffer.append(row)
+            self.last_evaluated += 1
+            if len(buffer) >= self.flush_every:
+                self.store.append(buffer)
+                buffer.clear()
+
+    def run_grid(self, space=None):
+        """Полная сетка (по умолчанию DEFAULT_SPACE)"""
+        return self.run(grid_candidates(space or DEFAULT_SPACE))
+
+    def run_random(self, space=None, n=100, seed=0):
+        """n случайных наборов из space"""
+        return self.run(random_candidates(space or DEFAULT_SPACE, n, seed))
+
+    def run_adaptive(self, space=None, rounds=4, per_round=None, top_k=None, metric="total_return_pct",
+                     min_trades=1, seed=0):
+        """
+        Адаптивный случайный поиск: первый раунд — случайные наборы, дальше
+        соседи лучших top_k наборов с сужающимся шагом
+
+        Args:
+            space: пространство поиска
+            rounds: число раундов
+            per_round: наборов за раунд (по умолчанию 4 на процесс)
+            top_k: сколько лучших наборов расширять (по умолчанию per_round // 4)
+            metric: метрика для ранжирования (больше — лучше)
+            min_trades: минимум сделок, чтобы набор участвовал в ранжировании
+            seed: seed генератора
+
+        Returns:
+            DataFrame всех сохранённых результатов
+        """
+        space = space or DEFAULT_SPACE
+        per_round = per_round or self.workers * 4
+        top_k = top_k or max(per_round // 4, 1)
+        rng = random.Random(seed)
+        results = self.run(random_candidates(space, per_round, seed))
+        for round_index in range(1, rounds):
+            leaders = self.best(metric, min_trades=min_trades, n=top_k, results=results)
+            if leaders.empty:
+                candidates = random_candidates(space, per_round, seed + round_index)
+            else:
+                scale = 0.25 * 0.5 ** (round_index - 1)
+                parents = leaders[list(space)].to_dict("records")
+                candidates = [
+                    {name: _perturb(rng, values, parents[i % len(parents)][name], scale) for name, values in space.items()}
+                    for i in range(per_round)
+                ]
+            results = self.run(candidates)
+        return results
+
+    def best(self, metric="total_return_pct", min_trades=1, n=10, results=None):
+        """
+        Лучшие наборы по метрике
+
+        Returns:
+            DataFrame, отсортированный по убыванию metric
+        """
+        results = self.store.load(self.results_key()) if results is None else results
+        if results.empty:
+            return results
+        results = results[results["trades"] >= min_trades]
+        return results.sort_values(metric, ascending=False).head(n).reset_index(drop=True)
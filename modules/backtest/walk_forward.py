@@ -0,0 +1,260 @@
+# modules/backtest/walk_forward.py
+
+"""
+Walk-forward бэктест полного пайплайна решений
+Исторические свечи проигрываются по одной: на закрытии каждой свечи окно
+последних KLINE_LIMIT свечей проходит MarketStructure → TA → Liquidity →
+SVD → Trap → Decision (как в основном цикле main.py), сигнал исполняется
+на следующих свечах через ExecutionSimulator.
+
+Движки инкрементальные (структура, индикаторы, реестр уровней с sweeps и
+касаниями, профили обновляются только по новой свече), поэтому шаг стоит
+O(окно), а не O(история). HTF-свечи собираются из базовых локально; HTF-анализ
+пересчитывается только при закрытии HTF-свечи (AnalysisCache).
+"""
+
+import time
+
+import numpy as np
+
+from modules.bars.resampler import resample_ohlcv, interval_to_ms
+from modules.market_structure.market_structure_engine import MarketStructureEngine
+from modules.ta_engine.ta_engine import TAEngine
+from modules.liquidity.liquidity_engine import LiquidityEngine
+from modules.svd.svd_engine import SVDEngine
+from modules.decision.decision_engine import DecisionEngine
+from modules.utils.result_cache import AnalysisCache
+from .execution import ExecutionSimulator, build_order
+from .stats import summarize_trades
+
+# SVD без сделок / стакана (как в main.py)
+NO_SVD = {"intent": "unclear", "confidence": 0}
+
+
+class WalkForwardBacktester:
+    """
+    Бэктест DecisionEngine свеча за свечой.
+
+    run() = iter_features() (структура, TA, ликвидность, HTF, срез сделок и
+    стакана на закрытии свечи) + replay() (SVD, решение, исполнение).
+    Признаки не зависят от порогов DecisionEngine / SVD, поэтому их можно
+    посчитать один раз и проиграть с разными настройками.
+    """
+
+    def __init__(self, config=None, window=None, htf_window=None, htf_intervals=None,
+                 fee_pct=0.04, slippage_pct=0.02, entry_timeout=4, max_holding=96,
+                 entry_fill="edge", trades_limit=None, incremental=True):
+        """
+        Args:
+            config: Config (пороги DecisionEngine, KLINE_LIMIT, HTF_*)
+            window: свечей в окне анализа (по умолчанию KLINE_LIMIT)
+            htf_window: HTF-свечей в окне (по умолчанию HTF_LIMIT)
+            htf_intervals: старшие таймфреймы (по умолчанию HTF_1_INTERVAL, HTF_2_INTERVAL)
+            fee_pct: комиссия на сторону, %
+            slippage_pct: проскальзывание рыночных исполнений, %
+            entry_timeout: свечей ожидания входа
+            max_holding: максимум свечей в позиции
+            entry_fill: "edge" | "mid" — цена входа в зоне (см. build_order)
+            trades_limit: сколько последних сделок отдавать SVD (по умолчанию WS_TRADES_BUFFER)
+            incremental: инкрементальные структура и индикаторы (False — пакетный
+                пересчёт окна на каждой свече, для сверки и бенчмарков)
+        """
+        self.config = config
+        self.window = window or getattr(config, "KLINE_LIMIT", 100)
+        self.htf_window = htf_window or getattr(config, "HTF_LIMIT", 200)
+        if htf_intervals is None:
+            htf_intervals = (getattr(config, "HTF_1_INTERVAL", "1h"), getattr(config, "HTF_2_INTERVAL", "4h"))
+        self.htf_intervals = tuple(htf_intervals)
+        self.entry_fill = entry_fill
+        self.trades_limit = trades_limit or getattr(config, "WS_TRADES_BUFFER", 1000)
+        self.incremental = incremental
+        self.simulator = ExecutionSimulator(
+            fee_pct=fee_pct, slippage_pct=slippage_pct, entry_timeout=entry_timeout, max_holding=max_holding
+        )
+        self._now_ms = 0
+
+    def _clock(self):
+        """Время закрытия текущей свечи (секунды) — для decay и устаревания уровней"""
+        return self._now_ms / 1000
+
+    # ------------------ Признаки ------------------ #
+    def iter_features(self, df, trades=None, orderbooks=None):
+        """
+        Признаки на закрытии каждой свечи (генератор)
+
+        Args:
+            df: история OHLCV (формат DataFeed), свечи по возрастанию времени
+            trades: записанные сделки [{price, volume, side, timestamp}] по возрастанию времени
+            orderbooks: снапшоты стакана [{timestamp, bids, asks}] по возрастанию времени
+
+        Yields:
+            dict: index, timestamp, close_time, price, structure, ta, liquidity,
+                htf_context, htf_liquidity, trades, orderbook
+        """
+        df = df.reset_index(drop=True)
+        if len(df) < max(self.window, 2):
+            return
+        timestamps = df['timestamp'].to_numpy(dtype=np.int64)
+        closes = df['close'].to_numpy(dtype=np.float64)
+        base_ms = int(np.median(np.diff(timestamps)))
+
+        structure_engine = MarketStructureEngine(incremental=self.incremental)
+        ta_engine = TAEngine(incremental=self.incremental)
+        liquidity_engine = LiquidityEngine(clock=self._clock)
+        htf_cache = AnalysisCache(maxsize=4 * len(self.htf_intervals))
+        htf_frames = {}
+        for interval in self.htf_intervals:
+            htf_df = resample_ohlcv(df, interval)
+            htf_frames[interval] = (htf_df, htf_df['timestamp'].to_numpy(dtype=np.int64) + interval_to_ms(interval))
+
+        trade_ts = np.array([t.get("timestamp", 0) for t in trades], dtype=np.int64) if trades else None
+        book_ts = np.array([b.get("timestamp", 0) for b in orderbooks], dtype=np.int64) if orderbooks else None
+
+        for i in range(self.window - 1, len(df)):
+            close_time = int(timestamps[i]) + base_ms
+            self._now_ms = close_time
+            window = df.iloc[i + 1 - self.window:i + 1]
+
+            structure = structure_engine.analyze(window, series=(None, base_ms))
+            ta = ta_engine.analyze(window, series=(None, base_ms))
+            liquidity = liquidity_engine.analyze(window, structure, series=(None, base_ms))
+
+            # HTF: только закрытые к этому моменту свечи
+            htf_context, htf_liquidity = {}, {}
+            for n, interval in enumerate(self.htf_intervals, 1):
+                htf_df, htf_close_ts = htf_frames[interval]
+                count = int(np.searchsorted(htf_close_ts, close_time, side="right"))
+                if count < 2:
+                    htf_context[f"htf{n}"] = "unknown"
+                    htf_liquidity[f"htf{n}"] = {}
+                    continue
+                htf_window = htf_df.iloc[max(count - self.htf_window, 0):count]
+                htf_struct = htf_cache.get_or_compute(
+                    "structure", htf_window,
+                    lambda: structure_engine.analyze(htf_window, series=(None, interval)), interval=interval
+                )
+                htf_liq = htf_cache.get_or_compute(
+                    "liquidity", htf_window,
+                    lambda: liquidity_engine.analyze(htf_window, htf_struct, series=(None, interval)), interval=interval
+                )
+                htf_context[f"htf{n}"] = htf_struct.get("trend", "unknown")
+                htf_liquidity[f"htf{n}"] = htf_liq.get("direction", {}) if htf_liq else {}
+
+            recent_trades = None
+            if trade_ts is not None:
+                end = int(np.searchsorted(trade_ts, close_time, side="left"))
+                recent_trades = trades[max(end - self.trades_limit, 0):end] or None
+            orderbook = None
+            if book_ts is not None:
+                last = int(np.searchsorted(book_ts, close_time, side="left")) - 1
+                orderbook = orderbooks[last] if last >= 0 else None
+
+            yield {
+                "index": i,
+                "timestamp": int(timestamps[i]),
+                "close_time": close_time,
+                "price": float(closes[i]),
+                "structure": structure,
+                "ta": ta,
+                "liquidity": liquidity,
+                "htf_context": htf_context,
+                "htf_liquidity": htf_liquidity,
+                "trades": recent_trades,
+                "orderbook": orderbook
+            }
+
+    # ------------------ Решение и исполнение ------------------ #
+    @staticmethod
+    def decide(features, svd_engine, decision_engine):
+        """SVD + DecisionEngine по признакам одной свечи (как шаги 4–5 main.py)"""
+        if features["trades"] and features["orderbook"]:
+            svd_data = svd_engine.analyze(features["trades"], features["orderbook"], atr_pct=features["ta"].get("atr_pct"))
+        else:
+            svd_data = dict(NO_SVD)
+        return decision_engine.analyze(
+            features["liquidity"],
+            svd_data,
+            features["structure"],
+            features["ta"],
+            current_price=features["price"],
+            htf_context=features["htf_context"],
+            htf_liquidity=features["htf_liquidity"]
+        )
+
+    def replay(self, df, features, svd_engine=None, decision_engine=None):
+        """
+        Решения и исполнение по готовым признакам
+
+        Свеча i сначала исполняет заявки, выставленные раньше, затем на её
+        закрытии принимается решение — заглядывания вперёд нет.
+
+        Args:
+            df: та же история OHLCV, что и для iter_features
+            features: итерируемые признаки (iter_features или сохранённый список)
+            svd_engine: SVDEngine (по умолчанию новый)
+            decision_engine: DecisionEngine (по умолчанию новый с self.config)
+
+        Returns:
+            dict: trades, stats, signals, orders, candles, elapsed_sec
+        """
+        started = time.perf_counter()
+        svd_engine = svd_engine or SVDEngine(self.config)
+        decision_engine = decision_engine or DecisionEngine(self.config)
+        df = df.reset_index(drop=True)
+        timestamps = df['timestamp'].to_numpy(dtype=np.int64).tolist()
+        opens, highs, lows, closes = (df[name].to_numpy(dtype=np.float64).tolist() for name in ("open", "high", "low", "close"))
+
+        simulator = self.simulator
+        simulator.reset()
+        trades = []
+        signals = {"BUY": 0, "SELL": 0, "WAIT": 0}
+        rejected = {}
+        last_index = None
+
+        for step in features:
+            i = step["index"]
+            trade = simulator.on_candle(i, timestamps[i], opens[i], highs[i], lows[i], closes[i])
+            if trade is not None:
+                trades.append(trade)
+
+            signal = self.decide(step, svd_engine, decision_engine)
+            direction = signal.get("signal", "WAIT")
+            signals[direction] = signals.get(direction, 0) + 1
+            if direction in ("BUY", "SELL"):
+                if simulator.busy:
+                    rejected["busy"] = rejected.get("busy", 0) + 1
+                else:
+                    order, reason = build_order(signal, self.entry_fill)
+                    if order is None:
+                        rejected[reason] = rejected.get(reason, 0) + 1
+                    else:
+                        simulator.submit(order, i, timestamps[i])
+            last_index = i
+
+        if last_index is not None:
+            trade = simulator.close(last_index, timestamps[last_index], closes[last_index])
+            if trade is not None:
+                trades.append(trade)
+
+        return {
+            "trades": trades,
+            "stats": summarize_trades(trades),
+            "signals": signals,
+            "orders": dict(simulator.counts, rejected=rejected),
+            "candles": sum(signals.values()),
+            "elapsed_sec": time.perf_counter() - started
+        }
+
+    def run(self, df, trades=None, orderbooks=None):
+        """
+        Полный прогон: признаки считаются по ходу проигрывания
+
+        Args:
+            df: история OHLCV
+            trades: записанные сделки (опционально, для SVD)
+            orderbooks: снапшоты стакана (опционально, для SVD)
+
+        Returns:
+            dict: см. replay()
+        """
+        return self.replay(df, self.iter_features(df, trades, orderbooks))
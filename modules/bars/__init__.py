@@ -0,0 +1,17 @@
+"""
+Bars - хранилище свечей и activity-бары
+Колоночный CandleStore, построение tick/volume/dollar/imbalance баров из сделок
+и локальный ресэмплинг в старшие таймфреймы
+"""
+
+from .candle_store import CandleStore
+from .bar_builder import BarBuilder
+from .resampler import TimeframeResampler, resample_ohlcv, interval_to_ms
+
+__all__ = [
+    'CandleStore',
+    'BarBuilder',
+    'TimeframeResampler',
+    'resample_ohlcv',
+    'interval_to_ms'
+]
@@ -0,0 +1,237 @@
+# modules/bars/bar_builder.py
+
+"""
+Построитель activity-баров из потока сделок
+Tick / Volume / Dollar бары и imbalance-бары (López de Prado)
+"""
+
+import logging
+from .candle_store import CandleStore
+
+logger = logging.getLogger(__name__)
+
+
+class BarBuilder:
+    """
+    Собирает бары из потока сделок с O(1) стоимостью на сделку.
+
+    Типы баров:
+      - tick: бар закрывается после threshold сделок
+      - volume: бар закрывается при накоплении threshold объёма
+      - dollar: бар закрывается при накоплении threshold оборота (price * volume)
+      - tick_imbalance / volume_imbalance / dollar_imbalance:
+        бар закрывается, когда |Σ b_t * m_t| превышает ожидаемый дисбаланс
+        E[T] * |E[b * m]| (EWMA по прошлым барам)
+
+    Закрытые бары пишутся в CandleStore с колонками OHLCV + buy_volume,
+    sell_volume, trades — это тот же формат, что у klines, поэтому
+    MarketStructureEngine / TAEngine / LiquidityEngine работают без изменений.
+    """
+
+    BAR_TYPES = ("tick", "volume", "dollar", "tick_imbalance", "volume_imbalance", "dollar_imbalance")
+    EXTRA_COLUMNS = ("buy_volume", "sell_volume", "trades")
+
+    def __init__(self, bar_type="volume", threshold=100.0, store=None, maxlen=5000, ewma_span=20, on_bar=None):
+        """
+        Args:
+            bar_type: тип бара (см. BAR_TYPES)
+            threshold: порог закрытия бара; для imbalance-баров — начальное
+                ожидаемое число сделок в баре (E[T] на прогреве)
+            store: CandleStore для закрытых баров (создаётся, если не передан)
+            maxlen: размер создаваемого CandleStore
+            ewma_span: окно EWMA для оценок imbalance-баров
+            on_bar: callback(bar_dict), вызывается при закрытии бара
+        """
+        if bar_type not in self.BAR_TYPES:
+            raise ValueError(f"Неизвестный тип бара: {bar_type}. Допустимые: {', '.join(self.BAR_TYPES)}")
+        if threshold <= 0:
+            raise ValueError("threshold должен быть > 0")
+
+        self.bar_type = bar_type
+        self.threshold = float(threshold)
+        self.store = store if store is not None else CandleStore(maxlen=maxlen, extra_columns=self.EXTRA_COLUMNS)
+        self.on_bar = on_bar
+
+        self._measure = bar_type.replace("_imbalance", "")
+        self._imbalance = bar_type.endswith("_imbalance")
+        self._alpha = 2.0 / (ewma_span + 1)
+
+        # Оценки для imbalance-баров
+        self._expected_ticks = self.threshold
+        self._expected_signed = None  # EWMA E[b * m] (None до первого бара)
+        self._last_price = None
+        self._last_sign = 1
+
+        self.bars_emitted = 0
+        self._reset_bar()
+
+    def _reset_bar(self):
+        self._open = None
+        self._high = None
+        self._low = None
+        self._close = None
+        self._ts = None
+        self._volume = 0.0
+        self._buy_volume = 0.0
+        self._sell_volume = 0.0
+        self._trades = 0
+        self._accum = 0.0  # Σ m_t (стандартные бары) или Σ b_t * m_t (imbalance)
+
+    def _trade_measure(self, price, volume):
+        if self._measure == "tick":
+            return 1.0
+        if self._measure == "volume":
+            return volume
+        return price * volume
+
+    def _trade_sign(self, price, side):
+        """Направление сделки: по side, иначе по tick rule"""
+        if side == "buy":
+            sign = 1
+        elif side == "sell":
+            sign = -1
+        elif self._last_price is not None and price != self._last_price:
+            sign = 1 if price > self._last_price else -1
+        else:
+            sign = self._last_sign
+        self._last_sign = sign
+        self._last_price = price
+        return sign
+
+    @property
+    def expected_ticks(self):
+        """EWMA длины бара в сделках (E[T]) для imbalance-баров"""
+        return self._expected_ticks
+
+    def expected_imbalance(self):
+        """Текущий порог закрытия imbalance-бара"""
+        if self._expected_signed is None:
+            return None
+        return self._expected_ticks * abs(self._expected_signed)
+
+    def add_trade(self, trade):
+        """
+        Добавляет сделку в формирующийся бар
+
+        Args:
+            trade: {price, volume, side, timestamp}
+
+        Returns:
+            dict закрытого бара или None
+        """
+        try:
+            price = float(trade.get("price", 0) or 0)
+            volume = float(trade.get("volume", 0) or 0)
+        except (TypeError, ValueError, AttributeError):
+            return None
+        if price <= 0:
+            return None
+
+        side = trade.get("side")
+        sign = self._trade_sign(price, side)
+
+        if self._open is None:
+            self._open = self._high = self._low = price
+            self._ts = trade.get("timestamp") or 0
+        elif price > self._high:
+            self._high = price
+        elif price < self._low:
+            self._low = price
+        self._close = price
+        self._volume += volume
+        if sign > 0:
+            self._buy_volume += volume
+        else:
+            self._sell_volume += volume
+        self._trades += 1
+
+        measure = self._trade_measure(price, volume)
+        if self._imbalance:
+            self._accum += sign * measure
+            if self._should_close_imbalance():
+                return self._close_bar()
+        else:
+            self._accum += measure
+            if self._accum >= self.threshold:
+                return self._close_bar()
+        return None
+
+    def add_trades(self, trades):
+        """
+        Добавляет пачку сделок
+
+        Returns:
+            list закрытых баров
+        """
+        bars = []
+        for trade in trades:
+            bar = self.add_trade(trade)
+            if bar:
+                bars.append(bar)
+        return bars
+
+    def _should_close_imbalance(self):
+        expected = self.expected_imbalance()
+        if expected is None:
+            # Прогрев: первый бар закрываем по числу сделок
+            return self._trades >= self._expected_ticks
+        if expected <= 0:
+            return self._trades >= self._expected_ticks
+        return abs(self._accum) >= expected
+
+    def _close_bar(self):
+        bar = {
+            "timestamp": int(self._ts),
+            "open": self._open,
+            "high": self._high,
+            "low": self._low,
+            "close": self._close,
+            "volume": self._volume,
+            "buy_volume": self._buy_volume,
+            "sell_volume": self._sell_volume,
+            "trades": float(self._trades)
+        }
+        self.store.append(**bar)
+        self.bars_emitted += 1
+
+        if self._imbalance:
+            # Обновляем EWMA-оценки: длина бара и средний знаковый вклад сделки
+            signed_mean = self._accum / self._trades
+            a = self._alpha
+            if self._expected_signed is None:
+                self._expected_signed = signed_mean
+            else:
+                self._expected_signed = a * signed_mean + (1 - a) * self._expected_signed
+            # E[T] учит длину каждого бара, включая первый (порог прогрева — лишь стартовая оценка)
+            self._expected_ticks = a * self._trades + (1 - a) * self._expected_ticks
+            # Защита от вырождения (слишком короткие/длинные бары)
+            self._expected_ticks = min(max(self._expected_ticks, 1.0), self.threshold * 10)
+
+        self._reset_bar()
+
+        if self.on_bar:
+            try:
+                self.on_bar(bar)
+            except Exception as e:
+                logger.error(f"Ошибка в on_bar callback: {e}")
+        return bar
+
+    def forming_bar(self):
+        """Возвращает формирующийся (незакрытый) бар или None"""
+        if self._open is None:
+            return None
+        return {
+            "timestamp": int(self._ts),
+            "open": self._open,
+            "high": self._high,
+            "low": self._low,
+            "close": self._close,
+            "volume": self._volume,
+            "buy_volume": self._buy_volume,
+            "sell_volume": self._sell_volume,
+            "trades": float(self._trades)
+        }
+
+    def to_dataframe(self, last=None):
+        """OHLCV DataFrame закрытых баров (формат DataFeed)"""
+        return self.store.to_dataframe(last=last)
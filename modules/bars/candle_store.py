@@ -0,0 +1,186 @@
+# modules/bars/candle_store.py
+
+"""
+Колоночное хранилище свечей (numpy)
+Единый буфер OHLCV для klines, activity-баров и производных таймфреймов
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class CandleStore:
+    """
+    Колоночный буфер свечей с O(1) амортизированным добавлением.
+
+    Каждая колонка — отдельный numpy-массив. Данные лежат непрерывным куском
+    [start:end], поэтому column() отдаёт view без копирования.
+    При maxlen буфер держит ёмкость 2 * maxlen и раз в maxlen добавлений
+    сдвигает хвост в начало (O(1) амортизированно).
+    """
+
+    BASE_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+    def __init__(self, maxlen=None, extra_columns=(), initial_capacity=256):
+        """
+        Args:
+            maxlen: максимальное количество хранимых свечей (None = без ограничения)
+            extra_columns: дополнительные float-колонки (например buy_volume)
+            initial_capacity: начальная ёмкость буфера
+        """
+        self.maxlen = maxlen
+        self.columns = self.BASE_COLUMNS + tuple(c for c in extra_columns if c not in self.BASE_COLUMNS)
+        capacity = max(initial_capacity, 2 * maxlen) if maxlen else initial_capacity
+        self._data = {name: self._new_array(name, capacity) for name in self.columns}
+        self._start = 0
+        self._end = 0
+        self._version = 0  # Растёт при каждом изменении (для кэшей и снапшотов)
+
+    @staticmethod
+    def _new_array(name, capacity):
+        dtype = np.int64 if name == "timestamp" else np.float64
+        return np.zeros(capacity, dtype=dtype)
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def version(self):
+        """Монотонный номер версии содержимого"""
+        return self._version
+
+    @property
+    def empty(self):
+        return self._end == self._start
+
+    def _ensure_capacity(self):
+        """Освобождает место под одну свечу в конце буфера"""
+        capacity = len(self._data["timestamp"])
+        if self._end < capacity:
+            return
+        size = len(self)
+        if self.maxlen and size >= self.maxlen:
+            # Сдвигаем последние maxlen-1 свечей в начало буфера
+            keep = self.maxlen - 1
+            for arr in self._data.values():
+                arr[:keep] = arr[self._end - keep:self._end]
+            self._start = 0
+            self._end = keep
+            return
+        # Растим буфер вдвое
+        new_capacity = capacity * 2
+        for name, arr in self._data.items():
+            grown = self._new_array(name, new_capacity)
+            grown[:size] = arr[self._start:self._end]
+            self._data[name] = grown
+        self._start = 0
+        self._end = size
+
+    def append(self, timestamp, open, high, low, close, volume, **extra):
+        """
+        Добавляет закрытую свечу в конец хранилища
+
+        Args:
+            timestamp: время открытия свечи (ms)
+            open/high/low/close/volume: значения свечи
+            **extra: значения дополнительных колонок
+        """
+        self._ensure_capacity()
+        i = self._end
+        data = self._data
+        data["timestamp"][i] = timestamp
+        data["open"][i] = open
+        data["high"][i] = high
+        data["low"][i] = low
+        data["close"][i] = close
+        data["volume"][i] = volume
+        for name in self.columns[len(self.BASE_COLUMNS):]:
+            data[name][i] = extra.get(name, 0.0)
+        self._end += 1
+        if self.maxlen and len(self) > self.maxlen:
+            self._start += 1
+        self._version += 1
+
+    def update_last(self, **fields):
+        """
+        Обновляет поля последней свечи (формирующаяся свеча)
+
+        Args:
+            **fields: имя колонки → новое значение
+        """
+        if self.empty:
+            raise IndexError("CandleStore пуст")
+        i = self._end - 1
+        for name, value in fields.items():
+            self._data[name][i] = value
+        self._version += 1
+
+    def last(self):
+        """Возвращает последнюю свечу как dict или None"""
+        if self.empty:
+            return None
+        i = self._end - 1
+        return {name: self._data[name][i].item() for name in self.columns}
+
+    def column(self, name, last=None):
+        """
+        Возвращает view колонки (без копирования)
+
+        Args:
+            name: имя колонки
+            last: вернуть только последние N значений
+        """
+        start = self._start if last is None else max(self._start, self._end - last)
+        return self._data[name][start:self._end]
+
+    def to_dataframe(self, last=None, columns=None):
+        """
+        Формирует DataFrame в формате DataFeed (timestamp int64, OHLCV float64)
+
+        Args:
+            last: только последние N свечей
+            columns: подмножество колонок (по умолчанию все)
+        """
+        names = columns or self.columns
+        return pd.DataFrame({name: self.column(name, last) for name in names})
+
+    def extend_from_dataframe(self, df):
+        """
+        Загружает свечи из DataFrame (например, история из REST)
+
+        Args:
+            df: DataFrame с колонками timestamp/open/high/low/close/volume
+        """
+        if df is None or df.empty:
+            return
+        cols = {name: df[name].to_numpy() for name in self.columns if name in df.columns}
+        n = len(df)
+        if self.maxlen and n > self.maxlen:
+            cols = {name: arr[-self.maxlen:] for name, arr in cols.items()}
+            n = self.maxlen
+        free = len(self._data["timestamp"]) - self._end
+        if free < n:
+            size = len(self)
+            keep = size if not self.maxlen else min(size, self.maxlen - n)
+            capacity = max(len(self._data["timestamp"]), keep + n)
+            for name, arr in self._data.items():
+                fresh = self._new_array(name, capacity)
+                fresh[:keep] = arr[self._end - keep:self._end]
+                self._data[name] = fresh
+            self._start = 0
+            self._end = keep
+        for name, arr in self._data.items():
+            if name in cols:
+                arr[self._end:self._end + n] = cols[name]
+            else:
+                arr[self._end:self._end + n] = 0
+        self._end += n
+        if self.maxlen and len(self) > self.maxlen:
+            self._start = self._end - self.maxlen
+        self._version += 1
+
+    def clear(self):
+        """Очищает хранилище"""
+        self._start = 0
+        self._end = 0
+        self._version += 1
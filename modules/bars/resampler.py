@@ -0,0 +1,264 @@
+# modules/bars/resampler.py
+
+"""
+Локальный ресэмплинг свечей в старшие таймфреймы
+HTF-свечи (1h / 4h / 1D ...) строятся из базовой серии (15m), поэтому
+все таймфреймы согласованы на границах и не требуют отдельных REST-запросов.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .candle_store import CandleStore
+
+
+INTERVAL_UNITS_MS = {
+    "m": 60_000,
+    "h": 3_600_000,
+    "d": 86_400_000,
+    "w": 604_800_000
+}
+# Недельные свечи биржи начинаются в понедельник, а эпоха Unix — четверг
+WEEK_OFFSET_MS = 4 * INTERVAL_UNITS_MS["d"]
+OHLCV_COLUMNS = CandleStore.BASE_COLUMNS
+
+
+def interval_to_ms(interval):
+    """
+    Длительность интервала биржи в миллисекундах
+
+    Args:
+        interval: "15m", "1h", "4h", "1D", "1w"...
+
+    Returns:
+        int или None (месячные и нераспознанные интервалы)
+    """
+    if not interval or interval[-1] == "M":
+        return None
+    unit = INTERVAL_UNITS_MS.get(interval[-1].lower())
+    try:
+        count = int(interval[:-1])
+    except ValueError:
+        return None
+    if unit is None or count <= 0:
+        return None
+    return count * unit
+
+
+def bucket_starts(timestamps, interval_ms):
+    """Время открытия HTF-свечи для каждого timestamp (выравнивание как у биржи)"""
+    offset = WEEK_OFFSET_MS if interval_ms % INTERVAL_UNITS_MS["w"] == 0 else 0
+    return (timestamps - offset) // interval_ms * interval_ms + offset
+
+
+def _aggregate(columns, interval_ms):
+    """
+    Сворачивает базовые свечи в HTF-свечи
+
+    Args:
+        columns: {имя: numpy-массив} для OHLCV_COLUMNS, timestamp по возрастанию
+        interval_ms: длительность HTF-свечи
+
+    Returns:
+        dict: колонки HTF-свечей (по одной строке на каждую HTF-свечу)
+    """
+    buckets = bucket_starts(columns["timestamp"], interval_ms)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    return {
+        "timestamp": buckets[starts],
+        "open": columns["open"][starts],
+        "high": np.maximum.reduceat(columns["high"], starts),
+        "low": np.minimum.reduceat(columns["low"], starts),
+        "close": columns["close"][ends],
+        "volume": np.add.reduceat(columns["volume"], starts)
+    }
+
+
+def _first_full_bucket(first_ts, interval_ms):
+    """Начало первой HTF-свечи, целиком покрытой базовыми свечами от first_ts"""
+    bucket = int(bucket_starts(np.int64(first_ts), interval_ms))
+    return bucket if bucket == first_ts else bucket + interval_ms
+
+
+def resample_ohlcv(df, interval):
+    """
+    Пакетный ресэмплинг OHLCV в старший таймфрейм
+
+    Первая HTF-свеча пропускается, если базовая серия начинается с её середины
+    (open был бы неверным). Последняя HTF-свеча может быть неполной — это
+    формирующаяся свеча, как и последняя строка klines.
+
+    Args:
+        df: OHLCV DataFrame (формат DataFeed)
+        interval: старший интервал ("1h", "4h", ...)
+
+    Returns:
+        DataFrame в формате DataFeed
+    """
+    interval_ms = interval_to_ms(interval)
+    if interval_ms is None:
+        raise ValueError(f"Неподдерживаемый интервал: {interval}")
+    if df is None or df.empty:
+        return pd.DataFrame(columns=list(OHLCV_COLUMNS))
+
+    timestamps = df['timestamp'].to_numpy(dtype=np.int64)
+    start = int(np.searchsorted(timestamps, _first_full_bucket(timestamps[0], interval_ms), side="left"))
+    columns = {"timestamp": timestamps[start:]}
+    for name in OHLCV_COLUMNS[1:]:
+        columns[name] = df[name].to_numpy(dtype=np.float64)[start:]
+    if len(columns["timestamp"]) == 0:
+        return pd.DataFrame({name: columns[name] for name in OHLCV_COLUMNS})
+    return pd.DataFrame(_aggregate(columns, interval_ms))
+
+
+class TimeframeResampler:
+    """
+    Инкрементальный ресэмплер базовой серии в один старший таймфрейм.
+
+    Закрытые HTF-свечи лежат в CandleStore. Закрытые базовые свечи
+    текущего HTF-периода свёрнуты в одну незавершённую свечу (_pending),
+    а формирующаяся базовая свеча (последняя строка df) подмешивается
+    только при чтении — за цикл обновляется лишь формирующаяся HTF-свеча.
+
+    История глубже базового буфера подгружается один раз (history_df из REST)
+    при первом update() или после разрыва в данных.
+    """
+
+    def __init__(self, interval, maxlen=1000):
+        """
+        Args:
+            interval: старший интервал ("1h", "4h", ...)
+            maxlen: сколько закрытых HTF-свечей хранить
+        """
+        self.interval = interval
+        self.interval_ms = interval_to_ms(interval)
+        if self.interval_ms is None:
+            raise ValueError(f"Неподдерживаемый интервал: {interval}")
+        self.store = CandleStore(maxlen=maxlen)
+        self.reset()
+
+    def reset(self):
+        """Полный сброс состояния"""
+        self.store.clear()
+        self.last_closed_ts = None  # timestamp последней свёрнутой базовой свечи
+        self._pending = None  # HTF-свеча из закрытых базовых свечей текущего периода
+        self._forming = None  # формирующаяся базовая свеча
+        self._first_bucket = None  # первая HTF-свеча, собранная локально
+
+    def can_resample(self, base_interval):
+        """True если старший интервал кратен базовому"""
+        base_ms = interval_to_ms(base_interval)
+        return bool(base_ms) and self.interval_ms > base_ms and self.interval_ms % base_ms == 0
+
+    def needs_history(self, base_df):
+        """True если следующий update(base_df) построит состояние заново"""
+        if self.last_closed_ts is None:
+            return True
+        timestamps = base_df['timestamp'].to_numpy()
+        return len(timestamps) > 1 and not self._is_continuous(timestamps)
+
+    def _is_continuous(self, timestamps):
+        """Новые данные продолжают свёрнутую серию без разрыва"""
+        return timestamps[-2] >= self.last_closed_ts and timestamps[0] <= self.last_closed_ts
+
+    def update(self, base_df, history_df=None):
+        """
+        Сворачивает новые закрытые базовые свечи и запоминает формирующуюся
+
+        Args:
+            base_df: базовые свечи (последняя строка — формирующаяся свеча)
+            history_df: HTF-свечи из REST; используются только при пустом
+                состоянии для периода до первой локально собранной свечи
+        """
+        if base_df is None or len(base_df) < 2:
+            return
+        timestamps = base_df['timestamp'].to_numpy(dtype=np.int64)
+        closed_end = len(timestamps) - 1
+        if self.last_closed_ts is not None and not self._is_continuous(timestamps):
+            # Разрыв в данных или другая серия — строим заново
+            self.reset()
+
+        if self.last_closed_ts is None:
+            self.store.clear()
+            self._first_bucket = _first_full_bucket(timestamps[0], self.interval_ms)
+            start = int(np.searchsorted(timestamps, self._first_bucket, side="left"))
+            if history_df is not None and not history_df.empty:
+                history = history_df[history_df['timestamp'] < self._first_bucket]
+                self.store.extend_from_dataframe(history)
+        else:
+            start = int(np.searchsorted(timestamps, self.last_closed_ts, side="right"))
+
+        if start < closed_end:
+            columns = {"timestamp": timestamps[start:closed_end]}
+            for name in OHLCV_COLUMNS[1:]:
+                columns[name] = base_df[name].to_numpy(dtype=np.float64)[start:closed_end]
+            self._fold(_aggregate(columns, self.interval_ms))
+            self.last_closed_ts = int(timestamps[closed_end - 1])
+        elif self.last_closed_ts is None and start <= closed_end:
+            # Локальная история начинается с формирующейся свечи
+            self.last_closed_ts = int(timestamps[start]) - 1
+
+        forming_ts = int(timestamps[-1])
+        if forming_ts >= self._first_bucket and (self.last_closed_ts is None or forming_ts > self.last_closed_ts):
+            row = base_df.iloc[-1]
+            self._forming = {
+                "timestamp": int(bucket_starts(np.int64(forming_ts), self.interval_ms)),
+                **{name: float(row[name]) for name in OHLCV_COLUMNS[1:]}
+            }
+        else:
+            self._forming = None
+
+    def _fold(self, candles):
+        """Добавляет свёрнутые HTF-свечи: все, кроме последней, закрыты"""
+        rows = [dict(zip(OHLCV_COLUMNS, values)) for values in zip(*(candles[name].tolist() for name in OHLCV_COLUMNS))]
+        if self._pending is not None:
+            if rows[0]["timestamp"] == self._pending["timestamp"]:
+                rows[0] = _merge(self._pending, rows[0])
+            else:
+                rows.insert(0, self._pending)
+        closed, self._pending = rows[:-1], rows[-1]
+        if len(closed) == 1:
+            self.store.append(**closed[0])
+        elif closed:
+            self.store.extend_from_dataframe(pd.DataFrame(closed))
+
+    def forming_candle(self):
+        """Формирующаяся HTF-свеча (с учётом формирующейся базовой) или None"""
+        tail = self._tail()
+        return tail[-1] if tail else None
+
+    def _tail(self):
+        """HTF-свечи после закрытых в store: незавершённая и формирующаяся"""
+        pending, forming = self._pending, self._forming
+        if pending is not None and forming is not None and pending["timestamp"] == forming["timestamp"]:
+            return [_merge(pending, forming)]
+        return [candle for candle in (pending, forming) if candle is not None]
+
+    def to_dataframe(self, last=None):
+        """
+        HTF-свечи в формате DataFeed (последняя строка — формирующаяся свеча)
+
+        Args:
+            last: только последние N свечей
+        """
+        tail = self._tail()
+        stored = None if last is None else max(last - len(tail), 0)
+        columns = {}
+        for name in OHLCV_COLUMNS:
+            values = self.store.column(name, stored)
+            columns[name] = np.concatenate([values, np.array([c[name] for c in tail], dtype=values.dtype)])
+        df = pd.DataFrame(columns)
+        return df if last is None else df.iloc[-last:].reset_index(drop=True)
+
+
+def _merge(first, second):
+    """Объединяет две последовательные части одной HTF-свечи"""
+    return {
+        "timestamp": first["timestamp"],
+        "open": first["open"],
+        "high": max(first["high"], second["high"]),
+        "low": min(first["low"], second["low"]),
+        "close": second["close"],
+        "volume": first["volume"] + second["volume"]
+    }
@@ -15,6 +15,8 @@ class DecisionEngine:
     def __init__(self, config=None):
         self.config = config
         self.min_confidence = 7.0 if config is None else getattr(config, 'MIN_CONFIDENCE', 7.0)
+        # Порог принудительного WAIT и фильтра риска (по умолчанию 4.0)
+        self.min_confidence_to_trade = getattr(config, 'MIN_CONFIDENCE_TO_TRADE', 4.0) if config else 4.0
         self.conflict_detector = ConflictDetector(config)
         self.trap_engine = TrapEngine(config)
         self.behavior_engine = BehaviorEngine(config)
@@ -125,7 +127,7 @@ class DecisionEngine:
                 }
 
         # Применение фильтров риска
-        filtered = apply_risk_filters(signals, confidence)
+        filtered = apply_risk_filters(signals, confidence, min_confidence=self.min_confidence_to_trade)
         
         if not filtered["allowed"]:
             import logging
@@ -170,9 +172,9 @@ class DecisionEngine:
         
         # ПРИНУДИТЕЛЬНЫЙ WAIT для низкой уверенности
         # Если уверенность < 4.0 → слишком неопределенно для торговли
-        # Синхронизировано с risk_filters.py (MIN_CONFIDENCE = 4.0)
-        # АГРЕССИВНАЯ настройка для максимального количества сигналов
-        MIN_CONFIDENCE_TO_TRADE = 4.0  # Снижен с 5.5 для МАКСИМАЛЬНОГО количества сигналов
+        # Синхронизировано с risk_filters.py (тот же порог MIN_CONFIDENCE_TO_TRADE)
+        # АГРЕССИВНАЯ настройка для максимального количества сигналов (4.0, снижен с 5.5)
+        MIN_CONFIDENCE_TO_TRADE = self.min_confidence_to_trade
         if confidence < MIN_CONFIDENCE_TO_TRADE and direction != "WAIT":
             import logging
             logger = logging.getLogger(__name__)
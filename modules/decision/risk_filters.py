@@ -1,13 +1,14 @@
 # modules/decision/risk_filters.py
 
 
-def apply_risk_filters(signals, confidence):
+def apply_risk_filters(signals, confidence, min_confidence=4.0):
     """
     Применяет фильтры риска к сигналу
     
     Args:
         signals: словарь со всеми сигналами
         confidence: уровень уверенности (0-10)
+        min_confidence: минимальный confidence для торговли (Config.MIN_CONFIDENCE_TO_TRADE)
         
     Returns:
         Dict с результатом фильтрации
@@ -17,11 +18,11 @@ def apply_risk_filters(signals, confidence):
     # 5.5+ = хорошие сигналы (SVD + liquidity + structure)
     # 4.0-5.5 = рискованные сигналы (могут быть конфликты)
     # <4.0 = очень слабые сигналы (блокируются)
-    MIN_CONFIDENCE = 4.0  # Снижен с 5.5 для МАКСИМАЛЬНОГО количества сигналов
-    if confidence < MIN_CONFIDENCE:
+    # 4.0 по умолчанию — снижен с 5.5 для МАКСИМАЛЬНОГО количества сигналов
+    if confidence < min_confidence:
         return {
             "allowed": False,
-            "reason": f"Слишком низкая уверенность сигнала ({confidence:.1f} < {MIN_CONFIDENCE})"
+            "reason": f"Слишком низкая уверенность сигнала ({confidence:.1f} < {min_confidence})"
         }
     
     # Проверка на критический конфликт сигналов
@@ -9,6 +9,10 @@ from .stop_clusters import detect_stop_clusters
 from .swing_liquidity import detect_swing_liquidity
 from .ath_atl import detect_ath_atl_liquidity
 from .liquidity_direction import detect_liquidity_direction
+from .volume_profile import (
+    calculate_volume_profile, AnchoredVolumeProfile, MultiAnchorVolumeProfile, RollingVolumeProfile
+)
+from .level_registry import LiquidityLevelRegistry
 
 # Старая версия (для обратной совместимости)
 from .engine import LiquidityEngine as OrderbookLiquidityEngine
@@ -24,6 +28,11 @@ __all__ = [
     'detect_swing_liquidity',
     'detect_ath_atl_liquidity',
     'detect_liquidity_direction',
+    'calculate_volume_profile',
+    'AnchoredVolumeProfile',
+    'MultiAnchorVolumeProfile',
+    'RollingVolumeProfile',
+    'LiquidityLevelRegistry',
     # Старая версия (orderbook-based)
     'OrderbookLiquidityEngine',
     'detect_stop_clusters_orderbook',
@@ -2,13 +2,82 @@
 
 # Определение зон ликвидности у исторических экстремумов.
 
+from collections import deque
+
+import numpy as np
+
 
 def detect_ath_atl_liquidity(df):
-    high = df['high'].max()
-    low = df['low'].min()
+    return ath_atl_levels(df['high'].max(), df['low'].min())
 
+
+def ath_atl_levels(high, low):
+    """Уровни ATH / ATL в формате detect_ath_atl_liquidity"""
     return {
         "ath": {"price": high, "type": "buy_stops"},
         "atl": {"price": low, "type": "sell_stops"}
     }
 
+
+class RollingExtremes:
+    """
+    Максимум high / минимум low скользящего окна свечей.
+
+    Закрытые свечи хранятся в монотонных очередях: новая свеча добавляется
+    за амортизированное O(1), ушедшие из окна снимаются с головы.
+    Формирующаяся (последняя) свеча учитывается при чтении и не фиксируется.
+    NaN пропускаются, как в df['high'].max().
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Полный сброс"""
+        self._highs = deque()  # (ts, high), high по убыванию
+        self._lows = deque()  # (ts, low), low по возрастанию
+        self.last_closed_ts = None
+
+    def update(self, df):
+        """
+        Добавляет закрытые свечи после last_closed_ts
+
+        Args:
+            df: OHLCV DataFrame с колонкой timestamp (последняя свеча — формирующаяся)
+
+        Returns:
+            tuple: (max high, min low) окна df; NaN если значений нет
+        """
+        timestamps = df['timestamp'].to_numpy()
+        if self.last_closed_ts is not None and timestamps[-1] < self.last_closed_ts:
+            # Другая/старая серия — начинаем заново
+            self.reset()
+        highs = df['high'].to_numpy(dtype=np.float64)
+        lows = df['low'].to_numpy(dtype=np.float64)
+
+        closed_end = len(df) - 1
+        start = 0 if self.last_closed_ts is None else int(np.searchsorted(timestamps, self.last_closed_ts, side="right"))
+        for i in range(start, closed_end):
+            if not np.isnan(highs[i]):
+                while self._highs and self._highs[-1][1] <= highs[i]:
+                    self._highs.pop()
+                self._highs.append((timestamps[i], highs[i]))
+            if not np.isnan(lows[i]):
+                while self._lows and self._lows[-1][1] >= lows[i]:
+                    self._lows.pop()
+                self._lows.append((timestamps[i], lows[i]))
+        if start < closed_end:
+            self.last_closed_ts = timestamps[closed_end - 1]
+
+        # Свечи, ушедшие из окна
+        for queue in (self._highs, self._lows):
+            while queue and queue[0][0] < timestamps[0]:
+                queue.popleft()
+
+        high = self._highs[0][1] if self._highs else np.float64(np.nan)
+        low = self._lows[0][1] if self._lows else np.float64(np.nan)
+        if highs[-1] > high or np.isnan(high):
+            high = highs[-1]
+        if lows[-1] < low or np.isnan(low):
+            low = lows[-1]
+        return high, low
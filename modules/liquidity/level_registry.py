@@ -0,0 +1,487 @@
+# modules/liquidity/level_registry.py
+
+"""
+Реестр уровней ликвидности
+Хранит уровни между циклами анализа: стабильный id, жизненный цикл
+(active → touched → swept), инкрементальное добавление новых свечей
+и ленивый пересчёт time-decay при чтении.
+"""
+
+import time
+
+import numpy as np
+
+from modules.utils.time_decay import calculate_time_decay_batch
+from .ath_atl import RollingExtremes, ath_atl_levels, detect_ath_atl_liquidity
+from .stop_clusters import detect_stop_clusters
+from .sweep_detector import detect_historical_sweeps
+from .swing_liquidity import detect_swing_liquidity
+from .touch_detector import detect_recent_touches, first_touch_indices
+
+
+# Порядок состояний: переход возможен только «вперёд»
+LEVEL_STATES = ("active", "touched", "swept")
+
+
+def make_level_id(kind, level_type, timestamp, price):
+    """
+    Стабильный id уровня: по timestamp свечи-источника, иначе по цене
+
+    Args:
+        kind: "cluster" | "swing"
+        level_type: "buy_stops" | "sell_stops"
+        timestamp: timestamp свечи (ms) или None
+        price: цена уровня
+    """
+    anchor = int(timestamp) if timestamp is not None else f"{float(price):.10g}"
+    return f"{kind}:{level_type}:{anchor}"
+
+
+# Состояние касаний нового уровня: (цена, ts первого касания, ts проверенной свечи);
+# ts первого касания = inf — касаний в последних lookback свечах нет
+NEW_TOUCH_STATE = (np.nan, -1.0, -1.0)
+
+# Начальное состояние sweep swing-уровня: (фаза, timestamp пробоя, свечей после восстановления)
+SWEEP_PENDING = ("pending", None, 0)
+
+
+def advance_sweep(state, direction, price, highs, lows, closes, timestamps):
+    """
+    Продвигает состояние sweep swing-уровня по новым свечам
+
+    Фазы: pending → swept (пробой) → recovered (возврат за уровень) →
+    retested (close в пределах 0.5% не раньше 5-й свечи после возврата).
+    Условия те же, что в detect_historical_sweeps; NaN не срабатывают.
+    Обычно приходит одна свеча, поэтому цикл скалярный, без numpy.
+
+    Args:
+        state: (phase, swept_ts, since) — since: свечей после восстановления
+        direction: "down" (swing low) | "up" (swing high)
+        price: цена swing-уровня
+        highs, lows, closes, timestamps: последовательности новых свечей
+
+    Returns:
+        tuple: новое состояние
+    """
+    phase, swept_ts, since = state
+    down = direction == "down"
+    for high, low, close, ts in zip(highs, lows, closes, timestamps):
+        if phase == "retested":
+            break
+        if phase == "pending":
+            if not (low < price if down else high > price):
+                continue
+            phase, swept_ts = "swept", ts
+        if phase == "swept":
+            # Восстановление возможно на той же свече, что и пробой
+            if close > price * 1.002 if down else close < price * 0.998:
+                phase, since = "recovered", 0
+            continue
+        since += 1
+        if since >= 5 and abs(close - price) / price < 0.005:
+            phase = "retested"
+    return phase, swept_ts, since
+
+
+class LiquidityLevelRegistry:
+    """
+    Уровни ликвидности одной серии свечей (один таймфрейм).
+
+    Стоп-кластеры: в реестр добавляются только свечи после last_closed_ts,
+    последняя (формирующаяся) свеча пересчитывается каждый цикл и не
+    фиксируется. Уровни, чья свеча ушла из окна df, удаляются — набор
+    кластеров совпадает с полным пересчётом detect_stop_clusters(df).
+
+    Swing-уровни: приходят готовыми из MarketStructureEngine, реестр
+    присваивает им id и хранит состояние между циклами.
+
+    Sweeps swing-уровней, касания уровней и ATH/ATL тоже ведутся по новым
+    свечам: у каждого свинга — конечный автомат sweep (advance_sweep), у
+    каждого уровня — самое раннее касание в последних lookback свечах,
+    экстремумы — в монотонных очередях. Новый свинг или уровень один раз
+    догоняется по окну; формирующаяся свеча учитывается при чтении.
+    Результаты совпадают с detect_historical_sweeps / detect_recent_touches /
+    detect_ath_atl_liquidity по текущему окну.
+    """
+
+    def __init__(self, apply_time_decay=True):
+        self.apply_time_decay = apply_time_decay
+        self.levels = {}  # id -> уровень (без decay_weight)
+        self._clusters = {}  # id -> уровень для закрытых свечей, в хронологическом порядке
+        self._forming_clusters = []  # кластеры формирующейся свечи
+        self._swing_ids = []  # id swing-уровней текущего цикла (в порядке входа)
+        self.last_closed_ts = None
+        self._reset_tracking()
+
+    def _reset_tracking(self):
+        self._sweeps = {}  # (direction, swing ts, price) -> состояние advance_sweep по закрытым свечам
+        self._sweeps_closed_ts = None
+        self._touches = {}  # id -> (цена, ts первого касания в последних lookback, ts проверенной свечи)
+        self._touches_closed_ts = None
+        self._touch_recent_ts = None  # timestamp начала последних lookback свечей
+        self._touch_tolerance = None
+        self.extremes = RollingExtremes()
+
+    @staticmethod
+    def _closed_start(timestamps, closed_ts):
+        """Индекс первой свечи df после closed_ts"""
+        return 0 if closed_ts is None else int(np.searchsorted(timestamps, closed_ts, side="right"))
+
+    # ------------------ Стоп-кластеры ------------------ #
+    def update_stop_clusters(self, df, current_ts=None):
+        """
+        Добавляет кластеры новых свечей и возвращает актуальный список
+
+        Args:
+            df: OHLCV DataFrame (скользящее окно)
+            current_ts: timestamp для decay (ms), по умолчанию time.time()
+
+        Returns:
+            list: кластеры в формате detect_stop_clusters + id / state
+        """
+        if 'timestamp' not in df.columns:
+            return detect_stop_clusters(df, apply_time_decay=self.apply_time_decay, current_ts=current_ts)
+        if len(df) <= 2:
+            return []
+
+        timestamps = df['timestamp'].to_numpy()
+        if self.last_closed_ts is not None and timestamps[-1] < self.last_closed_ts:
+            # Другая/старая серия — начинаем заново
+            self.reset()
+
+        closed_end = len(df) - 1
+        start = 0 if self.last_closed_ts is None else int(np.searchsorted(timestamps, self.last_closed_ts, side="right"))
+        if start < closed_end:
+            # detect_stop_clusters пропускает 2 первые строки — даём им контекст
+            context_start = max(start - 2, 0)
+            for cluster in detect_stop_clusters(df.iloc[context_start:closed_end], apply_time_decay=False):
+                self._register_cluster(cluster, self._clusters)
+            self.last_closed_ts = timestamps[closed_end - 1]
+
+        # Формирующаяся свеча: тень ещё меняется, пересчитываем каждый цикл
+        forming = {}
+        for cluster in detect_stop_clusters(df.iloc[-3:], apply_time_decay=False):
+            self._register_cluster(cluster, forming)
+        for level_id in self._forming_clusters:
+            if level_id not in forming and level_id not in self._clusters:
+                self.levels.pop(level_id, None)
+        self._forming_clusters = list(forming)
+
+        # Кластеры, чья свеча ушла из окна (первые 2 строки окна не анализируются)
+        window_start = timestamps[2]
+        expired = [level_id for level_id, level in self._clusters.items() if level["timestamp"] < window_start]
+        for level_id in expired:
+            del self._clusters[level_id]
+            self.levels.pop(level_id, None)
+
+        levels = list(self._clusters.values()) + list(forming.values())
+        return self._with_decay(levels, current_ts)
+
+    def _register_cluster(self, cluster, target):
+        level_id = make_level_id("cluster", cluster["type"], cluster["timestamp"], cluster["price"])
+        level = self.levels.get(level_id)
+        if level is None:
+            level = dict(cluster, id=level_id, state="active")
+            level.pop("decay_weight", None)
+            self.levels[level_id] = level
+        else:
+            # Формирующаяся свеча могла обновить high/low
+            level["price"] = cluster["price"]
+        target[level_id] = level
+
+    # ------------------ Swing-уровни ------------------ #
+    def update_swing_levels(self, market_structure, current_ts=None):
+        """
+        Синхронизирует swing-уровни с текущей структурой рынка
+
+        Returns:
+            list: уровни в формате detect_swing_liquidity + id / state
+        """
+        swing_levels = detect_swing_liquidity(market_structure, apply_time_decay=False)
+        current_ids = []
+        for swing in swing_levels:
+            level_id = make_level_id("swing", swing["type"], swing.get("timestamp"), swing["price"])
+            level = self.levels.get(level_id)
+            if level is None:
+                level = dict(swing, id=level_id, state="active")
+                level.pop("decay_weight", None)
+                self.levels[level_id] = level
+            else:
+                level["price"] = swing["price"]
+            current_ids.append(level_id)
+
+        # Свинги, которых больше нет в структуре
+        current = set(current_ids)
+        for level_id in self._swing_ids:
+            if level_id not in current:
+                self.levels.pop(level_id, None)
+        self._swing_ids = current_ids
+
+        return self._with_decay([self.levels[level_id] for level_id in current_ids], current_ts)
+
+    def find_swing(self, price, level_type):
+        """Swing-уровень текущего цикла с точно такой ценой (или None)"""
+        for level_id in self._swing_ids:
+            level = self.levels[level_id]
+            if level["type"] == level_type and level["price"] == price:
+                return level
+        return None
+
+    # ------------------ ATH / ATL ------------------ #
+    def update_ath_atl(self, df):
+        """
+        Экстремумы окна в формате detect_ath_atl_liquidity
+
+        Returns:
+            dict: {"ath": {...}, "atl": {...}}
+        """
+        if 'timestamp' not in df.columns or df.empty:
+            return detect_ath_atl_liquidity(df)
+        return ath_atl_levels(*self.extremes.update(df))
+
+    # ------------------ Исторические sweeps ------------------ #
+    def update_sweeps(self, df, swing_highs, swing_lows, current_price):
+        """
+        Исторические sweeps swing-уровней по текущему окну
+
+        Состояние известных свингов продвигается только свечами, закрытыми
+        после прошлого вызова; новый свинг один раз догоняется по закрытым
+        свечам после своей свечи. Формирующаяся свеча применяется к копии
+        состояния.
+
+        Args:
+            df: OHLCV DataFrame (скользящее окно)
+            swing_highs, swing_lows: swing'и из MarketStructureEngine (с timestamp)
+            current_price: текущая цена
+
+        Returns:
+            list: в формате detect_historical_sweeps
+        """
+        swings = [(swing, "down") for swing in swing_lows] + [(swing, "up") for swing in swing_highs]
+        if 'timestamp' not in df.columns or any(swing.get("timestamp") is None for swing, _ in swings):
+            return detect_historical_sweeps(df, swing_highs, swing_lows, current_price)
+        if len(df) < 10:
+            return []
+
+        timestamps = df['timestamp'].to_numpy()
+        if self._sweeps_closed_ts is not None and timestamps[-1] < self._sweeps_closed_ts:
+            self.reset()
+        highs = df['high'].to_numpy(dtype=np.float64)
+        lows = df['low'].to_numpy(dtype=np.float64)
+        closes = df['close'].to_numpy(dtype=np.float64)
+        n = len(df)
+        closed_end = n - 1
+
+        start = self._closed_start(timestamps, self._sweeps_closed_ts)
+        if start < closed_end:
+            new = [column[start:closed_end].tolist() for column in (highs, lows, closes, timestamps)]
+            for key, state in self._sweeps.items():
+                direction, _, price = key
+                self._sweeps[key] = advance_sweep(state, direction, price, *new)
+            self._sweeps_closed_ts = timestamps[closed_end - 1]
+        forming = [column[-1:].tolist() for column in (highs, lows, closes, timestamps)]
+
+        current = {}
+        result = []
+        for swing, direction in swings:
+            price = swing.get("price")
+            if price is None:
+                continue
+            key = (direction, int(swing["timestamp"]), price)
+            state = self._sweeps.get(key)
+            if state is None:
+                # Новый свинг — догоняем по закрытым свечам после его свечи
+                after = int(np.searchsorted(timestamps, key[1], side="right"))
+                state = advance_sweep(SWEEP_PENDING, direction, price, *(
+                    column[after:closed_end].tolist() for column in (highs, lows, closes, timestamps)
+                ))
+            current[key] = state
+
+            if price >= current_price if direction == "down" else price <= current_price:
+                continue
+            phase, swept_ts, _ = advance_sweep(state, direction, price, *forming)
+            if phase != "recovered":
+                continue
+            swept_idx = int(np.searchsorted(timestamps, swept_ts))
+            result.append({
+                "price": price,
+                "direction": direction,
+                "swept_at_index": swept_idx,
+                "recovery_confirmed": True,
+                "type": "swing_low" if direction == "down" else "swing_high",
+                "candles_ago": n - swept_idx
+            })
+        # Свинги, которых больше нет в структуре
+        self._sweeps = current
+        return result
+
+    # ------------------ Касания ------------------ #
+    def update_touches(self, df, levels, lookback=20, tolerance_pct=0.2):
+        """
+        Недавние касания уровней по текущему окну
+
+        Для уровня хранится timestamp самой ранней касавшейся его закрытой
+        свечи среди последних lookback и до какой свечи он проверен. Пока
+        это касание не ушло из окна, оно остаётся самым ранним; уровни без
+        касания проверяются только по новым закрытым свечам. Заново (по
+        последним lookback свечам) ищутся лишь новые уровни, уровни с
+        изменившейся ценой и уровни, чьё касание ушло из окна. Формирующаяся
+        свеча проверяется при чтении.
+
+        Args:
+            df: OHLCV DataFrame (скользящее окно)
+            levels: уровни реестра (с id)
+            lookback: сколько последних свечей проверять
+            tolerance_pct: допуск касания в %
+
+        Returns:
+            dict: в формате detect_recent_touches
+        """
+        if ('timestamp' not in df.columns or len(df) < 2 or lookback < 1 or not levels
+                or any("id" not in level for level in levels)):
+            return detect_recent_touches(df, levels, lookback=lookback, tolerance_pct=tolerance_pct)
+
+        timestamps = df['timestamp'].to_numpy()
+        n = len(df)
+        closed_end = n - 1
+        recent_start = n - min(lookback, n)
+        last_closed_ts = int(timestamps[closed_end - 1])
+        if self._touches_closed_ts is not None and timestamps[-1] < self._touches_closed_ts:
+            self.reset()
+        if tolerance_pct != self._touch_tolerance or (
+                self._touch_recent_ts is not None and timestamps[recent_start] < self._touch_recent_ts):
+            # Другой допуск или окно касаний расширилось назад — уровни ищутся заново
+            self._touches = {}
+            self._touch_tolerance = tolerance_pct
+        self._touch_recent_ts = int(timestamps[recent_start])
+
+        levels = [level for level in levels if level.get("price", 0) not in (0, None)]
+        ids = [level["id"] for level in levels]
+        if self._touches_closed_ts is None or timestamps[closed_end - 1] > self._touches_closed_ts:
+            # Новая закрытая свеча — забываем уровни, которых больше нет
+            current = set(ids)
+            for level_id in [i for i in self._touches if i not in self.levels and i not in current]:
+                del self._touches[level_id]
+            self._touches_closed_ts = timestamps[closed_end - 1]
+
+        highs = df['high'].to_numpy(dtype=np.float64)
+        lows = df['low'].to_numpy(dtype=np.float64)
+        prices = np.array([level["price"] for level in levels], dtype=np.float64)
+        types = np.array([level.get("type", "") for level in levels], dtype=object)
+        tolerance = prices * (tolerance_pct / 100)
+        lower, upper = prices - tolerance, prices + tolerance
+
+        # Состояние: (цена, ts первого касания | inf, ts последней проверенной свечи)
+        states = np.array([self._touches.get(level_id, NEW_TOUCH_STATE) for level_id in ids],
+                          dtype=np.float64).reshape(len(ids), 3)
+        first, checked = states[:, 1], states[:, 2]
+        # Новый уровень или изменившаяся цена — как новый
+        first[states[:, 0] != prices] = -1.0
+
+        # Касание ушло из последних lookback свечей (или уровень новый) — ищем по ним заново
+        rescan = np.flatnonzero(first < self._touch_recent_ts)
+        if len(rescan):
+            recent_ts = np.append(timestamps[recent_start:closed_end].astype(np.float64), np.inf)
+            first[rescan] = recent_ts[first_touch_indices(highs[recent_start:closed_end], lows[recent_start:closed_end],
+                                                          types[rescan], lower[rescan], upper[rescan])]
+            checked[rescan] = last_closed_ts
+
+        # Уровни без касания — только свечи после последней проверки
+        pending = np.flatnonzero(np.isinf(first) & (checked < last_closed_ts))
+        if len(pending):
+            starts = np.maximum(np.searchsorted(timestamps, checked[pending], side="right"), recent_start)
+            for start in np.unique(starts).tolist():
+                group = pending[starts == start]
+                idx = first_touch_indices(highs[start:closed_end], lows[start:closed_end],
+                                          types[group], lower[group], upper[group])
+                hit = idx < closed_end - start
+                first[group[hit]] = timestamps[start + idx[hit]]
+            checked[pending] = last_closed_ts
+        self._touches.update(zip(ids, zip(prices.tolist(), first.tolist(), checked.tolist())))
+
+        # Самое раннее касание, иначе — формирующаяся свеча
+        forming = first_touch_indices(highs[-1:], lows[-1:], types, lower, upper) == 0
+        touched_closed = ~np.isinf(first)
+        positions = np.where(touched_closed, np.searchsorted(timestamps, np.where(touched_closed, first, 0)),
+                             np.where(forming, closed_end, -1))
+
+        touched = []
+        untouched = []
+        for level, position in zip(levels, positions.tolist()):
+            if position < 0:
+                untouched.append(level)
+                continue
+            touched.append({
+                "price": level["price"],
+                "type": level.get("type", ""),
+                "candles_ago": closed_end - position,
+                "source": level.get("source", "unknown"),
+                "id": level["id"]
+            })
+
+        return {
+            "touched_levels": touched,
+            "untouched_levels": untouched
+        }
+
+    # ------------------ Жизненный цикл ------------------ #
+    def transition(self, level_id, state, **info):
+        """
+        Переводит уровень в новое состояние
+
+        Args:
+            level_id: id уровня
+            state: "touched" | "swept"
+            **info: доп. поля (candles_ago, reason, ...)
+
+        Returns:
+            bool: True если состояние изменилось (повторные события не логируются)
+        """
+        level = self.levels.get(level_id)
+        if level is None or LEVEL_STATES.index(state) <= LEVEL_STATES.index(level["state"]):
+            return False
+        level["state"] = state
+        level.update(info)
+        return True
+
+    def get_levels(self, state=None, current_ts=None):
+        """
+        Все уровни реестра (опционально только в состоянии state)
+
+        Returns:
+            list: уровни с decay_weight на момент чтения
+        """
+        levels = [level for level in self.levels.values() if state is None or level["state"] == state]
+        return self._with_decay(levels, current_ts)
+
+    def _with_decay(self, levels, current_ts=None):
+        """Копии уровней с decay_weight, посчитанным одним batch-вызовом"""
+        if current_ts is None:
+            current_ts = int(time.time() * 1000)
+        if not levels:
+            return []
+        if self.apply_time_decay:
+            timestamps = [level.get("timestamp") for level in levels]
+            # Свинг без timestamp получает полный вес (как в detect_swing_liquidity)
+            has_ts = np.array([
+                ts is not None and (ts != 0 or not level["id"].startswith("swing:"))
+                for ts, level in zip(timestamps, levels)
+            ])
+            weights = np.ones(len(levels))
+            if has_ts.any():
+                weights[has_ts] = calculate_time_decay_batch(
+                    [ts for ts, ok in zip(timestamps, has_ts) if ok], current_ts
+                )
+            weights = weights.tolist()
+        else:
+            weights = [1.0] * len(levels)
+        return [dict(level, decay_weight=weight) for level, weight in zip(levels, weights)]
+
+    def reset(self):
+        """Полный сброс реестра"""
+        self.levels = {}
+        self._clusters = {}
+        self._forming_clusters = []
+        self._swing_ids = []
+        self.last_closed_ts = None
+        self._reset_tracking()
@@ -1,31 +1,74 @@
-from .stop_clusters import detect_stop_clusters
-from .swing_liquidity import detect_swing_liquidity
-from .ath_atl import detect_ath_atl_liquidity
 from .liquidity_direction import detect_liquidity_direction
-from .sweep_detector import detect_sweep, detect_historical_sweeps, detect_breakout
-from .volume_profile import calculate_volume_profile, get_position_relative_to_value_area, get_poc_significance
+from .sweep_detector import detect_sweep, detect_breakout
+from .volume_profile import (
+    get_position_relative_to_value_area, get_poc_significance,
+    MultiAnchorVolumeProfile, RollingVolumeProfile
+)
 from .swept_tracker import SweptLevelsTracker
-from .touch_detector import detect_recent_touches, filter_touched_levels
+from .level_registry import LiquidityLevelRegistry
+from modules.utils.series_states import SeriesStates, series_key
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class LiquidityEngine:
+
+    # Максимум серий (symbol, timeframe) с инкрементальным состоянием
+    MAX_SERIES = 8
     
-    def __init__(self):
+    def __init__(self, clock=None):
+        """
+        Args:
+            clock: функция текущего времени в секундах для decay и устаревания
+                swept уровней (по умолчанию time.time; бэктест подставляет время свечи)
+        """
+        self.clock = clock
         # Трекер отработанных (swept) уровней
-        self.swept_tracker = SweptLevelsTracker(expiry_hours=24)
+        self.swept_tracker = SweptLevelsTracker(expiry_hours=24, clock=clock)
+        # Инкрементальные anchored профили по сериям свечей
+        self.anchored_profiles = SeriesStates(MultiAnchorVolumeProfile, maxsize=self.MAX_SERIES)
+        # Volume Profile окна по сериям свечей (скользящий, без раскладки всего окна)
+        self.window_profiles = SeriesStates(RollingVolumeProfile, maxsize=self.MAX_SERIES)
+        # Реестры уровней ликвидности по сериям свечей (стабильные id между циклами)
+        self.level_registries = SeriesStates(LiquidityLevelRegistry, maxsize=self.MAX_SERIES)
+
+    def _update_anchored_profiles(self, df, series=None):
+        """Обновляет anchored профили серии df"""
+        key = series_key(df, series)
+        if key is None:
+            return {}
+        return self.anchored_profiles.get(key).update(df)
+
+    @staticmethod
+    def _record_touch(registry, touch, swept):
+        """
+        Фиксирует касание в реестре
+
+        Returns:
+            bool: True если это новое событие для уровня (его стоит логировать)
+        """
+        if "id" not in touch:
+            return True
+        state = "swept" if swept else "touched"
+        reason = "recent_touch" if swept else "touch"
+        return registry.transition(touch["id"], state, reason=reason, candles_ago=touch["candles_ago"])
 
-    def analyze(self, df, market_structure):
+    def analyze(self, df, market_structure, series=None):
         """
         df — OHLCV DataFrame
         market_structure — данные из MarketStructureEngine
+        series — id серии свечей, например (symbol, timeframe); без него
+            серия определяется по интервалу последних свечей
         """
 
-        stop_clusters = detect_stop_clusters(df)
-        swing_levels = detect_swing_liquidity(market_structure)
-        ath_atl = detect_ath_atl_liquidity(df)
+        # Реестр обрабатывает только новые свечи, decay считается при чтении
+        key = series_key(df, series)
+        registry = self.level_registries.get(key)
+        current_ts = int(self.clock() * 1000) if self.clock is not None else None
+        stop_clusters = registry.update_stop_clusters(df, current_ts=current_ts)
+        swing_levels = registry.update_swing_levels(market_structure, current_ts=current_ts)
+        ath_atl = registry.update_ath_atl(df)
         
         # Получаем текущую цену
         current_price = df['close'].iloc[-1] if not df.empty else None
@@ -45,17 +88,14 @@ class LiquidityEngine:
                 )
         
         # НОВОЕ: Обнаруживаем исторические sweeps swing levels
+        # Реестр продвигает состояние sweeps и касаний по новым свечам; уровни
+        # повторно помечаются в swept_tracker каждый цикл (это продлевает их
+        # срок), а логируются только при смене состояния уровня.
         swing_highs = market_structure.get("swings", {}).get("highs", [])
         swing_lows = market_structure.get("swings", {}).get("lows", [])
         
         if current_price and len(df) >= 20:
-            historical_sweeps = detect_historical_sweeps(
-                df, 
-                swing_highs, 
-                swing_lows, 
-                current_price,
-                lookback_candles=100
-            )
+            historical_sweeps = registry.update_sweeps(df, swing_highs, swing_lows, current_price)
             
             # Помечаем исторические sweeps в tracker
             for hist_sweep in historical_sweeps:
@@ -65,6 +105,13 @@ class LiquidityEngine:
                     reason=f"historical_sweep",
                     candles_ago=hist_sweep["candles_ago"]
                 )
+                # Логируем только первый раз для уровня (не каждый цикл)
+                level_type = "sell_stops" if hist_sweep["direction"] == "down" else "buy_stops"
+                level = registry.find_swing(hist_sweep["price"], level_type)
+                if level is not None and not registry.transition(
+                    level["id"], "swept", reason="historical_sweep", candles_ago=hist_sweep["candles_ago"]
+                ):
+                    continue
                 logger.info(f"🎯 Исторический sweep обнаружен: ${hist_sweep['price']:.2f} "
                            f"({hist_sweep['direction']}, {hist_sweep['candles_ago']} свечей назад)")
         
@@ -72,8 +119,8 @@ class LiquidityEngine:
         # Используем ВСЕ доступные свечи (обычно 100 на 5м = 8.3 часов)
         # Это решает проблему когда цена коснулась уровня даже несколько часов назад
         max_lookback = min(len(df) - 3, 100)  # Используем все доступные (максимум 100)
-        touched_stop_clusters = detect_recent_touches(df, stop_clusters, lookback=max_lookback, tolerance_pct=0.2)
-        touched_swing_levels = detect_recent_touches(df, swing_levels, lookback=max_lookback, tolerance_pct=0.2)
+        touched_stop_clusters = registry.update_touches(df, stop_clusters, lookback=max_lookback, tolerance_pct=0.2)
+        touched_swing_levels = registry.update_touches(df, swing_levels, lookback=max_lookback, tolerance_pct=0.2)
         
         # Помечаем touched levels в swept_tracker
         for touch in touched_stop_clusters["touched_levels"]:
@@ -87,6 +134,8 @@ class LiquidityEngine:
                     reason="recent_touch",
                     candles_ago=touch["candles_ago"]
                 )
+                if not self._record_touch(registry, touch, swept=True):
+                    continue
                 logger.info(f"🎯 Недавнее касание обнаружено: ${touch['price']:.2f} "
                            f"({touch['type']}, {touch['candles_ago']} свечей назад) → помечен как swept")
         
@@ -100,9 +149,16 @@ class LiquidityEngine:
                     reason="recent_touch",
                     candles_ago=touch["candles_ago"]
                 )
+                if not self._record_touch(registry, touch, swept=True):
+                    continue
                 logger.info(f"🎯 Недавнее касание swing level: ${touch['price']:.2f} "
                            f"({touch['type']}, {touch['candles_ago']} свечей назад) → помечен как swept")
         
+        # Более старые касания — только состояние touched в реестре
+        for touch in touched_stop_clusters["touched_levels"] + touched_swing_levels["touched_levels"]:
+            if touch.get("candles_ago", 999) >= 20:
+                self._record_touch(registry, touch, swept=False)
+        
         # Фильтруем swept уровни из stop_clusters и swing_liquidity
         stop_clusters = self.swept_tracker.filter_swept_levels(stop_clusters, tolerance_pct=0.5)
         swing_levels = self.swept_tracker.filter_swept_levels(swing_levels, tolerance_pct=0.5)
@@ -132,8 +188,11 @@ class LiquidityEngine:
                                f"consolidation: {breakout_down['consolidation_candles']} свечей, "
                                f"strong: {breakout_down['strong_breakout']}")
         
-        # Volume Profile - распределение объёмов по ценам
-        volume_profile = calculate_volume_profile(df, num_bins=50)
+        # Volume Profile - распределение объёмов по ценам (скользящий по окну)
+        volume_profile = self.window_profiles.get(key).update(df)
+        
+        # Anchored профили (session / day / week / visible) — только новые свечи
+        anchored_profiles = self._update_anchored_profiles(df, series)
         
         # Положение относительно Value Area
         va_position = get_position_relative_to_value_area(current_price, volume_profile) if current_price else "unknown"
@@ -161,6 +220,7 @@ class LiquidityEngine:
             "breakout_down": breakout_down,  # Обнаружение breakout вниз
             "direction": direction,
             "volume_profile": volume_profile,
+            "anchored_profiles": anchored_profiles,
             "va_position": va_position,
             "poc_info": poc_info
         }
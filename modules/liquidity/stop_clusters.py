@@ -3,55 +3,76 @@
 # Минимальный анализ объёмов + ценовых областей.
 
 import numpy as np
-from modules.utils.time_decay import calculate_time_decay
+from modules.utils.time_decay import calculate_time_decay_batch
 import time
 
 
-def detect_stop_clusters(df, apply_time_decay=True):
+def detect_stop_clusters(df, apply_time_decay=True, current_ts=None):
     """
     Находим зоны, где вероятно стоят стопы толпы:
     - над локальными high
     - под локальными low
     - аномальные тени (wicks)
-    
+
+    Векторная реализация: маски теней считаются по целым колонкам,
+    time-decay — одним вызовом для всех кластеров.
+
     Args:
         df: DataFrame с OHLCV и timestamp
         apply_time_decay: применять ли time-decay к старым кластерам
+        current_ts: текущий timestamp (ms), по умолчанию time.time()
     """
 
-    clusters = []
-    current_ts = int(time.time() * 1000)
-
-    for i in range(2, len(df)):
-        high = df['high'].iloc[i]
-        low = df['low'].iloc[i]
-        
-        # Получаем timestamp свечи
-        candle_ts = df['timestamp'].iloc[i] if 'timestamp' in df.columns else current_ts
-
-        # Длинная верхняя тень → стопы покупателей выше high
-        upper_wick = df['high'].iloc[i] - max(df['open'].iloc[i], df['close'].iloc[i])
-        if upper_wick > (df['high'].iloc[i] - df['low'].iloc[i]) * 0.6:
-            decay_weight = calculate_time_decay(candle_ts, current_ts) if apply_time_decay else 1.0
-            clusters.append({
-                "type": "buy_stops",
-                "price": high,
-                "source": "wick",
-                "timestamp": candle_ts,
-                "decay_weight": decay_weight
-            })
-
-        # Длинная нижняя тень → стопы продавцов под low
-        lower_wick = min(df['open'].iloc[i], df['close'].iloc[i]) - df['low'].iloc[i]
-        if lower_wick > (df['high'].iloc[i] - df['low'].iloc[i]) * 0.6:
-            decay_weight = calculate_time_decay(candle_ts, current_ts) if apply_time_decay else 1.0
-            clusters.append({
-                "type": "sell_stops",
-                "price": low,
-                "source": "wick",
-                "timestamp": candle_ts,
-                "decay_weight": decay_weight
-            })
-
-    return clusters
+    if current_ts is None:
+        current_ts = int(time.time() * 1000)
+
+    if len(df) <= 2:
+        return []
+
+    high = df['high'].to_numpy(dtype=np.float64)[2:]
+    low = df['low'].to_numpy(dtype=np.float64)[2:]
+    open_ = df['open'].to_numpy(dtype=np.float64)[2:]
+    close = df['close'].to_numpy(dtype=np.float64)[2:]
+
+    if 'timestamp' in df.columns:
+        timestamps = df['timestamp'].to_numpy()[2:]
+    else:
+        timestamps = np.full(len(high), current_ts, dtype=np.int64)
+
+    wick_threshold = (high - low) * 0.6
+    # Длинная верхняя тень → стопы покупателей выше high
+    upper_mask = (high - np.maximum(open_, close)) > wick_threshold
+    # Длинная нижняя тень → стопы продавцов под low
+    lower_mask = (np.minimum(open_, close) - low) > wick_threshold
+
+    upper_idx = np.flatnonzero(upper_mask)
+    lower_idx = np.flatnonzero(lower_mask)
+    if len(upper_idx) == 0 and len(lower_idx) == 0:
+        return []
+
+    # Порядок как у построчного обхода: по свече, buy_stops перед sell_stops
+    idx = np.concatenate([upper_idx, lower_idx])
+    is_sell = np.concatenate([np.zeros(len(upper_idx), dtype=bool), np.ones(len(lower_idx), dtype=bool)])
+    order = np.lexsort((is_sell, idx))
+    idx = idx[order]
+    is_sell = is_sell[order]
+
+    prices = np.where(is_sell, low[idx], high[idx])
+    cluster_ts = timestamps[idx]
+    if apply_time_decay:
+        decay_weights = calculate_time_decay_batch(cluster_ts, current_ts)
+    else:
+        decay_weights = np.ones(len(idx))
 
+    return [
+        {
+            "type": "sell_stops" if sell else "buy_stops",
+            "price": price,
+            "source": "wick",
+            "timestamp": ts,
+            "decay_weight": weight
+        }
+        for sell, price, ts, weight in zip(
+            is_sell.tolist(), prices.tolist(), cluster_ts.tolist(), decay_weights.tolist()
+        )
+    ]
@@ -1,3 +1,8 @@
+import bisect
+
+import numpy as np
+
+
 def detect_sweep(df, lookback: int = 50, stop_prices_above=None, stop_prices_below=None):
     """
     Обнаружение ликвидити-свипа на последних свечах:
@@ -45,9 +50,13 @@ def detect_sweep(df, lookback: int = 50, stop_prices_above=None, stop_prices_bel
             "swept_prices": []
         }
     
-    last_3 = df.iloc[-3:]  # Последние 3 свечи
-    highs = df["high"].iloc[-(lookback + 1):-3]  # Исключаем последние 3 свечи
-    lows = df["low"].iloc[-(lookback + 1):-3]
+    high = df["high"].to_numpy()
+    low = df["low"].to_numpy()
+    close = df["close"].to_numpy()
+    # Последние 3 свечи
+    last_high, last_low, last_closes = high[-3:], low[-3:], close[-3:]
+    highs = high[-(lookback + 1):-3]  # Исключаем последние 3 свечи
+    lows = low[-(lookback + 1):-3]
 
     sweep_up = False
     sweep_down = False
@@ -57,24 +66,19 @@ def detect_sweep(df, lookback: int = 50, stop_prices_above=None, stop_prices_bel
     post_move = 0
     
     # Максимум/минимум исторических данных (без последних 3 свечей)
-    historical_high = highs.max() if len(highs) > 0 else last_3.iloc[0]["high"]
-    historical_low = lows.min() if len(lows) > 0 else last_3.iloc[0]["low"]
+    historical_high = highs.max() if len(highs) > 0 else last_high[0]
+    historical_low = lows.min() if len(lows) > 0 else last_low[0]
 
     # SWEEP ВВЕРХ (bull trap): паттерн из 2-3 свечей
     # 1. Одна или несколько свечей прокалывают исторический максимум
     # 2. Быстрый возврат вниз (close < исторический максимум)
-    max_in_pattern = last_3["high"].max()
-    last_close = last_3.iloc[-1]["close"]
-    first_close = last_3.iloc[0]["close"]
+    max_in_pattern = last_high.max()
+    last_close = last_closes[-1]
     
     if max_in_pattern > historical_high and last_close < historical_high:
         # Проверяем что это был БЫСТРЫЙ возврат (не медленное падение)
-        # Хотя бы одна свеча в последних 3 должна закрыться значительно ниже прокола
-        significant_return = False
-        for candle in last_3.itertuples():
-            if candle.high > historical_high and candle.close < historical_high * 0.998:  # -0.2%
-                significant_return = True
-                break
+        # Хотя бы одна свеча в последних 3 должна закрыться значительно ниже прокола (-0.2%)
+        significant_return = bool(np.any((last_high > historical_high) & (last_closes < historical_high * 0.998)))
         
         if significant_return:
             sweep_up = True
@@ -83,38 +87,25 @@ def detect_sweep(df, lookback: int = 50, stop_prices_above=None, stop_prices_bel
     # SWEEP ВНИЗ (bear trap): паттерн из 2-3 свечей
     # 1. Одна или несколько свечей прокалывают исторический минимум
     # 2. Быстрый возврат вверх (close > исторический минимум)
-    min_in_pattern = last_3["low"].min()
+    min_in_pattern = last_low.min()
     
     if min_in_pattern < historical_low and last_close > historical_low:
-        # Проверяем что это был БЫСТРЫЙ возврат
-        significant_return = False
-        for candle in last_3.itertuples():
-            if candle.low < historical_low and candle.close > historical_low * 1.002:  # +0.2%
-                significant_return = True
-                break
+        # Проверяем что это был БЫСТРЫЙ возврат (+0.2%)
+        significant_return = bool(np.any((last_low < historical_low) & (last_closes > historical_low * 1.002)))
         
         if significant_return:
             sweep_down = True
             post_move = last_close - historical_low
 
-    # Проверка, задел ли свип стоп-уровни (проверяем по всем 3 свечам)
+    # Проверка, задел ли свип стоп-уровни (проверяем по всем 3 свечам):
+    # матрица уровни × свечи
     if stop_prices_above:
-        for p in stop_prices_above:
-            for candle in last_3.itertuples():
-                if candle.high >= p >= candle.close:
-                    hit_above = True
-                    break
-            if hit_above:
-                break
+        prices = np.asarray(stop_prices_above, dtype=np.float64)[:, None]
+        hit_above = bool(np.any((last_high >= prices) & (prices >= last_closes)))
     
     if stop_prices_below:
-        for p in stop_prices_below:
-            for candle in last_3.itertuples():
-                if candle.low <= p <= candle.close:
-                    hit_below = True
-                    break
-            if hit_below:
-                break
+        prices = np.asarray(stop_prices_below, dtype=np.float64)[:, None]
+        hit_below = bool(np.any((last_low <= prices) & (prices <= last_closes)))
 
     # Оценка пост-реакции: если было возвращение внутрь диапазона
     if sweep_up:
@@ -250,12 +241,93 @@ def detect_breakout(df, liquidity_level, direction="both", lookback=3):
     }
 
 
+def _sparse_table(values, fn):
+    """
+    Sparse table для range-запросов: levels[k][i] = fn(values[i:i + 2**k])
+
+    Построение O(n log n) целыми колонками numpy.
+    """
+    levels = [values]
+    step = 1
+    while step * 2 <= len(values):
+        prev = levels[-1]
+        levels.append(fn(prev[:-step], prev[step:]))
+        step *= 2
+    return levels
+
+
+def _first_below(values, starts, thresholds):
+    """
+    Для каждого запроса — первый индекс i >= start, где values[i] < threshold
+
+    Бинарный подъём по sparse table минимумов, векторно по всем запросам:
+    O((n + queries) log n). NaN никогда не удовлетворяет условию.
+
+    Returns:
+        np.ndarray: индексы (len(values), если такого нет)
+    """
+    n = len(values)
+    size = 1 << n.bit_length()  # > n: хвост из +inf, чтобы блоки не выходили за массив
+    padded = np.full(size, np.inf)
+    padded[:n] = np.where(np.isnan(values), np.inf, values)
+    levels = _sparse_table(padded, np.minimum)
+
+    pos = np.clip(np.asarray(starts, dtype=np.int64), 0, n)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    for k in range(len(levels) - 1, -1, -1):
+        step = 1 << k
+        can_jump = pos + step <= size
+        block_min = levels[k][np.where(can_jump, pos, 0)]
+        pos = np.where(can_jump & (block_min >= thresholds), pos + step, pos)
+    return np.minimum(pos, n)
+
+
+def _has_retest(closes, swing_prices, retest_from):
+    """
+    Был ли ретест уровня: есть ли j >= retest_from с |close[j] - price| / price < 0.5%
+
+    Условие монотонно по close с каждой стороны от price, поэтому подходящие
+    close образуют непрерывный блок в отсортированном массиве; его границы
+    ищутся бинарным поиском с точной проверкой условия, а «есть ли в блоке
+    индекс >= retest_from» — range max по sparse table исходных индексов.
+    """
+    n = len(closes)
+    valid = ~np.isnan(closes)
+    order = np.argsort(closes, kind="stable")[:int(valid.sum())]
+    sorted_closes = closes[order].tolist()
+    max_tables = _sparse_table(order, np.maximum) if len(order) else []
+
+    result = []
+    for price, start in zip(swing_prices, retest_from):
+        if start >= n or not sorted_closes:
+            result.append(False)
+            continue
+
+        def near(c):
+            return abs(c - price) / price < 0.005
+
+        mid = bisect.bisect_left(sorted_closes, price)
+        lo = bisect.bisect_left(sorted_closes, True, 0, mid, key=near)
+        hi = bisect.bisect_left(sorted_closes, True, mid, len(sorted_closes), key=lambda c: not near(c))
+        if lo >= hi:
+            result.append(False)
+            continue
+        k = (hi - lo).bit_length() - 1
+        last_index = max(max_tables[k][lo], max_tables[k][hi - (1 << k)])
+        result.append(bool(last_index >= start))
+    return result
+
+
 def detect_historical_sweeps(df, swing_highs, swing_lows, current_price, lookback_candles=100):
     """
     Обнаружение исторических sweeps swing levels:
     - Swing level был пробит ценой
     - Цена вернулась обратно (reversal)
     - Цена не возвращалась к этому уровню длительное время
+
+    Векторная реализация: первый пробой и первое восстановление для всех
+    swing'ов ищутся бинарным подъёмом по sparse table экстремумов,
+    ретест — поиском по отсортированным close. O((n + swings) log n).
     
     Args:
         df: OHLCV DataFrame
@@ -271,96 +343,53 @@ def detect_historical_sweeps(df, swing_highs, swing_lows, current_price, lookbac
     
     if df is None or len(df) < 10:
         return historical_sweeps
-    
-    # Ограничиваем анализ последними N свечами
-    start_idx = max(0, len(df) - lookback_candles)
-    df_slice = df.iloc[start_idx:]
-    
-    # Анализируем swing lows (проверяем sweep вниз)
-    for swing in swing_lows:
-        swing_price = swing.get("price")
-        swing_idx = swing.get("index", 0)
-        
-        if swing_price is None or swing_price >= current_price:
-            continue  # Интересуют только уровни ниже текущей цены
-        
-        # Ищем свечи после swing, которые пробили его вниз
-        swept = False
-        swept_idx = None
-        recovery_confirmed = False
-        
-        for i in range(swing_idx + 1, len(df)):
-            candle = df.iloc[i]
-            
-            # Пробой вниз: low пробил swing_price
-            if candle["low"] < swing_price and not swept:
-                swept = True
-                swept_idx = i
-            
-            # Восстановление: close вернулся выше swing_price
-            if swept and candle["close"] > swing_price * 1.002:  # +0.2% подтверждение
-                recovery_confirmed = True
-                
-                # Проверяем, не возвращались ли к этому уровню после
-                no_retest = True
-                for j in range(i + 5, len(df)):  # Минимум 5 свечей без ретеста
-                    if abs(df.iloc[j]["close"] - swing_price) / swing_price < 0.005:  # < 0.5%
-                        no_retest = False
-                        break
-                
-                if no_retest:
-                    historical_sweeps.append({
-                        "price": swing_price,
-                        "direction": "down",
-                        "swept_at_index": swept_idx,
-                        "recovery_confirmed": True,
-                        "type": "swing_low",
-                        "candles_ago": len(df) - swept_idx
-                    })
-                break
-    
-    # Анализируем swing highs (проверяем sweep вверх)
-    for swing in swing_highs:
-        swing_price = swing.get("price")
-        swing_idx = swing.get("index", 0)
-        
-        if swing_price is None or swing_price <= current_price:
-            continue  # Интересуют только уровни выше текущей цены
-        
-        # Ищем свечи после swing, которые пробили его вверх
-        swept = False
-        swept_idx = None
-        recovery_confirmed = False
-        
-        for i in range(swing_idx + 1, len(df)):
-            candle = df.iloc[i]
-            
-            # Пробой вверх: high пробил swing_price
-            if candle["high"] > swing_price and not swept:
-                swept = True
-                swept_idx = i
-            
-            # Восстановление: close вернулся ниже swing_price
-            if swept and candle["close"] < swing_price * 0.998:  # -0.2% подтверждение
-                recovery_confirmed = True
-                
-                # Проверяем, не возвращались ли к этому уровню после
-                no_retest = True
-                for j in range(i + 5, len(df)):  # Минимум 5 свечей без ретеста
-                    if abs(df.iloc[j]["close"] - swing_price) / swing_price < 0.005:  # < 0.5%
-                        no_retest = False
-                        break
-                
-                if no_retest:
-                    historical_sweeps.append({
-                        "price": swing_price,
-                        "direction": "up",
-                        "swept_at_index": swept_idx,
-                        "recovery_confirmed": True,
-                        "type": "swing_high",
-                        "candles_ago": len(df) - swept_idx
-                    })
-                break
+
+    n = len(df)
+    lows = df["low"].to_numpy(dtype=np.float64)
+    highs = df["high"].to_numpy(dtype=np.float64)
+    closes = df["close"].to_numpy(dtype=np.float64)
+
+    # swing lows — только уровни ниже текущей цены (sweep вниз),
+    # swing highs — только выше текущей цены (sweep вверх)
+    lows_selected = [
+        swing for swing in swing_lows
+        if swing.get("price") is not None and swing.get("price") < current_price
+    ]
+    highs_selected = [
+        swing for swing in swing_highs
+        if swing.get("price") is not None and swing.get("price") > current_price
+    ]
+
+    for swings, direction in ((lows_selected, "down"), (highs_selected, "up")):
+        if not swings:
+            continue
+        prices = [swing["price"] for swing in swings]
+        price_arr = np.array(prices, dtype=np.float64)
+        starts = np.array([swing.get("index", 0) + 1 for swing in swings], dtype=np.int64)
+
+        if direction == "down":
+            # Пробой вниз: low < swing_price; восстановление: close > swing_price * 1.002
+            swept_idx = _first_below(lows, starts, price_arr)
+            recovery_idx = _first_below(-closes, swept_idx, -(price_arr * 1.002))
+        else:
+            # Пробой вверх: high > swing_price; восстановление: close < swing_price * 0.998
+            swept_idx = _first_below(-highs, starts, -price_arr)
+            recovery_idx = _first_below(closes, swept_idx, price_arr * 0.998)
+
+        recovered = np.flatnonzero(recovery_idx < n)
+        # Минимум 5 свечей после восстановления без ретеста
+        retested = _has_retest(closes, [prices[i] for i in recovered], (recovery_idx[recovered] + 5).tolist())
+
+        for i, was_retested in zip(recovered.tolist(), retested):
+            if was_retested:
+                continue
+            historical_sweeps.append({
+                "price": prices[i],
+                "direction": direction,
+                "swept_at_index": int(swept_idx[i]),
+                "recovery_confirmed": True,
+                "type": "swing_low" if direction == "down" else "swing_high",
+                "candles_ago": n - int(swept_idx[i])
+            })
     
     return historical_sweeps
-
@@ -5,52 +5,73 @@
 Помечает уровни, которые были swept, чтобы не использовать их повторно
 """
 
+import bisect
+import heapq
 import time
 
 
 class SweptLevelsTracker:
     """
     Отслеживает swept (отработанные) уровни ликвидности
+
+    Уровни хранятся в отсортированном по цене индексе (поиск в окне допуска
+    через bisect) и в min-heap по времени (очистка устаревших без перестройки
+    списка). Порядок добавления сохраняется: при нескольких совпадениях
+    берётся самый ранний уровень, как и при линейном обходе.
     """
-    
-    def __init__(self, expiry_hours=24):
+
+    def __init__(self, expiry_hours=24, clock=None):
         """
         Args:
             expiry_hours: через сколько часов swept уровень "забывается"
+            clock: функция текущего времени в секундах (по умолчанию time.time;
+                бэктест подставляет время свечи)
         """
-        self.swept_levels = []  # [{price, direction, timestamp, reason}]
         self.expiry_seconds = expiry_hours * 3600
-    
+        self.clock = clock
+        self._levels = {}  # seq -> {price, direction, timestamp, reason, count}, в порядке добавления
+        self._prices = []  # отсортированные цены
+        self._seqs = []  # seq уровня для каждой цены в _prices
+        self._expiry_heap = []  # (timestamp, seq); устаревшие записи пропускаются лениво
+        self._next_seq = 0
+
+    @property
+    def swept_levels(self):
+        """Активные swept уровни в порядке добавления"""
+        return list(self._levels.values())
+
     def mark_as_swept(self, price, direction, reason="sweep", candles_ago=None):
         """
         Помечает уровень как swept (отработанный)
-        
+
         Args:
             price: цена уровня
             direction: "up" (swept вверх) или "down" (swept вниз)
             reason: причина (sweep, liquidation, breakout, historical_sweep_...)
             candles_ago: сколько свечей назад был sweep (для исторических sweeps)
         """
-        timestamp = time.time()
-        
+        timestamp = self._now()
+
         # Проверяем, нет ли уже такого уровня (в пределах 0.1%)
-        for level in self.swept_levels:
-            if abs(level["price"] - price) / price < 0.001:  # < 0.1%
-                # КРИТИЧНО: НЕ инкрементируем count если это дубликат из того же цикла!
-                # Инкрементируем только если прошло > 60 секунд с последнего обновления
-                time_since_last = timestamp - level.get("timestamp", 0)
-                
-                if time_since_last < 60:  # < 1 минуты
-                    # Это дубликат из того же цикла анализа - игнорируем
-                    return
-                
-                # Прошло > 1 минуты - это НОВЫЙ sweep того же уровня
-                level["timestamp"] = timestamp
-                level["count"] = level.get("count", 1) + 1
-                if candles_ago and "candles_ago" not in level:
-                    level["candles_ago"] = candles_ago
+        seq = self._find_first(price, lambda level_price: abs(level_price - price) / price < 0.001, 0.1)
+        if seq is not None:
+            level = self._levels[seq]
+            # КРИТИЧНО: НЕ инкрементируем count если это дубликат из того же цикла!
+            # Инкрементируем только если прошло > 60 секунд с последнего обновления
+            time_since_last = timestamp - level.get("timestamp", 0)
+
+            if time_since_last < 60:  # < 1 минуты
+                # Это дубликат из того же цикла анализа - игнорируем
                 return
-        
+
+            # Прошло > 1 минуты - это НОВЫЙ sweep того же уровня
+            level["timestamp"] = timestamp
+            level["count"] = level.get("count", 1) + 1
+            if candles_ago and "candles_ago" not in level:
+                level["candles_ago"] = candles_ago
+            heapq.heappush(self._expiry_heap, (timestamp, seq))
+            return
+
         # Добавляем новый swept уровень
         swept_level = {
             "price": price,
@@ -59,82 +80,140 @@ class SweptLevelsTracker:
             "reason": reason,
             "count": 1
         }
-        
+
         if candles_ago:
             swept_level["candles_ago"] = candles_ago
-        
-        self.swept_levels.append(swept_level)
-    
+
+        seq = self._next_seq
+        self._next_seq += 1
+        self._levels[seq] = swept_level
+        pos = bisect.bisect_right(self._prices, price)
+        self._prices.insert(pos, price)
+        self._seqs.insert(pos, seq)
+        heapq.heappush(self._expiry_heap, (timestamp, seq))
+
+    def mark_many(self, levels):
+        """
+        Пакетная пометка уровней
+
+        Args:
+            levels: list of dict {price, direction, reason?, candles_ago?}
+        """
+        for level in levels:
+            self.mark_as_swept(
+                level["price"],
+                level["direction"],
+                reason=level.get("reason", "sweep"),
+                candles_ago=level.get("candles_ago")
+            )
+
     def is_swept(self, price, tolerance_pct=0.5):
         """
         Проверяет, является ли уровень swept
-        
+
         Args:
             price: цена уровня
             tolerance_pct: допуск в процентах (если уровень в пределах tolerance от swept - считается swept)
-            
+
         Returns:
             bool: True если уровень swept
         """
         self._cleanup_expired()
-        
-        for level in self.swept_levels:
-            if abs(level["price"] - price) / price * 100 < tolerance_pct:
-                return True
-        return False
-    
+        return self._find_first(price, self._tolerance_check(price, tolerance_pct), tolerance_pct) is not None
+
     def get_swept_info(self, price, tolerance_pct=0.5):
         """
         Получает информацию о swept уровне
-        
+
         Returns:
             dict или None
         """
         self._cleanup_expired()
-        
-        for level in self.swept_levels:
-            if abs(level["price"] - price) / price * 100 < tolerance_pct:
-                return level
-        return None
-    
+        seq = self._find_first(price, self._tolerance_check(price, tolerance_pct), tolerance_pct)
+        return self._levels[seq] if seq is not None else None
+
+    def swept_mask(self, prices, tolerance_pct=0.5):
+        """
+        Пакетная проверка: swept ли каждая цена (одна очистка на весь пакет)
+
+        Args:
+            prices: список цен
+            tolerance_pct: допуск в процентах
+
+        Returns:
+            list[bool]
+        """
+        self._cleanup_expired()
+        return [
+            self._find_first(price, self._tolerance_check(price, tolerance_pct), tolerance_pct) is not None
+            for price in prices
+        ]
+
     def filter_swept_levels(self, levels, tolerance_pct=0.5):
         """
         Фильтрует список уровней, исключая swept
-        
+
         Args:
             levels: list of dict с ключом "price"
             tolerance_pct: допуск в процентах
-            
+
         Returns:
             list: отфильтрованные уровни (только не-swept)
         """
-        self._cleanup_expired()
-        
-        filtered = []
-        for level in levels:
-            price = level.get("price")
-            if price is None:
-                continue
-            
-            if not self.is_swept(price, tolerance_pct):
-                filtered.append(level)
-        
-        return filtered
-    
+        levels = [level for level in levels if level.get("price") is not None]
+        mask = self.swept_mask([level["price"] for level in levels], tolerance_pct)
+        return [level for level, swept in zip(levels, mask) if not swept]
+
     def get_all_swept(self):
         """Возвращает все активные swept уровни"""
         self._cleanup_expired()
-        return self.swept_levels.copy()
-    
+        return self.swept_levels
+
+    def _now(self):
+        return self.clock() if self.clock is not None else time.time()
+
+    @staticmethod
+    def _tolerance_check(price, tolerance_pct):
+        return lambda level_price: abs(level_price - price) / price * 100 < tolerance_pct
+
+    def _find_first(self, price, matches, window_pct):
+        """
+        Самый ранний (по порядку добавления) уровень, удовлетворяющий matches
+
+        Кандидаты берутся из окна ±window_pct% вокруг price (с небольшим запасом
+        на округление), точное условие проверяется для каждого кандидата.
+        """
+        if not self._prices:
+            return None
+        half_width = abs(price) * window_pct / 100 * (1 + 1e-9) + 1e-12
+        lo = bisect.bisect_left(self._prices, price - half_width)
+        hi = bisect.bisect_right(self._prices, price + half_width)
+        found = None
+        for i in range(lo, hi):
+            seq = self._seqs[i]
+            if (found is None or seq < found) and matches(self._prices[i]):
+                found = seq
+        return found
+
     def _cleanup_expired(self):
-        """Удаляет устаревшие swept уровни"""
-        current_time = time.time()
-        self.swept_levels = [
-            level for level in self.swept_levels
-            if (current_time - level["timestamp"]) < self.expiry_seconds
-        ]
-    
+        """Удаляет устаревшие swept уровни (вершины heap, O(log n) на уровень)"""
+        current_time = self._now()
+        heap = self._expiry_heap
+        while heap and (current_time - heap[0][0]) >= self.expiry_seconds:
+            timestamp, seq = heapq.heappop(heap)
+            level = self._levels.get(seq)
+            if level is None or level["timestamp"] != timestamp:
+                continue  # уровень обновлён позже — в heap есть более свежая запись
+            del self._levels[seq]
+            pos = bisect.bisect_left(self._prices, level["price"])
+            while self._seqs[pos] != seq:
+                pos += 1
+            del self._prices[pos]
+            del self._seqs[pos]
+
     def reset(self):
         """Очищает все swept уровни"""
-        self.swept_levels = []
-
+        self._levels = {}
+        self._prices = []
+        self._seqs = []
+        self._expiry_heap = []
@@ -5,18 +5,25 @@
 Проверяет был ли уровень коснут недавно (в последних N свечах)
 """
 
+import numpy as np
+
 
 def detect_recent_touches(df, liquidity_levels, lookback=20, tolerance_pct=0.2):
     """
     Проверяет какие уровни ликвидности были коснуты недавно
-    
+
+    Векторная реализация: накопленный максимум high (для buy_stops) и
+    минимум low (для sell_stops) по окну монотонны, поэтому первая свеча
+    касания для всех уровней находится одним searchsorted.
+    O((levels + candles) log candles).
+
     Args:
         df: OHLCV DataFrame
         liquidity_levels: список уровней для проверки
             [{"price": float, "type": "buy_stops/sell_stops"}, ...]
         lookback: сколько последних свечей проверять (default: 20)
         tolerance_pct: допуск касания в % (default: 0.2%)
-    
+
     Returns:
         {
             "touched_levels": [{"price": X, "type": Y, "candles_ago": N}, ...],
@@ -28,99 +35,134 @@ def detect_recent_touches(df, liquidity_levels, lookback=20, tolerance_pct=0.2):
             "touched_levels": [],
             "untouched_levels": liquidity_levels
         }
-    
-    touched = []
-    untouched = []
-    
+
     # Анализируем последние N свечей
     recent_candles = df.iloc[-min(lookback, len(df)):]
-    
-    for level in liquidity_levels:
-        price = level.get("price", 0)
-        level_type = level.get("type", "")
-        
-        if price == 0:
-            continue
-        
-        # Порог касания
-        tolerance = price * (tolerance_pct / 100)
-        upper_bound = price + tolerance
-        lower_bound = price - tolerance
-        
-        # Проверяем был ли касание в recent_candles
-        was_touched = False
-        touch_candle_idx = None
-        
-        for idx, candle in enumerate(recent_candles.itertuples()):
-            # Проверяем касание high или low
-            if level_type == "buy_stops":
-                # Buy stops сверху - проверяем high
-                if candle.high >= lower_bound:
-                    was_touched = True
-                    touch_candle_idx = len(recent_candles) - idx - 1  # Сколько свечей назад
-                    break
-            elif level_type == "sell_stops":
-                # Sell stops снизу - проверяем low
-                if candle.low <= upper_bound:
-                    was_touched = True
-                    touch_candle_idx = len(recent_candles) - idx - 1
-                    break
-            else:
-                # Универсальная проверка (high или low в диапазоне)
-                if lower_bound <= candle.high <= upper_bound or lower_bound <= candle.low <= upper_bound:
-                    was_touched = True
-                    touch_candle_idx = len(recent_candles) - idx - 1
-                    break
-        
-        if was_touched:
-            touched.append({
-                "price": price,
-                "type": level_type,
-                "candles_ago": touch_candle_idx,
+    highs = recent_candles["high"].to_numpy(dtype=np.float64)
+    lows = recent_candles["low"].to_numpy(dtype=np.float64)
+    n = len(highs)
+
+    levels = [level for level in liquidity_levels if level.get("price", 0) not in (0, None)]
+    prices = np.array([level["price"] for level in levels], dtype=np.float64)
+    types = np.array([level.get("type", "") for level in levels], dtype=object)
+
+    # Порог касания
+    tolerance = prices * (tolerance_pct / 100)
+    first_touch = first_touch_indices(highs, lows, types, prices - tolerance, prices + tolerance)
+
+    touched = []
+    untouched = []
+    for level, idx in zip(levels, first_touch.tolist()):
+        if idx < n:
+            touch = {
+                "price": level["price"],
+                "type": level.get("type", ""),
+                "candles_ago": n - idx - 1,  # Сколько свечей назад
                 "source": level.get("source", "unknown")
-            })
+            }
+            if "id" in level:
+                touch["id"] = level["id"]  # id из LiquidityLevelRegistry
+            touched.append(touch)
         else:
             untouched.append(level)
-    
+
     return {
         "touched_levels": touched,
         "untouched_levels": untouched
     }
 
 
+def first_touch_indices(highs, lows, types, lower_bounds, upper_bounds):
+    """
+    Индекс первой свечи, коснувшейся каждого уровня
+
+    Накопленный максимум high (для buy_stops) и минимум low (для sell_stops)
+    монотонны, поэтому первая свеча касания для всех уровней находится одним
+    searchsorted; остальные типы — маской уровни × свечи (high или low в допуске).
+
+    Args:
+        highs, lows: массивы свечей
+        types: np.ndarray типов уровней (dtype=object)
+        lower_bounds, upper_bounds: границы допуска уровней
+
+    Returns:
+        np.ndarray: индексы свечей (len(highs) — касания не было)
+    """
+    n = len(highs)
+    lower_bounds = np.asarray(lower_bounds, dtype=np.float64)
+    upper_bounds = np.asarray(upper_bounds, dtype=np.float64)
+
+    # NaN не касается ни одного уровня
+    highs_clean = np.where(np.isnan(highs), -np.inf, highs)
+    lows_clean = np.where(np.isnan(lows), np.inf, lows)
+    running_high = np.maximum.accumulate(highs_clean)
+    neg_running_low = -np.minimum.accumulate(lows_clean)
+
+    # Индекс первой (самой ранней) свечи касания; n = касания не было
+    first_touch = np.full(len(types), n, dtype=np.int64)
+
+    # Buy stops сверху - проверяем high
+    buy = types == "buy_stops"
+    first_touch[buy] = np.searchsorted(running_high, lower_bounds[buy], side="left")
+
+    # Sell stops снизу - проверяем low
+    sell = types == "sell_stops"
+    first_touch[sell] = np.searchsorted(neg_running_low, -upper_bounds[sell], side="left")
+
+    # Универсальная проверка (high или low в диапазоне) — маска уровни × свечи
+    other = ~(buy | sell)
+    if other.any():
+        lb = lower_bounds[other, None]
+        ub = upper_bounds[other, None]
+        in_range = ((lb <= highs) & (highs <= ub)) | ((lb <= lows) & (lows <= ub))
+        first_touch[other] = np.where(in_range.any(axis=1), in_range.argmax(axis=1), n)
+    return first_touch
+
+
 def filter_touched_levels(liquidity_levels, touched_levels, min_cooldown_candles=20):
     """
     Фильтрует уровни ликвидности - удаляет недавно коснутые
-    
+
+    Коснутые цены сортируются один раз; для каждого уровня точное условие
+    проверяется только для кандидатов из окна searchsorted.
+
     Args:
         liquidity_levels: полный список уровней
         touched_levels: список коснутых уровней (из detect_recent_touches)
         min_cooldown_candles: минимальное количество свечей после касания
                              для повторного учёта уровня (default: 20)
                              20 свечей на 5м = ~1.5 часа
-    
+
     Returns:
         list: отфильтрованные уровни (без недавно коснутых)
     """
     if not touched_levels:
         return liquidity_levels
-    
-    # Создаём set touched prices для быстрого поиска
-    touched_prices = set()
-    for touch in touched_levels:
-        # Только если касание было недавно (< min_cooldown_candles)
-        if touch.get("candles_ago", 999) < min_cooldown_candles:
-            touched_prices.add(touch["price"])
-    
+
+    # Только если касание было недавно (< min_cooldown_candles)
+    touched_prices = np.unique(np.array([
+        touch["price"] for touch in touched_levels
+        if touch.get("candles_ago", 999) < min_cooldown_candles
+    ], dtype=np.float64))
+    if len(touched_prices) == 0 or touched_prices[0] <= 0:
+        return [level for level in liquidity_levels if not _is_touched(level.get("price", 0), touched_prices)]
+
+    # |price - tp| / tp < 0.1%  ⇒  tp ∈ (price / 1.001, price / 0.999) — окно с запасом на округление
+    prices = np.array([level.get("price", 0) for level in liquidity_levels], dtype=np.float64)
+    lo = np.searchsorted(touched_prices, prices / 1.001 * (1 - 1e-9), side="left")
+    hi = np.searchsorted(touched_prices, prices / 0.999 * (1 + 1e-9), side="right")
+
     # Фильтруем
     filtered = []
-    for level in liquidity_levels:
-        price = level.get("price", 0)
+    for level, start, end in zip(liquidity_levels, lo.tolist(), hi.tolist()):
         # Допуск 0.1% для сравнения float
-        is_touched = any(abs(price - tp) / tp < 0.001 for tp in touched_prices)
-        
-        if not is_touched:
-            filtered.append(level)
-    
+        if start < end and _is_touched(level.get("price", 0), touched_prices[start:end]):
+            continue
+        filtered.append(level)
+
     return filtered
 
+
+def _is_touched(price, touched_prices):
+    """Точная проверка: цена в пределах 0.1% от одной из коснутых"""
+    return any(abs(price - tp) / tp < 0.001 for tp in touched_prices.tolist())
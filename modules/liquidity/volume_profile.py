@@ -5,9 +5,97 @@ Volume Profile - распределение объёмов по ценовым 
 Определяет PoC (Point of Control), VAL/VAH (Value Area)
 """
 
+from collections import deque
+
 import pandas as pd
 import numpy as np
 
+from .ath_atl import RollingExtremes
+
+
+# Якоря для инкрементальных профилей (длина периода в ms; visible — скользящее окно)
+ANCHOR_PERIODS_MS = {
+    "session": 8 * 3600 * 1000,  # Азия / Лондон / Нью-Йорк по 8 часов (UTC)
+    "day": 24 * 3600 * 1000,
+    "week": 7 * 24 * 3600 * 1000,
+}
+WEEK_OFFSET_MS = 4 * 24 * 3600 * 1000  # 1970-01-01 — четверг, неделя начинается с понедельника
+
+
+def spread_volume_to_bins(lows, highs, volumes, bin_lows, bin_highs, closed_edges=True, chunk_size=4096):
+    """
+    Распределяет объём свечей по ценовым бинам пропорционально перекрытию
+
+    Считается матрицей (свечи × бины) блоками по chunk_size свечей,
+    без Python-цикла по бинам.
+
+    Args:
+        lows, highs, volumes: массивы свечей
+        bin_lows, bin_highs: границы бинов
+        closed_edges: свеча нулевой высоты попадает во все бины, границы которых
+            её касаются (как в исходном алгоритме); иначе — в один бин [low, high)
+        chunk_size: размер блока свечей
+
+    Returns:
+        np.ndarray: объём в каждом бине
+    """
+    lows = np.asarray(lows, dtype=np.float64)
+    highs = np.asarray(highs, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+    bin_lows = np.asarray(bin_lows, dtype=np.float64)
+    bin_highs = np.asarray(bin_highs, dtype=np.float64)
+
+    total = np.zeros(len(bin_lows))
+    for start in range(0, len(lows), chunk_size):
+        lo = lows[start:start + chunk_size, None]
+        hi = highs[start:start + chunk_size, None]
+        vol = volumes[start:start + chunk_size, None]
+        candle_range = hi - lo
+
+        touches = (hi >= bin_lows) & (lo <= bin_highs)
+        if not closed_edges:
+            touches = np.where(candle_range > 0, touches, (lo >= bin_lows) & (lo < bin_highs))
+        overlap = np.minimum(hi, bin_highs) - np.maximum(lo, bin_lows)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            overlap_pct = np.where(candle_range > 0, overlap / candle_range, 1.0)
+        total += np.where(touches, vol * overlap_pct, 0.0).sum(axis=0)
+    return total
+
+
+def summarize_profile(bin_prices, bin_volumes, value_area_pct=0.70):
+    """
+    PoC / VAL / VAH по готовому распределению объёма
+
+    Args:
+        bin_prices: нижние границы бинов (по возрастанию)
+        bin_volumes: объём в бинах
+        value_area_pct: доля объёма в Value Area
+
+    Returns:
+        dict в формате calculate_volume_profile
+    """
+    bin_prices = np.asarray(bin_prices, dtype=np.float64)
+    bin_volumes = np.asarray(bin_volumes, dtype=np.float64)
+
+    # PoC — первый бин с максимальным объёмом
+    poc_i = int(np.argmax(bin_volumes))
+
+    # Value Area: бины по убыванию объёма (стабильно), пока не набрано 70%
+    total_volume = float(bin_volumes.sum())
+    order = np.argsort(-bin_volumes, kind="stable")
+    accumulated_before = np.concatenate(([0.0], np.cumsum(bin_volumes[order])[:-1]))
+    count = int(np.searchsorted(accumulated_before, total_volume * value_area_pct, side="left"))
+    value_area_prices = bin_prices[order[:count]]
+
+    return {
+        "poc": float(bin_prices[poc_i]),
+        "poc_volume": float(bin_volumes[poc_i]),
+        "val": float(value_area_prices.min()) if count else None,
+        "vah": float(value_area_prices.max()) if count else None,
+        "profile": dict(zip(bin_prices.tolist(), bin_volumes.tolist())),
+        "total_volume": total_volume
+    }
+
 
 def calculate_volume_profile(df, num_bins=50):
     """
@@ -33,9 +121,12 @@ def calculate_volume_profile(df, num_bins=50):
             "profile": {}
         }
     
+    lows = df['low'].to_numpy(dtype=np.float64)
+    highs = df['high'].to_numpy(dtype=np.float64)
+    
     # Определяем диапазон цен
-    price_min = df['low'].min()
-    price_max = df['high'].max()
+    price_min = lows.min()
+    price_max = highs.max()
     
     if price_min >= price_max:
         return {
@@ -45,68 +136,297 @@ def calculate_volume_profile(df, num_bins=50):
             "profile": {}
         }
     
-    # Создаём бины (price bins)
+    # Создаём бины (price bins) и распределяем объём каждой свечи по бинам
     price_bins = np.linspace(price_min, price_max, num_bins + 1)
+    bin_volumes = spread_volume_to_bins(
+        lows, highs, df['volume'].to_numpy(dtype=np.float64),
+        price_bins[:-1], price_bins[1:]
+    )
     
-    # Инициализируем объёмы для каждого бина
-    volume_at_price = {float(price_bins[i]): 0.0 for i in range(num_bins)}
-    
-    # Распределяем объём каждой свечи по бинам
-    for idx in range(len(df)):
-        candle_low = df['low'].iloc[idx]
-        candle_high = df['high'].iloc[idx]
-        candle_volume = df['volume'].iloc[idx]
-        
-        # Находим бины, которые пересекает свеча
-        for i in range(num_bins):
-            bin_low = price_bins[i]
-            bin_high = price_bins[i + 1]
-            
-            # Проверяем пересечение
-            if candle_high >= bin_low and candle_low <= bin_high:
-                # Пропорция объёма, попадающая в этот бин
-                overlap_low = max(candle_low, bin_low)
-                overlap_high = min(candle_high, bin_high)
-                overlap_pct = (overlap_high - overlap_low) / (candle_high - candle_low) if candle_high > candle_low else 1.0
-                
-                volume_at_price[bin_low] += candle_volume * overlap_pct
-    
-    # Находим PoC (Point of Control) - бин с максимальным объёмом
-    poc_price = max(volume_at_price, key=volume_at_price.get)
-    poc_volume = volume_at_price[poc_price]
-    
-    # Сортируем бины по объёму (descending)
-    sorted_bins = sorted(volume_at_price.items(), key=lambda x: x[1], reverse=True)
-    
-    # Находим Value Area (70% объёма)
-    total_volume = sum(volume_at_price.values())
-    target_volume = total_volume * 0.70
-    
-    accumulated_volume = 0.0
-    value_area_prices = []
-    
-    for price, volume in sorted_bins:
-        if accumulated_volume >= target_volume:
-            break
-        value_area_prices.append(price)
-        accumulated_volume += volume
-    
-    # VAL и VAH - минимальная и максимальная цены в Value Area
-    if value_area_prices:
-        val = min(value_area_prices)
-        vah = max(value_area_prices)
-    else:
-        val = None
-        vah = None
-    
-    return {
-        "poc": poc_price,
-        "poc_volume": poc_volume,
-        "val": val,
-        "vah": vah,
-        "profile": volume_at_price,
-        "total_volume": total_volume
-    }
+    return summarize_profile(price_bins[:-1], bin_volumes)
+
+
+class RollingVolumeProfile:
+    """
+    Volume Profile скользящего окна: тот же результат, что
+    calculate_volume_profile(df, num_bins), без раскладки всего окна каждый цикл.
+
+    Сетка бинов натянута на min(low) / max(high) окна. Пока экстремумы не
+    меняются, объём закрытых свечей ведётся на сетке инкрементально: новая
+    свеча добавляется, ушедшая из окна — вычитается, формирующаяся
+    добавляется при чтении. Новый экстремум или уход экстремума из окна
+    меняет сетку — тогда закрытые свечи окна раскладываются заново (rebuilds).
+    """
+
+    def __init__(self, num_bins=50):
+        """
+        Args:
+            num_bins: количество ценовых бинов
+        """
+        self.num_bins = num_bins
+        self.extremes = RollingExtremes()
+        self.rebuilds = 0
+        self.reset()
+
+    def reset(self):
+        """Полный сброс профиля"""
+        self._window = deque()  # (ts, low, high, volume) закрытых свечей окна
+        self._grid = None  # (price_min, price_max), на которых построен _closed
+        self._closed = None  # объём закрытых свечей окна по бинам
+        self.last_closed_ts = None
+        self.extremes.reset()
+
+    def update(self, df):
+        """
+        Добавляет новые свечи окна и возвращает профиль
+
+        Args:
+            df: OHLCV DataFrame (скользящее окно, последняя свеча — формирующаяся)
+
+        Returns:
+            dict в формате calculate_volume_profile
+        """
+        if df.empty or len(df) < 10 or 'timestamp' not in df.columns:
+            return calculate_volume_profile(df, num_bins=self.num_bins)
+
+        timestamps = df['timestamp'].to_numpy()
+        if self.last_closed_ts is not None and (
+                timestamps[-1] < self.last_closed_ts or (self._window and self._window[0][0] > timestamps[0])):
+            # Другая серия или окно с неизвестными нам свечами — начинаем заново
+            self.reset()
+
+        lows = df['low'].to_numpy(dtype=np.float64)
+        highs = df['high'].to_numpy(dtype=np.float64)
+        volumes = df['volume'].to_numpy(dtype=np.float64)
+        price_max, price_min = self.extremes.update(df)
+
+        closed_end = len(df) - 1
+        start = 0 if self.last_closed_ts is None else int(np.searchsorted(timestamps, self.last_closed_ts, side="right"))
+        added = slice(start, closed_end)
+        self._window.extend(zip(timestamps[added].tolist(), lows[added], highs[added], volumes[added]))
+        if start < closed_end:
+            self.last_closed_ts = timestamps[closed_end - 1]
+        dropped = []
+        while self._window and self._window[0][0] < timestamps[0]:
+            dropped.append(self._window.popleft())
+
+        if not price_min < price_max:
+            self._grid = self._closed = None
+            return {"poc": None, "val": None, "vah": None, "profile": {}}
+
+        price_bins = np.linspace(price_min, price_max, self.num_bins + 1)
+        bin_lows, bin_highs = price_bins[:-1], price_bins[1:]
+        if self._grid == (price_min, price_max):
+            if start < closed_end:
+                self._closed += spread_volume_to_bins(lows[added], highs[added], volumes[added], bin_lows, bin_highs)
+            if dropped:
+                _, lo, hi, vol = zip(*dropped)
+                self._closed -= spread_volume_to_bins(lo, hi, vol, bin_lows, bin_highs)
+        else:
+            # Сетка изменилась — раскладываем закрытые свечи окна заново
+            _, lo, hi, vol = zip(*self._window) if self._window else ((), (), (), ())
+            self._closed = spread_volume_to_bins(lo, hi, vol, bin_lows, bin_highs)
+            self._grid = (price_min, price_max)
+            self.rebuilds += 1
+
+        forming = spread_volume_to_bins(lows[-1:], highs[-1:], volumes[-1:], bin_lows, bin_highs)
+        # Вычитания оставляют float-остатки около нуля
+        return summarize_profile(bin_lows, np.maximum(self._closed + forming, 0.0))
+
+
+class AnchoredVolumeProfile:
+    """
+    Инкрементальный Volume Profile для одного якоря.
+
+    Объём хранится на фиксированной ценовой сетке (bin_size), поэтому новые
+    свечи просто добавляются в свои бины — пересчёт истории не нужен.
+    PoC/VAL/VAH пересчитываются лениво при чтении.
+
+    Якоря:
+      - session / day / week: профиль сбрасывается с началом нового периода (UTC)
+      - visible: скользящее окно последних visible_candles свечей
+    """
+
+    def __init__(self, anchor="day", bin_pct=0.1, bin_size=None, visible_candles=100, value_area_pct=0.70):
+        """
+        Args:
+            anchor: "session" | "day" | "week" | "visible"
+            bin_pct: размер бина в % от цены первой свечи (если bin_size не задан)
+            bin_size: фиксированный размер бина в единицах цены
+            visible_candles: размер окна для anchor="visible"
+            value_area_pct: доля объёма в Value Area
+        """
+        if anchor not in ANCHOR_PERIODS_MS and anchor != "visible":
+            raise ValueError(f"Неизвестный якорь: {anchor}")
+        self.anchor = anchor
+        self.bin_pct = bin_pct
+        self.bin_size = bin_size
+        self.visible_candles = visible_candles
+        self.value_area_pct = value_area_pct
+        self.reset()
+
+    def reset(self):
+        """Полный сброс профиля"""
+        self._volumes = np.zeros(0)
+        self._origin = 0  # индекс бина, соответствующий _volumes[0]
+        self.anchor_start = None
+        self.last_closed_ts = None
+        self._tentative = None  # формирующаяся свеча (low, high, volume, ts)
+        self._window = deque()  # свечи окна для anchor="visible"
+        self._summary = None  # кэш PoC/VAL/VAH (None = нужно пересчитать)
+
+    def _anchor_start(self, ts):
+        if self.anchor == "visible":
+            return None
+        period = ANCHOR_PERIODS_MS[self.anchor]
+        offset = WEEK_OFFSET_MS if self.anchor == "week" else 0
+        return (int(ts) - offset) // period * period + offset
+
+    def _add(self, lows, highs, volumes, sign=1.0):
+        """Добавляет (или вычитает при sign=-1) объём свечей на сетку"""
+        if len(lows) == 0:
+            return
+        if self.bin_size is None:
+            self.bin_size = float(highs[0]) * self.bin_pct / 100 or 1.0
+        first = int(np.floor(np.min(lows) / self.bin_size))
+        last = int(np.floor(np.max(highs) / self.bin_size))
+        self._ensure_bins(first, last)
+        idx = np.arange(first, last + 1)
+        bin_lows = idx * self.bin_size
+        spread = spread_volume_to_bins(lows, highs, volumes, bin_lows, bin_lows + self.bin_size, closed_edges=False)
+        self._volumes[first - self._origin:last - self._origin + 1] += sign * spread
+        self._summary = None
+
+    def _ensure_bins(self, first, last):
+        if len(self._volumes) == 0:
+            self._origin = first
+            self._volumes = np.zeros(last - first + 1)
+            return
+        end = self._origin + len(self._volumes) - 1
+        if first >= self._origin and last <= end:
+            return
+        new_origin = min(first, self._origin)
+        new_end = max(last, end)
+        grown = np.zeros(new_end - new_origin + 1)
+        grown[self._origin - new_origin:self._origin - new_origin + len(self._volumes)] = self._volumes
+        self._origin = new_origin
+        self._volumes = grown
+
+    def _fold_closed(self, lows, highs, volumes, timestamps):
+        """Добавляет закрытые свечи с учётом смены периода / окна"""
+        if self.anchor == "visible":
+            self._window.extend(zip(lows.tolist(), highs.tolist(), volumes.tolist()))
+            self._add(lows, highs, volumes)
+            max_closed = max(self.visible_candles - 1, 0)
+            if len(self._window) > max_closed:
+                dropped = [self._window.popleft() for _ in range(len(self._window) - max_closed)]
+                lo, hi, vol = (np.array(col) for col in zip(*dropped))
+                self._add(lo, hi, vol, sign=-1.0)
+            return
+        first_start = self._anchor_start(timestamps[0])
+        last_start = self._anchor_start(timestamps[-1])
+        if last_start != self.anchor_start:
+            # Начался новый период — свечи прошлых периодов не нужны
+            self._volumes = np.zeros(0)
+            self.anchor_start = last_start
+        if first_start != self.anchor_start:
+            period = ANCHOR_PERIODS_MS[self.anchor]
+            offset = WEEK_OFFSET_MS if self.anchor == "week" else 0
+            mask = (timestamps.astype(np.int64) - offset) // period * period + offset == self.anchor_start
+            lows, highs, volumes = lows[mask], highs[mask], volumes[mask]
+        self._add(lows, highs, volumes)
+
+    def update(self, df):
+        """
+        Добавляет в профиль только новые свечи
+
+        Последняя свеча df считается формирующейся: её вклад пересчитывается
+        при каждом вызове, остальные свечи после last_closed_ts добавляются один раз.
+
+        Args:
+            df: OHLCV DataFrame с колонкой timestamp
+        """
+        if df is None or df.empty or 'timestamp' not in df.columns:
+            return
+        timestamps = df['timestamp'].to_numpy()
+        if self.last_closed_ts is not None and timestamps[-1] < self.last_closed_ts:
+            # Пришла другая/старая серия — начинаем заново
+            self.reset()
+
+        # Убираем прошлый вклад формирующейся свечи
+        if self._tentative is not None:
+            lo, hi, vol, ts = self._tentative
+            if self.anchor == "visible" or self._anchor_start(ts) == self.anchor_start:
+                self._add(np.array([lo]), np.array([hi]), np.array([vol]), sign=-1.0)
+            self._tentative = None
+
+        start = 0 if self.last_closed_ts is None else int(np.searchsorted(timestamps, self.last_closed_ts, side="right"))
+        if self.anchor == "visible":
+            start = max(start, len(df) - self.visible_candles)
+        lows = df['low'].to_numpy(dtype=np.float64)
+        highs = df['high'].to_numpy(dtype=np.float64)
+        volumes = df['volume'].to_numpy(dtype=np.float64)
+
+        closed_end = len(df) - 1
+        if start < closed_end:
+            self._fold_closed(lows[start:closed_end], highs[start:closed_end],
+                              volumes[start:closed_end], timestamps[start:closed_end])
+            self.last_closed_ts = timestamps[closed_end - 1]
+
+        # Формирующаяся свеча
+        ts = timestamps[-1]
+        if self.anchor != "visible" and self._anchor_start(ts) != self.anchor_start:
+            self._volumes = np.zeros(0)
+            self.anchor_start = self._anchor_start(ts)
+        self._add(lows[-1:], highs[-1:], volumes[-1:])
+        self._tentative = (lows[-1], highs[-1], volumes[-1], ts)
+        self._summary = None
+
+    def get_profile(self):
+        """
+        Returns:
+            dict в формате calculate_volume_profile + anchor / anchor_start
+        """
+        if self._summary is None:
+            # Порог отсекает остатки float-погрешности после вычитаний
+            tolerance = self._volumes.max() * 1e-12 if len(self._volumes) else 0.0
+            nonzero = np.flatnonzero(self._volumes > tolerance)
+            if len(nonzero) == 0:
+                summary = {"poc": None, "val": None, "vah": None, "profile": {}}
+            else:
+                lo, hi = nonzero[0], nonzero[-1] + 1
+                prices = (np.arange(lo, hi) + self._origin) * self.bin_size
+                summary = summarize_profile(prices, np.maximum(self._volumes[lo:hi], 0.0), self.value_area_pct)
+            summary["anchor"] = self.anchor
+            summary["anchor_start"] = self.anchor_start
+            self._summary = summary
+        return self._summary
+
+
+class MultiAnchorVolumeProfile:
+    """
+    Набор инкрементальных профилей (session / day / week / visible) для одной серии свечей
+    """
+
+    def __init__(self, anchors=("session", "day", "week", "visible"), bin_pct=0.1, visible_candles=100):
+        self.profiles = {
+            anchor: AnchoredVolumeProfile(anchor, bin_pct=bin_pct, visible_candles=visible_candles)
+            for anchor in anchors
+        }
+
+    def update(self, df):
+        """
+        Добавляет новые свечи во все профили
+
+        Returns:
+            dict: {anchor: profile}
+        """
+        for profile in self.profiles.values():
+            profile.update(df)
+        return self.get_profiles()
+
+    def get_profiles(self):
+        return {anchor: profile.get_profile() for anchor, profile in self.profiles.items()}
 
 
 def get_position_relative_to_value_area(current_price, volume_profile):
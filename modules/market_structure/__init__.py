@@ -9,6 +9,8 @@ from .trend import detect_trend
 from .range import detect_range
 from .fvg import detect_fvg
 from .orderblocks import detect_orderblocks
+from .incremental_structure import IncrementalMarketStructure
+from .mitigation import ZoneMitigationTracker, compute_mitigation
 
 __all__ = [
     'MarketStructureEngine',
@@ -16,6 +18,9 @@ __all__ = [
     'detect_trend',
     'detect_range',
     'detect_fvg',
-    'detect_orderblocks'
+    'detect_orderblocks',
+    'IncrementalMarketStructure',
+    'ZoneMitigationTracker',
+    'compute_mitigation'
 ]
 
@@ -3,34 +3,43 @@ def detect_fvg(df):
     Fair Value Gap — свеча оставила разрыв:
     Previous high < next low (бычий FVG)
     Previous low > next high (медвежий FVG)
+
+    Векторная реализация: сравнение сдвинутых колонок за один проход.
+    Бычий и медвежий FVG на одной свече невозможны одновременно.
     """
 
-    gaps = []
+    if len(df) < 3:
+        return []
 
-    for i in range(1, len(df)-1):
-        prev_high = df['high'][i-1]
-        next_low = df['low'][i+1]
+    high = df['high'].to_numpy()
+    low = df['low'].to_numpy()
+    prev_high, next_high = high[:-2], high[2:]
+    prev_low, next_low = low[:-2], low[2:]
 
-        prev_low = df['low'][i-1]
-        next_high = df['high'][i+1]
+    bullish = prev_high < next_low
+    bearish = prev_low > next_high
 
+    gaps = []
+    for i, is_bullish, is_bearish, p_high, n_low, p_low, n_high in zip(
+        range(1, len(df) - 1), bullish.tolist(), bearish.tolist(),
+        prev_high.tolist(), next_low.tolist(), prev_low.tolist(), next_high.tolist()
+    ):
         # Bullish FVG
-        if prev_high < next_low:
+        if is_bullish:
             gaps.append({
                 "index": i,
                 "type": "bullish",
-                "low": prev_high,
-                "high": next_low
+                "low": p_high,
+                "high": n_low
             })
 
         # Bearish FVG
-        if prev_low > next_high:
+        if is_bearish:
             gaps.append({
                 "index": i,
                 "type": "bearish",
-                "low": next_high,
-                "high": prev_low
+                "low": n_high,
+                "high": p_low
             })
 
     return gaps
-
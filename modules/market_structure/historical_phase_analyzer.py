@@ -5,9 +5,12 @@
 Отслеживает глобальные тренды формирования позиций китов
 """
 
+import logging
+import warnings
+
 import pandas as pd
 import numpy as np
-import logging
+from numpy.lib.stride_tricks import sliding_window_view
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +21,7 @@ class HistoricalPhaseAnalyzer:
     """
     
     def __init__(self):
-        pass
+        self._runs_cache = None  # (phases, runs) последнего анализа
     
     def analyze_historical_phases(self, df, timeframe_name="HTF"):
         """
@@ -97,121 +100,149 @@ class HistoricalPhaseAnalyzer:
         - Accumulation: высокий объём + боковое движение или медленный рост
         - Distribution: высокий объём + боковое движение или медленное падение
         - Execution: сильное движение цены с объёмом
+
+        Векторная реализация: окна по 11 свечей (i-10..i) считаются один раз
+        через sliding_window_view, классификация — np.select.
         """
-        phases = []
-        
-        # Скользящие средние для объёма и цены
-        volume_ma = df['volume'].rolling(window=10).mean()
-        price_ma = df['close'].rolling(window=10).mean()
-        
-        # Определяем волатильность
-        price_volatility = df['close'].rolling(window=10).std()
-        avg_volatility = price_volatility.mean()
-        
-        for i in range(10, len(df)):
-            window = df.iloc[i-10:i+1]
-            current = df.iloc[i]
-            
-            # Средний объём за окно
-            avg_volume = window['volume'].mean()
-            current_volume = current['volume']
-            
-            # Изменение цены за окно
-            price_change = (current['close'] - window['close'].iloc[0]) / window['close'].iloc[0] * 100
-            price_range = (window['high'].max() - window['low'].min()) / window['close'].iloc[0] * 100
-            
-            # Определяем фазу
-            if current_volume > avg_volume * 1.2:  # Высокий объём
-                if abs(price_change) < 2.0 and price_range < 3.0:  # Боковое движение
-                    # Накопление или распределение
-                    if price_change > 0:
-                        phase = "accumulation"
-                    else:
-                        phase = "distribution"
-                elif price_change > 3.0:  # Сильный рост
-                    phase = "execution_up"
-                elif price_change < -3.0:  # Сильное падение
-                    phase = "execution_down"
-                else:
-                    phase = "neutral"
-            else:
-                phase = "neutral"
-            
-            phases.append({
+        n = len(df)
+        if n <= 10:
+            return []
+
+        window_size = 11
+        volume = df['volume'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        volume_windows = sliding_window_view(volume, window_size)
+        high_windows = sliding_window_view(df['high'].to_numpy(dtype=np.float64), window_size)
+        low_windows = sliding_window_view(df['low'].to_numpy(dtype=np.float64), window_size)
+
+        # Средний объём за окно (как Series.mean: NaN пропускаются)
+        volume_nan = np.isnan(volume_windows)
+        volume_count = window_size - volume_nan.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg_volume = np.where(volume_nan, 0.0, volume_windows).sum(axis=1) / volume_count
+        current_volume = volume[10:]
+
+        # Изменение цены и диапазон за окно относительно первой свечи окна
+        first_close = close[:-10]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # окна целиком из NaN
+            window_high = np.nanmax(high_windows, axis=1)
+            window_low = np.nanmin(low_windows, axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            price_change = (close[10:] - first_close) / first_close * 100
+            price_range = (window_high - window_low) / first_close * 100
+
+        # Определяем фазу
+        high_volume = current_volume > avg_volume * 1.2  # Высокий объём
+        sideways = (np.abs(price_change) < 2.0) & (price_range < 3.0)  # Боковое движение
+        phase_labels = np.select(
+            [
+                high_volume & sideways & (price_change > 0),
+                high_volume & sideways,
+                high_volume & (price_change > 3.0),  # Сильный рост
+                high_volume & (price_change < -3.0)  # Сильное падение
+            ],
+            ["accumulation", "distribution", "execution_up", "execution_down"],
+            default="neutral"
+        )
+
+        labels = df.index[10:].tolist()
+        return [
+            {
                 "index": i,
                 "phase": phase,
-                "timestamp": current.name if hasattr(current.name, '__iter__') else i,
-                "price": current['close'],
-                "volume": current_volume,
-                "price_change_pct": price_change
-            })
-        
-        return phases
+                "timestamp": label if hasattr(label, '__iter__') else i,
+                "price": price,
+                "volume": current_vol,
+                "price_change_pct": change
+            }
+            for i, phase, label, price, current_vol, change in zip(
+                range(10, n), phase_labels.tolist(), labels,
+                close[10:].tolist(), current_volume.tolist(), price_change.tolist()
+            )
+        ]
     
+    def _phase_runs(self, df, phases):
+        """
+        Run-length encoding фаз: непрерывные отрезки одной фазы
+
+        Returns:
+            list: [(phase, start_idx, end_idx, price_low, price_high, volume_sum)],
+                где окно отрезка — df.iloc[start_idx:end_idx] (у последнего — до конца df)
+        """
+        if not phases:
+            return []
+        # История и зоны строятся по одним и тем же отрезкам — считаем один раз
+        if self._runs_cache is not None and self._runs_cache[0] is phases:
+            return self._runs_cache[1]
+        labels = np.array([p["phase"] for p in phases], dtype=object)
+        indices = np.array([p["index"] for p in phases], dtype=np.int64)
+        run_starts = np.flatnonzero(np.concatenate(([True], labels[1:] != labels[:-1])))
+        start_idx = indices[run_starts]
+        end_idx = np.append(start_idx[1:], len(df))
+
+        # Экстремумы отрезков: min/max не зависят от порядка, reduceat по всем сразу
+        # (fmin/fmax пропускают NaN, как Series.min/max)
+        low = df['low'].to_numpy(dtype=np.float64)
+        high = df['high'].to_numpy(dtype=np.float64)
+        price_low = np.fmin.reduceat(low, start_idx)
+        price_high = np.fmax.reduceat(high, start_idx)
+        # Сумма объёма — по срезам, чтобы порядок суммирования совпадал с Series.sum
+        volume = np.nan_to_num(df['volume'].to_numpy(dtype=np.float64), nan=0.0)
+        volume_sum = [volume[s:e].sum() for s, e in zip(start_idx.tolist(), end_idx.tolist())]
+
+        runs = list(zip(
+            labels[run_starts].tolist(), start_idx.tolist(), end_idx.tolist(),
+            price_low.tolist(), price_high.tolist(), volume_sum
+        ))
+        self._runs_cache = (phases, runs)
+        return runs
+
     def _build_phase_history(self, df, phases):
         """
         Строит историю фаз с длительностью и ценовыми диапазонами
         """
-        if not phases:
+        runs = self._phase_runs(df, phases)
+        if not runs:
             return []
-        
+
+        close = df['close'].to_numpy()
         history = []
-        current_phase = None
-        phase_start_idx = None
-        phase_start_price = None
-        
-        for phase_data in phases:
-            phase = phase_data["phase"]
-            
-            if phase != current_phase:
-                # Завершаем предыдущую фазу
-                if current_phase and phase_start_idx is not None:
-                    phase_window = df.iloc[phase_start_idx:phase_data["index"]]
-                    duration_candles = phase_data["index"] - phase_start_idx
-                    
-                    # Определяем длительность в часах (зависит от таймфрейма)
-                    # Для 1h: 1 candle = 1 hour, для 4h: 1 candle = 4 hours
-                    timeframe_hours = self._estimate_timeframe_hours(df, phase_start_idx, phase_data["index"])
-                    duration_hours = duration_candles * timeframe_hours
-                    
-                    history.append({
-                        "phase": current_phase,
-                        "start_index": phase_start_idx,
-                        "end_index": phase_data["index"],
-                        "start_price": phase_start_price,
-                        "end_price": phase_data["price"],
-                        "duration_candles": duration_candles,
-                        "duration_hours": duration_hours,
-                        "price_range": (phase_window['low'].min(), phase_window['high'].max()),
-                        "volume_sum": phase_window['volume'].sum()
-                    })
-                
-                # Начинаем новую фазу
-                current_phase = phase
-                phase_start_idx = phase_data["index"]
-                phase_start_price = phase_data["price"]
-        
-        # Добавляем последнюю фазу (если она ещё не завершена)
-        if current_phase and phase_start_idx is not None:
-            last_idx = len(df) - 1
-            phase_window = df.iloc[phase_start_idx:]
-            duration_candles = last_idx - phase_start_idx + 1
-            timeframe_hours = self._estimate_timeframe_hours(df, phase_start_idx, last_idx)
-            duration_hours = duration_candles * timeframe_hours
-            
+        for phase, start_idx, end_idx, price_low, price_high, volume_sum in runs[:-1]:
+            # Определяем длительность в часах (зависит от таймфрейма)
+            # Для 1h: 1 candle = 1 hour, для 4h: 1 candle = 4 hours
+            duration_candles = end_idx - start_idx
+            timeframe_hours = self._estimate_timeframe_hours(df, start_idx, end_idx)
             history.append({
-                "phase": current_phase,
-                "start_index": phase_start_idx,
-                "end_index": last_idx,
-                "start_price": phase_start_price,
-                "end_price": df['close'].iloc[-1],
+                "phase": phase,
+                "start_index": start_idx,
+                "end_index": end_idx,
+                "start_price": close[start_idx],
+                "end_price": close[end_idx],
                 "duration_candles": duration_candles,
-                "duration_hours": duration_hours,
-                "price_range": (phase_window['low'].min(), phase_window['high'].max()),
-                "volume_sum": phase_window['volume'].sum(),
-                "is_active": True  # Текущая активная фаза
+                "duration_hours": duration_candles * timeframe_hours,
+                "price_range": (price_low, price_high),
+                "volume_sum": volume_sum
             })
-        
+
+        # Добавляем последнюю фазу (если она ещё не завершена)
+        phase, start_idx, _, price_low, price_high, volume_sum = runs[-1]
+        last_idx = len(df) - 1
+        duration_candles = last_idx - start_idx + 1
+        timeframe_hours = self._estimate_timeframe_hours(df, start_idx, last_idx)
+        history.append({
+            "phase": phase,
+            "start_index": start_idx,
+            "end_index": last_idx,
+            "start_price": close[start_idx],
+            "end_price": close[-1],
+            "duration_candles": duration_candles,
+            "duration_hours": duration_candles * timeframe_hours,
+            "price_range": (price_low, price_high),
+            "volume_sum": volume_sum,
+            "is_active": True  # Текущая активная фаза
+        })
+
         return history
     
     def _estimate_timeframe_hours(self, df, start_idx, end_idx):
@@ -317,49 +348,19 @@ class HistoricalPhaseAnalyzer:
     def _identify_zones(self, df, phases):
         """
         Идентифицирует зоны накопления и распределения
+
+        Зона — завершённый отрезок фазы accumulation / distribution
+        (последний, ещё не завершённый отрезок зоной не считается).
         """
         accumulation_zones = []
         distribution_zones = []
-        
-        current_zone = None
-        zone_start_idx = None
-        
-        for phase_data in phases:
-            phase = phase_data["phase"]
-            
-            if phase in ("accumulation", "distribution"):
-                if current_zone != phase:
-                    # Завершаем предыдущую зону
-                    if current_zone and zone_start_idx is not None:
-                        zone_window = df.iloc[zone_start_idx:phase_data["index"]]
-                        zone_volume = zone_window['volume'].sum()
-                        zone_low = zone_window['low'].min()
-                        zone_high = zone_window['high'].max()
-                        
-                        if current_zone == "accumulation":
-                            accumulation_zones.append((zone_low, zone_high, zone_volume))
-                        else:
-                            distribution_zones.append((zone_low, zone_high, zone_volume))
-                    
-                    # Начинаем новую зону
-                    current_zone = phase
-                    zone_start_idx = phase_data["index"]
-            else:
-                # Завершаем зону если была
-                if current_zone and zone_start_idx is not None:
-                    zone_window = df.iloc[zone_start_idx:phase_data["index"]]
-                    zone_volume = zone_window['volume'].sum()
-                    zone_low = zone_window['low'].min()
-                    zone_high = zone_window['high'].max()
-                    
-                    if current_zone == "accumulation":
-                        accumulation_zones.append((zone_low, zone_high, zone_volume))
-                    else:
-                        distribution_zones.append((zone_low, zone_high, zone_volume))
-                    
-                    current_zone = None
-                    zone_start_idx = None
-        
+
+        for phase, _, _, zone_low, zone_high, zone_volume in self._phase_runs(df, phases)[:-1]:
+            if phase == "accumulation":
+                accumulation_zones.append((zone_low, zone_high, zone_volume))
+            elif phase == "distribution":
+                distribution_zones.append((zone_low, zone_high, zone_volume))
+
         return accumulation_zones, distribution_zones
     
     def _calculate_trend_consistency(self, phase_history):
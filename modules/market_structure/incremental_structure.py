@@ -0,0 +1,268 @@
+# modules/market_structure/incremental_structure.py
+
+"""
+Инкрементальная рыночная структура
+Состояние swing'ов, тренда, диапазона, FVG и Order Blocks обновляется
+по одной закрытой свече, analyze() отвечает из готового состояния.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from .trend import detect_trend
+from .range import detect_range
+from .mitigation import ZoneMitigationTracker
+
+
+class IncrementalMarketStructure:
+    """
+    Стейт-машина структуры рынка для одной серии свечей.
+
+    На каждой закрытой свече (O(lookback)):
+      - подтверждается не более одного swing high / swing low — свеча,
+        закрывшаяся lookback свечей назад, сравнивается с соседями;
+      - по последним двум swing'ам пересчитываются тренд (HH/HL/LH/LL) и диапазон;
+      - добавляются новые FVG (по трём последним свечам) и Order Blocks;
+      - ZoneMitigationTracker отмечает частичное / полное заполнение зон,
+        в результат попадают только незаполненные (fvg_active / orderblocks_active).
+
+    Отличия от пакетного MarketStructureEngine:
+      - формирующаяся (последняя) свеча df не учитывается — только закрытые;
+      - значимость swing'а считается по скользящим средним объёма и размаха
+        за stats_window свечей на момент подтверждения (без «заглядывания вперёд»).
+
+    Индексы в результатах — позиции в df последнего вызова update(); записи,
+    ушедшие за левый край окна, удаляются.
+    """
+
+    def __init__(self, lookback=2, volume_threshold=1.2, stats_window=300):
+        """
+        Args:
+            lookback: свечей слева и справа для подтверждения swing'а
+            volume_threshold: минимальный множитель объёма для "значимого" свинга
+            stats_window: окно скользящих средних объёма и размаха
+        """
+        self.lookback = lookback
+        self.volume_threshold = volume_threshold
+        self.stats_window = stats_window
+        self.reset()
+
+    def reset(self):
+        """Полный сброс состояния"""
+        self.closed_count = 0  # сколько закрытых свечей обработано (абсолютный индекс следующей)
+        self.last_closed_ts = None
+        self._candles = deque(maxlen=max(self.lookback * 2 + 1, 4))  # (open, high, low, close, volume, ts)
+        self._stats = deque()  # (volume, range) для скользящих средних
+        self._volume_sum = 0.0
+        self._range_sum = 0.0
+        # Записи хранят абсолютный индекс свечи в "index"
+        self.swing_highs = deque()
+        self.swing_lows = deque()
+        self.fvgs = deque()
+        self.orderblocks = deque()
+        self.mitigation = ZoneMitigationTracker()
+        self.trend = "unknown"
+        self.range_info = {"in_range": False}
+        self._offset = 0  # абсолютный индекс первой строки df последнего update()
+        self._result = None
+        self._result_key = None
+
+    # ------------------ Обновление ------------------ #
+    def add_candle(self, open_, high, low, close, volume=0.0, timestamp=None):
+        """
+        Добавляет одну закрытую свечу
+
+        Returns:
+            bool: True если подтвердился новый swing (изменились тренд/диапазон)
+        """
+        index = self.closed_count
+        self._candles.append((open_, high, low, close, volume, timestamp))
+        self.closed_count += 1
+        self.last_closed_ts = timestamp
+        self._result = None
+
+        candle_range = high - low
+        self._stats.append((volume, candle_range))
+        self._volume_sum += volume
+        self._range_sum += candle_range
+        if len(self._stats) > self.stats_window:
+            old_volume, old_range = self._stats.popleft()
+            self._volume_sum -= old_volume
+            self._range_sum -= old_range
+
+        # Сначала митигация уже известных зон, потом новые зоны
+        self.mitigation.update(high, low)
+        self._detect_fvg(index)
+        self._detect_orderblock(index)
+        return self._confirm_swing(index)
+
+    def _candle(self, index):
+        """Свеча по абсолютному индексу из буфера последних свечей"""
+        return self._candles[index - self.closed_count]
+
+    def _confirm_swing(self, index):
+        lookback = self.lookback
+        center = index - lookback
+        if center < lookback:
+            return False
+        window = [self._candle(i) for i in range(center - lookback, index + 1)]
+        mid = window[lookback]
+        neighbors = window[:lookback] + window[lookback + 1:]
+
+        is_high = not any(mid[1] <= c[1] for c in neighbors)
+        is_low = not any(mid[2] >= c[2] for c in neighbors)
+        confirmed = False
+        if is_high:
+            confirmed |= self._add_swing(self.swing_highs, center, mid, mid[1])
+        if is_low:
+            confirmed |= self._add_swing(self.swing_lows, center, mid, mid[2])
+        if confirmed:
+            self._update_trend()
+        return confirmed
+
+    def _update_trend(self):
+        """HH/HL/LH/LL тренд и диапазон по двум последним swing'ам"""
+        swings = {
+            "highs": [self.swing_highs[i] for i in range(-min(2, len(self.swing_highs)), 0)],
+            "lows": [self.swing_lows[i] for i in range(-min(2, len(self.swing_lows)), 0)]
+        }
+        self.trend = detect_trend(swings)
+        self.range_info = detect_range(swings, None)
+
+    def _add_swing(self, target, index, candle, price):
+        """Оценивает значимость и добавляет swing; False если swing незначимый"""
+        count = len(self._stats)
+        avg_volume = self._volume_sum / count
+        avg_range = self._range_sum / count
+        swing_volume = candle[4]
+        volume_significance = swing_volume / avg_volume if avg_volume > 0 else 1.0
+        candle_range = candle[1] - candle[2]
+        range_significance = candle_range / avg_range if avg_range > 0 else 1.0
+        if not (volume_significance >= self.volume_threshold or range_significance >= 1.5):
+            return False
+        swing_data = {
+            "index": index,
+            "price": price,
+            "significance": (volume_significance + range_significance) / 2,
+            "volume": swing_volume,
+            "candle_range": candle_range
+        }
+        if candle[5] is not None:
+            swing_data["timestamp"] = candle[5]
+        target.append(swing_data)
+        return True
+
+    def _detect_fvg(self, index):
+        """FVG на свече index - 1 по соседям index - 2 и index"""
+        if index < 2:
+            return
+        prev_candle = self._candle(index - 2)
+        next_candle = self._candle(index)
+        # Bullish FVG
+        if prev_candle[1] < next_candle[2]:
+            self._add_zone(self.fvgs, "fvg", {"index": index - 1, "type": "bullish", "low": prev_candle[1], "high": next_candle[2]})
+        # Bearish FVG
+        if prev_candle[2] > next_candle[1]:
+            self._add_zone(self.fvgs, "fvg", {"index": index - 1, "type": "bearish", "low": next_candle[1], "high": prev_candle[2]})
+
+    def _add_zone(self, target, kind, zone):
+        """Добавляет FVG / OB в список и в трекер митигации"""
+        target.append(zone)
+        # Свечи после формирования зоны, которые уже закрылись
+        past = [self._candle(i)[1:3] for i in range(zone["index"] + 2, self.closed_count)]
+        self.mitigation.add(f"{kind}:{zone['type']}:{zone['index']}", zone, past)
+
+    def _detect_orderblock(self, index):
+        """
+        Order Block на свече index - 3 (пакетная версия тоже не смотрит
+        на 3 последние свечи): противоположная свеча перед импульсом
+        """
+        i = index - 3
+        if i < 0:
+            return
+        candle = self._candle(i)
+        following = self._candle(i + 1)
+        # Bullish Order Block (последняя медвежья перед ростом)
+        if candle[3] < candle[0] and following[3] > following[0]:
+            self._add_zone(self.orderblocks, "ob", {"index": i, "type": "bullish", "low": candle[2], "high": candle[1]})
+        # Bearish Order Block (последняя бычья перед падением)
+        if candle[3] > candle[0] and following[3] < following[0]:
+            self._add_zone(self.orderblocks, "ob", {"index": i, "type": "bearish", "low": candle[2], "high": candle[1]})
+
+    def update(self, df):
+        """
+        Добавляет закрытые свечи df, которых ещё нет в состоянии
+
+        Последняя строка df считается формирующейся свечой и не добавляется.
+
+        Args:
+            df: OHLCV DataFrame с колонкой timestamp
+        """
+        timestamps = df['timestamp'].to_numpy()
+        closed_end = len(df) - 1
+        if closed_end <= 0:
+            return
+        if self.last_closed_ts is not None and (
+            timestamps[closed_end - 1] < self.last_closed_ts or timestamps[0] > self.last_closed_ts
+        ):
+            # Другая серия или разрыв в данных — строим состояние заново
+            self.reset()
+
+        start = 0 if self.last_closed_ts is None else int(np.searchsorted(timestamps, self.last_closed_ts, side="right"))
+        if start < closed_end:
+            has_volume = 'volume' in df.columns
+            rows = zip(
+                df['open'].to_numpy()[start:closed_end].tolist(),
+                df['high'].to_numpy()[start:closed_end].tolist(),
+                df['low'].to_numpy()[start:closed_end].tolist(),
+                df['close'].to_numpy()[start:closed_end].tolist(),
+                df['volume'].to_numpy()[start:closed_end].tolist() if has_volume else [0.0] * (closed_end - start),
+                timestamps[start:closed_end].tolist()
+            )
+            for open_, high, low, close, volume, ts in rows:
+                self.add_candle(open_, high, low, close, volume, ts)
+
+        self._offset = self.closed_count - closed_end  # абсолютный индекс первой строки df
+        self._trim()
+
+    def _trim(self):
+        """Удаляет записи, ушедшие за левый край окна (как пакетные детекторы)"""
+        swings_trimmed = False
+        for records, min_position, kind in (
+            (self.swing_highs, self.lookback, None), (self.swing_lows, self.lookback, None),
+            (self.fvgs, 1, "fvg"), (self.orderblocks, 3, "ob")
+        ):
+            while records and records[0]["index"] - self._offset < min_position:
+                record = records.popleft()
+                if kind:
+                    self.mitigation.remove(f"{kind}:{record['type']}:{record['index']}")
+                swings_trimmed |= records is self.swing_highs or records is self.swing_lows
+                self._result = None
+        if swings_trimmed:
+            self._update_trend()
+
+    # ------------------ Чтение ------------------ #
+    def analyze(self):
+        """
+        Результат в формате MarketStructureEngine.analyze (кэшируется до
+        следующей закрытой свечи — между закрытиями O(1))
+        """
+        key = (self.closed_count, self._offset)
+        if self._result is not None and self._result_key == key:
+            return self._result
+
+        def relative(records):
+            return [dict(record, index=record["index"] - self._offset) for record in records]
+
+        self._result = {
+            "trend": self.trend,
+            "swings": {"highs": relative(self.swing_highs), "lows": relative(self.swing_lows)},
+            "range": dict(self.range_info),
+            "fvg": relative(self.fvgs),
+            "orderblocks": relative(self.orderblocks),
+            "fvg_active": relative(zone for zone in self.mitigation.active() if zone["id"].startswith("fvg:")),
+            "orderblocks_active": relative(zone for zone in self.mitigation.active() if zone["id"].startswith("ob:"))
+        }
+        self._result_key = key
+        return self._result
@@ -3,15 +3,41 @@ from .trend import detect_trend
 from .range import detect_range
 from .fvg import detect_fvg
 from .orderblocks import detect_orderblocks
+from .incremental_structure import IncrementalMarketStructure
+from .mitigation import compute_mitigation, active_zones
+from modules.utils.series_states import SeriesStates, series_key
 
 
 class MarketStructureEngine:
 
-    def analyze(self, df):
+    # Максимум серий (symbol, timeframe) с инкрементальным состоянием
+    MAX_SERIES = 8
+
+    def __init__(self, incremental=False):
+        """
+        Args:
+            incremental: вести состояние структуры между вызовами (по закрытым свечам);
+                False — пересчитывать всё окно пакетно на каждом вызове (по умолчанию).
+                Инкрементальный режим даёт другой результат: формирующаяся свеча
+                не учитывается, значимость swing'ов — по скользящей статистике
+                (см. IncrementalMarketStructure); включается Config.INCREMENTAL_STRUCTURE
+        """
+        self.incremental = incremental
+        # Состояния по сериям свечей (LTF и HTF ведутся отдельно)
+        self.states = SeriesStates(IncrementalMarketStructure, maxsize=self.MAX_SERIES)
+
+    def analyze(self, df, series=None):
         """
         df — pandas DataFrame OHLCV (последние 200–300 свечей)
+        series — id серии свечей, например (symbol, timeframe); без него
+            серия определяется по интервалу последних свечей
         """
 
+        if self.incremental and 'timestamp' in df.columns and len(df) >= 2:
+            state = self.states.get(series_key(df, series))
+            state.update(df)
+            return state.analyze()
+
         swings = detect_swings(df)
         trend = detect_trend(swings)
         range_info = detect_range(swings, df)
@@ -23,6 +49,8 @@ class MarketStructureEngine:
             "swings": swings,
             "range": range_info,
             "fvg": fvg,
-            "orderblocks": orderblocks
+            "orderblocks": orderblocks,
+            # Только незаполненные зоны (active / partial)
+            "fvg_active": active_zones(compute_mitigation(fvg, df)),
+            "orderblocks_active": active_zones(compute_mitigation(orderblocks, df))
         }
-
@@ -0,0 +1,180 @@
+# modules/market_structure/mitigation.py
+
+"""
+Отслеживание митигации FVG и Order Blocks
+Зона (бычья — поддержка снизу, медвежья — сопротивление сверху) считается
+частично заполненной, когда цена зашла внутрь, и заполненной, когда цена
+прошла её насквозь. Наружу отдаются только незаполненные зоны.
+"""
+
+import bisect
+
+import numpy as np
+
+
+# Первая свеча, которая может заполнить зону: FVG/OB на свече i формируются
+# вместе со свечой i + 1, митигация — начиная с i + 2
+MITIGATION_START_OFFSET = 2
+
+
+def _fill_state(zone, extreme):
+    """
+    Статус и глубина заполнения по экстремуму цены после формирования зоны
+
+    Args:
+        zone: {"type", "low", "high"}
+        extreme: минимум low (для бычьей) или максимум high (для медвежьей), None — свечей не было
+    """
+    if extreme is None:
+        return "active", 0.0
+    height = zone["high"] - zone["low"]
+    if zone["type"] == "bullish":
+        if extreme >= zone["high"]:
+            return "active", 0.0
+        if extreme <= zone["low"]:
+            return "filled", 1.0
+        return "partial", (zone["high"] - extreme) / height
+    if extreme <= zone["low"]:
+        return "active", 0.0
+    if extreme >= zone["high"]:
+        return "filled", 1.0
+    return "partial", (extreme - zone["low"]) / height
+
+
+def compute_mitigation(zones, df):
+    """
+    Пакетная митигация всех зон по df
+
+    Суффиксные минимумы low / максимумы high считаются один раз, после чего
+    статус каждой зоны определяется за O(1).
+
+    Args:
+        zones: список FVG / OB (с "index" — позицией в df)
+        df: OHLCV DataFrame
+
+    Returns:
+        list: копии зон с "status" ("active" | "partial" | "filled") и "fill_pct"
+    """
+    n = len(df)
+    if not zones:
+        return []
+    low = df['low'].to_numpy(dtype=np.float64)
+    high = df['high'].to_numpy(dtype=np.float64)
+    suffix_min_low = np.minimum.accumulate(low[::-1])[::-1].tolist()
+    suffix_max_high = np.maximum.accumulate(high[::-1])[::-1].tolist()
+
+    result = []
+    for zone in zones:
+        start = zone["index"] + MITIGATION_START_OFFSET
+        if start >= n:
+            extreme = None
+        elif zone["type"] == "bullish":
+            extreme = suffix_min_low[start]
+        else:
+            extreme = suffix_max_high[start]
+        status, fill_pct = _fill_state(zone, extreme)
+        result.append(dict(zone, status=status, fill_pct=fill_pct))
+    return result
+
+
+def active_zones(zones):
+    """Только незаполненные зоны (active / partial)"""
+    return [zone for zone in zones if zone.get("status") != "filled"]
+
+
+class ZoneMitigationTracker:
+    """
+    Инкрементальная митигация зон с интервальным индексом.
+
+    Незаполненные бычьи зоны отсортированы по high: свеча с минимумом L
+    задевает ровно хвост списка (high > L). Медвежьи — по low: свеча с
+    максимумом H задевает префикс (low < H). Поэтому каждая свеча трогает
+    только задетые зоны, а заполненные сразу удаляются из индекса.
+    """
+
+    def __init__(self):
+        self.zones = {}  # id -> зона (только незаполненные)
+        self._bull_keys = []  # отсортированные (high, id)
+        self._bear_keys = []  # отсортированные (low, id)
+        self.filled_count = 0
+
+    def add(self, zone_id, zone, past_candles=()):
+        """
+        Добавляет зону
+
+        Args:
+            zone_id: стабильный id зоны
+            zone: {"type", "low", "high", ...}
+            past_candles: (high, low) свечей после формирования, уже закрытых к моменту добавления
+        """
+        zone = dict(zone, id=zone_id, status="active", fill_pct=0.0, extreme=None)
+        for candle_high, candle_low in past_candles:
+            self._apply(zone, candle_high, candle_low)
+        if zone["status"] == "filled":
+            self.filled_count += 1
+            return
+        self.zones[zone_id] = zone
+        if zone["type"] == "bullish":
+            bisect.insort(self._bull_keys, (zone["high"], zone_id))
+        else:
+            bisect.insort(self._bear_keys, (zone["low"], zone_id))
+
+    def _apply(self, zone, candle_high, candle_low):
+        if zone["type"] == "bullish":
+            extreme = candle_low if zone["extreme"] is None else min(zone["extreme"], candle_low)
+        else:
+            extreme = candle_high if zone["extreme"] is None else max(zone["extreme"], candle_high)
+        zone["extreme"] = extreme
+        zone["status"], zone["fill_pct"] = _fill_state(zone, extreme)
+
+    def update(self, candle_high, candle_low):
+        """
+        Применяет новую закрытую свечу к задетым зонам
+
+        Returns:
+            list: id зон, заполненных этой свечой
+        """
+        filled = []
+        # Бычьи зоны с high > candle_low
+        start = bisect.bisect_right(self._bull_keys, (candle_low, chr(0x10FFFF)))
+        for _, zone_id in self._bull_keys[start:]:
+            zone = self.zones[zone_id]
+            self._apply(zone, candle_high, candle_low)
+            if zone["status"] == "filled":
+                filled.append(zone_id)
+        # Медвежьи зоны с low < candle_high
+        end = bisect.bisect_left(self._bear_keys, (candle_high, ""))
+        for _, zone_id in self._bear_keys[:end]:
+            zone = self.zones[zone_id]
+            self._apply(zone, candle_high, candle_low)
+            if zone["status"] == "filled":
+                filled.append(zone_id)
+        for zone_id in filled:
+            self.remove(zone_id)
+            self.filled_count += 1
+        return filled
+
+    def remove(self, zone_id):
+        """Удаляет зону из индекса (заполнена или ушла из окна)"""
+        zone = self.zones.pop(zone_id, None)
+        if zone is None:
+            return
+        keys = self._bull_keys if zone["type"] == "bullish" else self._bear_keys
+        key = (zone["high"], zone_id) if zone["type"] == "bullish" else (zone["low"], zone_id)
+        pos = bisect.bisect_left(keys, key)
+        if pos < len(keys) and keys[pos] == key:
+            del keys[pos]
+
+    def active(self, low=None, high=None):
+        """
+        Незаполненные зоны, опционально пересекающие ценовой диапазон [low, high]
+
+        Returns:
+            list: зоны в порядке добавления
+        """
+        zones = self.zones.values()
+        if low is not None or high is not None:
+            low = -np.inf if low is None else low
+            high = np.inf if high is None else high
+            zones = [zone for zone in zones if zone["low"] <= high and zone["high"] >= low]
+        return [{k: v for k, v in zone.items() if k != "extreme"} for zone in zones]
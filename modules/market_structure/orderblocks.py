@@ -1,30 +1,39 @@
+import numpy as np
+
+
 def detect_orderblocks(swings, df):
     """
     Ультра-минимальная версия OB:
     - последний медвежий свечной блок перед импульсом вверх (bullish OB)
     - последний бычий блок перед импульсом вниз (bearish OB)
+
+    Векторная реализация: маски по колонкам open/close для всех свечей сразу.
     """
 
-    ob_list = []
-
-    for i in range(3, len(df)-3):
-        # Bullish Order Block (последняя медвежья перед ростом)
-        if df['close'][i] < df['open'][i] and df['close'][i+1] > df['open'][i+1]:
-            ob_list.append({
-                "index": i,
-                "type": "bullish",
-                "low": df['low'][i],
-                "high": df['high'][i]
-            })
-
-        # Bearish Order Block (последняя бычья перед падением)
-        if df['close'][i] > df['open'][i] and df['close'][i+1] < df['open'][i+1]:
-            ob_list.append({
-                "index": i,
-                "type": "bearish",
-                "low": df['low'][i],
-                "high": df['high'][i]
-            })
-
-    return ob_list
+    if len(df) < 7:
+        return []
+
+    open_ = df['open'].to_numpy()
+    close = df['close'].to_numpy()
+    high = df['high'].to_numpy()
+    low = df['low'].to_numpy()
+
+    bearish_candle = close < open_
+    bullish_candle = close > open_
+
+    # Кандидаты i в [3, len - 3): свеча i и следующая за ней
+    i = np.arange(3, len(df) - 3)
+    # Bullish Order Block (последняя медвежья перед ростом)
+    bullish_ob = bearish_candle[i] & bullish_candle[i + 1]
+    # Bearish Order Block (последняя бычья перед падением)
+    bearish_ob = bullish_candle[i] & bearish_candle[i + 1]
+
+    idx = i[bullish_ob | bearish_ob]
+    types = np.where(bullish_ob[bullish_ob | bearish_ob], "bullish", "bearish")
 
+    return [
+        {"index": index, "type": ob_type, "low": ob_low, "high": ob_high}
+        for index, ob_type, ob_low, ob_high in zip(
+            idx.tolist(), types.tolist(), low[idx].tolist(), high[idx].tolist()
+        )
+    ]
@@ -1,97 +1,96 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
 def detect_swings(df, lookback=2, volume_threshold=1.2):
     """
     Находим swing highs и swing lows с расширенным контекстом.
-    
+
     Args:
         df: DataFrame с OHLCV
         lookback: количество свечей слева и справа для проверки (по умолчанию 2)
         volume_threshold: минимальный множитель объёма для "значимого" свинга
-    
+
     Свинг = экстремум, окружённый lookback свечами с обеих сторон.
     Дополнительная оценка значимости: объём, размах, расстояние до других свингов.
+
+    Векторная реализация: окна 2 * lookback + 1 свечей через sliding_window_view,
+    средние объём и размах считаются один раз на весь df.
     """
 
     highs = []
     lows = []
-    
+
     if len(df) < lookback * 2 + 1:
         return {"highs": highs, "lows": lows}
-    
-    # Средний объём для оценки значимости
-    avg_volume = df['volume'].mean() if 'volume' in df.columns else 0
-
-    for i in range(lookback, len(df) - lookback):
-        # Swing High: цена выше всех соседних свечей
-        is_swing_high = True
-        for offset in range(1, lookback + 1):
-            if df['high'].iloc[i] <= df['high'].iloc[i - offset] or \
-               df['high'].iloc[i] <= df['high'].iloc[i + offset]:
-                is_swing_high = False
-                break
-        
-        if is_swing_high:
-            # Оцениваем значимость свинга
-            swing_volume = df['volume'].iloc[i] if 'volume' in df.columns else avg_volume
-            volume_significance = swing_volume / avg_volume if avg_volume > 0 else 1.0
-            
-            # Размах свечи (волатильность на момент свинга)
-            candle_range = df['high'].iloc[i] - df['low'].iloc[i]
-            avg_range = (df['high'] - df['low']).mean()
-            range_significance = candle_range / avg_range if avg_range > 0 else 1.0
-            
-            # Общая значимость
-            significance = (volume_significance + range_significance) / 2
-            
-            swing_data = {
-                "index": i,
-                "price": df['high'].iloc[i],
-                "significance": significance,
-                "volume": swing_volume,
-                "candle_range": candle_range
-            }
-            # Добавляем timestamp если есть
-            if 'timestamp' in df.columns:
-                swing_data["timestamp"] = df['timestamp'].iloc[i]
-            
-            # Фильтр: только значимые свинги (объём выше threshold или большой range)
-            if volume_significance >= volume_threshold or range_significance >= 1.5:
-                highs.append(swing_data)
-        
-        # Swing Low: цена ниже всех соседних свечей
-        is_swing_low = True
-        for offset in range(1, lookback + 1):
-            if df['low'].iloc[i] >= df['low'].iloc[i - offset] or \
-               df['low'].iloc[i] >= df['low'].iloc[i + offset]:
-                is_swing_low = False
-                break
-        
-        if is_swing_low:
-            # Оцениваем значимость свинга
-            swing_volume = df['volume'].iloc[i] if 'volume' in df.columns else avg_volume
-            volume_significance = swing_volume / avg_volume if avg_volume > 0 else 1.0
-            
-            # Размах свечи
-            candle_range = df['high'].iloc[i] - df['low'].iloc[i]
-            avg_range = (df['high'] - df['low']).mean()
-            range_significance = candle_range / avg_range if avg_range > 0 else 1.0
-            
-            # Общая значимость
-            significance = (volume_significance + range_significance) / 2
-            
+
+    high = df['high'].to_numpy()
+    low = df['low'].to_numpy()
+    has_volume = 'volume' in df.columns
+    has_timestamp = 'timestamp' in df.columns
+
+    # Средний объём и средний размах для оценки значимости
+    avg_volume = df['volume'].mean() if has_volume else 0
+    avg_range = (df['high'] - df['low']).mean()
+
+    # Строка окна r соответствует свече i = r + lookback
+    width = lookback * 2 + 1
+    high_windows = sliding_window_view(high, width)
+    low_windows = sliding_window_view(low, width)
+    high_neighbors = np.delete(high_windows, lookback, axis=1)
+    low_neighbors = np.delete(low_windows, lookback, axis=1)
+
+    # Swing High: цена выше всех соседних свечей (свеча отбрасывается, если <= любой соседки)
+    is_swing_high = ~(high_windows[:, lookback:lookback + 1] <= high_neighbors).any(axis=1)
+    # Swing Low: цена ниже всех соседних свечей
+    is_swing_low = ~(low_windows[:, lookback:lookback + 1] >= low_neighbors).any(axis=1)
+
+    for mask, prices, target in ((is_swing_high, high, highs), (is_swing_low, low, lows)):
+        idx = np.flatnonzero(mask) + lookback
+        if len(idx) == 0:
+            continue
+
+        # Оцениваем значимость свинга
+        if has_volume:
+            swing_volume = df['volume'].to_numpy()[idx]
+        else:
+            swing_volume = np.full(len(idx), avg_volume)
+        if avg_volume > 0:
+            volume_significance = swing_volume / avg_volume
+        else:
+            volume_significance = np.ones(len(idx))
+
+        # Размах свечи (волатильность на момент свинга)
+        candle_range = high[idx] - low[idx]
+        if avg_range > 0:
+            range_significance = candle_range / avg_range
+        else:
+            range_significance = np.ones(len(idx))
+
+        # Общая значимость
+        significance = (volume_significance + range_significance) / 2
+
+        # Фильтр: только значимые свинги (объём выше threshold или большой range)
+        keep = (volume_significance >= volume_threshold) | (range_significance >= 1.5)
+        timestamps = df['timestamp'].to_numpy()[idx[keep]].tolist() if has_timestamp else None
+
+        for n, (i, price, sig, volume, rng) in enumerate(zip(
+            idx[keep].tolist(),
+            prices[idx[keep]].tolist(),
+            significance[keep].tolist(),
+            swing_volume[keep].tolist(),
+            candle_range[keep].tolist()
+        )):
             swing_data = {
                 "index": i,
-                "price": df['low'].iloc[i],
-                "significance": significance,
-                "volume": swing_volume,
-                "candle_range": candle_range
+                "price": price,
+                "significance": sig,
+                "volume": volume,
+                "candle_range": rng
             }
             # Добавляем timestamp если есть
-            if 'timestamp' in df.columns:
-                swing_data["timestamp"] = df['timestamp'].iloc[i]
-            
-            # Фильтр: только значимые свинги
-            if volume_significance >= volume_threshold or range_significance >= 1.5:
-                lows.append(swing_data)
+            if has_timestamp:
+                swing_data["timestamp"] = timestamps[n]
+            target.append(swing_data)
 
     return {"highs": highs, "lows": lows}
-
@@ -0,0 +1,35 @@
+"""
+Pipeline - декларативный граф стадий анализа и его исполнитель
+Один граф используется основным циклом и командами бота; независимые
+стадии считаются параллельно, с таймингами и изоляцией ошибок по стадиям.
+Сессия движков закреплена за воркером вне event loop (процесс или поток);
+команды бота отвечают из последних прогонов, пока данные свежее SLA
+"""
+
+from .stage_graph import Stage, StageGraph, StageExecutor, PipelineRun
+from .analysis_graph import (
+    build_analysis_graph, collect_alerts, ANALYSIS_INPUTS, NO_SVD, MAIN_TARGETS, SIGNAL_TARGETS, REPORT_TARGETS
+)
+from .session import AnalysisSession
+from .offload import AnalysisWorker, LoopLagMonitor, set_switch_interval
+from .latest_results import LatestResults, ServedResult
+
+__all__ = [
+    'Stage',
+    'StageGraph',
+    'StageExecutor',
+    'PipelineRun',
+    'build_analysis_graph',
+    'collect_alerts',
+    'ANALYSIS_INPUTS',
+    'NO_SVD',
+    'MAIN_TARGETS',
+    'SIGNAL_TARGETS',
+    'REPORT_TARGETS',
+    'AnalysisSession',
+    'AnalysisWorker',
+    'LoopLagMonitor',
+    'set_switch_interval',
+    'LatestResults',
+    'ServedResult'
+]
@@ -0,0 +1,183 @@
+# modules/pipeline/analysis_graph.py
+
+"""
+Граф анализа SmartMoneyAI — общий для основного цикла и команд бота
+
+Входы: ohlcv, htf1_df, htf2_df, trades, orderbook, activity_df, data_quality
+Стадии:
+    structure, ta                          — базовый таймфрейм
+    liquidity(structure), svd(ta)          — ATR из TA нормирует SVD
+    htf{1,2}_structure → htf{1,2}_liquidity
+    htf{1,2}_phases → global_trend
+    activity_structure                     — activity-бары (если построитель подключен)
+    decision → alerts, deep_report (отчёт /analysis)
+Ветки HTF1/HTF2 и базового таймфрейма не зависят друг от друга и идут
+параллельно; stateful движки, общие для веток, защищены lock стадий.
+"""
+
+from .stage_graph import StageGraph
+
+# SVD без сделок / стакана
+NO_SVD = {"intent": "unclear", "confidence": 0}
+
+ANALYSIS_INPUTS = ("ohlcv", "htf1_df", "htf2_df", "trades", "orderbook", "activity_df", "data_quality")
+
+# Серия activity-баров в состояниях движков и ключах кэша
+ACTIVITY_SERIES = "activity"
+
+# Стадии, нужные основному циклу и командам бота
+MAIN_TARGETS = ("decision", "alerts")
+SIGNAL_TARGETS = ("decision",)
+REPORT_TARGETS = ("decision", "deep_report")
+
+
+def _empty(df):
+    return df is None or df.empty
+
+
+def collect_alerts(alert_manager, svd_data, signal):
+    """
+    Проверки AlertManager по результатам цикла
+
+    Returns:
+        list алертов (смена фазы, разворот CVD, execution, токсичность, сильный сигнал)
+    """
+    checks = (
+        alert_manager.check_phase_change(svd_data.get("phase", "discovery"), svd_data.get("phase_info", {})),
+        alert_manager.check_cvd_reversal(svd_data),
+        alert_manager.check_execution_phase(svd_data.get("phase", "discovery"), svd_data, signal),
+        alert_manager.check_flow_toxicity(svd_data),
+        alert_manager.check_strong_signal(signal)
+    )
+    return [alert for alert in checks if alert]
+
+
+def build_analysis_graph(structure_engine, ta_engine, liquidity_engine, svd_engine, decision_engine,
+                         phase_analyzer=None, trend_analyzer=None, alert_manager=None,
+                         config=None, cache=None, symbol=""):
+    """
+    Граф стадий полного анализа
+
+    Args:
+        structure_engine: MarketStructureEngine (состояние по серии (symbol, timeframe) —
+            разные таймфреймы считаются параллельно)
+        ta_engine: TAEngine
+        liquidity_engine: LiquidityEngine (общий трекер sweep — стадии по очереди)
+        svd_engine: SVDEngine
+        decision_engine: DecisionEngine
+        phase_analyzer: HistoricalPhaseAnalyzer (без него фазы пустые)
+        trend_analyzer: GlobalTrendAnalyzer (без него global_trend пустой)
+        alert_manager: AlertManager — добавляет стадию alerts
+        config: Config (TIMEFRAME, HTF_1_INTERVAL, HTF_2_INTERVAL)
+        cache: AnalysisCache для результатов по окнам свечей
+        symbol: торговая пара (ключ кэша)
+
+    Returns:
+        StageGraph
+    """
+    timeframe = getattr(config, "TIMEFRAME", "15m")
+    htf_intervals = (getattr(config, "HTF_1_INTERVAL", "1h"), getattr(config, "HTF_2_INTERVAL", "4h"))
+
+    def cached(name, df, compute, interval):
+        if cache is None:
+            return compute()
+        return cache.get_or_compute(name, df, compute, symbol=symbol, interval=interval)
+
+    def structure(df, interval):
+        if _empty(df):
+            return {"trend": "unknown"}
+        return cached("structure", df, lambda: structure_engine.analyze(df, series=(symbol, interval)), interval)
+
+    def liquidity(df, struct, interval):
+        if _empty(df):
+            return {}
+        return cached("liquidity", df, lambda: liquidity_engine.analyze(df, struct, series=(symbol, interval)), interval)
+
+    def phases(df, interval, label):
+        if phase_analyzer is None or _empty(df):
+            return {}
+        return cached(
+            "phases", df, lambda: phase_analyzer.analyze_historical_phases(df, timeframe_name=f"{label} ({interval})"), interval
+        )
+
+    def global_trend(htf1_struct, htf2_struct, htf1_phases, htf2_phases):
+        if trend_analyzer is None:
+            return {}
+        return trend_analyzer.analyze_global_trend(htf1_struct, htf2_struct, htf1_phases, htf2_phases)
+
+    def svd(trades, orderbook, ta_data):
+        if not trades or not orderbook:
+            return dict(NO_SVD)
+        return svd_engine.analyze(trades, orderbook, atr_pct=ta_data.get("atr_pct"))
+
+    def decision(liquidity_data, svd_data, structure_data, ta_data, ohlcv,
+                 htf1_struct, htf2_struct, htf1_liq, htf2_liq, data_quality):
+        current_price = ohlcv["close"].iloc[-1]
+        signal = decision_engine.analyze(
+            liquidity_data,
+            svd_data,
+            structure_data,
+            ta_data,
+            current_price=current_price,
+            htf_context={
+                "htf1": htf1_struct.get("trend", "unknown"),
+                "htf2": htf2_struct.get("trend", "unknown"),
+            },
+            htf_liquidity={
+                "htf1": htf1_liq.get("direction", {}) if htf1_liq else {},
+                "htf2": htf2_liq.get("direction", {}) if htf2_liq else {},
+            },
+            data_quality=data_quality
+        )
+        # Текущая цена нужна форматтерам для расчёта уровней
+        if "current_price" not in signal:
+            signal["current_price"] = current_price
+        return signal
+
+    graph = StageGraph()
+    graph.add("structure", lambda df: structure(df, timeframe), deps=("ohlcv",), lock=f"structure:{timeframe}")
+    graph.add("ta", lambda df: cached("ta", df, lambda: ta_engine.analyze(df, series=(symbol, timeframe)), timeframe), deps=("ohlcv",))
+    graph.add("liquidity", lambda df, struct: liquidity(df, struct, timeframe),
+              deps=("ohlcv", "structure"), lock="liquidity")
+
+    for n, interval in enumerate(htf_intervals, 1):
+        graph.add(f"htf{n}_structure", lambda df, interval=interval: structure(df, interval),
+                  deps=(f"htf{n}_df",), lock=f"structure:{interval}", fallback=lambda: {"trend": "unknown"})
+        graph.add(f"htf{n}_liquidity", lambda df, struct, interval=interval: liquidity(df, struct, interval),
+                  deps=(f"htf{n}_df", f"htf{n}_structure"), lock="liquidity", fallback=dict)
+        graph.add(f"htf{n}_phases", lambda df, interval=interval, label=f"HTF{n}": phases(df, interval, label),
+                  deps=(f"htf{n}_df",), lock="phases", fallback=dict)
+
+    graph.add("activity_structure", lambda df: structure(df, ACTIVITY_SERIES),
+              deps=("activity_df",), lock=f"structure:{ACTIVITY_SERIES}", fallback=lambda: {"trend": "unknown"})
+
+    graph.add("global_trend", global_trend,
+              deps=("htf1_structure", "htf2_structure", "htf1_phases", "htf2_phases"), fallback=dict)
+    graph.add("svd", svd, deps=("trades", "orderbook", "ta"), lock="svd", fallback=lambda: dict(NO_SVD))
+    graph.add("decision", decision, deps=(
+        "liquidity", "svd", "structure", "ta", "ohlcv",
+        "htf1_structure", "htf2_structure", "htf1_liquidity", "htf2_liquidity", "data_quality"
+    ), lock="decision")
+
+    def deep_report(liquidity_data, structure_data, svd_data, ta_data, ohlcv, signal,
+                    htf1_phases, htf2_phases, global_trend_data, activity_df, activity_struct):
+        from modules.ai_explanations.deep_analyzer import DeepMarketAnalyzer
+        return DeepMarketAnalyzer().generate_full_report(
+            liquidity_data, structure_data, svd_data, ta_data, ohlcv["close"].iloc[-1],
+            decision_result=signal,
+            htf1_phases=htf1_phases,
+            htf2_phases=htf2_phases,
+            global_trend=global_trend_data,
+            activity_df=activity_df,
+            activity_structure=activity_struct
+        )
+
+    graph.add("deep_report", deep_report, deps=(
+        "liquidity", "structure", "svd", "ta", "ohlcv", "decision", "htf1_phases", "htf2_phases", "global_trend",
+        "activity_df", "activity_structure"
+    ))
+
+    if alert_manager is not None:
+        graph.add("alerts", lambda svd_data, signal: collect_alerts(alert_manager, svd_data, signal),
+                  deps=("svd", "decision"), fallback=list)
+    return graph
@@ -0,0 +1,147 @@
+# modules/pipeline/latest_results.py
+
+"""
+Последние результаты графа анализа для ответов команд бота
+Основной цикл публикует каждый прогон; команды отвечают из него, пока
+данные моложе SLA свежести. Иначе запускается пересчёт, и команды,
+пришедшие во время пересчёта, ждут тот же расчёт, а не запускают свой.
+"""
+
+import asyncio
+import logging
+import time
+
+from modules.utils.result_types import ResultRecord
+
+logger = logging.getLogger(__name__)
+
+
+class ServedResult(ResultRecord):
+    """Ответ LatestResults: результат и метрики его выдачи"""
+
+    FIELDS = (
+        "snapshot",  # MarketSnapshot, по которому считался прогон
+        "run",  # PipelineRun (None — нет OHLCV)
+        "source",  # "cache" | "computed" | "coalesced"
+        "age_seconds",  # Возраст данных снимка на момент ответа
+        "latency_seconds"  # Время от запроса до ответа
+    )
+
+
+class LatestResults:
+    """
+    Свежие прогоны графа по набору стадий.
+
+    Запись покрывает запрос, если в ней посчитаны все нужные стадии:
+    прогон основного цикла (decision, alerts) отвечает на /signal, прогон
+    /analysis (decision, deep_report) — и на /analysis, и на /signal.
+    Основной цикл deep_report не считает, поэтому /analysis отвечает из
+    записи только после другого /analysis в пределах SLA; пересчёт при
+    этом дешевле полного — окна свечей основного цикла берутся из
+    AnalysisCache сессии.
+    """
+
+    SOURCES = ("cache", "computed", "coalesced")
+
+    def __init__(self, compute, clock=time.time):
+        """
+        Args:
+            compute: async функция(targets) -> (MarketSnapshot, PipelineRun или None)
+            clock: текущее время, с (согласовано с MarketSnapshot.captured_at)
+        """
+        self.compute = compute
+        self.clock = clock
+        self.entries = {}  # frozenset(стадий) -> (snapshot, run)
+        self._inflight = {}  # frozenset(targets) -> asyncio.Task
+        self.counts = dict.fromkeys(self.SOURCES, 0)
+
+    def age_seconds(self, snapshot):
+        """Возраст данных снимка, с"""
+        return max(self.clock() - snapshot.captured_at / 1000, 0.0)
+
+    def publish(self, snapshot, run, targets):
+        """
+        Сохраняет прогон (основной цикл или пересчёт по команде)
+
+        Args:
+            snapshot: MarketSnapshot входов прогона
+            run: PipelineRun
+            targets: стадии, которые запрашивались (в записи — только посчитанные)
+        """
+        done = frozenset(name for name in targets if name in run)
+        if done:
+            self.entries[done] = (snapshot, run)
+
+    def latest(self, targets, max_age=None):
+        """
+        Самая свежая запись, покрывающая targets
+
+        Args:
+            targets: нужные стадии
+            max_age: SLA свежести, с (None — любой возраст)
+
+        Returns:
+            (snapshot, run) или None
+        """
+        needed = frozenset(targets)
+        best = None
+        for done, (snapshot, run) in self.entries.items():
+            if needed <= done and (best is None or snapshot.captured_at > best[0].captured_at):
+                best = (snapshot, run)
+        if best is None or (max_age is not None and self.age_seconds(best[0]) > max_age):
+            return None
+        return best
+
+    async def get(self, targets, max_age=None):
+        """
+        Результат не старше max_age: из записи, из идущего расчёта или новым расчётом
+
+        Returns:
+            ServedResult
+        """
+        started = time.perf_counter()
+        entry = self.latest(targets, max_age)
+        if entry is not None:
+            source = "cache"
+        else:
+            task, source = self._join(targets)
+            if task is None:
+                needed = frozenset(targets)
+                task = asyncio.ensure_future(self._compute(needed))
+                self._inflight[needed] = task
+                source = "computed"
+            # shield: отмена одного ожидающего не отменяет общий расчёт
+            entry = await asyncio.shield(task)
+        self.counts[source] += 1
+        snapshot, run = entry
+        return ServedResult(
+            snapshot=snapshot,
+            run=run,
+            source=source,
+            age_seconds=self.age_seconds(snapshot),
+            latency_seconds=time.perf_counter() - started
+        )
+
+    def _join(self, targets):
+        """Идущий расчёт, покрывающий targets: (task, "coalesced") или (None, None)"""
+        needed = frozenset(targets)
+        for running, task in self._inflight.items():
+            if needed <= running:
+                return task, "coalesced"
+        return None, None
+
+    async def _compute(self, targets):
+        try:
+            snapshot, run = await self.compute(tuple(sorted(targets)))
+            if run is not None:
+                self.publish(snapshot, run, targets)
+            return snapshot, run
+        finally:
+            self._inflight.pop(targets, None)
+
+    def stats(self):
+        """
+        Returns:
+            dict: cache, computed, coalesced (количество ответов), inflight
+        """
+        return {**self.counts, "inflight": len(self._inflight)}
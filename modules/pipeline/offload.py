@@ -0,0 +1,232 @@
+# modules/pipeline/offload.py
+
+"""
+Вынос CPU-работы анализа из event loop
+AnalysisWorker владеет AnalysisSession (движки, кэш, граф) и выполняет на
+ней вызовы вне event loop:
+  - "process" — выделенный процесс: анализ не делит GIL с event loop,
+    обратно приходит только сериализованный PipelineRun;
+  - "thread" — выделенный поток: без сериализации, но длинные операции
+    pandas/numpy без отпускания GIL задерживают loop.
+Сессия одна, вызовы выполняются по очереди — stateful движки закреплены
+за воркером, основной цикл и команды бота видят одно состояние.
+
+LoopLagMonitor измеряет задержку event loop: насколько позже заданного
+просыпается периодическая корутина.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Сессия процесса анализа (заполняется инициализатором пула)
+_SESSION = None
+
+
+def set_switch_interval(ms):
+    """
+    Интервал переключения GIL между потоками
+
+    Поток на чистом Python держит GIL до switch interval (5 мс по
+    умолчанию); меньший интервал быстрее возвращает GIL event loop.
+
+    Args:
+        ms: интервал в миллисекундах (None или <= 0 — не менять)
+
+    Returns:
+        float: предыдущий интервал, с
+    """
+    previous = sys.getswitchinterval()
+    if ms and ms > 0:
+        sys.setswitchinterval(ms / 1000)
+    return previous
+
+
+def _init_session(session_factory):
+    global _SESSION
+    _SESSION = session_factory()
+
+
+def _session_call(method, args, kwargs):
+    """Вызов метода сессии в процессе анализа: (результат, секунды)"""
+    started = time.perf_counter()
+    result = getattr(_SESSION, method)(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+class AnalysisWorker:
+    """
+    Выделенный исполнитель анализа с закреплённой сессией.
+
+    Внутри прогона граф по-прежнему распараллеливается StageExecutor
+    сессии; сам воркер гарантирует, что вызовы не пересекаются.
+    """
+
+    MODES = ("process", "thread")
+
+    def __init__(self, session_factory, mode="process", name="analysis"):
+        """
+        Args:
+            session_factory: функция без аргументов, создающая AnalysisSession
+                (для "process" — сериализуемая, например functools.partial)
+            mode: "process" | "thread"
+            name: префикс имени потока
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Неизвестный режим {mode}, ожидается один из {self.MODES}")
+        self.session_factory = session_factory
+        self.mode = mode
+        self.name = name
+        self.session = None
+        self._executor = None
+        self.pending = 0  # вызовов в очереди и в работе
+        self.completed = 0
+        self.busy_seconds = 0.0
+        self.restarts = 0
+        self._start()
+
+    def _start(self):
+        if self.mode == "process":
+            # spawn: дочерний процесс не наследует потоки WebSocket/Telegram
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_session,
+                initargs=(self.session_factory,)
+            )
+        else:
+            self.session = self.session_factory()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.name)
+
+    def _thread_call(self, method, args, kwargs):
+        started = time.perf_counter()
+        result = getattr(self.session, method)(*args, **kwargs)
+        return result, time.perf_counter() - started
+
+    async def call(self, method, *args, **kwargs):
+        """
+        Вызывает метод сессии вне event loop
+
+        Args:
+            method: имя метода AnalysisSession ("run", "cache_stats", ...)
+
+        Returns:
+            результат метода
+        """
+        loop = asyncio.get_running_loop()
+        target = _session_call if self.mode == "process" else self._thread_call
+        self.pending += 1
+        try:
+            result, seconds = await loop.run_in_executor(self._executor, target, method, args, kwargs)
+        except BrokenProcessPool:
+            # Процесс анализа упал: следующий вызов поднимет новый (состояние движков теряется)
+            logger.error("Процесс анализа завершился аварийно, перезапуск")
+            self.restarts += 1
+            self._executor.shutdown(wait=False)
+            self._start()
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self.busy_seconds += seconds
+        return result
+
+    async def run(self, inputs, targets=None, snapshot_id=None):
+        """
+        Прогон графа анализа
+
+        Returns:
+            PipelineRun (с меткой snapshot_id)
+        """
+        return await self.call("run", inputs, targets, snapshot_id)
+
+    def stats(self):
+        """
+        Returns:
+            dict: mode, pending, completed, busy_seconds, restarts
+        """
+        return {
+            "mode": self.mode,
+            "pending": self.pending,
+            "completed": self.completed,
+            "busy_seconds": self.busy_seconds,
+            "restarts": self.restarts
+        }
+
+    def shutdown(self):
+        """Дожидается текущих вызовов, закрывает сессию (сохранение состояния) и останавливает воркер"""
+        if self.mode == "process":
+            # Сессия живёт в дочернем процессе — закрываем её там же
+            try:
+                self._executor.submit(_session_call, "close", (), {}).result()
+            except Exception as e:
+                logger.error(f"Не удалось закрыть сессию анализа: {e}")
+        self._executor.shutdown(wait=True)
+        if self.session is not None:
+            self.session.close()
+
+
+class LoopLagMonitor:
+    """
+    Задержка event loop.
+
+    Корутина спит interval секунд; всё, что сверх interval, — время, когда
+    loop был занят (синхронный код в корутинах или GIL у другого потока).
+    """
+
+    def __init__(self, interval=0.05, window=1200):
+        """
+        Args:
+            interval: период замеров, с
+            window: сколько последних замеров хранить
+        """
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self._task = None
+
+    def start(self):
+        """Запускает замеры в текущем event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(loop.time() - started - self.interval, 0.0))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        """
+        Returns:
+            dict: samples, last_ms, avg_ms, p99_ms, max_ms
+        """
+        if not self.samples:
+            return {"samples": 0, "last_ms": 0.0, "avg_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        lags = np.fromiter(self.samples, dtype=np.float64) * 1000
+        return {
+            "samples": len(lags),
+            "last_ms": float(lags[-1]),
+            "avg_ms": float(lags.mean()),
+            "p99_ms": float(np.percentile(lags, 99)),
+            "max_ms": float(lags.max())
+        }
@@ -0,0 +1,121 @@
+# modules/pipeline/session.py
+
+"""
+Сессия анализа: движки, кэш результатов, граф и исполнитель стадий
+Всё stateful (инкрементальные индикаторы и структура, реестр уровней,
+трекер sweep, история фаз SVD, алерты) живёт в одной сессии, закреплённой
+за потоком или процессом анализа (см. AnalysisWorker).
+"""
+
+import logging
+import time
+
+from modules.liquidity.liquidity_engine import LiquidityEngine
+from modules.svd.svd_engine import SVDEngine
+from modules.market_structure.market_structure_engine import MarketStructureEngine
+from modules.market_structure.historical_phase_analyzer import HistoricalPhaseAnalyzer
+from modules.market_structure.global_trend_analyzer import GlobalTrendAnalyzer
+from modules.ta_engine.ta_engine import TAEngine
+from modules.decision.decision_engine import DecisionEngine
+from modules.alerts import AlertManager
+from modules.utils.result_cache import AnalysisCache
+from .stage_graph import StageExecutor
+from .analysis_graph import build_analysis_graph
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisSession:
+    """
+    Движки анализа и граф стадий над ними
+    """
+
+    def __init__(self, config=None, symbol="", state_path=None, engines=None):
+        """
+        Args:
+            config: Config (пороги, таймфреймы, ANALYSIS_CACHE_SIZE, ANALYSIS_WORKERS,
+                INCREMENTAL_STRUCTURE, TA_STATE_SAVE_INTERVAL)
+            symbol: торговая пара (ключ кэша)
+            state_path: файл состояния индикаторов TAEngine (загружается при старте,
+                сохраняется не чаще раза в TA_STATE_SAVE_INTERVAL секунд и при close)
+            engines: готовые движки {structure_engine, ta_engine, liquidity_engine,
+                svd_engine, decision_engine, phase_analyzer, trend_analyzer, alert_manager}
+                вместо новых
+        """
+        engines = dict(engines or {})
+        self.config = config
+        self.structure_engine = engines.get("structure_engine") or MarketStructureEngine(
+            incremental=getattr(config, "INCREMENTAL_STRUCTURE", False)
+        )
+        self.ta_engine = engines.get("ta_engine") or TAEngine(symbol=symbol)
+        self.liquidity_engine = engines.get("liquidity_engine") or LiquidityEngine()
+        self.svd_engine = engines.get("svd_engine") or SVDEngine(config)
+        self.decision_engine = engines.get("decision_engine") or DecisionEngine(config)
+        # None в engines отключает опциональный анализатор
+        self.phase_analyzer = engines["phase_analyzer"] if "phase_analyzer" in engines else HistoricalPhaseAnalyzer()
+        self.trend_analyzer = engines["trend_analyzer"] if "trend_analyzer" in engines else GlobalTrendAnalyzer()
+        self.alert_manager = engines["alert_manager"] if "alert_manager" in engines else AlertManager()
+        self.cache = AnalysisCache(maxsize=getattr(config, "ANALYSIS_CACHE_SIZE", 64))
+        self.graph = build_analysis_graph(
+            self.structure_engine, self.ta_engine, self.liquidity_engine, self.svd_engine, self.decision_engine,
+            phase_analyzer=self.phase_analyzer,
+            trend_analyzer=self.trend_analyzer,
+            alert_manager=self.alert_manager,
+            config=config,
+            cache=self.cache,
+            symbol=symbol
+        )
+        self.executor = StageExecutor(max_workers=getattr(config, "ANALYSIS_WORKERS", 4))
+
+        # Состояние инкрементальных индикаторов (EMA/RSI/ATR) переживает перезапуск
+        self.state_path = state_path
+        self.state_save_interval = getattr(config, "TA_STATE_SAVE_INTERVAL", 300.0)
+        self._state_saved_at = time.monotonic()
+        self._state_dirty = False
+        if state_path and self.ta_engine.load_state(state_path):
+            logger.info("📈 Состояние индикаторов загружено")
+
+    def run(self, inputs, targets=None, snapshot_id=None):
+        """
+        Прогон графа
+
+        Args:
+            inputs: входы графа (ANALYSIS_INPUTS)
+            targets: нужные стадии (по умолчанию все)
+            snapshot_id: id MarketSnapshot входов — метка результата
+
+        Returns:
+            PipelineRun (с метриками кэша — /health не ждёт воркер ради них)
+        """
+        run = self.executor.run(self.graph, inputs, targets)
+        run.snapshot_id = snapshot_id
+        run.cache_stats = self.cache.stats()
+        if self.state_path and "ta" in run.timings:
+            self._state_dirty = True
+            if time.monotonic() - self._state_saved_at >= self.state_save_interval:
+                self.save_state()
+        return run
+
+    def save_state(self):
+        """
+        Сохраняет состояние индикаторов, если были прогоны с TA после прошлого сохранения
+
+        Returns:
+            bool: True если файл записан
+        """
+        if not self.state_path or not self._state_dirty:
+            return False
+        self._state_saved_at = time.monotonic()
+        if not self.ta_engine.save_state(self.state_path):
+            return False
+        self._state_dirty = False
+        return True
+
+    def cache_stats(self):
+        """Метрики AnalysisCache сессии"""
+        return self.cache.stats()
+
+    def close(self):
+        """Сохраняет состояние индикаторов и останавливает исполнитель стадий"""
+        self.save_state()
+        self.executor.shutdown()
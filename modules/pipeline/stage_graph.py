@@ -0,0 +1,297 @@
+# modules/pipeline/stage_graph.py
+
+"""
+Граф стадий анализа и его исполнитель
+Стадия объявляет функцию и зависимости — имена других стадий или входов
+(свечи, сделки, стакан); функция получает их результаты позиционно в
+порядке deps. StageExecutor запускает стадию, как только готовы все её
+зависимости, независимые ветки идут параллельно в пуле потоков (numpy и
+pandas отпускают GIL на тяжёлых операциях). Стадии с общим lock — один и
+тот же stateful движок — не выполняются одновременно.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class Stage:
+    """Стадия графа: func(*результаты deps) -> результат"""
+
+    __slots__ = ("name", "func", "deps", "lock", "fallback")
+
+    def __init__(self, name, func, deps=(), lock=None, fallback=_MISSING):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.lock = lock
+        self.fallback = fallback
+
+    @property
+    def has_fallback(self):
+        return self.fallback is not _MISSING
+
+    def fallback_value(self):
+        return self.fallback() if callable(self.fallback) else self.fallback
+
+
+class StageGraph:
+    """
+    Декларативный граф стадий.
+
+    Пример:
+        graph = StageGraph()
+        graph.add("structure", engine.analyze, deps=("ohlcv",))
+        graph.add("liquidity", liquidity_engine.analyze, deps=("ohlcv", "structure"), lock="liquidity")
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, func, deps=(), lock=None, fallback=_MISSING):
+        """
+        Добавляет стадию
+
+        Args:
+            name: имя стадии (ключ результата)
+            func: функция от результатов deps (в том же порядке)
+            deps: имена стадий и входов, нужных стадии
+            lock: имя общего ресурса; стадии с одним lock выполняются по очереди
+            fallback: результат (или функция без аргументов) при ошибке стадии —
+                зависимые стадии продолжают работу; без fallback они пропускаются
+
+        Returns:
+            self (для цепочек add)
+        """
+        if name in self.stages:
+            raise ValueError(f"Стадия {name} уже есть в графе")
+        self.stages[name] = Stage(name, func, deps, lock, fallback)
+        return self
+
+    def __contains__(self, name):
+        return name in self.stages
+
+    def __len__(self):
+        return len(self.stages)
+
+    def order(self, inputs=(), targets=None):
+        """
+        Стадии, нужные для targets, в топологическом порядке
+
+        Args:
+            inputs: имена входов графа
+            targets: нужные стадии (по умолчанию все)
+
+        Returns:
+            list имён стадий
+
+        Raises:
+            ValueError: неизвестная зависимость или цикл
+        """
+        inputs = set(inputs)
+        targets = list(self.stages) if targets is None else list(targets)
+        order, state = [], {}  # state: 1 — в обходе, 2 — готово
+
+        def visit(name, path):
+            if name not in self.stages:
+                if name in inputs:
+                    return
+                raise ValueError(f"Неизвестная зависимость {name} ({' -> '.join(path)})")
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Цикл в графе: {' -> '.join(path + [name])}")
+            state[name] = 1
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            state[name] = 2
+            order.append(name)
+
+        for name in targets:
+            visit(name, [])
+        return order
+
+
+class PipelineRun:
+    """
+    Результат прогона графа
+
+    Attributes:
+        results: {стадия: результат} (упавшие с fallback — их fallback)
+        timings: {стадия: секунды выполнения}
+        errors: {стадия: текст ошибки}
+        skipped: стадии, пропущенные из-за упавших зависимостей
+        elapsed: общее время прогона, с
+        snapshot_id: id MarketSnapshot, по которому считался прогон (None — не задан)
+        cache_stats: метрики AnalysisCache сессии после прогона (None — без сессии)
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.timings = {}
+        self.errors = {}
+        self.skipped = []
+        self.elapsed = 0.0
+        self.snapshot_id = None
+        self.cache_stats = None
+
+    def __getitem__(self, name):
+        return self.results[name]
+
+    def __contains__(self, name):
+        return name in self.results
+
+    def get(self, name, default=None):
+        return self.results.get(name, default)
+
+    @property
+    def ok(self):
+        return not self.errors and not self.skipped
+
+    def summary(self):
+        """
+        Returns:
+            dict: snapshot_id, elapsed_ms, stages {имя: мс}, errors, skipped, cache
+        """
+        return {
+            "snapshot_id": self.snapshot_id,
+            "elapsed_ms": self.elapsed * 1000,
+            "stages": {name: seconds * 1000 for name, seconds in self.timings.items()},
+            "errors": dict(self.errors),
+            "skipped": list(self.skipped),
+            "cache": self.cache_stats
+        }
+
+
+class StageExecutor:
+    """
+    Исполнитель графа стадий.
+
+    max_workers=1 — последовательный прогон в текущем потоке (тот же
+    порядок, те же результаты). Пул потоков создаётся один раз и
+    переиспользуется между прогонами.
+    """
+
+    def __init__(self, max_workers=4):
+        """
+        Args:
+            max_workers: потоков для независимых стадий
+        """
+        self.max_workers = max(int(max_workers or 1), 1)
+        self._pool = None
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, name):
+        with self._locks_guard:
+            lock = self._locks.get(name)
+            if lock is None:
+                lock = self._locks[name] = threading.Lock()
+            return lock
+
+    def _call(self, stage, args):
+        """Выполняет стадию под её lock: (результат, секунды)"""
+        lock = self._lock(stage.lock) if stage.lock else None
+        if lock:
+            lock.acquire()
+        try:
+            started = time.perf_counter()
+            result = stage.func(*args)
+            return result, time.perf_counter() - started
+        finally:
+            if lock:
+                lock.release()
+
+    def run(self, graph, inputs=None, targets=None):
+        """
+        Прогоняет граф
+
+        Ошибка стадии не прерывает прогон: она записывается в errors, вместо
+        результата берётся fallback стадии, а если его нет — зависимые стадии
+        пропускаются.
+
+        Args:
+            graph: StageGraph
+            inputs: {имя входа: значение}
+            targets: нужные стадии (по умолчанию все); считаются только они и их зависимости
+
+        Returns:
+            PipelineRun
+        """
+        inputs = inputs or {}
+        order = graph.order(inputs, targets)
+        run = PipelineRun()
+        started = time.perf_counter()
+        values = dict(inputs)
+
+        if self.max_workers == 1 or len(order) < 2:
+            for name in order:
+                stage = graph.stages[name]
+                if self._blocked(stage, values, run):
+                    continue
+                try:
+                    result, seconds = self._call(stage, [values[dep] for dep in stage.deps])
+                except Exception as e:
+                    self._failed(stage, e, values, run)
+                else:
+                    values[name] = run.results[name] = result
+                    run.timings[name] = seconds
+        else:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage")
+            remaining = list(order)
+            running = {}
+            while remaining or running:
+                for name in list(remaining):
+                    stage = graph.stages[name]
+                    if any(dep in remaining or dep in running.values() for dep in stage.deps):
+                        continue
+                    remaining.remove(name)
+                    if self._blocked(stage, values, run):
+                        continue
+                    future = self._pool.submit(self._call, stage, [values[dep] for dep in stage.deps])
+                    running[future] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    stage = graph.stages[name]
+                    try:
+                        result, seconds = future.result()
+                    except Exception as e:
+                        self._failed(stage, e, values, run)
+                    else:
+                        values[name] = run.results[name] = result
+                        run.timings[name] = seconds
+
+        run.elapsed = time.perf_counter() - started
+        return run
+
+    @staticmethod
+    def _blocked(stage, values, run):
+        """Пропускает стадию, если у неё нет результата какой-либо зависимости"""
+        missing = [dep for dep in stage.deps if dep not in values]
+        if missing:
+            run.skipped.append(stage.name)
+            logger.warning(f"Стадия {stage.name} пропущена: нет {', '.join(missing)}")
+            return True
+        return False
+
+    @staticmethod
+    def _failed(stage, error, values, run):
+        run.errors[stage.name] = f"{type(error).__name__}: {error}"
+        logger.error(f"Ошибка стадии {stage.name}: {error}", exc_info=True)
+        if stage.has_fallback:
+            values[stage.name] = run.results[stage.name] = stage.fallback_value()
+
+    def shutdown(self):
+        """Останавливает пул потоков"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
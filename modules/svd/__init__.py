@@ -4,6 +4,7 @@ SVD Engine v1.0 (Smart Volume Dynamics)
 """
 
 from .svd_engine import SVDEngine
+from .svd_result import SVDResult
 from .delta import compute_delta
 from .absorption import detect_absorption
 from .aggression import detect_aggression
@@ -13,9 +14,11 @@ from .orderbook_imbalance import compute_orderbook_imbalance
 from .trade_buckets import bucket_trades
 from .orderbook_thin import detect_thin_zones
 from .spoof_detector import detect_spoof_wall
+from .vpin import VPINCalculator
 
 __all__ = [
     'SVDEngine',
+    'SVDResult',
     'compute_delta',
     'detect_absorption',
     'detect_aggression',
@@ -24,6 +27,7 @@ __all__ = [
     'compute_orderbook_imbalance',
     'bucket_trades',
     'detect_thin_zones',
-    'detect_spoof_wall'
+    'detect_spoof_wall',
+    'VPINCalculator'
 ]
 
@@ -6,10 +6,27 @@ discovery → manipulation → execution → distribution
 """
 
 import logging
-from collections import deque
 
 logger = logging.getLogger(__name__)
 
+# Ожидаемые следующие фазы
+NEXT_PHASES = {
+    "discovery": ("manipulation", "execution"),
+    "manipulation": ("execution",),
+    "execution": ("distribution",),
+    "distribution": ("discovery",)
+}
+
+
+def expected_next_phases(phase):
+    """
+    Ожидаемые следующие фазы после phase
+
+    Returns:
+        list: список возможных следующих фаз
+    """
+    return list(NEXT_PHASES.get(phase, ()))
+
 
 class PhaseTracker:
     """
@@ -18,7 +35,9 @@ class PhaseTracker:
     
     def __init__(self, history_size=10):
         self.history_size = history_size
-        self.phase_history = deque(maxlen=history_size)
+        # Неизменяемый кортеж: пересобирается только при смене фазы и отдаётся
+        # в результатах по ссылке, без копии на каждом цикле
+        self.phase_history = ()
         self.current_phase = "discovery"
         self.phase_start_time = None
         self.phase_duration = 0
@@ -59,11 +78,11 @@ class PhaseTracker:
             logger.info(f"🔄 Смена фазы: {self.current_phase} → {new_phase} (длительность: {self.phase_duration:.1f}s, valid: {is_valid_transition})")
             
             # Добавляем в историю
-            self.phase_history.append({
+            self.phase_history = (self.phase_history + ({
                 "phase": self.current_phase,
                 "duration_seconds": self.phase_duration,
                 "timestamp": timestamp
-            })
+            },))[-self.history_size:]
             
             # Обновляем текущую фазу
             self.current_phase = new_phase
@@ -78,7 +97,7 @@ class PhaseTracker:
             "phase_duration_seconds": self.phase_duration,
             "is_valid_transition": is_valid_transition,
             "phase_confidence": phase_confidence,
-            "phase_history": list(self.phase_history)
+            "phase_history": self.phase_history
         }
     
     def _is_valid_transition(self, from_phase, to_phase):
@@ -147,14 +166,7 @@ class PhaseTracker:
         Returns:
             list: список возможных следующих фаз
         """
-        transitions = {
-            "discovery": ["manipulation", "execution"],
-            "manipulation": ["execution"],
-            "execution": ["distribution"],
-            "distribution": ["discovery"]
-        }
-        
-        return transitions.get(self.current_phase, [])
+        return expected_next_phases(self.current_phase)
     
     def is_in_cycle(self):
         """
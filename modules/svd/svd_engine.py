@@ -8,21 +8,41 @@ from .orderbook_imbalance import compute_orderbook_imbalance
 from .orderbook_thin import detect_thin_zones
 from .spoof_detector import detect_spoof_wall
 from .trade_buckets import bucket_trades
-from .svd_score import svd_confidence_score
+from .svd_score import svd_confidence_score, scale_tiers
 from .orderbook_path import compute_path_cost
-from .phase_tracker import PhaseTracker
+from .phase_tracker import PhaseTracker, expected_next_phases
 from .cvd import CVDCalculator
-from collections import deque
+from .vpin import VPINCalculator
+from .svd_result import SVDResult
+from modules.utils.result_types import Lazy
+from functools import partial
+
+# Сколько подтверждённых спуфов хранить
+SPOOF_HISTORY_SIZE = 20
 
 
 class SVDEngine:
-    def __init__(self):
+    def __init__(self, config=None):
+        """
+        Args:
+            config: Config (пороги CVD и масштаб ступеней SVD score; по умолчанию — исходные значения)
+        """
+        # Пороги CVD для intent
+        self.cvd_threshold = getattr(config, 'SVD_CVD_THRESHOLD', 5.0) if config else 5.0  # Порог для значимого общего CVD
+        self.cvd_slope_threshold = getattr(config, 'SVD_CVD_SLOPE_THRESHOLD', 0.5) if config else 0.5  # Порог для значимого slope
+        # Порог для обнаружения разворота (снижен с 2.0 для более ранней detection)
+        self.cvd_reversal_threshold = getattr(config, 'SVD_CVD_REVERSAL_THRESHOLD', 1.5) if config else 1.5
+        self.score_tiers = scale_tiers(
+            getattr(config, 'SVD_DELTA_TIER_SCALE', 1.0) if config else 1.0,
+            getattr(config, 'SVD_VELOCITY_TIER_SCALE', 1.0) if config else 1.0
+        )
         # Память для трекинга спуфов и движения лучшего бид/аск
         self._prev_spoof = None  # {"side":..., "price":..., "ts_start":..., "ts_last":...}
         self._prev_best = {"bid": None, "ask": None, "ts": None}
-        self._spoof_events = deque(maxlen=20)  # история подтвержденных спуфов
+        self._spoof_events = ()  # история подтвержденных спуфов (кортеж: в результат без копии)
         self.phase_tracker = PhaseTracker(history_size=10)
         self.cvd_calculator = CVDCalculator()  # CVD для подтверждения трендов
+        self.vpin_calculator = VPINCalculator()  # VPIN: токсичность потока (инкрементально)
 
     def analyze(self, trades: list, orderbook: dict, atr_pct=None):
         """
@@ -31,6 +51,8 @@ class SVDEngine:
             trades  — список последних сделок
             orderbook — стакан (bids/asks)
             atr_pct — ATR в процентах для нормировки (optional)
+        Выход:
+            SVDResult (неизменяемый, доступ как к dict)
         """
         from modules.utils.normalize import normalize_delta_on_atr, get_absorption_threshold, normalize_path_cost_on_atr
 
@@ -60,7 +82,7 @@ class SVDEngine:
         best_bid = orderbook["bids"][0][0] if orderbook and orderbook.get("bids") else None
         best_ask = orderbook["asks"][0][0] if orderbook and orderbook.get("asks") else None
         
-        score = svd_confidence_score(delta, absorption, aggression, velocity, dom_imbalance, bucket_metrics)
+        score = svd_confidence_score(delta, absorption, aggression, velocity, dom_imbalance, bucket_metrics, tiers=self.score_tiers)
         
         # CVD (Cumulative Volume Delta) для подтверждения тренда
         cvd_data = self.cvd_calculator.calculate_cvd_from_trades(trades, reset_on_swing=False)
@@ -68,14 +90,17 @@ class SVDEngine:
         cvd_slope = cvd_data["cvd_slope"]
         cvd_divergence = cvd_data["divergence"]
 
+        # VPIN: обрабатываются только новые сделки из снапшота
+        vpin_data = self.vpin_calculator.update(trades)
+
         # Smart Money intent с учётом ОБЩЕГО CVD и CVD SLOPE
         # CVD value показывает ОБЩИЙ тренд накопления/распределения
         # CVD slope показывает НАПРАВЛЕНИЕ изменения (ускорение/замедление)
         
-        # Пороги
-        cvd_threshold = 5.0  # Порог для значимого общего CVD
-        cvd_slope_threshold = 0.5  # Порог для значимого slope
-        cvd_reversal_threshold = 1.5  # Порог для обнаружения разворота (снижен с 2.0 для более ранней detection)
+        # Пороги (из config, см. __init__)
+        cvd_threshold = self.cvd_threshold
+        cvd_slope_threshold = self.cvd_slope_threshold
+        cvd_reversal_threshold = self.cvd_reversal_threshold
         
         # ОБНАРУЖЕНИЕ РАЗВОРОТА ТРЕНДА (высокий приоритет!)
         # Если общий CVD отрицательный, НО slope сильно положительный → начало разворота вверх
@@ -163,12 +188,12 @@ class SVDEngine:
                 if price_move < 0.0015 and time_ok:
                     spoof_confirmed = True
                     # логируем событие
-                    self._spoof_events.append({
+                    self._spoof_events = (self._spoof_events + ({
                         "side": prev.get("side"),
                         "price": prev.get("price"),
                         "duration_ms": spoof_duration,
                         "ts": current_ts
-                    })
+                    },))[-SPOOF_HISTORY_SIZE:]
         # обновляем память спуфа
         if spoof_wall.get("side"):
             # если стена та же сторона, продлеваем ts_last, ts_start
@@ -271,39 +296,40 @@ class SVDEngine:
                     logger.info(f"⚡ EXECUTION: CVD slope {cvd_slope:.1f} → intent перезаписан на DISTRIBUTING")
                 intent = "distributing"
 
-        return {
-            "delta": delta,
-            "delta_normalized": delta_normalized,  # Нормированная дельта
-            "cvd": cvd_value,  # CVD (накопительная дельта)
-            "cvd_slope": cvd_slope,  # Наклон CVD (trend)
-            "cvd_divergence": cvd_divergence,  # Дивергенция CVD с ценой
-            "cvd_confirms_intent": cvd_confirms_intent,  # CVD подтверждает intent
-            "cvd_reversal_detected": reversal_detected,  # Обнаружен разворот тренда
-            "is_pullback_or_bounce": is_pullback_or_bounce,  # Накопление с откатом или распределение с отскоком
-            "absorption": absorption,
-            "aggression": aggression,
-            "velocity": velocity,
-            "dom_imbalance": dom_imbalance,
-            "thin_zones": thin_zones,
-            "spoof_wall": spoof_wall,
-            "spoof_confirmed": spoof_confirmed,
-            "spoof_duration_ms": spoof_duration,
-            "spoof_events": list(self._spoof_events),
-            "dom_chasing": dom_chasing,
-            "buckets": bucket_metrics,
-            "path_cost": path_cost,
-            "path_cost_normalized": path_cost_normalized,  # Нормированный path cost
-            "fomo": fomo_flag,
-            "panic": panic_flag,
-            "strong_fomo": strong_fomo,
-            "strong_panic": strong_panic,
-            "phase": phase,
-            "phase_info": phase_info,  # Полная информация о фазе
-            "phase_confidence": phase_confidence,
-            "phase_changed": phase_changed,
-            "expected_next_phases": self.phase_tracker.get_expected_next_phase(),
-            "intent": intent,
-            "confidence": score,
-            "atr_pct": atr_pct  # Для справки
-        }
+        return SVDResult(
+            delta=delta,
+            delta_normalized=delta_normalized,
+            cvd=cvd_value,
+            cvd_slope=cvd_slope,
+            cvd_divergence=cvd_divergence,
+            cvd_confirms_intent=cvd_confirms_intent,
+            cvd_reversal_detected=reversal_detected,
+            vpin=vpin_data,
+            is_pullback_or_bounce=is_pullback_or_bounce,
+            absorption=absorption,
+            aggression=aggression,
+            velocity=velocity,
+            dom_imbalance=dom_imbalance,
+            thin_zones=thin_zones,
+            spoof_wall=spoof_wall,
+            spoof_confirmed=spoof_confirmed,
+            spoof_duration_ms=spoof_duration,
+            spoof_events=self._spoof_events,
+            dom_chasing=dom_chasing,
+            buckets=bucket_metrics,
+            path_cost=path_cost,
+            path_cost_normalized=path_cost_normalized,
+            fomo=fomo_flag,
+            panic=panic_flag,
+            strong_fomo=strong_fomo,
+            strong_panic=strong_panic,
+            phase=phase,
+            phase_info=phase_info,
+            phase_confidence=phase_confidence,
+            phase_changed=phase_changed,
+            expected_next_phases=Lazy(partial(expected_next_phases, phase)),
+            intent=intent,
+            confidence=score,
+            atr_pct=atr_pct
+        )
 
@@ -0,0 +1,55 @@
+# modules/svd/svd_result.py
+
+"""
+Результат SVDEngine.analyze
+"""
+
+from modules.utils.result_types import ResultRecord
+
+
+class SVDResult(ResultRecord):
+    """
+    SVD данные одного цикла: неизменяемая запись с доступом как к dict.
+
+    spoof_events и phase_info["phase_history"] — кортежи-снимки истории
+    движка (общие между циклами, пока история не изменилась);
+    expected_next_phases считается при первом обращении.
+    """
+
+    FIELDS = (
+        "delta",
+        "delta_normalized",  # Нормированная дельта
+        "cvd",  # CVD (накопительная дельта)
+        "cvd_slope",  # Наклон CVD (trend)
+        "cvd_divergence",  # Дивергенция CVD с ценой
+        "cvd_confirms_intent",  # CVD подтверждает intent
+        "cvd_reversal_detected",  # Обнаружен разворот тренда
+        "vpin",  # Токсичность потока ордеров (VPIN + rolling CDF)
+        "is_pullback_or_bounce",  # Накопление с откатом или распределение с отскоком
+        "absorption",
+        "aggression",
+        "velocity",
+        "dom_imbalance",
+        "thin_zones",
+        "spoof_wall",
+        "spoof_confirmed",
+        "spoof_duration_ms",
+        "spoof_events",
+        "dom_chasing",
+        "buckets",
+        "path_cost",
+        "path_cost_normalized",  # Нормированный path cost
+        "fomo",
+        "panic",
+        "strong_fomo",
+        "strong_panic",
+        "phase",
+        "phase_info",  # Полная информация о фазе
+        "phase_confidence",
+        "phase_changed",
+        "expected_next_phases",
+        "intent",
+        "confidence",
+        "atr_pct"  # Для справки
+    )
+    LAZY = ("expected_next_phases",)
@@ -1,27 +1,47 @@
 # modules/svd/svd_score.py
 
-def svd_confidence_score(delta, absorption, aggression, velocity, dom_imbalance=None, bucket_metrics=None):
+# Ступени (порог, баллы) по убыванию порога: берётся первая, где значение > порога
+SCORE_TIERS = {
+    "delta": ((100000, 3), (50000, 2.5), (20000, 2), (5000, 1), (0, 0.5)),
+    "velocity": ((100, 3), (50, 2), (20, 1.5), (5, 1), (0, 0.5))
+}
+
+
+def scale_tiers(delta_scale=1.0, velocity_scale=1.0):
+    """
+    Ступени SCORE_TIERS с масштабированными порогами (для подбора параметров)
+
+    Returns:
+        dict в формате SCORE_TIERS
+    """
+    return {
+        "delta": tuple((threshold * delta_scale, points) for threshold, points in SCORE_TIERS["delta"]),
+        "velocity": tuple((threshold * velocity_scale, points) for threshold, points in SCORE_TIERS["velocity"])
+    }
+
+
+def _tier_points(value, tiers):
+    for threshold, points in tiers:
+        if value > threshold:
+            return points
+    return 0
+
+
+def svd_confidence_score(delta, absorption, aggression, velocity, dom_imbalance=None, bucket_metrics=None, tiers=None):
     """
     Финальный Confidence Score SVD: 0–10
     Добавлены:
       - дисбаланс стакана (DOM)
       - краткосрочные бакеты сделок (delta/velocity)
+
+    tiers — ступени дельты и скорости (по умолчанию SCORE_TIERS)
     """
 
+    tiers = tiers or SCORE_TIERS
     score = 0
 
     # 1. Дельта (адаптивные пороги в зависимости от объема)
-    delta_abs = abs(delta)
-    if delta_abs > 100000:
-        score += 3
-    elif delta_abs > 50000:
-        score += 2.5
-    elif delta_abs > 20000:
-        score += 2
-    elif delta_abs > 5000:
-        score += 1
-    elif delta_abs > 0:
-        score += 0.5
+    score += _tier_points(abs(delta), tiers["delta"])
 
     # 2. Поглощение
     if absorption.get("absorbing"):
@@ -43,17 +63,7 @@ def svd_confidence_score(delta, absorption, aggression, velocity, dom_imbalance=
             score += 1
 
     # 4. Скорость сделок (адаптивные пороги)
-    vel = velocity.get("velocity", 0)
-    if vel > 100:
-        score += 3
-    elif vel > 50:
-        score += 2
-    elif vel > 20:
-        score += 1.5
-    elif vel > 5:
-        score += 1
-    elif vel > 0:
-        score += 0.5
+    score += _tier_points(velocity.get("velocity", 0), tiers["velocity"])
 
     # 5. Дисбаланс стакана (DOM)
     if dom_imbalance:
@@ -0,0 +1,222 @@
+# modules/svd/vpin.py
+
+"""
+VPIN (Volume-Synchronized Probability of Informed Trading)
+Токсичность потока ордеров по корзинам равного объёма
+"""
+
+import bisect
+from collections import deque
+
+
+class VPINCalculator:
+    """
+    Инкрементальный VPIN поверх потока сделок.
+
+    Сделки раскладываются по корзинам равного объёма (bucket_volume);
+    сделка, пересекающая границу корзины, делится между корзинами.
+    VPIN = Σ|V_buy - V_sell| по последним num_buckets корзинам / (num_buckets * bucket_volume).
+
+    Стоимость: O(1) на сделку (скользящая сумма по deque), CDF обновляется
+    один раз на закрытую корзину. Пока в истории меньше min_history значений,
+    CDF не считается и поток не помечается токсичным (по 1–2 значениям CDF
+    всегда 1.0). Сделки без стороны делятся между buy и sell пополам.
+    """
+
+    def __init__(self, bucket_volume=None, num_buckets=50, cdf_window=500,
+                 toxic_cdf=0.9, warmup_trades=200, trades_per_bucket=50, min_history=50):
+        """
+        Args:
+            bucket_volume: объём одной корзины (None = оценить по первым warmup_trades сделкам)
+            num_buckets: сколько корзин входит в VPIN
+            cdf_window: сколько последних значений VPIN держать для rolling CDF
+            toxic_cdf: порог CDF, выше которого поток считается токсичным
+            warmup_trades: сделок для автооценки bucket_volume
+            trades_per_bucket: средних сделок в корзине при автооценке
+            min_history: минимум значений VPIN в истории для CDF и флага toxic
+        """
+        self.bucket_volume = float(bucket_volume) if bucket_volume else None
+        self.num_buckets = num_buckets
+        self.cdf_window = cdf_window
+        self.toxic_cdf = toxic_cdf
+        self.warmup_trades = warmup_trades
+        self.trades_per_bucket = trades_per_bucket
+        self.min_history = min_history
+
+        self._warmup = []  # сделки до определения bucket_volume
+        self._bucket_buy = 0.0
+        self._bucket_sell = 0.0
+        self._imbalances = deque()  # |buy - sell| закрытых корзин
+        self._imbalance_sum = 0.0
+
+        self._vpin_history = deque()  # значения VPIN по порядку поступления
+        self._vpin_sorted = []  # те же значения, отсортированные (для CDF)
+
+        # Курсор для дедупликации пересекающихся снапшотов сделок
+        self._last_ts = None
+        self._seen_at_last_ts = 0
+
+        self.buckets_closed = 0
+
+    # ------------------ Обновление ------------------ #
+    def add_trade(self, trade):
+        """
+        Добавляет одну сделку (O(1) амортизированно)
+
+        Args:
+            trade: {price, volume, side, timestamp}
+        """
+        if not isinstance(trade, dict):
+            return
+        ts = trade.get("timestamp") or 0
+        if self._last_ts is None or ts > self._last_ts:
+            self._last_ts = ts
+            self._seen_at_last_ts = 1
+        elif ts == self._last_ts:
+            self._seen_at_last_ts += 1
+
+        try:
+            volume = float(trade.get("volume", 0) or 0)
+        except (TypeError, ValueError):
+            return
+        if volume <= 0:
+            return
+        side = trade.get("side", "")
+
+        if self.bucket_volume is None:
+            self._warmup.append((volume, side))
+            if len(self._warmup) >= self.warmup_trades:
+                avg_volume = sum(v for v, _ in self._warmup) / len(self._warmup)
+                self.bucket_volume = avg_volume * self.trades_per_bucket
+                warmup, self._warmup = self._warmup, []
+                for v, s in warmup:
+                    self._fill(v, s)
+            return
+
+        self._fill(volume, side)
+
+    def _fill(self, volume, side):
+        """Раскладывает объём сделки по корзинам"""
+        while volume > 0:
+            room = self.bucket_volume - (self._bucket_buy + self._bucket_sell)
+            part = volume if volume < room else room
+            if side == "buy":
+                self._bucket_buy += part
+            elif side == "sell":
+                self._bucket_sell += part
+            else:
+                # Сторона неизвестна — объём идёт в корзину, но не в дисбаланс
+                self._bucket_buy += part / 2
+                self._bucket_sell += part / 2
+            volume -= part
+            if part >= room:
+                self._close_bucket()
+
+    def _close_bucket(self):
+        imbalance = abs(self._bucket_buy - self._bucket_sell)
+        self._imbalances.append(imbalance)
+        self._imbalance_sum += imbalance
+        if len(self._imbalances) > self.num_buckets:
+            self._imbalance_sum -= self._imbalances.popleft()
+        self._bucket_buy = 0.0
+        self._bucket_sell = 0.0
+        self.buckets_closed += 1
+
+        if len(self._imbalances) == self.num_buckets:
+            vpin = self._imbalance_sum / (self.num_buckets * self.bucket_volume)
+            self._vpin_history.append(vpin)
+            bisect.insort(self._vpin_sorted, vpin)
+            if len(self._vpin_history) > self.cdf_window:
+                old = self._vpin_history.popleft()
+                del self._vpin_sorted[bisect.bisect_left(self._vpin_sorted, old)]
+
+    def update(self, trades):
+        """
+        Добавляет только новые сделки из снапшота буфера (снапшоты пересекаются)
+
+        Args:
+            trades: список сделок, упорядоченный по timestamp
+
+        Returns:
+            dict: текущее состояние (см. get_state)
+        """
+        if trades:
+            for trade in self._new_trades(trades):
+                self.add_trade(trade)
+        return self.get_state()
+
+    def _new_trades(self, trades):
+        """Хвост снапшота, который ещё не обработан (обход с конца)"""
+        if self._last_ts is None:
+            return trades
+        i = len(trades)
+        while i > 0:
+            t = trades[i - 1]
+            ts = (t.get("timestamp") or 0) if isinstance(t, dict) else 0
+            if ts < self._last_ts:
+                break
+            i -= 1
+        tail = trades[i:]
+        same_ts = 0
+        for t in tail:
+            if (t.get("timestamp") or 0) != self._last_ts:
+                break
+            same_ts += 1
+        return tail[min(same_ts, self._seen_at_last_ts):]
+
+    # ------------------ Чтение ------------------ #
+    def get_vpin(self):
+        """Текущий VPIN или None, пока не накоплено num_buckets корзин"""
+        return self._vpin_history[-1] if self._vpin_history else None
+
+    def get_cdf(self, value=None):
+        """
+        Rolling CDF: доля исторических VPIN <= value
+
+        Args:
+            value: значение (по умолчанию текущий VPIN)
+
+        Returns:
+            float или None (нет VPIN или история короче min_history)
+        """
+        if value is None:
+            value = self.get_vpin()
+        if value is None or len(self._vpin_sorted) < max(self.min_history, 1):
+            return None
+        return bisect.bisect_right(self._vpin_sorted, value) / len(self._vpin_sorted)
+
+    def get_state(self):
+        """
+        Returns:
+            dict: {
+                "vpin": float | None,
+                "vpin_cdf": float | None,
+                "toxic": bool,
+                "buckets_closed": int,
+                "bucket_volume": float | None,
+                "history_size": int
+            }
+        """
+        vpin = self.get_vpin()
+        cdf = self.get_cdf(vpin)
+        return {
+            "vpin": vpin,
+            "vpin_cdf": cdf,
+            "toxic": cdf is not None and cdf >= self.toxic_cdf,
+            "buckets_closed": self.buckets_closed,
+            "bucket_volume": self.bucket_volume,
+            "history_size": len(self._vpin_history)
+        }
+
+    def reset(self):
+        """Сбрасывает состояние (bucket_volume сохраняется)"""
+        self._warmup = []
+        self._bucket_buy = 0.0
+        self._bucket_sell = 0.0
+        self._imbalances.clear()
+        self._imbalance_sum = 0.0
+        self._vpin_history.clear()
+        self._vpin_sorted = []
+        self._last_ts = None
+        self._seen_at_last_ts = 0
+        self.buckets_closed = 0
@@ -6,11 +6,24 @@ from .ta_engine import TAEngine
 from .ema import calculate_ema
 from .rsi import calculate_rsi
 from .patterns import detect_patterns
+from .pattern_scanner import scan_patterns, PATTERN_COLUMNS
+from .batch import analyze_batch, stack_ohlcv
+from .indicator_bank import IndicatorBank, IncrementalEMA, WilderRSI, IncrementalATR
+from .ta_result import TAResult
 
 __all__ = [
     'TAEngine',
     'calculate_ema',
     'calculate_rsi',
-    'detect_patterns'
+    'detect_patterns',
+    'scan_patterns',
+    'PATTERN_COLUMNS',
+    'analyze_batch',
+    'stack_ohlcv',
+    'IndicatorBank',
+    'IncrementalEMA',
+    'WilderRSI',
+    'IncrementalATR',
+    'TAResult'
 ]
 
@@ -0,0 +1,145 @@
+# modules/ta_engine/batch.py
+
+"""
+Пакетный TA по многим символам сразу
+OHLCV передаётся матрицами (символы × свечи), каждый индикатор считается
+одним векторным проходом по всем символам. Результат для каждого символа
+совпадает с TAEngine(incremental=False).analyze на том же окне.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .ta_engine import EMA_FAST_PERIOD, EMA_SLOW_PERIOD, RSI_PERIOD, ATR_PERIOD
+from .patterns import tail_patterns
+from .ta_result import TAResult
+
+
+def _ewm_last(matrix, **ewm_kwargs):
+    """Последнее значение ewm(adjust=False) по каждой строке матрицы (тот же расчёт, что у Series.ewm)"""
+    return pd.DataFrame(matrix.T).ewm(adjust=False, **ewm_kwargs).mean().to_numpy()[-1]
+
+
+def batch_ema(close, period):
+    """Последняя EMA для каждого символа (как calculate_ema)"""
+    return _ewm_last(close, span=period)
+
+
+def batch_rsi(close, period=RSI_PERIOD):
+    """Последний RSI Уайлдера для каждого символа (как calculate_rsi)"""
+    n_symbols, n_candles = close.shape
+    if n_candles <= period:
+        return np.full(n_symbols, np.nan)
+    delta = np.diff(close, axis=1)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    # Первое среднее — SMA за period изменений, дальше сглаживание Уайлдера
+    avg_gain = _ewm_last(np.column_stack([gain[:, :period].mean(axis=1), gain[:, period:]]), alpha=1 / period)
+    avg_loss = _ewm_last(np.column_stack([loss[:, :period].mean(axis=1), loss[:, period:]]), alpha=1 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def batch_atr(high, low, close, period=ATR_PERIOD):
+    """Последний ATR для каждого символа (как calculate_atr)"""
+    n_symbols, n_candles = close.shape
+    if n_candles < period + 1:
+        return np.zeros(n_symbols)
+    prev_close = np.column_stack([np.full(n_symbols, np.nan), close[:, :-1]])
+    # NaN предыдущего закрытия пропускается (как max(axis=1) в pandas)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return _ewm_last(true_range, span=period)
+
+
+def batch_patterns(open_, high, low, close):
+    """
+    Паттерны последних трёх свечей для каждого символа (как detect_patterns)
+
+    Returns:
+        list: список паттернов на каждый символ
+    """
+    n_symbols, n_candles = close.shape
+    if n_candles < 3:
+        return [[] for _ in range(n_symbols)]
+    return tail_patterns(open_, high, low, close)
+
+
+def stack_ohlcv(frames, length=None):
+    """
+    Матрицы OHLCV (символы × свечи) из DataFrame'ов разных символов
+
+    Символы без свечей и короче length в матрицы не попадают: одно короткое
+    окно не обрезает остальные. Пропущенные символы — те, что есть во
+    frames, но не в возвращаемом списке.
+
+    Args:
+        frames: {symbol: DataFrame}
+        length: длина окна (по умолчанию — медианная длина непустых frames);
+            берутся последние length свечей каждого символа
+
+    Returns:
+        (symbols, {"open", "high", "low", "close", "volume": матрица})
+    """
+    lengths = {symbol: 0 if df is None else len(df) for symbol, df in frames.items()}
+    if length is None:
+        non_empty = sorted(n for n in lengths.values() if n > 0)
+        length = non_empty[len(non_empty) // 2] if non_empty else 0
+    symbols = [symbol for symbol, n in lengths.items() if n > 0 and n >= length]
+    matrices = {
+        name: np.vstack([frames[s][name].to_numpy(dtype=np.float64)[lengths[s] - length:] for s in symbols])
+        if symbols else np.empty((0, length))
+        for name in ("open", "high", "low", "close", "volume")
+    }
+    return symbols, matrices
+
+
+def analyze_batch(open_, high, low, close, symbols=None):
+    """
+    TA по всем символам одним проходом на индикатор
+
+    Args:
+        open_/high/low/close: матрицы float (символы × свечи), окна одинаковой длины
+            с выравниванием по последней свече
+        symbols: имена символов (по умолчанию — индексы строк)
+
+    Returns:
+        dict: symbol -> TAResult (как TAEngine.analyze)
+    """
+    open_, high, low, close = (np.asarray(m, dtype=np.float64) for m in (open_, high, low, close))
+    if symbols is None:
+        symbols = list(range(close.shape[0]))
+    if close.shape[0] == 0 or close.shape[1] == 0:
+        # Без свечей считать нечего (TAEngine.analyze на пустом окне тоже не работает)
+        return {}
+
+    ema_fast = batch_ema(close, EMA_FAST_PERIOD)
+    ema_slow = batch_ema(close, EMA_SLOW_PERIOD)
+    rsi = batch_rsi(close, RSI_PERIOD)
+    atr = batch_atr(high, low, close, ATR_PERIOD)
+    current_price = close[:, -1]
+    atr_pct = atr / current_price * 100
+    patterns = batch_patterns(open_, high, low, close)
+
+    # Тренд по EMA
+    trend = np.select(
+        [(ema_fast > ema_slow) & (current_price > ema_fast), (ema_fast < ema_slow) & (current_price < ema_fast)],
+        ["bullish", "bearish"],
+        default="neutral"
+    )
+    overbought = rsi > 70
+    oversold = rsi < 30
+
+    results = {}
+    for i, symbol in enumerate(symbols):
+        results[symbol] = TAResult(
+            ema_fast=float(ema_fast[i]),
+            ema_slow=float(ema_slow[i]),
+            rsi=float(rsi[i]),
+            trend=str(trend[i]),
+            patterns=patterns[i],
+            overbought=bool(overbought[i]),
+            oversold=bool(oversold[i]),
+            atr=float(atr[i]),
+            atr_pct=float(atr_pct[i])
+        )
+    return results
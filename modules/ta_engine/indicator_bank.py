@@ -0,0 +1,250 @@
+# modules/ta_engine/indicator_bank.py
+
+"""
+Инкрементальные индикаторы: EMA, RSI Уайлдера, ATR
+Каждый индикатор обновляется за O(1) на закрытую свечу; формирующаяся свеча
+учитывается пробным шагом (peek) без изменения состояния.
+"""
+
+import math
+
+import numpy as np
+
+
+class IncrementalIndicator:
+    """
+    Базовый инкрементальный индикатор.
+
+    Состояние — dict простых значений (сериализуется в JSON). Шаг _step
+    не изменяет переданное состояние, поэтому один и тот же код служит и
+    для фиксации закрытой свечи (update), и для пробного шага (peek).
+    """
+
+    kind = None
+
+    def __init__(self, period, state=None):
+        self.period = period
+        self.state = self._initial_state() if state is None else dict(state)
+
+    def _initial_state(self):
+        raise NotImplementedError
+
+    def _step(self, state, high, low, close):
+        raise NotImplementedError
+
+    def _value(self, state):
+        raise NotImplementedError
+
+    def update(self, high, low, close):
+        """Фиксирует закрытую свечу"""
+        self.state = self._step(self.state, high, low, close)
+
+    def peek(self, high, low, close):
+        """Значение индикатора с учётом незакрытой свечи (состояние не меняется)"""
+        return self._value(self._step(self.state, high, low, close))
+
+    @property
+    def value(self):
+        """Значение по последней закрытой свече"""
+        return self._value(self.state)
+
+    def to_dict(self):
+        return {"kind": self.kind, "period": self.period, "state": dict(self.state)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return INDICATOR_TYPES[data["kind"]](data["period"], state=data["state"])
+
+
+class IncrementalEMA(IncrementalIndicator):
+    """EMA цены закрытия (как ewm(span=period, adjust=False): первое значение — первая цена)"""
+
+    kind = "ema"
+
+    def _initial_state(self):
+        return {"ema": None}
+
+    def _step(self, state, high, low, close):
+        ema = state["ema"]
+        alpha = 2 / (self.period + 1)
+        return {"ema": close if ema is None else alpha * close + (1 - alpha) * ema}
+
+    def _value(self, state):
+        return math.nan if state["ema"] is None else state["ema"]
+
+
+class WilderRSI(IncrementalIndicator):
+    """RSI Уайлдера: SMA первых period изменений, затем сглаживание 1/period"""
+
+    kind = "rsi"
+
+    def _initial_state(self):
+        return {"prev_close": None, "count": 0, "avg_gain": 0.0, "avg_loss": 0.0}
+
+    def _step(self, state, high, low, close):
+        prev_close = state["prev_close"]
+        if prev_close is None:
+            return dict(state, prev_close=close)
+        delta = close - prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        count = state["count"] + 1
+        period = self.period
+        if count <= period:
+            # Прогрев: накапливаем SMA
+            avg_gain = state["avg_gain"] + (gain - state["avg_gain"]) / count
+            avg_loss = state["avg_loss"] + (loss - state["avg_loss"]) / count
+        else:
+            avg_gain = (state["avg_gain"] * (period - 1) + gain) / period
+            avg_loss = (state["avg_loss"] * (period - 1) + loss) / period
+        return {"prev_close": close, "count": count, "avg_gain": avg_gain, "avg_loss": avg_loss}
+
+    def _value(self, state):
+        if state["count"] < self.period:
+            return math.nan
+        if state["avg_loss"] == 0:
+            # Только рост — 100, нет движения — не определён (как 0 / 0 в пакетной версии)
+            return 100.0 if state["avg_gain"] > 0 else math.nan
+        rs = state["avg_gain"] / state["avg_loss"]
+        return 100 - (100 / (1 + rs))
+
+
+class IncrementalATR(IncrementalIndicator):
+    """
+    ATR как в calculate_atr: EMA(span=period) от True Range,
+    первая свеча — high - low. Пока свечей меньше period + 1, ATR = 0.
+    """
+
+    kind = "atr"
+
+    def _initial_state(self):
+        return {"prev_close": None, "atr": None, "count": 0}
+
+    def _step(self, state, high, low, close):
+        prev_close = state["prev_close"]
+        if prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        atr = state["atr"]
+        alpha = 2 / (self.period + 1)
+        atr = true_range if atr is None else alpha * true_range + (1 - alpha) * atr
+        return {"prev_close": close, "atr": atr, "count": state["count"] + 1}
+
+    def _value(self, state):
+        if state["count"] < self.period + 1:
+            return 0.0
+        return state["atr"]
+
+
+INDICATOR_TYPES = {cls.kind: cls for cls in (IncrementalEMA, WilderRSI, IncrementalATR)}
+
+
+class IndicatorBank:
+    """
+    Набор инкрементальных индикаторов одной серии свечей.
+
+    update(df) добавляет только закрытые свечи, которых ещё нет в состоянии
+    (первый вызов — прогрев по всей истории df), последняя строка df
+    считается формирующейся и учитывается в values() пробным шагом.
+    Состояние сохраняется через to_dict() / from_dict().
+    """
+
+    def __init__(self, ema_periods=(20, 50), rsi_period=14, atr_period=14,
+                 indicators=None, closed_count=0, last_closed_ts=None):
+        """
+        Args:
+            ema_periods: периоды EMA
+            rsi_period: период RSI
+            atr_period: период ATR
+            indicators: готовые индикаторы {имя: IncrementalIndicator} вместо новых
+                (восстановление состояния; периоды тогда не используются)
+            closed_count / last_closed_ts: счётчик и время последней закрытой свечи
+                для indicators
+        """
+        if indicators is None:
+            indicators = {f"ema_{period}": IncrementalEMA(period) for period in ema_periods}
+            indicators["rsi"] = WilderRSI(rsi_period)
+            indicators["atr"] = IncrementalATR(atr_period)
+        self.indicators = indicators
+        self.closed_count = closed_count
+        self.last_closed_ts = last_closed_ts
+        self._forming = None  # (high, low, close) формирующейся свечи
+
+    def reset(self):
+        """Полный сброс состояния (индикаторы прогреваются заново)"""
+        for name, indicator in self.indicators.items():
+            indicator.state = indicator._initial_state()
+        self.closed_count = 0
+        self.last_closed_ts = None
+        self._forming = None  # (high, low, close) формирующейся свечи
+
+    def add_candle(self, high, low, close, timestamp=None):
+        """Добавляет одну закрытую свечу во все индикаторы"""
+        for indicator in self.indicators.values():
+            indicator.update(high, low, close)
+        self.closed_count += 1
+        self.last_closed_ts = timestamp
+
+    def update(self, df):
+        """
+        Добавляет закрытые свечи df и запоминает формирующуюся
+
+        Args:
+            df: OHLCV DataFrame с колонкой timestamp
+        """
+        timestamps = df['timestamp'].to_numpy()
+        closed_end = len(df) - 1
+        if closed_end <= 0:
+            return
+        if self.last_closed_ts is not None and (
+            timestamps[closed_end - 1] < self.last_closed_ts or timestamps[0] > self.last_closed_ts
+        ):
+            # Другая серия или разрыв в данных — прогреваемся заново
+            self.reset()
+
+        start = 0 if self.last_closed_ts is None else int(np.searchsorted(timestamps, self.last_closed_ts, side="right"))
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        if start < closed_end:
+            for candle_high, candle_low, candle_close, ts in zip(
+                high[start:closed_end].tolist(), low[start:closed_end].tolist(),
+                close[start:closed_end].tolist(), timestamps[start:closed_end].tolist()
+            ):
+                self.add_candle(candle_high, candle_low, candle_close, ts)
+        self._forming = (float(high[-1]), float(low[-1]), float(close[-1]))
+
+    def values(self):
+        """
+        Текущие значения индикаторов (с учётом формирующейся свечи)
+
+        Returns:
+            {"ema_<period>": ..., "rsi": ..., "atr": ..., "atr_pct": ..., "close": ...}
+        """
+        if self._forming is None:
+            result = {name: indicator.value for name, indicator in self.indicators.items()}
+            close = self.indicators["rsi"].state["prev_close"]
+        else:
+            result = {name: indicator.peek(*self._forming) for name, indicator in self.indicators.items()}
+            close = self._forming[2]
+        result["close"] = math.nan if close is None else close
+        result["atr_pct"] = result["atr"] / close * 100 if close else math.nan
+        return result
+
+    def to_dict(self):
+        """Состояние для сохранения (JSON-совместимое)"""
+        return {
+            "closed_count": self.closed_count,
+            "last_closed_ts": self.last_closed_ts,
+            "indicators": {name: indicator.to_dict() for name, indicator in self.indicators.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Восстанавливает банк из to_dict()"""
+        return cls(
+            indicators={name: IncrementalIndicator.from_dict(item) for name, item in data["indicators"].items()},
+            closed_count=data["closed_count"],
+            last_closed_ts=data["last_closed_ts"]
+        )
@@ -0,0 +1,94 @@
+# modules/ta_engine/pattern_scanner.py
+
+"""
+Векторный сканер свечных паттернов по всей истории
+Флаг паттерна на свече i означает, что паттерн завершился этой свечой.
+Работает по последней оси массивов, поэтому одинаково подходит для одной
+серии (история для бэктеста) и для матрицы символов × свечи.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Паттерн -> сила (формат detect_patterns)
+PATTERN_STRENGTH = {
+    "bullish_engulfing": "medium",
+    "bearish_engulfing": "medium",
+    "hammer": "medium",
+    "shooting_star": "medium",
+    "doji": "low",
+    "inside_bar": "low",
+    "outside_bar": "low",
+    "bullish_pin_bar": "medium",
+    "bearish_pin_bar": "medium",
+    "bullish_three_bar_reversal": "high",
+    "bearish_three_bar_reversal": "high"
+}
+PATTERN_COLUMNS = tuple(PATTERN_STRENGTH)
+
+
+def _shift(values, periods):
+    """Сдвиг вправо по последней оси, освободившиеся позиции — NaN (сравнения с ними False)"""
+    shifted = np.full(values.shape, np.nan)
+    shifted[..., periods:] = values[..., :-periods]
+    return shifted
+
+
+def scan_pattern_arrays(open_, high, low, close):
+    """
+    Флаги всех паттернов по массивам OHLC
+
+    Args:
+        open_/high/low/close: массивы одинаковой формы, время — последняя ось
+
+    Returns:
+        dict: паттерн -> bool-массив той же формы
+    """
+    open_, high, low, close = (np.asarray(a, dtype=np.float64) for a in (open_, high, low, close))
+    prev_open, prev_close = _shift(open_, 1), _shift(close, 1)
+    prev_high, prev_low = _shift(high, 1), _shift(low, 1)
+
+    body = np.abs(close - open_)
+    total_range = high - low
+    has_range = total_range > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        body_ratio = body / total_range
+    upper_wick = high - np.maximum(open_, close)
+    lower_wick = np.minimum(open_, close) - low
+    bullish = close > open_
+    bearish = close < open_
+
+    # Три свечи: экстремум на средней, третья закрывается за её пределами
+    open_2, close_2 = _shift(open_, 2), _shift(close, 2)
+    high_2, low_2 = _shift(high, 2), _shift(low, 2)
+
+    return {
+        # Тело текущей свечи перекрывает тело предыдущей противоположной
+        "bullish_engulfing": (prev_close < prev_open) & (open_ < prev_close) & (close > prev_open),
+        "bearish_engulfing": (prev_close > prev_open) & (open_ > prev_close) & (close < prev_open),
+        # Маленькое тело, длинная нижняя / верхняя тень
+        "hammer": has_range & (body_ratio < 0.3) & (lower_wick > total_range * 0.6),
+        "shooting_star": has_range & (body_ratio < 0.3) & (upper_wick > total_range * 0.6),
+        "doji": has_range & (body_ratio < 0.1),
+        "inside_bar": (high < prev_high) & (low > prev_low),
+        "outside_bar": (high > prev_high) & (low < prev_low),
+        # Тень >= 2/3 размаха и выходит за экстремум предыдущей свечи
+        "bullish_pin_bar": has_range & (lower_wick >= total_range * 2 / 3) & (body <= total_range / 3) & (low < prev_low),
+        "bearish_pin_bar": has_range & (upper_wick >= total_range * 2 / 3) & (body <= total_range / 3) & (high > prev_high),
+        "bullish_three_bar_reversal": (close_2 < open_2) & (prev_low < low_2) & (prev_low < low) & bullish & (close > prev_high),
+        "bearish_three_bar_reversal": (close_2 > open_2) & (prev_high > high_2) & (prev_high > high) & bearish & (close < prev_low)
+    }
+
+
+def scan_patterns(df):
+    """
+    Флаги паттернов для каждой свечи df (для бэктестов и скоринга)
+
+    Args:
+        df: OHLCV DataFrame
+
+    Returns:
+        DataFrame int8 (колонки PATTERN_COLUMNS) с индексом df
+    """
+    flags = scan_pattern_arrays(df['open'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy())
+    return pd.DataFrame({name: flags[name].astype(np.int8) for name in PATTERN_COLUMNS}, index=df.index)
@@ -1,54 +1,50 @@
 # modules/ta_engine/patterns.py
 
+from .pattern_scanner import scan_pattern_arrays, PATTERN_STRENGTH
+
+# Паттерны, которые отдаёт TAEngine, и свеча, на которой они читаются:
+# engulfing — по паре закрытых свечей (-3, -2), hammer / doji — по последней
+TAIL_PATTERNS = (
+    ("bullish_engulfing", -2),
+    ("bearish_engulfing", -2),
+    ("hammer", -1),
+    ("doji", -1)
+)
+
+
+def tail_patterns(open_, high, low, close):
+    """
+    Паттерны хвоста из последних трёх свечей (время — последняя ось)
+
+    Returns:
+        list: по одному списку паттернов на каждую серию (для 1D — один список)
+    """
+    flags = scan_pattern_arrays(open_[..., -3:], high[..., -3:], low[..., -3:], close[..., -3:])
+    n_series = 1 if flags["doji"].ndim == 1 else flags["doji"].shape[0]
+    patterns = [[] for _ in range(n_series)]
+    for name, position in TAIL_PATTERNS:
+        mask = flags[name][..., position].reshape(-1)
+        for i in mask.nonzero()[0].tolist():
+            patterns[i].append({"type": name, "strength": PATTERN_STRENGTH[name]})
+    return patterns
+
 
 def detect_patterns(df):
     """
     Минималистичное определение свечных паттернов
     
+    Флаги берутся из векторного сканера только по хвосту (3 свечи);
+    вся история — scan_patterns(df).
+    
     Args:
         df: DataFrame с OHLCV данными
         
     Returns:
         List обнаруженных паттернов
     """
-    patterns = []
-    
     if len(df) < 3:
-        return patterns
-    
-    # Последние 3 свечи
-    c1 = df.iloc[-3]
-    c2 = df.iloc[-2]
-    c3 = df.iloc[-1]
-    
-    # Engulfing patterns
-    # Bullish Engulfing
-    if (c1['close'] < c1['open'] and  # первая медвежья
-        c2['open'] < c1['close'] and   # открытие ниже закрытия первой
-        c2['close'] > c1['open']):     # закрытие выше открытия первой
-        patterns.append({"type": "bullish_engulfing", "strength": "medium"})
-    
-    # Bearish Engulfing
-    if (c1['close'] > c1['open'] and  # первая бычья
-        c2['open'] > c1['close'] and  # открытие выше закрытия первой
-        c2['close'] < c1['open']):    # закрытие ниже открытия первой
-        patterns.append({"type": "bearish_engulfing", "strength": "medium"})
-    
-    # Hammer / Doji (упрощенно)
-    body = abs(c3['close'] - c3['open'])
-    total_range = c3['high'] - c3['low']
-    
-    if total_range > 0:
-        body_ratio = body / total_range
-        
-        # Hammer (маленькое тело, длинная нижняя тень)
-        lower_wick = min(c3['open'], c3['close']) - c3['low']
-        if body_ratio < 0.3 and lower_wick > total_range * 0.6:
-            patterns.append({"type": "hammer", "strength": "medium"})
-        
-        # Doji (очень маленькое тело)
-        if body_ratio < 0.1:
-            patterns.append({"type": "doji", "strength": "low"})
-    
-    return patterns
-
+        return []
+    tail = df.iloc[-3:]
+    return tail_patterns(
+        tail['open'].to_numpy(), tail['high'].to_numpy(), tail['low'].to_numpy(), tail['close'].to_numpy()
+    )[0]
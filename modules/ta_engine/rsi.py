@@ -1,26 +1,42 @@
 # modules/ta_engine/rsi.py
 
+import numpy as np
 import pandas as pd
 
 
 def calculate_rsi(df, period=14):
     """
-    Расчет индикатора RSI (Relative Strength Index)
-    
+    Расчет индикатора RSI (Relative Strength Index) по Уайлдеру
+
+    Первые средние прироста/падения — SMA за period изменений цены,
+    дальше сглаживание Уайлдера: avg = (avg * (period - 1) + x) / period.
+
     Args:
         df: DataFrame с колонкой 'close'
         period: период RSI (по умолчанию 14)
-        
+
     Returns:
-        Series с RSI значениями (0-100)
+        Series с RSI значениями (0-100), NaN на прогреве
     """
-    delta = df['close'].diff()
-    
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    
-    return rsi
+    delta = df['close'].diff().to_numpy(dtype=np.float64)
+    rsi = np.full(len(delta), np.nan)
+    if len(delta) <= period:
+        return pd.Series(rsi, index=df.index)
+
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = _wilder_average(gain, period)
+    avg_loss = _wilder_average(loss, period)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        rsi[period:] = 100 - (100 / (1 + rs))
+
+    return pd.Series(rsi, index=df.index)
+
 
+def _wilder_average(values, period):
+    """Сглаживание Уайлдера для values[1:] (values[0] — изменение первой свечи, NaN)"""
+    seed = values[1:period + 1].mean()
+    smoothed = pd.Series(np.r_[seed, values[period + 1:]]).ewm(alpha=1 / period, adjust=False).mean()
+    return smoothed.to_numpy()
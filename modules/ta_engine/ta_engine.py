@@ -1,9 +1,23 @@
 # modules/ta_engine/ta_engine.py
 
+import json
+import logging
+import os
+
 from .ema import calculate_ema
 from .rsi import calculate_rsi
 from .patterns import detect_patterns
 from .atr import calculate_atr, calculate_atr_pct
+from .indicator_bank import IndicatorBank
+from .ta_result import TAResult
+from modules.utils.series_states import SeriesStates
+
+logger = logging.getLogger(__name__)
+
+EMA_FAST_PERIOD = 20
+EMA_SLOW_PERIOD = 50
+RSI_PERIOD = 14
+ATR_PERIOD = 14
 
 
 class TAEngine:
@@ -12,51 +26,166 @@ class TAEngine:
     Только самое необходимое для Smart Money анализа
     """
 
-    def __init__(self):
-        pass
+    # Максимум серий (symbol, timeframe) с банками индикаторов
+    MAX_SERIES = 8
+
+    def __init__(self, incremental=True, symbol=""):
+        """
+        Args:
+            incremental: вести EMA / RSI / ATR инкрементально между вызовами (O(1) на свечу);
+                False — пересчитывать индикаторы по всему окну на каждом вызове
+            symbol: торговая пара — пишется в файл состояния, чужое состояние не загружается
+        """
+        self.incremental = incremental
+        self.symbol = symbol
+        # Банки индикаторов по сериям (symbol, timeframe): LTF и HTF ведутся отдельно
+        self.banks = SeriesStates(self._new_bank, maxsize=self.MAX_SERIES)
+
+    @staticmethod
+    def _new_bank():
+        return IndicatorBank(
+            ema_periods=(EMA_FAST_PERIOD, EMA_SLOW_PERIOD), rsi_period=RSI_PERIOD, atr_period=ATR_PERIOD
+        )
+
+    def _series(self, df, series):
+        """(symbol, timeframe); без id серии timeframe — интервал последних свечей в ms"""
+        if series is not None:
+            return tuple(series)
+        return (self.symbol, int(df['timestamp'].iloc[-1] - df['timestamp'].iloc[-2]))
+
+    def _indicators(self, df, series=None):
+        """Последние значения EMA / RSI / ATR"""
+        if self.incremental and 'timestamp' in df.columns and len(df) >= 2:
+            bank = self.banks.get(self._series(df, series))
+            bank.update(df)
+            values = bank.values()
+            return {
+                "ema_fast": values[f"ema_{EMA_FAST_PERIOD}"],
+                "ema_slow": values[f"ema_{EMA_SLOW_PERIOD}"],
+                "rsi": values["rsi"],
+                "atr": values["atr"],
+                "atr_pct": values["atr_pct"]
+            }
 
-    def analyze(self, df):
+        return {
+            "ema_fast": calculate_ema(df, period=EMA_FAST_PERIOD).iloc[-1],
+            "ema_slow": calculate_ema(df, period=EMA_SLOW_PERIOD).iloc[-1],
+            "rsi": calculate_rsi(df, period=RSI_PERIOD).iloc[-1],
+            # ATR (волатильность)
+            "atr": calculate_atr(df, period=ATR_PERIOD).iloc[-1],
+            "atr_pct": calculate_atr_pct(df, period=ATR_PERIOD).iloc[-1]
+        }
+
+    def analyze(self, df, series=None):
         """
         Основной метод технического анализа
-        
+
         Args:
             df: DataFrame с OHLCV данными
-            
+            series: id серии свечей (symbol, timeframe); без него — (symbol движка,
+                интервал последних свечей)
+
         Returns:
-            Dict с результатами TA анализа
-        """
-        # EMA
-        ema_fast = calculate_ema(df, period=20)
-        ema_slow = calculate_ema(df, period=50)
-        
-        # RSI
-        rsi = calculate_rsi(df, period=14)
-        
-        # ATR (волатильность)
-        atr = calculate_atr(df, period=14)
-        atr_pct = calculate_atr_pct(df, period=14)
-        
+            TAResult с результатами TA анализа (неизменяемый, доступ как к dict)
+        """
+        # EMA / RSI / ATR
+        indicators = self._indicators(df, series)
+        ema_fast = indicators["ema_fast"]
+        ema_slow = indicators["ema_slow"]
+        rsi = indicators["rsi"]
+
         # Паттерны
         patterns = detect_patterns(df)
-        
+
         # Определение тренда по EMA
         current_price = df['close'].iloc[-1]
         trend = "neutral"
-        
-        if ema_fast.iloc[-1] > ema_slow.iloc[-1] and current_price > ema_fast.iloc[-1]:
+
+        if ema_fast > ema_slow and current_price > ema_fast:
             trend = "bullish"
-        elif ema_fast.iloc[-1] < ema_slow.iloc[-1] and current_price < ema_fast.iloc[-1]:
+        elif ema_fast < ema_slow and current_price < ema_fast:
             trend = "bearish"
-        
-        return {
-            "ema_fast": ema_fast.iloc[-1],
-            "ema_slow": ema_slow.iloc[-1],
-            "rsi": rsi.iloc[-1],
-            "trend": trend,
-            "patterns": patterns,
-            "overbought": rsi.iloc[-1] > 70,
-            "oversold": rsi.iloc[-1] < 30,
-            "atr": atr.iloc[-1],
-            "atr_pct": atr_pct.iloc[-1]  # В процентах от цены
+
+        return TAResult(
+            ema_fast=ema_fast,
+            ema_slow=ema_slow,
+            rsi=rsi,
+            trend=trend,
+            patterns=patterns,
+            overbought=rsi > 70,
+            oversold=rsi < 30,
+            atr=indicators["atr"],
+            atr_pct=indicators["atr_pct"]
+        )
+
+    def analyze_batch(self, frames, length=None):
+        """
+        TA по многим символам одним векторным проходом (без состояния)
+
+        Args:
+            frames: {symbol: OHLCV DataFrame}
+            length: свечей в окне (по умолчанию — медианная длина frames);
+                пустые и более короткие символы пропускаются с warning
+
+        Returns:
+            dict: symbol -> результат в формате analyze() (без пропущенных символов)
+        """
+        from .batch import analyze_batch, stack_ohlcv
+
+        symbols, matrices = stack_ohlcv(frames, length=length)
+        included = set(symbols)
+        skipped = [symbol for symbol in frames if symbol not in included]
+        if skipped:
+            logger.warning(f"Пакетный TA: пропущены символы без свечей или короче окна "
+                           f"{matrices['close'].shape[1]}: {skipped}")
+        return analyze_batch(matrices["open"], matrices["high"], matrices["low"], matrices["close"], symbols)
+
+    def save_state(self, path):
+        """
+        Сохраняет состояние банков индикаторов в JSON (вместе с symbol движка)
+
+        Returns:
+            bool: True при успехе
+        """
+        data = {
+            "symbol": self.symbol,
+            "banks": [{"series": list(series), "bank": bank.to_dict()} for series, bank in self.banks.items()]
         }
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+            return True
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить состояние индикаторов: {e}")
+            return False
 
+    def load_state(self, path):
+        """
+        Загружает состояние банков индикаторов из JSON (если файл есть)
+
+        Состояние другого symbol (или файл без symbol) не загружается:
+        индикаторы одной пары не продолжают ряд другой.
+
+        Returns:
+            bool: True если состояние загружено
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or data.get("symbol") != self.symbol:
+                saved = data.get("symbol") if isinstance(data, dict) else None
+                logger.warning(f"Состояние индикаторов в {path} сохранено для {saved!r}, "
+                               f"а не для {self.symbol!r} — не загружено")
+                return False
+            banks = SeriesStates(self._new_bank, maxsize=self.MAX_SERIES)
+            for item in data["banks"]:
+                banks[tuple(item["series"])] = IndicatorBank.from_dict(item["bank"])
+            self.banks = banks
+            return True
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Не удалось загрузить состояние индикаторов: {e}")
+            return False
@@ -0,0 +1,23 @@
+# modules/ta_engine/ta_result.py
+
+"""
+Результат TAEngine.analyze / analyze_batch
+"""
+
+from modules.utils.result_types import ResultRecord
+
+
+class TAResult(ResultRecord):
+    """TA одного окна свечей: неизменяемая запись с доступом как к dict"""
+
+    FIELDS = (
+        "ema_fast",
+        "ema_slow",
+        "rsi",
+        "trend",
+        "patterns",
+        "overbought",
+        "oversold",
+        "atr",
+        "atr_pct"  # В процентах от цены
+    )
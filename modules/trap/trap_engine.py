@@ -60,6 +60,7 @@ class TrapEngine:
         spoof_confirmed = svd_data.get("spoof_confirmed", False)
         sweeps = liquidity_data.get("sweeps", {})
         phase = svd_data.get("phase", "discovery")
+        vpin = svd_data.get("vpin", {}) or {}
         
         # === BULL TRAP DETECTION (толпа покупает, киты готовят дамп) ===
         
@@ -165,6 +166,12 @@ class TrapEngine:
             trap_type = "bear_trap"
             expected_reversal = "up"
         
+        # === ТОКСИЧНОСТЬ ПОТОКА (VPIN) ===
+        # Информированный поток усиливает уже найденную ловушку
+        if vpin.get("toxic") and trap_type:
+            trap_score += 1.0
+            trap_reasons.append(f"Токсичный поток ордеров: VPIN {vpin.get('vpin', 0):.2f} (CDF {vpin.get('vpin_cdf', 0):.0%}) — работают информированные участники")
+        
         # Определяем is_trap
         is_trap = trap_score >= self.trap_score_threshold
         
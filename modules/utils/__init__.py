@@ -17,9 +17,14 @@ from .normalize import (
 )
 from .time_decay import (
     calculate_time_decay,
+    calculate_time_decay_batch,
     apply_decay_to_levels,
     get_weighted_importance
 )
+from .result_cache import AnalysisCache, window_key
+from .result_types import ResultRecord, Lazy
+from .market_snapshot import MarketSnapshot, make_snapshot_id
+from .series_states import SeriesStates, series_key
 
 __all__ = [
     'calculate_percentage_change',
@@ -41,7 +46,16 @@ __all__ = [
     'normalize_path_cost_on_atr',
     'get_sweep_threshold',
     'calculate_time_decay',
+    'calculate_time_decay_batch',
     'apply_decay_to_levels',
-    'get_weighted_importance'
+    'get_weighted_importance',
+    'AnalysisCache',
+    'window_key',
+    'ResultRecord',
+    'Lazy',
+    'MarketSnapshot',
+    'make_snapshot_id',
+    'SeriesStates',
+    'series_key'
 ]
 
@@ -31,6 +31,13 @@ class HealthMonitor:
         
         # Счетчики по типам сигналов
         self.signal_types = {"BUY": 0, "SELL": 0, "WAIT": 0}
+        
+        # Тайминги стадий последнего прогона графа анализа
+        self.last_pipeline = None
+        self.stage_error_count = 0
+        
+        # Задержка event loop (LoopLagMonitor)
+        self.loop_lag_monitor = None
     
     def uptime_seconds(self):
         """Возвращает время работы в секундах"""
@@ -47,6 +54,20 @@ class HealthMonitor:
         """Записывает ошибку"""
         self.error_count += 1
     
+    def record_pipeline(self, summary):
+        """
+        Записывает прогон графа анализа
+        
+        Args:
+            summary: PipelineRun.summary() — snapshot_id, elapsed_ms, stages, errors, skipped, cache
+        """
+        self.last_pipeline = summary
+        self.stage_error_count += len(summary.get("errors", {}))
+    
+    def set_loop_lag_monitor(self, monitor):
+        """Подключает LoopLagMonitor для статуса"""
+        self.loop_lag_monitor = monitor
+    
     def record_api_call(self, success=True):
         """Записывает API вызов"""
         self.api_call_count += 1
@@ -91,6 +112,8 @@ class HealthMonitor:
                 "error_count": int,
                 "api_success_rate": float,
                 "ws_reconnects": int,
+                "pipeline": dict или None,
+                "loop_lag": dict или None,
                 "system": dict
             }
         """
@@ -145,6 +168,9 @@ class HealthMonitor:
             "api_errors": self.api_error_count,
             "api_success_rate": api_success_rate,
             "ws_reconnects": self.ws_reconnect_count,
+            "pipeline": self.last_pipeline,
+            "stage_errors": self.stage_error_count,
+            "loop_lag": self.loop_lag_monitor.stats() if self.loop_lag_monitor else None,
             "system": system_metrics
         }
     
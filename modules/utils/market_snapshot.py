@@ -0,0 +1,125 @@
+# modules/utils/market_snapshot.py
+
+"""
+Согласованный снимок рынка для одного цикла анализа
+OHLCV, сделки и стакан фиксируются вместе с номерами версий источников:
+версии базового и HTF OHLCV, диапазон номеров сделок буфера WS и номер
+обновления стакана. Сделки и стакан из REST номеров не имеют — вместо
+номера берётся хэш содержимого. Activity-бары (если построитель
+подключен) идут в снимок вместе с версией их хранилища.
+snapshot_id строится из этих версий,
+поэтому два снимка с одинаковым id содержат одни и те же данные — циклы
+можно воспроизводить, кэшировать и сравнивать.
+"""
+
+import hashlib
+import time
+
+from .result_types import ResultRecord
+
+
+def content_digest(data):
+    """Короткий хэш содержимого (сделки / стакан REST без номеров последовательности)"""
+    return hashlib.blake2b(repr(data).encode(), digest_size=6).hexdigest()
+
+
+def make_snapshot_id(symbol, ohlcv_version, trade_seq, book_seq, htf_versions=None, trades=None, orderbook=None,
+                     activity_version=None):
+    """
+    Идентификатор снимка по версиям источников
+
+    Args:
+        symbol: торговая пара
+        ohlcv_version: версия базового OHLCV
+        trade_seq: (первый, последний) номер сделки в снимке или None (REST)
+        book_seq: номер обновления стакана или None (REST)
+        htf_versions: {interval: версия HTF OHLCV} в порядке HTF_1, HTF_2
+        trades / orderbook: данные снимка — при seq None id берёт хэш содержимого
+        activity_version: версия хранилища activity-баров (None — бары не подключены)
+
+    Returns:
+        str: например "BTC-USDT:o12:h3.1:t3400:b918" или "BTC-USDT:o12:t#1f2e…:b#9a0c…" (REST)
+    """
+    if trade_seq:
+        trade_part = trade_seq[1]
+    else:
+        trade_part = f"#{content_digest(trades)}" if trades else "-"
+    if book_seq is not None:
+        book_part = book_seq
+    else:
+        book_part = f"#{content_digest(orderbook)}" if orderbook else "-"
+    htf_part = f":h{'.'.join(str(version) for version in htf_versions.values())}" if htf_versions else ""
+    activity_part = f":a{activity_version}" if activity_version is not None else ""
+    return f"{symbol}:o{ohlcv_version}{htf_part}:t{trade_part}:b{book_part}{activity_part}"
+
+
+class MarketSnapshot(ResultRecord):
+    """
+    Снимок рынка: неизменяемая запись с доступом как к dict
+    (market_data["ohlcv"], .get("trades") работают как раньше).
+
+    Данные не копируются: DataFrame'ы, список сделок и стакан общие для
+    всех потребителей снимка (валидатор, граф анализа, форматтеры) и не
+    должны изменяться.
+    """
+
+    FIELDS = (
+        "snapshot_id",
+        "symbol",
+        "captured_at",  # Локальное время снимка, ms
+        "ohlcv",
+        "htf",  # {interval: DataFrame} в порядке HTF_1, HTF_2
+        "trades",
+        "orderbook",
+        "activity",  # DataFrame activity-баров (tick/volume/dollar/imbalance) или None
+        "ohlcv_version",
+        "htf_versions",  # {interval: версия HTF OHLCV}
+        "trade_seq",  # (первый, последний) номер сделки буфера WS
+        "book_seq",
+        "activity_version",  # Версия CandleStore activity-баров
+        "source_ts"  # Биржевое время по источникам: {"ohlcv", "trades", "orderbook"}, ms
+    )
+
+    def __init__(self, **values):
+        values.setdefault("captured_at", int(time.time() * 1000))
+        values.setdefault("htf", {})
+        values.setdefault("htf_versions", {})
+        values.setdefault("source_ts", {})
+        if values.get("snapshot_id") is None:
+            values["snapshot_id"] = make_snapshot_id(
+                values.get("symbol", ""), values.get("ohlcv_version", 0), values.get("trade_seq"), values.get("book_seq"),
+                htf_versions=values["htf_versions"], trades=values.get("trades"), orderbook=values.get("orderbook"),
+                activity_version=values.get("activity_version")
+            )
+        super().__init__(**values)
+
+    def ages_ms(self, now=None):
+        """
+        Возраст данных каждого источника относительно now
+
+        Args:
+            now: время, ms (по умолчанию captured_at)
+
+        Returns:
+            dict: источник -> возраст в ms (None, если биржевое время неизвестно)
+        """
+        now = self.captured_at if now is None else now
+        return {source: (now - ts if ts is not None else None) for source, ts in self.source_ts.items()}
+
+    def analysis_inputs(self, data_quality=None):
+        """
+        Входы графа анализа (ANALYSIS_INPUTS) из снимка
+
+        Returns:
+            dict: ohlcv, htf1_df, htf2_df, trades, orderbook, activity_df, data_quality
+        """
+        htf = list(self.htf.values())
+        return {
+            "ohlcv": self.ohlcv,
+            "htf1_df": htf[0] if len(htf) > 0 else None,
+            "htf2_df": htf[1] if len(htf) > 1 else None,
+            "trades": self.trades,
+            "orderbook": self.orderbook,
+            "activity_df": self.activity,
+            "data_quality": data_quality
+        }
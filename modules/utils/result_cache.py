@@ -0,0 +1,126 @@
+# modules/utils/result_cache.py
+
+"""
+Мемоизация результатов анализаторов по окну свечей
+Ключ — содержимое окна (symbol, interval, первая/последняя свеча, хэш
+последней свечи), поэтому основной цикл и команды бота переиспользуют
+результаты, посчитанные на тех же данных.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+OHLCV_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+def window_key(df, symbol="", interval=""):
+    """
+    Ключ окна свечей
+
+    Закрытые свечи не меняются, поэтому окно однозначно задаётся границами и
+    длиной; последняя (формирующаяся) свеча хэшируется по значениям OHLCV.
+
+    Args:
+        df: OHLCV DataFrame
+        symbol: торговая пара
+        interval: таймфрейм
+
+    Returns:
+        tuple: (symbol, interval, first_ts, last_ts, len, hash последней свечи)
+    """
+    if df is None or df.empty:
+        return (symbol, interval, None, None, 0, "")
+    columns = [name for name in OHLCV_COLUMNS if name in df.columns]
+    last_row = np.array([df[name].iloc[-1] for name in columns], dtype=np.float64)
+    if 'timestamp' in df.columns:
+        first_ts, last_ts = int(df['timestamp'].iloc[0]), int(df['timestamp'].iloc[-1])
+    else:
+        first_ts, last_ts = df.index[0], df.index[-1]
+    candle_hash = hashlib.blake2b(last_row.tobytes(), digest_size=8).hexdigest()
+    return (symbol, interval, first_ts, last_ts, len(df), candle_hash)
+
+
+class AnalysisCache:
+    """
+    LRU-кэш результатов анализаторов.
+
+    Результаты отдаются по ссылке (без копирования) — вызывающий код не
+    должен их изменять. Метрики hit/miss ведутся общие и по имени анализатора.
+    Кэш можно использовать из нескольких потоков (стадии StageExecutor):
+    под lock только словарь, compute() выполняется без него.
+    """
+
+    def __init__(self, maxsize=64):
+        """
+        Args:
+            maxsize: максимальное количество хранимых результатов
+        """
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._by_name = {}  # name -> [hits, misses]
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, name, df, compute, symbol="", interval="", params=()):
+        """
+        Результат из кэша или compute() с сохранением
+
+        Args:
+            name: имя анализатора ("structure", "liquidity", ...)
+            df: OHLCV DataFrame, на котором считается результат
+            compute: функция без аргументов, считающая результат
+            symbol/interval: серия свечей
+            params: доп. параметры, влияющие на результат (hashable)
+
+        Returns:
+            результат compute() для этого окна
+        """
+        key = (name, params) + window_key(df, symbol, interval)
+        with self._lock:
+            counters = self._by_name.setdefault(name, [0, 0])
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                counters[0] += 1
+                return self._entries[key]
+            self.misses += 1
+            counters[1] += 1
+
+        result = compute()
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Очищает кэш (метрики сохраняются)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Метрики кэша
+
+        Returns:
+            {"hits", "misses", "evictions", "size", "hit_rate", "by_name": {name: {"hits", "misses"}}}
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "hit_rate": self.hits / total if total else 0.0,
+            "by_name": {name: {"hits": h, "misses": m} for name, (h, m) in self._by_name.items()}
+        }
@@ -0,0 +1,139 @@
+# modules/utils/result_types.py
+
+"""
+Компактные типизированные результаты движков
+ResultRecord — неизменяемая запись на __slots__ с доступом как к dict
+(get, [], in, keys/items, ==), чтобы потребители с цепочками .get(...)
+работали без изменений. Поля объявляются в FIELDS; поля из LAZY хранят
+Lazy и считаются при первом обращении. При сериализации (pickle между
+процессами) передаётся кортеж значений без имён полей.
+"""
+
+from abc import ABCMeta
+from collections.abc import Mapping
+from operator import attrgetter
+
+
+class Lazy:
+    """Отложенное значение поля: func() без аргументов, по неизменяемому снимку данных"""
+
+    __slots__ = ("func",)
+
+    def __init__(self, func):
+        self.func = func
+
+
+def _lazy_property(slot):
+    def getter(self):
+        value = object.__getattribute__(self, slot)
+        if type(value) is Lazy:
+            value = value.func()
+            object.__setattr__(self, slot, value)
+        return value
+    return property(getter)
+
+
+def _rebuild(cls, values):
+    record = cls.__new__(cls)
+    for set_slot, value in zip(cls._SETTERS, values):
+        set_slot(record, value)
+    return record
+
+
+class _RecordMeta(ABCMeta):
+    """Собирает __slots__ из FIELDS; ленивое поле — свойство над слотом '_<имя>'"""
+
+    def __new__(mcs, name, bases, namespace):
+        if "FIELDS" not in namespace:
+            # Подкласс без своих полей наследует раскладку родителя
+            namespace.setdefault("__slots__", ())
+            return super().__new__(mcs, name, bases, namespace)
+        fields = tuple(namespace["FIELDS"])
+        lazy = frozenset(namespace.get("LAZY", ()))
+        unknown = lazy - set(fields)
+        if unknown:
+            raise ValueError(f"{name}: ленивые поля {sorted(unknown)} не объявлены в FIELDS")
+        slots = tuple(f"_{field}" if field in lazy else field for field in fields)
+        namespace["__slots__"] = slots
+        namespace["_FIELD_SET"] = frozenset(fields)
+        for field in lazy:
+            namespace[field] = _lazy_property(f"_{field}")
+        cls = super().__new__(mcs, name, bases, namespace)
+        # Запись слотов напрямую через дескрипторы — быстрее object.__setattr__
+        cls._SETTERS = tuple(cls.__dict__[slot].__set__ for slot in slots)
+        getter = attrgetter(*fields) if fields else (lambda record: ())
+        cls._VALUES = getter if len(fields) != 1 else (lambda record: (getter(record),))
+        return cls
+
+
+class ResultRecord(Mapping, metaclass=_RecordMeta):
+    """
+    Базовый класс результата движка.
+
+    Запись неизменяема (как frozen dataclass): менять поля нельзя, для
+    изменённой копии — replace(). Результаты отдаются по ссылке из кэша и
+    между стадиями графа, поэтому неизменяемость здесь — гарантия, а не
+    соглашение. Не переданные в конструктор поля равны None.
+    """
+
+    FIELDS = ()
+    LAZY = ()
+
+    def __init__(self, **values):
+        unknown = values.keys() - self._FIELD_SET
+        if unknown:
+            raise TypeError(f"{type(self).__name__}: неизвестные поля {sorted(unknown)}")
+        for field, set_slot in zip(self.FIELDS, self._SETTERS):
+            set_slot(self, values.get(field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} неизменяем, используйте replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} неизменяем")
+
+    # Доступ как к dict
+    def __getitem__(self, key):
+        if key not in self._FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in self._FIELD_SET:
+            return default
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self._FIELD_SET
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.FIELDS)
+        return f"{type(self).__name__}({values})"
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: поле -> значение (ленивые поля вычисляются, вложенные объекты не копируются)
+        """
+        return dict(zip(self.FIELDS, self._VALUES(self)))
+
+    def replace(self, **changes):
+        """
+        Копия с изменёнными полями
+
+        Returns:
+            запись того же типа
+        """
+        values = self.to_dict()
+        values.update(changes)
+        return type(self)(**values)
+
+    def __reduce__(self):
+        # Кортеж значений по порядку FIELDS: имена полей не пишутся в каждый pickle
+        return _rebuild, (type(self), self._VALUES(self))
@@ -0,0 +1,92 @@
+# modules/utils/series_states.py
+
+"""
+Состояния инкрементальных движков по сериям свечей
+Серия задаётся вызывающим кодом: (symbol, timeframe). Без явного id ключом
+служит интервал между последними свечами — на нерегулярных барах такие
+ключи не повторяются, поэтому число серий ограничено, давно не
+обновлявшиеся вытесняются (LRU).
+"""
+
+import threading
+from collections import OrderedDict
+
+
+def series_key(df, series=None):
+    """
+    Ключ серии для df
+
+    Args:
+        df: OHLCV DataFrame
+        series: id серии от вызывающего кода, например (symbol, timeframe)
+
+    Returns:
+        hashable или None (нет id и меньше двух свечей с timestamp)
+    """
+    if series is not None:
+        return series
+    if 'timestamp' not in df.columns or len(df) < 2:
+        return None
+    return int(df['timestamp'].iloc[-1] - df['timestamp'].iloc[-2])
+
+
+class SeriesStates:
+    """
+    Ограниченный LRU-словарь «серия → состояние».
+
+    Состояние создаётся factory() при первом обращении к серии; при
+    превышении maxsize вытесняется серия, к которой дольше всего не
+    обращались (её состояние будет построено заново по окну). Серии могут
+    запрашиваться из параллельных стадий графа — словарь под lock.
+    """
+
+    def __init__(self, factory, maxsize=8):
+        """
+        Args:
+            factory: функция без аргументов, создающая состояние серии
+            maxsize: максимум хранимых серий
+        """
+        self.factory = factory
+        self.maxsize = maxsize
+        self._states = OrderedDict()
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Состояние серии key (создаётся при первом обращении)"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self.factory()
+                self._insert(key, state)
+            else:
+                self._states.move_to_end(key)
+            return state
+
+    def __setitem__(self, key, state):
+        """Готовое состояние серии (например, восстановленное из файла)"""
+        with self._lock:
+            self._insert(key, state)
+
+    def _insert(self, key, state):
+        self._states[key] = state
+        self._states.move_to_end(key)
+        while len(self._states) > self.maxsize:
+            self._states.popitem(last=False)
+            self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self._states
+
+    def __len__(self):
+        return len(self._states)
+
+    def __iter__(self):
+        return iter(self._states)
+
+    def items(self):
+        return self._states.items()
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
@@ -4,8 +4,11 @@
 Time-decay функции для снижения веса старых уровней
 """
 
+import math
 import time
 
+import numpy as np
+
 
 def calculate_time_decay(timestamp, current_timestamp=None, half_life_seconds=86400):
     """
@@ -34,12 +37,35 @@ def calculate_time_decay(timestamp, current_timestamp=None, half_life_seconds=86
         return 1.0
     
     # Экспоненциальный decay: weight = 0.5^(age / half_life)
-    import math
     decay = math.pow(0.5, age_seconds / half_life_seconds)
     
     return max(0.0, min(1.0, decay))
 
 
+def calculate_time_decay_batch(timestamps, current_timestamp=None, half_life_seconds=86400):
+    """
+    Векторная версия calculate_time_decay для массива timestamp'ов
+    
+    Args:
+        timestamps: массив timestamp'ов уровней (ms)
+        current_timestamp: текущий timestamp (ms), если None - берём time.time()
+        half_life_seconds: период полураспада в секундах
+        
+    Returns:
+        np.ndarray: коэффициенты от 0 до 1 (та же семантика, что у calculate_time_decay)
+    """
+    if current_timestamp is None:
+        current_timestamp = int(time.time() * 1000)
+    
+    ts = np.asarray(timestamps, dtype=np.float64)
+    age_seconds = (current_timestamp - ts) / 1000
+    decay = np.clip(np.power(0.5, np.maximum(age_seconds, 0) / half_life_seconds), 0.0, 1.0)
+    # Уровень "из будущего" - полный вес, без timestamp - средний
+    decay = np.where(age_seconds < 0, 1.0, decay)
+    decay = np.where(np.isnan(ts) | (ts <= 0), 0.5, decay)
+    return decay
+
+
 def apply_decay_to_levels(levels, current_timestamp=None, half_life_seconds=86400):
     """
     Применяет time-decay к списку уровней
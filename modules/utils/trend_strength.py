@@ -9,7 +9,197 @@ import numpy as np
 import pandas as pd
 
 
-def calculate_trend_strength(df, lookback=20, multi_period=False):
+MULTI_PERIODS = (20, 50, 100)
+RECENT_VOLUME_CANDLES = 5
+
+
+class TrendStrengthEngine:
+    """
+    Сила тренда на нескольких периодах по общим префиксным суммам.
+
+    Префиксные суммы числа растущих/падающих свечей и объёма считаются один
+    раз за O(n); после этого метрики любого периода для любой конечной
+    свечи — O(1), а все периоды по всей истории — одним векторным проходом.
+    """
+
+    def __init__(self, df):
+        """
+        Args:
+            df: OHLCV DataFrame
+        """
+        self.df = df
+        self.close = df["close"].to_numpy(dtype=np.float64)
+        self.high = df["high"].to_numpy(dtype=np.float64)
+        self.low = df["low"].to_numpy(dtype=np.float64)
+        volume = df["volume"].to_numpy(dtype=np.float64)
+        n = len(self.close)
+
+        # up_prefix[k] — число растущих свечей среди изменений 1..k (изменение k = close[k] - close[k-1])
+        diffs = np.diff(self.close)
+        self._up_prefix = np.concatenate([[0], np.cumsum(diffs > 0)])
+        self._down_prefix = np.concatenate([[0], np.cumsum(diffs < 0)])
+        # Суммы и количество непустых объёмов (mean без NaN, как в pandas)
+        valid = ~np.isnan(volume)
+        self._volume_prefix = np.concatenate([[0.0], np.cumsum(np.where(valid, volume, 0.0))])
+        self._volume_count = np.concatenate([[0], np.cumsum(valid)])
+        self.n = n
+
+    def _window_mean_volume(self, starts, ends):
+        """Средний объём свечей [starts, ends] включительно"""
+        count = self._volume_count[ends + 1] - self._volume_count[starts]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (self._volume_prefix[ends + 1] - self._volume_prefix[starts]) / count
+
+    def metrics(self, lookback, ends):
+        """
+        Метрики периода lookback для свечей ends (векторно)
+
+        Args:
+            lookback: длина окна
+            ends: индексы конечных свечей (>= lookback - 1)
+
+        Returns:
+            dict массивов: direction, strength, momentum, consistency, volume_confirmation
+        """
+        ends = np.asarray(ends, dtype=np.int64)
+        starts = ends - lookback + 1
+
+        # 1. Momentum (скорость изменения цены)
+        first_close = self.close[starts]
+        last_close = self.close[ends]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price_change_pct = ((last_close - first_close) / first_close) * 100
+
+        # 2. Trend direction
+        is_up = price_change_pct > 1.0
+        is_down = price_change_pct < -1.0
+        direction = np.select([is_up, is_down], ["up", "down"], default="neutral")
+
+        # 3. Consistency — доля свечей в направлении тренда
+        up_candles = self._up_prefix[ends] - self._up_prefix[starts]
+        down_candles = self._down_prefix[ends] - self._down_prefix[starts]
+        trend_candles = np.select([is_up, is_down], [up_candles, down_candles], default=0)
+        consistency = trend_candles / (lookback - 1) if lookback > 1 else np.zeros(len(ends))
+
+        # 4. Volume confirmation — объём последних свечей выше среднего на 10%
+        avg_volume = self._window_mean_volume(starts, ends)
+        recent = min(RECENT_VOLUME_CANDLES, lookback)
+        recent_volume = self._window_mean_volume(ends - recent + 1, ends)
+        volume_confirmation = recent_volume > avg_volume * 1.1
+
+        # 5. Strength — комбинация momentum, consistency и volume
+        momentum_score = np.minimum(np.abs(price_change_pct) / 5.0, 1.0)  # 5% = max strength
+        strength = (
+            momentum_score * 0.5 +  # 50% - momentum
+            consistency * 0.3 +     # 30% - consistency
+            np.where(volume_confirmation, 0.2, 0.0)  # 20% - volume
+        )
+
+        return {
+            "direction": direction,
+            "strength": np.minimum(strength, 1.0),
+            "momentum": price_change_pct,
+            "consistency": consistency,
+            "volume_confirmation": volume_confirmation
+        }
+
+    def period(self, lookback, end=None):
+        """Метрики одного периода для свечи end (по умолчанию последней) в формате dict"""
+        end = self.n - 1 if end is None else end
+        values = self.metrics(lookback, [end])
+        return {key: values[key][0].item() for key in values}
+
+    def analyze(self, lookback=20, multi_period=False):
+        """Результат в формате calculate_trend_strength по последней свече"""
+        if self.n < lookback:
+            return _empty_trend_strength()
+        result = self.period(lookback)
+        result["multi_period"] = {}
+        if multi_period:
+            result["multi_period"] = {
+                f"{period}candles": self.period(period)
+                for period in MULTI_PERIODS if self.n >= period
+            }
+        return result
+
+    def history(self, lookbacks=MULTI_PERIODS):
+        """
+        Метрики всех периодов для каждой свечи (для бэктестов)
+
+        Returns:
+            DataFrame с колонками <метрика>_<lookback>; до прогрева — NaN / "neutral" / False
+        """
+        columns = {}
+        for lookback in lookbacks:
+            ends = np.arange(lookback - 1, self.n)
+            values = self.metrics(lookback, ends) if len(ends) else None
+            pad = min(lookback - 1, self.n)
+            for key, default, dtype in (
+                ("direction", "neutral", object), ("strength", np.nan, np.float64),
+                ("momentum", np.nan, np.float64), ("consistency", np.nan, np.float64),
+                ("volume_confirmation", False, bool)
+            ):
+                column = np.full(self.n, default, dtype=dtype)
+                if values is not None:
+                    column[pad:] = values[key]
+                columns[f"{key}_{lookback}"] = column
+        return pd.DataFrame(columns, index=self.df.index)
+
+    def pullback_vs_reversal(self, trend_direction, lookback=50):
+        """Результат в формате analyze_pullback_vs_reversal по последней свече"""
+        if self.n < lookback or trend_direction not in ("up", "down"):
+            return _empty_pullback()
+        current_price = self.close[-1].item()
+
+        # Находим экстремумы основного тренда
+        if trend_direction == "up":
+            trend_high = np.nanmax(self.high[-lookback:]).item()
+            pullback_depth_pct = ((trend_high - current_price) / trend_high) * 100
+        else:
+            trend_low = np.nanmin(self.low[-lookback:]).item()
+            pullback_depth_pct = ((current_price - trend_low) / trend_low) * 100
+
+        # Pullback если откат < 20% от движения
+        is_pullback = 0 < pullback_depth_pct < 20
+        is_reversal = pullback_depth_pct > 30
+
+        # Если pullback быстрый и неглубокий → high confidence
+        if is_pullback:
+            confidence = 1.0 - (pullback_depth_pct / 20.0)  # Меньше откат = выше уверенность
+        elif is_reversal:
+            confidence = min(pullback_depth_pct / 30.0, 1.0)
+        else:
+            confidence = 0.5  # Neutral
+
+        return {
+            "is_pullback": is_pullback,
+            "is_reversal": is_reversal,
+            "pullback_depth_pct": pullback_depth_pct,
+            "confidence": confidence
+        }
+
+
+def _empty_trend_strength():
+    return {
+        "direction": "neutral",
+        "strength": 0.0,
+        "momentum": 0.0,
+        "consistency": 0.0,
+        "volume_confirmation": False,
+        "multi_period": {}
+    }
+
+
+def _empty_pullback():
+    return {
+        "is_pullback": False,
+        "is_reversal": False,
+        "pullback_depth_pct": 0.0,
+        "confidence": 0.0
+    }
+
+
+def calculate_trend_strength(df, lookback=20, multi_period=False, engine=None):
     """
     Рассчитывает силу текущего тренда
     
@@ -17,6 +207,7 @@ def calculate_trend_strength(df, lookback=20, multi_period=False):
         df: OHLCV DataFrame
         lookback: период для анализа (default: 20)
         multi_period: если True, анализирует несколько периодов (20, 50, 100)
+        engine: готовый TrendStrengthEngine для df (переиспользование префиксных сумм)
     
     Returns:
         dict: {
@@ -29,135 +220,22 @@ def calculate_trend_strength(df, lookback=20, multi_period=False):
         }
     """
     if df is None or len(df) < lookback:
-        return {
-            "direction": "neutral",
-            "strength": 0.0,
-            "momentum": 0.0,
-            "consistency": 0.0,
-            "volume_confirmation": False,
-            "multi_period": {}
-        }
-    
-    recent = df.iloc[-lookback:]
-    
-    # 1. Momentum (скорость изменения цены)
-    first_close = recent["close"].iloc[0]
-    last_close = recent["close"].iloc[-1]
-    price_change_pct = ((last_close - first_close) / first_close) * 100
-    
-    # 2. Trend direction
-    if price_change_pct > 1.0:
-        direction = "up"
-    elif price_change_pct < -1.0:
-        direction = "down"
-    else:
-        direction = "neutral"
-    
-    # 3. Consistency (насколько последовательно движется цена)
-    # Считаем сколько свечей движутся в направлении тренда
-    closes = recent["close"].values
-    price_diffs = np.diff(closes)
-    
-    if direction == "up":
-        trend_candles = np.sum(price_diffs > 0)
-    elif direction == "down":
-        trend_candles = np.sum(price_diffs < 0)
-    else:
-        trend_candles = 0
-    
-    consistency = trend_candles / len(price_diffs) if len(price_diffs) > 0 else 0.0
-    
-    # 4. Volume confirmation
-    # Проверяем растёт ли объём при движении в сторону тренда
-    avg_volume = recent["volume"].mean()
-    recent_volume = recent["volume"].iloc[-5:].mean()  # Последние 5 свечей
-    
-    volume_confirmation = recent_volume > avg_volume * 1.1  # +10% объём
-    
-    # 5. Strength (сила тренда)
-    # Комбинация momentum, consistency и volume
-    momentum_score = min(abs(price_change_pct) / 5.0, 1.0)  # 5% = max strength
-    
-    strength = (
-        momentum_score * 0.5 +  # 50% - momentum
-        consistency * 0.3 +     # 30% - consistency
-        (0.2 if volume_confirmation else 0.0)  # 20% - volume
-    )
-    
-    result = {
-        "direction": direction,
-        "strength": min(strength, 1.0),
-        "momentum": price_change_pct,
-        "consistency": consistency,
-        "volume_confirmation": volume_confirmation,
-        "multi_period": {}
-    }
-    
-    # Если multi_period=True, добавляем анализ на разных периодах
-    if multi_period:
-        periods = {}
-        for period in [20, 50, 100]:
-            if len(df) >= period:
-                period_result = _calculate_single_period(df, period)
-                periods[f"{period}candles"] = period_result
-        result["multi_period"] = periods
-    
-    return result
+        return _empty_trend_strength()
+    engine = engine or TrendStrengthEngine(df)
+    return engine.analyze(lookback=lookback, multi_period=multi_period)
 
 
-def _calculate_single_period(df, lookback):
-    """Внутренняя функция для анализа на одном периоде"""
-    recent = df.iloc[-lookback:]
-    
-    # 1. Momentum (скорость изменения цены)
-    first_close = recent["close"].iloc[0]
-    last_close = recent["close"].iloc[-1]
-    price_change_pct = ((last_close - first_close) / first_close) * 100
-    
-    # 2. Trend direction
-    if price_change_pct > 1.0:
-        direction = "up"
-    elif price_change_pct < -1.0:
-        direction = "down"
-    else:
-        direction = "neutral"
-    
-    # 3. Consistency (насколько последовательно движется цена)
-    closes = recent["close"].values
-    price_diffs = np.diff(closes)
-    
-    if direction == "up":
-        trend_candles = np.sum(price_diffs > 0)
-    elif direction == "down":
-        trend_candles = np.sum(price_diffs < 0)
-    else:
-        trend_candles = 0
-    
-    consistency = trend_candles / len(price_diffs) if len(price_diffs) > 0 else 0.0
-    
-    # 4. Volume confirmation
-    avg_volume = recent["volume"].mean()
-    recent_volume = recent["volume"].iloc[-5:].mean()  # Последние 5 свечей
-    volume_confirmation = recent_volume > avg_volume * 1.1  # +10% объём
-    
-    # 5. Strength (сила тренда)
-    momentum_score = min(abs(price_change_pct) / 5.0, 1.0)  # 5% = max strength
-    strength = (
-        momentum_score * 0.5 +  # 50% - momentum
-        consistency * 0.3 +     # 30% - consistency
-        (0.2 if volume_confirmation else 0.0)  # 20% - volume
-    )
-    
-    return {
-        "direction": direction,
-        "strength": min(strength, 1.0),
-        "momentum": price_change_pct,
-        "consistency": consistency,
-        "volume_confirmation": volume_confirmation
-    }
+def trend_strength_history(df, lookbacks=MULTI_PERIODS):
+    """
+    Сила тренда для каждой свечи истории на всех периодах за O(n * len(lookbacks))
+
+    Returns:
+        DataFrame с колонками <метрика>_<lookback>
+    """
+    return TrendStrengthEngine(df).history(lookbacks)
 
 
-def analyze_pullback_vs_reversal(df, trend_direction, lookback=50):
+def analyze_pullback_vs_reversal(df, trend_direction, lookback=50, engine=None):
     """
     Определяет это pullback (коррекция) или reversal (разворот)
     
@@ -165,6 +243,7 @@ def analyze_pullback_vs_reversal(df, trend_direction, lookback=50):
         df: OHLCV DataFrame
         trend_direction: направление основного тренда ("up"/"down")
         lookback: период для анализа основного тренда
+        engine: готовый TrendStrengthEngine для df
     
     Returns:
         dict: {
@@ -175,58 +254,9 @@ def analyze_pullback_vs_reversal(df, trend_direction, lookback=50):
         }
     """
     if df is None or len(df) < lookback:
-        return {
-            "is_pullback": False,
-            "is_reversal": False,
-            "pullback_depth_pct": 0.0,
-            "confidence": 0.0
-        }
-    
-    recent = df.iloc[-lookback:]
-    last_20 = df.iloc[-20:]
-    
-    # Находим экстремумы основного тренда
-    if trend_direction == "up":
-        trend_high = recent["high"].max()
-        current_price = last_20["close"].iloc[-1]
-        pullback_depth_pct = ((trend_high - current_price) / trend_high) * 100
-        
-        # Pullback если откат < 20% от движения
-        is_pullback = 0 < pullback_depth_pct < 20
-        is_reversal = pullback_depth_pct > 30
-        
-    elif trend_direction == "down":
-        trend_low = recent["low"].min()
-        current_price = last_20["close"].iloc[-1]
-        pullback_depth_pct = ((current_price - trend_low) / trend_low) * 100
-        
-        # Pullback если откат < 20% от движения
-        is_pullback = 0 < pullback_depth_pct < 20
-        is_reversal = pullback_depth_pct > 30
-        
-    else:
-        return {
-            "is_pullback": False,
-            "is_reversal": False,
-            "pullback_depth_pct": 0.0,
-            "confidence": 0.0
-        }
-    
-    # Confidence based on consistency
-    # Если pullback быстрый и неглубокий → high confidence
-    if is_pullback:
-        confidence = 1.0 - (pullback_depth_pct / 20.0)  # Меньше откат = выше уверенность
-    elif is_reversal:
-        confidence = min(pullback_depth_pct / 30.0, 1.0)
-    else:
-        confidence = 0.5  # Neutral
-    
-    return {
-        "is_pullback": is_pullback,
-        "is_reversal": is_reversal,
-        "pullback_depth_pct": pullback_depth_pct,
-        "confidence": confidence
-    }
+        return _empty_pullback()
+    engine = engine or TrendStrengthEngine(df)
+    return engine.pullback_vs_reversal(trend_direction, lookback=lookback)
 
 
 def count_liquidity_targets(liquidity_data, current_price):
@@ -0,0 +1,170 @@
+# tests/helpers.py
+
+"""
+Общие генераторы данных и эталонные реализации для тестов и бенчмарков
+"""
+
+import numpy as np
+import pandas as pd
+from modules.market_structure.historical_phase_analyzer import HistoricalPhaseAnalyzer
+from modules.utils.time_decay import calculate_time_decay
+
+
+NOW_TS = 1_700_000_000_000
+
+
+def make_ohlcv(n, seed=7, start_ts=NOW_TS - 15 * 60 * 1000 * 2000):
+    """Случайные OHLCV свечи с выраженными тенями"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n))
+    open_ = close + rng.normal(0, 0.3, n)
+    body_high = np.maximum(open_, close)
+    body_low = np.minimum(open_, close)
+    high = body_high + rng.exponential(0.4, n)
+    low = body_low - rng.exponential(0.4, n)
+    return pd.DataFrame({
+        "timestamp": start_ts + np.arange(n, dtype=np.int64) * 15 * 60 * 1000,
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": rng.uniform(100, 1000, n)
+    })
+
+
+def reference_detect_stop_clusters(df, apply_time_decay=True, current_ts=None):
+    """Исходная построчная реализация (эталон для parity)"""
+    clusters = []
+    for i in range(2, len(df)):
+        high = df['high'].iloc[i]
+        low = df['low'].iloc[i]
+        candle_ts = df['timestamp'].iloc[i] if 'timestamp' in df.columns else current_ts
+        upper_wick = df['high'].iloc[i] - max(df['open'].iloc[i], df['close'].iloc[i])
+        if upper_wick > (df['high'].iloc[i] - df['low'].iloc[i]) * 0.6:
+            decay_weight = calculate_time_decay(candle_ts, current_ts) if apply_time_decay else 1.0
+            clusters.append({"type": "buy_stops", "price": high, "source": "wick",
+                             "timestamp": candle_ts, "decay_weight": decay_weight})
+        lower_wick = min(df['open'].iloc[i], df['close'].iloc[i]) - df['low'].iloc[i]
+        if lower_wick > (df['high'].iloc[i] - df['low'].iloc[i]) * 0.6:
+            decay_weight = calculate_time_decay(candle_ts, current_ts) if apply_time_decay else 1.0
+            clusters.append({"type": "sell_stops", "price": low, "source": "wick",
+                             "timestamp": candle_ts, "decay_weight": decay_weight})
+    return clusters
+
+
+def make_phase_ohlcv(n, seed=1):
+    """Свечи с чередованием боковиков на всплесках объёма и импульсов"""
+    df = make_ohlcv(n, seed=seed)
+    rng = np.random.default_rng(seed)
+    df["volume"] = df["volume"] * np.where(rng.random(n) < 0.3, 3.0, 1.0)
+    df["close"] = 100 + np.cumsum(rng.normal(0, 0.8, n))
+    df["open"] = df["close"].shift(1).fillna(df["close"].iloc[0])
+    df["high"] = np.maximum(df["open"], df["close"]) + rng.exponential(0.3, n)
+    df["low"] = np.minimum(df["open"], df["close"]) - rng.exponential(0.3, n)
+    return df
+
+
+class ReferenceHistoricalPhaseAnalyzer(HistoricalPhaseAnalyzer):
+    """Исходная построчная реализация фаз, истории и зон (эталон для parity)"""
+
+    def _detect_phases_from_volume_price(self, df):
+        phases = []
+        for i in range(10, len(df)):
+            window = df.iloc[i-10:i+1]
+            current = df.iloc[i]
+            avg_volume = window['volume'].mean()
+            current_volume = current['volume']
+            price_change = (current['close'] - window['close'].iloc[0]) / window['close'].iloc[0] * 100
+            price_range = (window['high'].max() - window['low'].min()) / window['close'].iloc[0] * 100
+            if current_volume > avg_volume * 1.2:
+                if abs(price_change) < 2.0 and price_range < 3.0:
+                    phase = "accumulation" if price_change > 0 else "distribution"
+                elif price_change > 3.0:
+                    phase = "execution_up"
+                elif price_change < -3.0:
+                    phase = "execution_down"
+                else:
+                    phase = "neutral"
+            else:
+                phase = "neutral"
+            phases.append({
+                "index": i,
+                "phase": phase,
+                "timestamp": current.name if hasattr(current.name, '__iter__') else i,
+                "price": current['close'],
+                "volume": current_volume,
+                "price_change_pct": price_change
+            })
+        return phases
+
+    def _build_phase_history(self, df, phases):
+        if not phases:
+            return []
+        history = []
+        current_phase = None
+        phase_start_idx = None
+        phase_start_price = None
+        for phase_data in phases:
+            phase = phase_data["phase"]
+            if phase != current_phase:
+                if current_phase and phase_start_idx is not None:
+                    phase_window = df.iloc[phase_start_idx:phase_data["index"]]
+                    duration_candles = phase_data["index"] - phase_start_idx
+                    timeframe_hours = self._estimate_timeframe_hours(df, phase_start_idx, phase_data["index"])
+                    history.append({
+                        "phase": current_phase,
+                        "start_index": phase_start_idx,
+                        "end_index": phase_data["index"],
+                        "start_price": phase_start_price,
+                        "end_price": phase_data["price"],
+                        "duration_candles": duration_candles,
+                        "duration_hours": duration_candles * timeframe_hours,
+                        "price_range": (phase_window['low'].min(), phase_window['high'].max()),
+                        "volume_sum": phase_window['volume'].sum()
+                    })
+                current_phase = phase
+                phase_start_idx = phase_data["index"]
+                phase_start_price = phase_data["price"]
+        if current_phase and phase_start_idx is not None:
+            last_idx = len(df) - 1
+            phase_window = df.iloc[phase_start_idx:]
+            duration_candles = last_idx - phase_start_idx + 1
+            timeframe_hours = self._estimate_timeframe_hours(df, phase_start_idx, last_idx)
+            history.append({
+                "phase": current_phase,
+                "start_index": phase_start_idx,
+                "end_index": last_idx,
+                "start_price": phase_start_price,
+                "end_price": df['close'].iloc[-1],
+                "duration_candles": duration_candles,
+                "duration_hours": duration_candles * timeframe_hours,
+                "price_range": (phase_window['low'].min(), phase_window['high'].max()),
+                "volume_sum": phase_window['volume'].sum(),
+                "is_active": True
+            })
+        return history
+
+    def _identify_zones(self, df, phases):
+        accumulation_zones = []
+        distribution_zones = []
+        current_zone = None
+        zone_start_idx = None
+
+        def close_zone(end_idx):
+            zone_window = df.iloc[zone_start_idx:end_idx]
+            zone = (zone_window['low'].min(), zone_window['high'].max(), zone_window['volume'].sum())
+            (accumulation_zones if current_zone == "accumulation" else distribution_zones).append(zone)
+
+        for phase_data in phases:
+            phase = phase_data["phase"]
+            if phase in ("accumulation", "distribution"):
+                if current_zone != phase:
+                    if current_zone and zone_start_idx is not None:
+                        close_zone(phase_data["index"])
+                    current_zone = phase
+                    zone_start_idx = phase_data["index"]
+            elif current_zone and zone_start_idx is not None:
+                close_zone(phase_data["index"])
+                current_zone = None
+                zone_start_idx = None
+        return accumulation_zones, distribution_zones
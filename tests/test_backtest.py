@@ -0,0 +1,290 @@
+# tests/test_backtest.py
+
+"""
+Unit тесты для walk-forward бэктеста
+"""
+
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from modules.backtest import (
+    WalkForwardBacktester, ExecutionSimulator, build_order, parse_levels, summarize_trades, max_drawdown_pct,
+    ParameterSweep, grid_candidates, random_candidates, params_id
+)
+from modules.backtest.sweep import compact_features, params_config
+from modules.svd.svd_engine import SVDEngine
+from modules.decision.decision_engine import DecisionEngine
+from tests.helpers import make_ohlcv
+
+
+def make_signal(direction="BUY", entry_zone="$95.00 - $100.00", targets=("$110.00",), invalidation="$90.00"):
+    return {
+        "signal": direction,
+        "confidence": 6.0,
+        "levels": {"entry_zone": entry_zone, "targets": list(targets), "invalidation": invalidation}
+    }
+
+
+def submit(simulator, signal, index=0):
+    order, reason = build_order(signal)
+    assert reason is None
+    simulator.submit(order, index, index)
+    return order
+
+
+class TestLevels:
+    def test_parse_levels(self):
+        """Тест: строки уровней DecisionEngine разбираются в числа"""
+        levels = parse_levels({
+            "entry_zone": "$1,950.50 - $2,000.25",
+            "targets": ["$2,100.00", "$2,250.00 (ATH)"],
+            "invalidation": "$1,900.10"
+        })
+        assert levels == {"entry_zone": (1950.5, 2000.25), "targets": [2100.0, 2250.0], "invalidation": 1900.1}
+        assert parse_levels({"entry_zone": "$100.00"})["entry_zone"] == (100.0, 100.0)
+
+    def test_build_order(self):
+        """Тест: вход у края зоны ближе к цене, цели только по ходу сделки"""
+        order, _ = build_order(make_signal(targets=("$120.00", "$98.00", "$110.00")))
+        assert order["entry"] == 100.0
+        assert order["targets"] == [110.0, 120.0]
+
+        order, _ = build_order(make_signal("SELL", targets=("$80.00", "$85.00"), invalidation="$105.00"))
+        assert order["entry"] == 95.0
+        assert order["targets"] == [85.0, 80.0]
+
+        assert build_order(make_signal(), entry_fill="mid")[0]["entry"] == 97.5
+
+    def test_build_order_rejects(self):
+        """Тест: сигналы без уровней или с нарушенной геометрией не исполняются"""
+        assert build_order({"signal": "WAIT"}) == (None, "no_direction")
+        assert build_order({"signal": "BUY", "levels": {}}) == (None, "no_levels")
+        assert build_order(make_signal(invalidation="$101.00"))[1] == "invalid_levels"
+        assert build_order(make_signal(targets=("$99.00",)))[1] == "invalid_levels"
+
+
+class TestExecutionSimulator:
+    def test_fill_then_target_with_costs(self):
+        """Тест: вход со slippage, выход по лимитной цели, комиссии с обеих сторон"""
+        simulator = ExecutionSimulator(fee_pct=0.1, slippage_pct=0.5)
+        submit(simulator, make_signal())
+
+        assert simulator.on_candle(1, 1, 102.0, 103.0, 99.0, 101.0) is None
+        trade = simulator.on_candle(2, 2, 101.0, 111.0, 100.5, 110.0)
+
+        entry = 100.0 * 1.005
+        assert trade["entry_price"] == pytest.approx(entry)
+        assert trade["exit_price"] == 110.0
+        assert trade["exit_reason"] == "target"
+        assert trade["gross_pct"] == pytest.approx((110.0 - entry) / entry * 100)
+        assert trade["fees_pct"] == pytest.approx(0.1 * (1 + 110.0 / entry))
+        assert trade["pnl_pct"] == pytest.approx(trade["gross_pct"] - trade["fees_pct"])
+        assert trade["holding_candles"] == 1
+
+    def test_stop_checked_first(self):
+        """Тест: если свеча задела и стоп, и цель — считается стоп"""
+        simulator = ExecutionSimulator(fee_pct=0, slippage_pct=0)
+        submit(simulator, make_signal())
+        simulator.on_candle(1, 1, 100.0, 100.5, 99.0, 100.0)
+
+        trade = simulator.on_candle(2, 2, 100.0, 112.0, 89.0, 105.0)
+        assert trade["exit_reason"] == "stop"
+        assert trade["exit_price"] == 90.0
+
+    def test_gap_through_stop_exits_at_open(self):
+        """Тест: гэп за стоп исполняется по open"""
+        simulator = ExecutionSimulator(fee_pct=0, slippage_pct=0)
+        submit(simulator, make_signal())
+        simulator.on_candle(1, 1, 100.0, 100.5, 99.0, 100.0)
+
+        trade = simulator.on_candle(2, 2, 88.0, 89.0, 87.0, 88.5)
+        assert trade["exit_price"] == 88.0
+        assert trade["r_multiple"] == pytest.approx(-1.2)
+
+    def test_partial_targets(self):
+        """Тест: позиция делится между целями, остаток закрывается стопом"""
+        simulator = ExecutionSimulator(fee_pct=0, slippage_pct=0)
+        submit(simulator, make_signal(targets=("$110.00", "$120.00")))
+        simulator.on_candle(1, 1, 100.0, 100.5, 99.0, 100.0)
+        assert simulator.on_candle(2, 2, 100.0, 111.0, 99.5, 108.0) is None
+
+        trade = simulator.on_candle(3, 3, 100.0, 101.0, 89.0, 92.0)
+        assert trade["targets_hit"] == 1
+        assert trade["exit_price"] == pytest.approx(100.0)
+        assert trade["gross_pct"] == pytest.approx(0.0)
+
+    def test_entry_expires_or_invalidates(self):
+        """Тест: заявка снимается по таймауту или при открытии за стопом"""
+        simulator = ExecutionSimulator(entry_timeout=2)
+        submit(simulator, make_signal())
+        simulator.on_candle(1, 1, 104.0, 105.0, 101.0, 104.0)
+        simulator.on_candle(2, 2, 104.0, 105.0, 101.0, 104.0)
+        assert not simulator.busy
+        assert simulator.counts["expired"] == 1
+
+        submit(simulator, make_signal(), index=3)
+        simulator.on_candle(4, 4, 89.0, 91.0, 88.0, 90.0)
+        assert not simulator.busy
+        assert simulator.counts["invalidated"] == 1
+
+    def test_timeout_and_close(self):
+        """Тест: выход по max_holding и принудительное закрытие в конце данных"""
+        simulator = ExecutionSimulator(fee_pct=0, slippage_pct=0, max_holding=2)
+        submit(simulator, make_signal())
+        simulator.on_candle(1, 1, 100.0, 100.5, 99.0, 100.0)
+        assert simulator.on_candle(2, 2, 100.0, 101.0, 99.0, 101.0) is None
+        assert simulator.on_candle(3, 3, 101.0, 102.0, 100.0, 102.0)["exit_reason"] == "timeout"
+
+        submit(simulator, make_signal(), index=4)
+        simulator.on_candle(5, 5, 100.0, 100.5, 99.0, 100.0)
+        assert simulator.close(6, 6, 103.0)["exit_reason"] == "end_of_data"
+
+
+class TestStats:
+    def test_summarize_trades(self):
+        """Тест: доходность с реинвестированием, просадка, profit factor"""
+        trades = [
+            {"direction": "BUY", "pnl_pct": 10.0, "r_multiple": 2.0, "fees_pct": 0.1, "holding_candles": 2, "exit_reason": "target"},
+            {"direction": "SELL", "pnl_pct": -20.0, "r_multiple": -1.0, "fees_pct": 0.1, "holding_candles": 4, "exit_reason": "stop"},
+            {"direction": "BUY", "pnl_pct": 5.0, "r_multiple": 1.0, "fees_pct": 0.1, "holding_candles": 6, "exit_reason": "target"}
+        ]
+        stats = summarize_trades(trades)
+
+        assert stats["trades"] == 3
+        assert stats["win_rate"] == pytest.approx(2 / 3)
+        assert stats["total_return_pct"] == pytest.approx((1.1 * 0.8 * 1.05 - 1) * 100)
+        assert stats["max_drawdown_pct"] == pytest.approx(20.0)
+        assert stats["profit_factor"] == pytest.approx(0.75)
+        assert stats["by_direction"]["BUY"]["trades"] == 2
+        assert stats["exit_reasons"] == {"target": 2, "stop": 1}
+
+    def test_empty(self):
+        """Тест: без сделок — нулевая статистика"""
+        stats = summarize_trades([])
+        assert stats["trades"] == 0
+        assert stats["total_return_pct"] == 0.0
+        assert max_drawdown_pct([]) == 0.0
+
+
+def decisions(backtester, df):
+    svd_engine, decision_engine = SVDEngine(), DecisionEngine()
+    return {
+        step["index"]: (step["structure"]["trend"], step["ta"]["rsi"], backtester.decide(step, svd_engine, decision_engine)["signal"])
+        for step in backtester.iter_features(df)
+    }
+
+
+class TestWalkForwardBacktester:
+    @pytest.fixture(autouse=True)
+    def quiet(self):
+        logging.disable(logging.WARNING)
+        yield
+        logging.disable(logging.NOTSET)
+
+    def test_no_lookahead(self):
+        """Тест: решения по свече не зависят от будущих свечей"""
+        df = make_ohlcv(260, seed=4)
+        backtester = WalkForwardBacktester(window=60, htf_intervals=("1h",))
+
+        full = decisions(backtester, df)
+        truncated = decisions(backtester, df.iloc[:180])
+
+        assert len(truncated) == 121
+        for index, decision in truncated.items():
+            assert full[index] == pytest.approx(decision, nan_ok=True)
+
+    def test_run_report(self):
+        """Тест: прогон возвращает сделки, статистику и счётчики сигналов"""
+        df = make_ohlcv(400, seed=3)
+        result = WalkForwardBacktester(window=80).run(df)
+
+        assert result["candles"] == 321
+        assert sum(result["signals"].values()) == result["candles"]
+        assert result["stats"]["trades"] == len(result["trades"])
+        assert result["orders"]["filled"] >= len(result["trades"])
+        for trade in result["trades"]:
+            assert trade["entry_index"] > trade["signal_index"]
+            assert trade["exit_index"] >= trade["entry_index"]
+
+    def test_short_history(self):
+        """Тест: история короче окна — пустой отчёт"""
+        result = WalkForwardBacktester(window=100).run(make_ohlcv(50))
+        assert result["trades"] == []
+        assert result["candles"] == 0
+
+
+class TestParameterSweep:
+    @pytest.fixture(autouse=True)
+    def quiet(self):
+        logging.disable(logging.WARNING)
+        yield
+        logging.disable(logging.NOTSET)
+
+    def test_candidates(self):
+        """Тест: сетка — все комбинации, случайный поиск — в пределах пространства"""
+        grid = grid_candidates({"A": [1, 2], "B": [0.5, 1.0, 1.5]})
+        assert len(grid) == 6
+        assert {"A": 2, "B": 1.5} in grid
+
+        samples = random_candidates({"A": [1, 2], "B": (0.0, 1.0), "C": (1, 3)}, 50, seed=1)
+        assert samples == random_candidates({"A": [1, 2], "B": (0.0, 1.0), "C": (1, 3)}, 50, seed=1)
+        assert all(s["A"] in (1, 2) and 0.0 <= s["B"] <= 1.0 and s["C"] in (1, 2, 3) for s in samples)
+        assert params_id({"A": 1, "B": 0.5}) == params_id({"B": 0.5, "A": 1.0})
+
+    def test_params_config(self):
+        """Тест: перебираемые параметры поверх настроек базового config"""
+        config = params_config(SimpleNamespace(KLINE_LIMIT=80, TRAP_SCORE_THRESHOLD=3.0), {"TRAP_SCORE_THRESHOLD": 4.5})
+        assert (config.KLINE_LIMIT, config.TRAP_SCORE_THRESHOLD) == (80, 4.5)
+
+    def test_compact_features_keep_decisions(self):
+        """Тест: общий (урезанный) набор признаков даёт те же сделки"""
+        df = make_ohlcv(300, seed=3)
+        backtester = WalkForwardBacktester(window=60, htf_intervals=("1h",))
+        features = list(backtester.iter_features(df))
+
+        full = backtester.replay(df, features)
+        compact = backtester.replay(df, [compact_features(step) for step in features])
+        assert compact["trades"] == full["trades"]
+        assert compact["signals"] == full["signals"]
+
+    def test_sweep_and_resume(self, tmp_path):
+        """Тест: пул считает наборы, повторный запуск досчитывает только новые"""
+        df = make_ohlcv(300, seed=3)
+        backtester = WalkForwardBacktester(window=60, htf_intervals=("1h",))
+        sweep = ParameterSweep(df, str(tmp_path), backtester=backtester, workers=2, flush_every=1)
+
+        results = sweep.run_grid({"MIN_CONFIDENCE_TO_TRADE": [4.0, 6.0], "TRAP_SCORE_THRESHOLD": [3.0]})
+        assert len(results) == 2
+        assert sweep.last_evaluated == 2
+        default = results[results["MIN_CONFIDENCE_TO_TRADE"] == 4.0].iloc[0]
+        expected = backtester.run(df)
+        assert default["trades"] == expected["stats"]["trades"]
+        assert default["total_return_pct"] == pytest.approx(expected["stats"]["total_return_pct"])
+
+        resumed = ParameterSweep(df, str(tmp_path), backtester=backtester, workers=1)
+        results = resumed.run_grid({"MIN_CONFIDENCE_TO_TRADE": [4.0, 5.0, 6.0], "TRAP_SCORE_THRESHOLD": [3.0]})
+        assert len(results) == 3
+        assert resumed.last_evaluated == 1
+        assert len(resumed.best(min_trades=0)) == 3
+
+    def test_resume_ignores_results_of_other_settings(self, tmp_path):
+        """Тест: после смены истории или комиссий наборы считаются заново, старые строки не подмешиваются"""
+        df = make_ohlcv(300, seed=3)
+        grid = {"MIN_CONFIDENCE_TO_TRADE": [4.0], "TRAP_SCORE_THRESHOLD": [3.0]}
+        first = ParameterSweep(df, str(tmp_path), backtester=WalkForwardBacktester(window=60, htf_intervals=("1h",)),
+                               workers=1)
+        first.run_grid(grid)
+
+        fees = ParameterSweep(df, str(tmp_path), workers=1,
+                              backtester=WalkForwardBacktester(window=60, htf_intervals=("1h",), fee_pct=0.1))
+        results = fees.run_grid(grid)
+        assert fees.last_evaluated == 1
+        assert len(results) == 1 and results["results_key"].iloc[0] == fees.results_key()
+
+        history = ParameterSweep(make_ohlcv(300, seed=4), str(tmp_path), workers=1,
+                                 backtester=WalkForwardBacktester(window=60, htf_intervals=("1h",)))
+        assert history.results_key() not in (first.results_key(), fees.results_key())
+        assert len(history.run_grid(grid)) == 1 and history.last_evaluated == 1
+        assert len(first.run_grid(grid)) == 1 and first.last_evaluated == 0
@@ -0,0 +1,228 @@
+# tests/test_bars.py
+
+"""
+Unit тесты для CandleStore и BarBuilder
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from modules.bars import CandleStore, BarBuilder, TimeframeResampler, resample_ohlcv, interval_to_ms
+from modules.market_structure.market_structure_engine import MarketStructureEngine
+from modules.liquidity.liquidity_engine import LiquidityEngine
+from modules.ta_engine.ta_engine import TAEngine
+
+
+def make_trades(n, seed=42):
+    rng = np.random.default_rng(seed)
+    price = 100.0
+    trades = []
+    for i in range(n):
+        price = max(1.0, price + rng.normal(0, 0.2))
+        trades.append({
+            "price": price,
+            "volume": float(rng.uniform(0.1, 2.0)),
+            "side": "buy" if rng.random() > 0.5 else "sell",
+            "timestamp": 1_700_000_000_000 + i * 100
+        })
+    return trades
+
+
+def make_klines(n, interval="15m", start=1_700_000_000_000 + 30 * 60_000, seed=7):
+    """Базовые свечи с выравниванием по биржевой сетке (start не на границе часа)"""
+    rng = np.random.default_rng(seed)
+    step = interval_to_ms(interval)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        "timestamp": start // step * step + np.arange(n, dtype=np.int64) * step,
+        "open": open_,
+        "high": np.maximum(open_, close) + rng.uniform(0, 0.3, n),
+        "low": np.minimum(open_, close) - rng.uniform(0, 0.3, n),
+        "close": close,
+        "volume": rng.uniform(1, 10, n)
+    })
+
+
+class TestCandleStore:
+    def test_append_and_dataframe(self):
+        """Тест: добавление свечей и DataFrame в формате DataFeed"""
+        store = CandleStore()
+        for i in range(10):
+            store.append(1000 + i, 1.0, 2.0, 0.5, 1.5, 10.0)
+
+        df = store.to_dataframe()
+
+        assert len(store) == 10
+        assert list(df.columns) == ["timestamp", "open", "high", "low", "close", "volume"]
+        assert df["timestamp"].dtype == np.int64
+        assert df["timestamp"].iloc[-1] == 1009
+
+    def test_maxlen_keeps_tail(self):
+        """Тест: при maxlen хранятся только последние свечи"""
+        store = CandleStore(maxlen=5)
+        for i in range(23):
+            store.append(i, i, i, i, i, i)
+
+        assert len(store) == 5
+        assert list(store.column("timestamp")) == [18, 19, 20, 21, 22]
+
+    def test_version_and_update_last(self):
+        """Тест: версия растёт, формирующаяся свеча обновляется"""
+        store = CandleStore()
+        store.append(1, 1.0, 1.0, 1.0, 1.0, 1.0)
+        v = store.version
+        store.update_last(close=2.0, high=2.0)
+
+        assert store.version > v
+        assert store.last()["close"] == 2.0
+
+
+class TestBarBuilder:
+    def test_tick_bars(self):
+        """Тест: tick-бар закрывается ровно через threshold сделок"""
+        builder = BarBuilder(bar_type="tick", threshold=10)
+        bars = builder.add_trades(make_trades(105))
+
+        assert len(bars) == 10
+        assert all(b["trades"] == 10 for b in bars)
+        assert builder.forming_bar()["trades"] == 5
+
+    def test_volume_bars_ohlc(self):
+        """Тест: volume-бары сохраняют объём и корректный OHLC"""
+        trades = make_trades(500)
+        builder = BarBuilder(bar_type="volume", threshold=25)
+        bars = builder.add_trades(trades)
+
+        assert all(b["volume"] >= 25 for b in bars)
+        assert all(b["low"] <= min(b["open"], b["close"]) for b in bars)
+        assert all(b["high"] >= max(b["open"], b["close"]) for b in bars)
+        emitted = sum(b["volume"] for b in bars)
+        forming = builder.forming_bar()["volume"] if builder.forming_bar() else 0
+        assert emitted + forming == pytest.approx(sum(t["volume"] for t in trades))
+
+    def test_dollar_bars(self):
+        """Тест: dollar-бары закрываются по обороту"""
+        builder = BarBuilder(bar_type="dollar", threshold=5000)
+        bars = builder.add_trades(make_trades(500))
+
+        assert len(bars) > 0
+        assert len(builder.store) == len(bars)
+
+    def test_imbalance_bars(self):
+        """Тест: imbalance-бары строятся и обновляют ожидаемый порог"""
+        builder = BarBuilder(bar_type="volume_imbalance", threshold=20)
+        bars = builder.add_trades(make_trades(3000))
+
+        assert len(bars) > 1
+        assert builder.expected_imbalance() is not None
+
+    def test_imbalance_expected_ticks_ewma(self):
+        """Тест: E[T] — EWMA фактических длин imbalance-баров"""
+        builder = BarBuilder(bar_type="tick_imbalance", threshold=20, ewma_span=5)
+        bars = builder.add_trades(make_trades(3000))
+
+        alpha, expected = 2.0 / 6, 20.0
+        for bar in bars:
+            expected = min(max(alpha * bar["trades"] + (1 - alpha) * expected, 1.0), 200.0)
+        assert len({bar["trades"] for bar in bars}) > 1
+        assert builder.expected_ticks == pytest.approx(expected)
+        assert builder.expected_ticks != 20.0
+
+    def test_invalid_bar_type(self):
+        """Тест: неизвестный тип бара"""
+        with pytest.raises(ValueError):
+            BarBuilder(bar_type="renko")
+
+    def test_engines_run_on_bars(self):
+        """Тест: движки работают на activity-барах без изменений"""
+        builder = BarBuilder(bar_type="tick", threshold=20)
+        builder.add_trades(make_trades(20 * 120))
+        df = builder.to_dataframe()
+
+        structure = MarketStructureEngine().analyze(df)
+        ta = TAEngine().analyze(df)
+        liquidity = LiquidityEngine().analyze(df, structure)
+
+        assert "trend" in structure
+        assert "atr_pct" in ta
+        assert "direction" in liquidity
+
+
+class TestResampler:
+    def test_interval_to_ms(self):
+        """Тест: разбор интервалов биржи"""
+        assert interval_to_ms("15m") == 15 * 60_000
+        assert interval_to_ms("4h") == 4 * 3_600_000
+        assert interval_to_ms("1D") == 86_400_000
+        assert interval_to_ms("1M") is None
+        assert interval_to_ms("abc") is None
+
+    def test_resample_matches_pandas(self):
+        """Тест: пакетный ресэмплинг совпадает с pandas resample"""
+        base = make_klines(500)
+        result = resample_ohlcv(base, "4h")
+
+        indexed = base.set_index(pd.to_datetime(base["timestamp"], unit="ms"))
+        expected = indexed.resample("4h").agg({
+            "open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"
+        })
+        expected = expected[expected.index >= pd.to_datetime(result["timestamp"].iloc[0], unit="ms")]
+
+        # Первая (неполная) 4h-свеча пропущена
+        assert result["timestamp"].iloc[0] % interval_to_ms("4h") == 0
+        assert result["timestamp"].iloc[0] > base["timestamp"].iloc[0]
+        np.testing.assert_array_equal(result["timestamp"], expected.index.as_unit("ms").asi8)
+        for col in ["open", "high", "low", "close", "volume"]:
+            np.testing.assert_allclose(result[col], expected[col], rtol=1e-12)
+
+    def test_incremental_matches_batch(self):
+        """Тест: скользящее окно + формирующаяся свеча дают тот же результат, что пакетный расчёт"""
+        full = make_klines(600)
+        window = 100
+        resampler = TimeframeResampler("1h")
+        first_bucket = None
+        for end in range(window, len(full) + 1):
+            base = full.iloc[end - window:end].reset_index(drop=True)
+            # Формирующаяся свеча сначала неполная, затем окончательная
+            partial = base.copy()
+            partial.loc[partial.index[-1], ["high", "close", "volume"]] = [base["open"].iloc[-1] + 0.01, base["open"].iloc[-1], 0.5]
+            resampler.update(partial)
+            resampler.update(base)
+            if first_bucket is None:
+                first_bucket = resampler.to_dataframe()["timestamp"].iloc[0]
+
+            expected = resample_ohlcv(full.iloc[:end], "1h")
+            expected = expected[expected["timestamp"] >= first_bucket].reset_index(drop=True)
+            pd.testing.assert_frame_equal(resampler.to_dataframe(), expected, check_exact=False, rtol=1e-12)
+
+        assert resampler.forming_candle()["timestamp"] == expected["timestamp"].iloc[-1]
+        tail = resampler.to_dataframe(last=5)
+        pd.testing.assert_frame_equal(tail, expected.iloc[-5:].reset_index(drop=True), check_exact=False, rtol=1e-12)
+
+    def test_history_seed_and_gap_reset(self):
+        """Тест: REST-история дополняет период до базового буфера, разрыв сбрасывает состояние"""
+        full = make_klines(400)
+        history = resample_ohlcv(full, "1h")
+        resampler = TimeframeResampler("1h")
+        base = full.iloc[-100:].reset_index(drop=True)
+
+        assert resampler.needs_history(base)
+        resampler.update(base, history_df=history)
+        result = resampler.to_dataframe()
+
+        # Склейка без дублей и пропусков
+        assert result["timestamp"].is_monotonic_increasing
+        assert (np.diff(result["timestamp"]) == interval_to_ms("1h")).all()
+        pd.testing.assert_frame_equal(result, history.iloc[-len(result):].reset_index(drop=True),
+                                      check_exact=False, rtol=1e-12)
+
+        assert not resampler.needs_history(base)
+        later = make_klines(100, start=int(full["timestamp"].iloc[-1]) + 10 * 3_600_000)
+        assert resampler.needs_history(later)
+
+    def test_can_resample(self):
+        """Тест: локальный ресэмплинг только для кратных интервалов"""
+        assert TimeframeResampler("4h").can_resample("15m")
+        assert not TimeframeResampler("1h").can_resample("1h")
+        assert not TimeframeResampler("1h").can_resample("7m")
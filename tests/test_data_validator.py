@@ -146,6 +146,37 @@ class TestDataQualityValidator:
         assert result["all_valid"] == True
         assert result["overall_quality"] > 0.5
 
+    def test_validate_all_ws_book_staleness(self):
+        """Тест: стакан WS с timestamp — свежий без штрафа, устаревший снижает качество"""
+        now = 1_700_000_100_000
+        df = pd.DataFrame({
+            'timestamp': range(1000, 1100),
+            'open': [100.0] * 100,
+            'high': [101.0] * 100,
+            'low': [99.0] * 100,
+            'close': [100.5] * 100,
+            'volume': [1000.0] * 100
+        })
+        trades = [
+            {"id": i, "price": 100.0, "volume": 1.0, "side": "buy", "timestamp": now - 1000 + i}
+            for i in range(30)
+        ]
 
+        def ws_book(timestamp):
+            # Формат WebSocketManager._run_depth
+            return {
+                "bids": [(100.0, 10.0)] * 15,
+                "asks": [(101.0, 10.0)] * 15,
+                "avg_bid": 10.0,
+                "avg_ask": 10.0,
+                "timestamp": timestamp
+            }
 
+        fresh = self.validator.validate_all(df, ws_book(now - 1000), trades, fetch_timestamp=now)
+        stale = self.validator.validate_all(df, ws_book(now - 30000), trades, fetch_timestamp=now)
 
+        assert fresh["orderbook"]["quality_score"] == 1.0
+        assert fresh["orderbook"]["issues"] == []
+        assert "stale" in str(stale["orderbook"]["issues"]).lower()
+        assert stale["orderbook"]["quality_score"] == pytest.approx(0.5)
+        assert stale["overall_quality"] == pytest.approx(fresh["overall_quality"] - 0.2)
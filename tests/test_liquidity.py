@@ -0,0 +1,622 @@
+# tests/test_liquidity.py
+
+"""
+Unit тесты для Liquidity модулей
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from modules.liquidity.stop_clusters import detect_stop_clusters
+from modules.liquidity.sweep_detector import detect_sweep, detect_historical_sweeps
+from modules.liquidity.swept_tracker import SweptLevelsTracker
+from modules.liquidity.touch_detector import detect_recent_touches, filter_touched_levels
+from modules.liquidity.level_registry import LiquidityLevelRegistry
+from modules.liquidity.liquidity_engine import LiquidityEngine
+from modules.liquidity.volume_profile import (
+    calculate_volume_profile, spread_volume_to_bins, AnchoredVolumeProfile, RollingVolumeProfile
+)
+from modules.liquidity.ath_atl import detect_ath_atl_liquidity
+from modules.market_structure.swings import detect_swings
+from modules.utils.time_decay import calculate_time_decay, calculate_time_decay_batch
+from tests.helpers import NOW_TS, make_ohlcv, reference_detect_stop_clusters
+
+
+def assert_same_clusters(actual, expected):
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        assert a["type"] == e["type"]
+        assert a["price"] == e["price"]
+        assert a["timestamp"] == e["timestamp"]
+        assert a["source"] == e["source"]
+        assert a["decay_weight"] == pytest.approx(e["decay_weight"], rel=1e-12)
+
+
+class TestStopClusters:
+    def test_parity_with_reference(self):
+        """Тест: векторная версия совпадает с построчной"""
+        df = make_ohlcv(1500)
+        actual = detect_stop_clusters(df, current_ts=NOW_TS)
+        expected = reference_detect_stop_clusters(df, current_ts=NOW_TS)
+
+        assert len(expected) > 0
+        assert_same_clusters(actual, expected)
+
+    def test_parity_without_decay(self):
+        """Тест: parity без time-decay"""
+        df = make_ohlcv(300, seed=3)
+        actual = detect_stop_clusters(df, apply_time_decay=False, current_ts=NOW_TS)
+        expected = reference_detect_stop_clusters(df, apply_time_decay=False, current_ts=NOW_TS)
+
+        assert_same_clusters(actual, expected)
+
+    def test_upper_wick_cluster(self):
+        """Тест: длинная верхняя тень → buy_stops на high"""
+        df = pd.DataFrame({
+            "timestamp": [1, 2, 3],
+            "open": [100.0, 100.0, 100.0],
+            "high": [101.0, 101.0, 110.0],
+            "low": [99.0, 99.0, 99.5],
+            "close": [100.0, 100.0, 100.5],
+            "volume": [1.0, 1.0, 1.0]
+        })
+        clusters = detect_stop_clusters(df, current_ts=NOW_TS)
+
+        assert len(clusters) == 1
+        assert clusters[0]["type"] == "buy_stops"
+        assert clusters[0]["price"] == 110.0
+
+    def test_short_dataframe(self):
+        """Тест: меньше 3 свечей → нет кластеров"""
+        assert detect_stop_clusters(make_ohlcv(2)) == []
+
+
+class TestTimeDecayBatch:
+    def test_batch_matches_scalar(self):
+        """Тест: batch decay совпадает со скалярным, включая крайние случаи"""
+        timestamps = [NOW_TS - 1000, NOW_TS - 86400000, NOW_TS + 5000, 0, -1]
+        batch = calculate_time_decay_batch(timestamps, NOW_TS)
+        scalar = [calculate_time_decay(ts, NOW_TS) for ts in timestamps]
+
+        assert batch.tolist() == pytest.approx(scalar)
+
+
+def reference_calculate_volume_profile(df, num_bins=50):
+    """Исходная реализация с циклом по свечам и бинам (эталон для parity)"""
+    price_min = df['low'].min()
+    price_max = df['high'].max()
+    price_bins = np.linspace(price_min, price_max, num_bins + 1)
+    volume_at_price = {float(price_bins[i]): 0.0 for i in range(num_bins)}
+    for idx in range(len(df)):
+        candle_low = df['low'].iloc[idx]
+        candle_high = df['high'].iloc[idx]
+        candle_volume = df['volume'].iloc[idx]
+        for i in range(num_bins):
+            bin_low = price_bins[i]
+            bin_high = price_bins[i + 1]
+            if candle_high >= bin_low and candle_low <= bin_high:
+                overlap_low = max(candle_low, bin_low)
+                overlap_high = min(candle_high, bin_high)
+                overlap_pct = (overlap_high - overlap_low) / (candle_high - candle_low) if candle_high > candle_low else 1.0
+                volume_at_price[bin_low] += candle_volume * overlap_pct
+    poc_price = max(volume_at_price, key=volume_at_price.get)
+    sorted_bins = sorted(volume_at_price.items(), key=lambda x: x[1], reverse=True)
+    target_volume = sum(volume_at_price.values()) * 0.70
+    accumulated_volume = 0.0
+    value_area_prices = []
+    for price, volume in sorted_bins:
+        if accumulated_volume >= target_volume:
+            break
+        value_area_prices.append(price)
+        accumulated_volume += volume
+    return {"poc": poc_price, "val": min(value_area_prices), "vah": max(value_area_prices),
+            "profile": volume_at_price}
+
+
+class TestVolumeProfile:
+    def test_parity_with_reference(self):
+        """Тест: векторный профиль совпадает с исходным циклом"""
+        df = make_ohlcv(400, seed=11)
+        actual = calculate_volume_profile(df, num_bins=50)
+        expected = reference_calculate_volume_profile(df, num_bins=50)
+
+        assert actual["poc"] == expected["poc"]
+        assert actual["val"] == expected["val"]
+        assert actual["vah"] == expected["vah"]
+        assert list(actual["profile"]) == list(expected["profile"])
+        assert list(actual["profile"].values()) == pytest.approx(list(expected["profile"].values()), rel=1e-9)
+
+    def test_short_dataframe(self):
+        """Тест: меньше 10 свечей → пустой профиль"""
+        assert calculate_volume_profile(make_ohlcv(5))["poc"] is None
+
+    def test_rolling_matches_full_recompute(self):
+        """Тест: скользящий профиль окна = calculate_volume_profile, сетка перестраивается не каждый цикл"""
+        df = make_ohlcv(400, seed=12)
+        profile = RollingVolumeProfile(num_bins=50)
+        steps = 0
+        for end in range(120, len(df) + 1):
+            window = df.iloc[end - 100:end].reset_index(drop=True)
+            actual = profile.update(window)
+            expected = calculate_volume_profile(window, num_bins=50)
+            steps += 1
+
+            assert (actual["poc"], actual["val"], actual["vah"]) == (expected["poc"], expected["val"], expected["vah"])
+            assert list(actual["profile"]) == list(expected["profile"])
+            assert list(actual["profile"].values()) == pytest.approx(list(expected["profile"].values()),
+                                                                     rel=1e-9, abs=1e-9)
+        assert profile.rebuilds < steps / 2
+
+
+DAY_MS = 24 * 3600 * 1000
+
+
+def full_fold_volumes(profile, df):
+    """Объём на сетке профиля, посчитанный за один проход по df"""
+    bin_size = profile.bin_size
+    first = int(np.floor(df['low'].min() / bin_size))
+    last = int(np.floor(df['high'].max() / bin_size))
+    bin_lows = np.arange(first, last + 1) * bin_size
+    volumes = spread_volume_to_bins(df['low'], df['high'], df['volume'], bin_lows, bin_lows + bin_size,
+                                    closed_edges=False)
+    return {p: v for p, v in zip(bin_lows.tolist(), volumes.tolist()) if v > 0}
+
+
+def assert_profile_matches(profile, df):
+    expected = full_fold_volumes(profile, df)
+    actual = {p: v for p, v in profile.get_profile()["profile"].items() if v > 1e-9}
+    assert list(actual) == pytest.approx(list(expected))
+    assert list(actual.values()) == pytest.approx(list(expected.values()), rel=1e-9, abs=1e-9)
+
+
+class TestAnchoredVolumeProfile:
+    def test_incremental_equals_full_fold(self):
+        """Тест: поштучные обновления дают тот же профиль, что и один проход"""
+        df = make_ohlcv(300, start_ts=1_699_920_000_000)  # начало суток UTC
+        profile = AnchoredVolumeProfile("day", bin_size=0.5)
+        for end in range(20, len(df) + 1, 7):
+            profile.update(df.iloc[max(0, end - 100):end])
+        profile.update(df)
+
+        day_start = profile.anchor_start
+        day_df = df[df['timestamp'] >= day_start]
+        assert profile.anchor_start == (int(df['timestamp'].iloc[-1]) // DAY_MS) * DAY_MS
+        assert_profile_matches(profile, day_df)
+
+    def test_forming_candle_not_double_counted(self):
+        """Тест: повторные обновления формирующейся свечи не накапливают объём"""
+        df = make_ohlcv(50, start_ts=1_699_920_000_000)
+        profile = AnchoredVolumeProfile("day", bin_size=0.5)
+        for volume in (10.0, 20.0, 30.0):
+            forming = df.copy()
+            forming.loc[forming.index[-1], 'volume'] = volume
+            profile.update(forming)
+
+        assert_profile_matches(profile, forming)
+        assert profile.get_profile()["total_volume"] == pytest.approx(forming['volume'].sum())
+
+    def test_new_day_resets_profile(self):
+        """Тест: с началом нового дня профиль строится заново"""
+        df = make_ohlcv(150, start_ts=1_699_920_000_000)  # 150 * 15м > 24ч
+        profile = AnchoredVolumeProfile("day", bin_size=0.5)
+        profile.update(df.iloc[:90])
+        profile.update(df)
+
+        assert profile.anchor_start == 1_699_920_000_000 + DAY_MS
+        assert_profile_matches(profile, df[df['timestamp'] >= profile.anchor_start])
+
+    def test_visible_window(self):
+        """Тест: visible-профиль покрывает только последние visible_candles свечей"""
+        df = make_ohlcv(400)
+        profile = AnchoredVolumeProfile("visible", bin_size=0.5, visible_candles=60)
+        for end in range(30, len(df) + 1, 13):
+            profile.update(df.iloc[:end])
+        profile.update(df)
+
+        assert_profile_matches(profile, df.iloc[-60:])
+
+    def test_engine_profiles_bounded_on_irregular_bars(self):
+        """Тест: нерегулярные бары без id серии не растят число профилей, с id — одна серия"""
+        structure = {"swings": {"highs": [], "lows": []}}
+        engine = LiquidityEngine()
+        df = make_ohlcv(120)
+        for gap in range(60):
+            irregular = df.copy()
+            irregular.loc[irregular.index[-1], 'timestamp'] += gap * 1000
+            engine.analyze(irregular, structure)
+        assert len(engine.anchored_profiles) <= LiquidityEngine.MAX_SERIES
+        assert len(engine.level_registries) <= LiquidityEngine.MAX_SERIES
+
+        engine = LiquidityEngine()
+        for gap in range(60):
+            irregular = df.copy()
+            irregular.loc[irregular.index[-1], 'timestamp'] += gap * 1000
+            engine.analyze(irregular, structure, series=("BTC-USDT", "15m"))
+        assert list(engine.anchored_profiles) == [("BTC-USDT", "15m")]
+        assert list(engine.level_registries) == [("BTC-USDT", "15m")]
+
+
+def reference_detect_historical_sweeps(df, swing_highs, swing_lows, current_price):
+    """Исходная реализация с вложенными циклами по iloc (эталон для parity)"""
+    result = []
+    for swings, direction in ((swing_lows, "down"), (swing_highs, "up")):
+        for swing in swings:
+            price = swing.get("price")
+            if price is None or (price >= current_price if direction == "down" else price <= current_price):
+                continue
+            swept_idx = None
+            for i in range(swing.get("index", 0) + 1, len(df)):
+                candle = df.iloc[i]
+                broken = candle["low"] < price if direction == "down" else candle["high"] > price
+                if broken and swept_idx is None:
+                    swept_idx = i
+                recovered = candle["close"] > price * 1.002 if direction == "down" else candle["close"] < price * 0.998
+                if swept_idx is not None and recovered:
+                    no_retest = all(abs(df.iloc[j]["close"] - price) / price >= 0.005 for j in range(i + 5, len(df)))
+                    if no_retest:
+                        result.append({
+                            "price": price,
+                            "direction": direction,
+                            "swept_at_index": swept_idx,
+                            "recovery_confirmed": True,
+                            "type": "swing_low" if direction == "down" else "swing_high",
+                            "candles_ago": len(df) - swept_idx
+                        })
+                    break
+    return result
+
+
+def make_swings(df, every=7, seed=5):
+    """Swing-уровни на случайных свечах (включая уровни без пробоя)"""
+    rng = np.random.default_rng(seed)
+    idx = np.arange(0, len(df), every)
+    highs = [{"price": float(df['high'].iloc[i] + rng.uniform(-2, 2)), "index": int(i)} for i in idx]
+    lows = [{"price": float(df['low'].iloc[i] + rng.uniform(-2, 2)), "index": int(i)} for i in idx]
+    return highs, lows
+
+
+class TestHistoricalSweeps:
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_parity_with_reference(self, seed):
+        """Тест: векторная версия совпадает с построчной"""
+        df = make_ohlcv(600, seed=seed)
+        swing_highs, swing_lows = make_swings(df, seed=seed)
+        current_price = float(df['close'].iloc[-1])
+
+        actual = detect_historical_sweeps(df, swing_highs, swing_lows, current_price)
+        expected = reference_detect_historical_sweeps(df, swing_highs, swing_lows, current_price)
+
+        assert len(expected) > 0
+        assert actual == expected
+
+    def test_retest_cancels_sweep(self):
+        """Тест: возврат close к уровню после восстановления отменяет sweep"""
+        closes = [100.0] * 5 + [95.0, 101.0, 102.0, 102.0, 102.0, 102.0, 99.3, 102.0]
+        df = pd.DataFrame({
+            "open": closes,
+            "high": [c + 0.5 for c in closes],
+            "low": [c - 0.5 for c in closes],
+            "close": closes,
+            "volume": [1.0] * len(closes)
+        })
+        swing_lows = [{"price": 99.0, "index": 2}]
+
+        assert detect_historical_sweeps(df, [], swing_lows, 102.0) == []
+        assert detect_historical_sweeps(df.iloc[:-2], [], swing_lows, 102.0)[0]["swept_at_index"] == 5
+
+    def test_swing_at_last_candle(self):
+        """Тест: swing на последней свече не даёт sweep"""
+        df = make_ohlcv(20)
+        swing_highs = [{"price": float(df['high'].max()) + 1, "index": 19}]
+        assert detect_historical_sweeps(df, swing_highs, [], float(df['close'].iloc[-1])) == []
+
+
+def reference_detect_sweep(df, lookback=50, stop_prices_above=None, stop_prices_below=None):
+    """Исходная реализация с циклами по itertuples (эталон для parity, без ранних выходов)"""
+    last_3 = df.iloc[-3:]
+    highs = df["high"].iloc[-(lookback + 1):-3]
+    lows = df["low"].iloc[-(lookback + 1):-3]
+    sweep_up = sweep_down = hit_above = hit_below = post_reversal = False
+    post_move = 0
+    historical_high = highs.max() if len(highs) > 0 else last_3.iloc[0]["high"]
+    historical_low = lows.min() if len(lows) > 0 else last_3.iloc[0]["low"]
+    last_close = last_3.iloc[-1]["close"]
+    if last_3["high"].max() > historical_high and last_close < historical_high:
+        if any(c.high > historical_high and c.close < historical_high * 0.998 for c in last_3.itertuples()):
+            sweep_up = True
+            post_move = historical_high - last_close
+    if last_3["low"].min() < historical_low and last_close > historical_low:
+        if any(c.low < historical_low and c.close > historical_low * 1.002 for c in last_3.itertuples()):
+            sweep_down = True
+            post_move = last_close - historical_low
+    for p in stop_prices_above or []:
+        if any(c.high >= p >= c.close for c in last_3.itertuples()):
+            hit_above = True
+            break
+    for p in stop_prices_below or []:
+        if any(c.low <= p <= c.close for c in last_3.itertuples()):
+            hit_below = True
+            break
+    if sweep_up and last_close < historical_high * 0.998:
+        post_reversal = True
+    if sweep_down and last_close > historical_low * 1.002:
+        post_reversal = True
+    swept_prices = []
+    if sweep_up:
+        swept_prices.append({"price": historical_high, "direction": "up", "hit_liquidity": hit_above})
+    if sweep_down:
+        swept_prices.append({"price": historical_low, "direction": "down", "hit_liquidity": hit_below})
+    return {
+        "sweep_up": sweep_up,
+        "sweep_down": sweep_down,
+        "hit_liquidity_above": hit_above,
+        "hit_liquidity_below": hit_below,
+        "post_reversal": post_reversal,
+        "post_move": post_move,
+        "swept_prices": swept_prices
+    }
+
+
+class TestDetectSweep:
+    def test_parity_with_reference(self):
+        """Тест: векторная версия совпадает с построчной на скользящих окнах"""
+        df = make_ohlcv(1500, seed=11)
+        sweeps = 0
+        for end in range(60, len(df), 3):
+            window = df.iloc[end - 60:end]
+            closes = window["close"].to_numpy()
+            above = [float(closes[-1] + d) for d in (0.2, 0.8, 2.0)]
+            below = [float(closes[-1] - d) for d in (0.2, 0.8, 2.0)]
+            actual = detect_sweep(window, stop_prices_above=above, stop_prices_below=below)
+            expected = reference_detect_sweep(window, stop_prices_above=above, stop_prices_below=below)
+            assert actual == expected
+            sweeps += actual["sweep_up"] or actual["sweep_down"]
+        assert sweeps > 0
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestSweptLevelsTracker:
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        clock = FakeClock()
+        monkeypatch.setattr("modules.liquidity.swept_tracker.time.time", clock)
+        return clock
+
+    def test_duplicate_within_minute_ignored(self, clock):
+        """Тест: повтор уровня в течение минуты не увеличивает count"""
+        tracker = SweptLevelsTracker()
+        tracker.mark_as_swept(100.0, "up")
+        tracker.mark_as_swept(100.05, "up")
+        clock.now += 120
+        tracker.mark_as_swept(100.05, "up")
+
+        levels = tracker.get_all_swept()
+        assert len(levels) == 1
+        assert levels[0]["count"] == 2
+
+    def test_tolerance_window(self, clock):
+        """Тест: is_swept учитывает допуск в процентах"""
+        tracker = SweptLevelsTracker()
+        tracker.mark_many([{"price": 100.0, "direction": "up"}, {"price": 200.0, "direction": "down"}])
+
+        assert tracker.is_swept(100.4)
+        assert not tracker.is_swept(100.6)
+        assert tracker.swept_mask([99.7, 150.0, 200.9]) == [True, False, True]
+        assert tracker.get_swept_info(199.5)["direction"] == "down"
+
+    def test_earliest_match_returned(self, clock):
+        """Тест: при нескольких совпадениях берётся самый ранний уровень"""
+        tracker = SweptLevelsTracker()
+        tracker.mark_as_swept(100.3, "up", reason="first")
+        tracker.mark_as_swept(100.0, "up", reason="second")
+
+        assert tracker.get_swept_info(100.1)["reason"] == "first"
+
+    def test_expiry(self, clock):
+        """Тест: уровни забываются через expiry_hours, обновлённые — позже"""
+        tracker = SweptLevelsTracker(expiry_hours=1)
+        tracker.mark_as_swept(100.0, "up")
+        tracker.mark_as_swept(110.0, "up")
+        clock.now += 1800
+        tracker.mark_as_swept(110.0, "up")  # повторный sweep продлевает жизнь уровня
+        clock.now += 1800
+
+        assert not tracker.is_swept(100.0)
+        assert tracker.is_swept(110.0)
+        assert [level["price"] for level in tracker.get_all_swept()] == [110.0]
+
+    def test_injected_clock(self):
+        """Тест: время берётся из переданного clock (бэктест), а не из time.time"""
+        clock = FakeClock(now=1_000.0)
+        tracker = SweptLevelsTracker(expiry_hours=1, clock=clock)
+        tracker.mark_as_swept(100.0, "up")
+        assert tracker.get_all_swept()[0]["timestamp"] == 1_000.0
+
+        clock.now += 3600
+        assert not tracker.is_swept(100.0)
+
+    def test_filter_swept_levels(self, clock):
+        """Тест: batch-фильтрация сохраняет порядок и пропускает уровни без цены"""
+        tracker = SweptLevelsTracker()
+        tracker.mark_as_swept(100.0, "up")
+        levels = [{"price": 105.0}, {"price": 100.2}, {"price": None}, {"price": 95.0}]
+
+        assert tracker.filter_swept_levels(levels) == [{"price": 105.0}, {"price": 95.0}]
+
+
+def reference_detect_recent_touches(df, liquidity_levels, lookback=20, tolerance_pct=0.2):
+    """Исходная реализация: цикл по уровням × itertuples (эталон для parity)"""
+    touched = []
+    untouched = []
+    recent_candles = df.iloc[-min(lookback, len(df)):]
+    for level in liquidity_levels:
+        price = level.get("price", 0)
+        level_type = level.get("type", "")
+        if price == 0:
+            continue
+        tolerance = price * (tolerance_pct / 100)
+        upper_bound = price + tolerance
+        lower_bound = price - tolerance
+        touch_candle_idx = None
+        for idx, candle in enumerate(recent_candles.itertuples()):
+            if level_type == "buy_stops":
+                hit = candle.high >= lower_bound
+            elif level_type == "sell_stops":
+                hit = candle.low <= upper_bound
+            else:
+                hit = lower_bound <= candle.high <= upper_bound or lower_bound <= candle.low <= upper_bound
+            if hit:
+                touch_candle_idx = len(recent_candles) - idx - 1
+                break
+        if touch_candle_idx is not None:
+            touched.append({"price": price, "type": level_type, "candles_ago": touch_candle_idx,
+                            "source": level.get("source", "unknown")})
+        else:
+            untouched.append(level)
+    return {"touched_levels": touched, "untouched_levels": untouched}
+
+
+class TestTouchDetector:
+    def make_levels(self, df, seed=9):
+        rng = np.random.default_rng(seed)
+        close = float(df['close'].iloc[-1])
+        levels = []
+        for i, offset in enumerate(rng.uniform(-15, 15, 200)):
+            level_type = ("buy_stops", "sell_stops", "swing")[i % 3]
+            levels.append({"price": close + offset, "type": level_type, "source": "test"})
+        levels.append({"price": 0, "type": "buy_stops"})
+        return levels
+
+    @pytest.mark.parametrize("lookback", [20, 100, 0])
+    def test_parity_with_reference(self, lookback):
+        """Тест: векторная версия совпадает с построчной (включая lookback=0 → всё окно)"""
+        df = make_ohlcv(150, seed=4)
+        levels = self.make_levels(df)
+
+        actual = detect_recent_touches(df, levels, lookback=lookback, tolerance_pct=0.2)
+        expected = reference_detect_recent_touches(df, levels, lookback=lookback, tolerance_pct=0.2)
+
+        assert len(expected["touched_levels"]) > 0
+        assert len(expected["untouched_levels"]) > 0
+        assert actual == expected
+
+    def test_candles_ago_is_earliest_touch(self):
+        """Тест: candles_ago — самая ранняя свеча касания в окне"""
+        df = pd.DataFrame({
+            "open": [100.0] * 5, "close": [100.0] * 5, "volume": [1.0] * 5,
+            "high": [100.5, 105.0, 100.5, 105.0, 100.5],
+            "low": [99.5] * 5
+        })
+        result = detect_recent_touches(df, [{"price": 104.0, "type": "buy_stops"}], lookback=5)
+
+        assert result["touched_levels"][0]["candles_ago"] == 3
+
+    def test_filter_touched_levels(self):
+        """Тест: фильтр удаляет уровни в пределах 0.1% от недавних касаний"""
+        levels = [{"price": 100.0}, {"price": 100.05}, {"price": 100.2}, {"price": 200.0}]
+        touched = [{"price": 100.0, "candles_ago": 3}, {"price": 200.0, "candles_ago": 50}]
+
+        assert filter_touched_levels(levels, touched) == [{"price": 100.2}, {"price": 200.0}]
+
+
+class TestLiquidityLevelRegistry:
+    def test_sliding_window_matches_full_recompute(self):
+        """Тест: инкрементальный реестр = detect_stop_clusters по текущему окну"""
+        df = make_ohlcv(400, seed=21)
+        registry = LiquidityLevelRegistry()
+        for end in range(120, len(df) + 1, 9):
+            window = df.iloc[end - 100:end].reset_index(drop=True)
+            actual = registry.update_stop_clusters(window, current_ts=NOW_TS)
+            expected = detect_stop_clusters(window, current_ts=NOW_TS)
+
+            assert_same_clusters(actual, expected)
+
+    def test_stable_ids_and_forming_candle(self):
+        """Тест: id уровней стабильны, кластер формирующейся свечи заменяется"""
+        df = make_ohlcv(60, seed=2)
+        registry = LiquidityLevelRegistry()
+        first = registry.update_stop_clusters(df.iloc[:-1], current_ts=NOW_TS)
+
+        forming = df.copy()
+        idx = forming.index[-1]
+        forming.loc[idx, "high"] = max(forming.loc[idx, "open"], forming.loc[idx, "close"]) + 50.0
+        second = registry.update_stop_clusters(forming, current_ts=NOW_TS)
+        third = registry.update_stop_clusters(df, current_ts=NOW_TS)
+
+        first_ids = [c["id"] for c in first]
+        assert [c["id"] for c in second][:len(first_ids)] == first_ids
+        assert second[-1]["price"] == forming.loc[idx, "high"]
+        assert_same_clusters(third, detect_stop_clusters(df, current_ts=NOW_TS))
+
+    def test_transition_happens_once(self):
+        """Тест: повторное событие для уровня не считается новым"""
+        registry = LiquidityLevelRegistry()
+        level = registry.update_stop_clusters(make_ohlcv(50), current_ts=NOW_TS)[0]
+
+        assert registry.transition(level["id"], "touched", candles_ago=5)
+        assert not registry.transition(level["id"], "touched", candles_ago=4)
+        assert registry.transition(level["id"], "swept")
+        assert not registry.transition(level["id"], "touched")
+        assert [l["id"] for l in registry.get_levels(state="swept")] == [level["id"]]
+
+    def test_sweeps_touches_extremes_match_full_recompute(self):
+        """Тест: sweeps, касания и ATH/ATL реестра = пакетные детекторы по окну (с формирующейся свечой)"""
+        df = make_ohlcv(260, seed=22)
+        rng = np.random.default_rng(22)
+        registry = LiquidityLevelRegistry()
+        found_sweeps = found_touches = 0
+        for end in range(130, len(df) + 1):
+            window = df.iloc[end - 120:end].reset_index(drop=True)
+            forming = window.copy()
+            last = forming.index[-1]
+            forming.loc[last, ["high", "low"]] += (rng.uniform(0, 2), -rng.uniform(0, 2))
+            for current in (forming, window):
+                swings = detect_swings(current)
+                price = current['close'].iloc[-1]
+                sweeps = registry.update_sweeps(current, swings["highs"], swings["lows"], price)
+                assert sweeps == detect_historical_sweeps(current, swings["highs"], swings["lows"], price)
+
+                levels = registry.update_stop_clusters(current, current_ts=NOW_TS) + \
+                    registry.update_swing_levels({"swings": swings}, current_ts=NOW_TS)
+                touches = registry.update_touches(current, levels, lookback=100)
+                assert touches == detect_recent_touches(current, levels, lookback=100)
+                assert registry.update_ath_atl(current) == detect_ath_atl_liquidity(current)
+                found_sweeps += len(sweeps)
+                found_touches += len(touches["touched_levels"])
+
+        assert found_sweeps > 0 and found_touches > 0
+
+    def test_swing_levels_synced(self):
+        """Тест: swing-уровни получают id, исчезнувшие свинги удаляются"""
+        registry = LiquidityLevelRegistry()
+        structure = {"swings": {"highs": [{"price": 110.0, "timestamp": NOW_TS - 1000}],
+                                "lows": [{"price": 90.0, "timestamp": NOW_TS - 2000}]}}
+        levels = registry.update_swing_levels(structure, current_ts=NOW_TS)
+        assert [l["id"] for l in levels] == [f"swing:buy_stops:{NOW_TS - 1000}", f"swing:sell_stops:{NOW_TS - 2000}"]
+
+        structure["swings"]["lows"] = []
+        levels = registry.update_swing_levels(structure, current_ts=NOW_TS)
+        assert len(levels) == 1
+        assert len(registry.get_levels()) == 1
+
+
+class TestLiquidityEngineRegistry:
+    def test_repeated_cycles_log_once(self, caplog):
+        """Тест: одинаковые события не логируются повторно каждый цикл"""
+        df = make_ohlcv(200, seed=8)
+        structure = {"swings": {"highs": [], "lows": []}}
+        engine = LiquidityEngine()
+        with caplog.at_level("INFO", logger="modules.liquidity.liquidity_engine"):
+            engine.analyze(df, structure)
+            first = len(caplog.records)
+            engine.analyze(df, structure)
+
+        assert first > 0
+        assert len(caplog.records) == first
@@ -0,0 +1,89 @@
+# tests/test_market_snapshot.py
+
+"""
+Unit тесты для MarketSnapshot
+"""
+
+import pickle
+
+import pytest
+from modules.utils.market_snapshot import MarketSnapshot, make_snapshot_id
+from modules.pipeline import AnalysisSession, ANALYSIS_INPUTS
+from modules.bars import resample_ohlcv
+from tests.helpers import make_ohlcv
+
+
+def make_snapshot(**overrides):
+    df = make_ohlcv(120, seed=3)
+    values = dict(
+        symbol="BTC-USDT",
+        captured_at=1_700_000_010_000,
+        ohlcv=df,
+        htf={"1h": resample_ohlcv(df, "1h"), "4h": resample_ohlcv(df, "4h")},
+        trades=[{"price": 100.0, "volume": 1.0, "side": "buy", "timestamp": 1_700_000_009_000}],
+        orderbook={"bids": [(99.9, 1.0)], "asks": [(100.1, 1.0)], "timestamp": 1_700_000_009_500},
+        ohlcv_version=4,
+        trade_seq=(901, 1900),
+        book_seq=77,
+        source_ts={"ohlcv": 1_700_000_000_000, "trades": 1_700_000_009_000, "orderbook": 1_700_000_009_500}
+    )
+    values.update(overrides)
+    return MarketSnapshot(**values)
+
+
+class TestMarketSnapshot:
+    def test_id_from_source_versions(self):
+        """Тест: id определяется версиями источников, а не временем снимка"""
+        snapshot = make_snapshot()
+        assert snapshot.snapshot_id == "BTC-USDT:o4:t1900:b77"
+        assert make_snapshot(captured_at=1_700_000_020_000).snapshot_id == snapshot.snapshot_id
+        assert make_snapshot(book_seq=78).snapshot_id != snapshot.snapshot_id
+        assert make_snapshot_id("BTC-USDT", 1, None, None) == "BTC-USDT:o1:t-:b-"
+        assert make_snapshot(activity_version=12).snapshot_id == "BTC-USDT:o4:t1900:b77:a12"
+
+    def test_id_covers_htf_versions(self):
+        """Тест: новая HTF-свеча при том же базовом OHLCV меняет id"""
+        snapshot = make_snapshot(htf_versions={"1h": 3, "4h": 1})
+        assert snapshot.snapshot_id == "BTC-USDT:o4:h3.1:t1900:b77"
+        assert make_snapshot(htf_versions={"1h": 3, "4h": 2}).snapshot_id != snapshot.snapshot_id
+
+    def test_rest_sources_hashed(self):
+        """Тест: без номеров последовательности (REST) id различает содержимое сделок и стакана"""
+        rest = make_snapshot(trade_seq=None, book_seq=None)
+        assert rest.snapshot_id.startswith("BTC-USDT:o4:t#")
+        assert make_snapshot(trade_seq=None, book_seq=None).snapshot_id == rest.snapshot_id
+
+        other_trades = make_snapshot(trade_seq=None, book_seq=None,
+                                     trades=[{"price": 100.5, "volume": 1.0, "side": "sell", "timestamp": 1_700_000_009_900}])
+        other_book = make_snapshot(trade_seq=None, book_seq=None,
+                                   orderbook={"bids": [(99.8, 2.0)], "asks": [(100.1, 1.0)], "timestamp": 1_700_000_009_900})
+        assert len({rest.snapshot_id, other_trades.snapshot_id, other_book.snapshot_id}) == 3
+
+    def test_dict_compatible_and_zero_copy(self):
+        """Тест: доступ как к dict, данные снимка — те же объекты"""
+        trades = [{"price": 100.0, "volume": 1.0, "side": "buy", "timestamp": 1}]
+        snapshot = make_snapshot(trades=trades)
+
+        assert snapshot["trades"] is trades and snapshot.get("orderbook") is snapshot.orderbook
+        inputs = snapshot.analysis_inputs(data_quality={"overall_quality": 1.0})
+        assert tuple(inputs) == ANALYSIS_INPUTS
+        assert inputs["ohlcv"] is snapshot.ohlcv and inputs["htf2_df"] is snapshot.htf["4h"]
+        with pytest.raises(AttributeError):
+            snapshot.trades = []
+
+    def test_source_ages(self):
+        """Тест: возраст источников считается от captured_at или переданного now"""
+        snapshot = make_snapshot(source_ts={"ohlcv": 1_700_000_000_000, "orderbook": None})
+        assert snapshot.ages_ms() == {"ohlcv": 10_000, "orderbook": None}
+        assert snapshot.ages_ms(now=1_700_000_011_000)["ohlcv"] == 11_000
+
+    def test_run_tagged_with_snapshot(self):
+        """Тест: прогон анализа помечен id снимка, метка переживает pickle"""
+        snapshot = make_snapshot()
+        session = AnalysisSession()
+        run = session.run(snapshot.analysis_inputs(), targets=("decision",), snapshot_id=snapshot.snapshot_id)
+        session.close()
+
+        assert run.snapshot_id == snapshot.snapshot_id
+        assert run.summary()["snapshot_id"] == snapshot.snapshot_id
+        assert pickle.loads(pickle.dumps(run)).snapshot_id == snapshot.snapshot_id
@@ -0,0 +1,410 @@
+# tests/test_pipeline.py
+
+"""
+Unit тесты для графа стадий анализа
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from modules.pipeline import (
+    StageGraph, StageExecutor, build_analysis_graph, NO_SVD,
+    AnalysisSession, AnalysisWorker, LoopLagMonitor, REPORT_TARGETS, LatestResults
+)
+from modules.utils.market_snapshot import MarketSnapshot
+from modules.bars import resample_ohlcv
+from modules.market_structure.market_structure_engine import MarketStructureEngine
+from modules.market_structure.historical_phase_analyzer import HistoricalPhaseAnalyzer
+from modules.market_structure.global_trend_analyzer import GlobalTrendAnalyzer
+from modules.ta_engine.ta_engine import TAEngine
+from modules.liquidity.liquidity_engine import LiquidityEngine
+from modules.svd.svd_engine import SVDEngine
+from modules.decision.decision_engine import DecisionEngine
+from modules.alerts import AlertManager
+from tests.helpers import make_ohlcv
+
+
+def sleeper(value, seconds=0.1):
+    def stage(*args):
+        time.sleep(seconds)
+        return value
+    return stage
+
+
+class TestStageGraph:
+    def test_order(self):
+        """Тест: топологический порядок и подграф под targets"""
+        graph = StageGraph()
+        graph.add("c", lambda a, b: a + b, deps=("a", "b"))
+        graph.add("a", lambda x: x + 1, deps=("x",))
+        graph.add("b", lambda x: x * 2, deps=("x",))
+        graph.add("d", lambda a: -a, deps=("a",))
+
+        order = graph.order(inputs=("x",))
+        assert order.index("a") < order.index("c") and order.index("b") < order.index("c")
+        assert graph.order(inputs=("x",), targets=("d",)) == ["a", "d"]
+
+    def test_invalid_graph(self):
+        """Тест: неизвестная зависимость и цикл — ValueError"""
+        graph = StageGraph().add("a", lambda y: y, deps=("y",))
+        with pytest.raises(ValueError):
+            graph.order(inputs=("x",))
+        with pytest.raises(ValueError):
+            graph.add("a", lambda: 0)
+
+        graph = StageGraph().add("a", lambda b: b, deps=("b",)).add("b", lambda a: a, deps=("a",))
+        with pytest.raises(ValueError):
+            graph.order()
+
+
+class TestStageExecutor:
+    def test_results_match_serial(self):
+        """Тест: параллельный и последовательный прогон дают одно и то же"""
+        graph = StageGraph()
+        graph.add("a", lambda x: x + 1, deps=("x",))
+        graph.add("b", lambda x: x * 2, deps=("x",))
+        graph.add("c", lambda a, b: (a, b), deps=("a", "b"))
+
+        parallel = StageExecutor(max_workers=4).run(graph, {"x": 3})
+        serial = StageExecutor(max_workers=1).run(graph, {"x": 3})
+        assert parallel.results == serial.results == {"a": 4, "b": 6, "c": (4, 6)}
+        assert set(parallel.timings) == {"a", "b", "c"}
+        assert parallel.ok
+
+    def test_independent_stages_overlap(self):
+        """Тест: независимые стадии идут параллельно, стадии с общим lock — по очереди"""
+        graph = StageGraph()
+        graph.add("a", sleeper(1), deps=("x",))
+        graph.add("b", sleeper(2), deps=("x",))
+        executor = StageExecutor(max_workers=2)
+        assert executor.run(graph, {"x": 0}).elapsed < 0.18
+
+        graph = StageGraph()
+        graph.add("a", sleeper(1), deps=("x",), lock="engine")
+        graph.add("b", sleeper(2), deps=("x",), lock="engine")
+        assert executor.run(graph, {"x": 0}).elapsed >= 0.2
+        executor.shutdown()
+
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_failure_isolation(self, workers, caplog):
+        """Тест: ошибка стадии — fallback или пропуск зависимых, остальные стадии считаются"""
+        def boom(x):
+            raise RuntimeError("boom")
+
+        graph = StageGraph()
+        graph.add("soft", boom, deps=("x",), fallback=lambda: {"trend": "unknown"})
+        graph.add("hard", boom, deps=("x",))
+        graph.add("uses_soft", lambda soft: soft["trend"], deps=("soft",))
+        graph.add("uses_hard", lambda hard: hard, deps=("hard",))
+        graph.add("after_hard", lambda uses_hard: uses_hard, deps=("uses_hard",))
+        graph.add("other", lambda x: x, deps=("x",))
+
+        with caplog.at_level(logging.CRITICAL):
+            run = StageExecutor(max_workers=workers).run(graph, {"x": 1})
+        assert run["uses_soft"] == "unknown"
+        assert run["other"] == 1
+        assert set(run.errors) == {"soft", "hard"}
+        assert run.skipped == ["uses_hard", "after_hard"]
+        assert "hard" not in run and not run.ok
+
+
+class TestAnalysisGraph:
+    @staticmethod
+    def engines():
+        return dict(
+            structure_engine=MarketStructureEngine(),
+            ta_engine=TAEngine(),
+            liquidity_engine=LiquidityEngine(clock=lambda: 1.7e9),
+            svd_engine=SVDEngine(),
+            decision_engine=DecisionEngine()
+        )
+
+    def test_matches_serial_chain(self):
+        """Тест: граф даёт то же решение, что и последовательная цепочка main.py"""
+        df = make_ohlcv(300, seed=5)
+        htf1, htf2 = resample_ohlcv(df, "1h"), resample_ohlcv(df, "4h")
+        inputs = {"ohlcv": df, "htf1_df": htf1, "htf2_df": htf2, "trades": None, "orderbook": None,
+                  "activity_df": None, "data_quality": None}
+
+        engines = self.engines()
+        graph = build_analysis_graph(
+            **engines, phase_analyzer=HistoricalPhaseAnalyzer(), trend_analyzer=GlobalTrendAnalyzer(),
+            alert_manager=AlertManager()
+        )
+        run = StageExecutor(max_workers=4).run(graph, inputs)
+        assert run.ok
+        assert run["svd"] == NO_SVD
+        assert isinstance(run["alerts"], list)
+
+        e = self.engines()
+        structure = e["structure_engine"].analyze(df)
+        htf1_struct = e["structure_engine"].analyze(htf1)
+        htf2_struct = e["structure_engine"].analyze(htf2)
+        htf1_liq = e["liquidity_engine"].analyze(htf1, htf1_struct)
+        htf2_liq = e["liquidity_engine"].analyze(htf2, htf2_struct)
+        ta = e["ta_engine"].analyze(df)
+        liquidity = e["liquidity_engine"].analyze(df, structure)
+        signal = e["decision_engine"].analyze(
+            liquidity, dict(NO_SVD), structure, ta,
+            current_price=df["close"].iloc[-1],
+            htf_context={"htf1": htf1_struct.get("trend", "unknown"), "htf2": htf2_struct.get("trend", "unknown")},
+            htf_liquidity={"htf1": htf1_liq.get("direction", {}), "htf2": htf2_liq.get("direction", {})}
+        )
+        assert run["structure"] == structure
+        assert run["decision"]["signal"] == signal["signal"]
+        assert run["decision"]["confidence"] == signal["confidence"]
+
+    def test_targets_skip_unneeded_stages(self):
+        """Тест: /signal считает только стадии, нужные для решения"""
+        df = make_ohlcv(150, seed=2)
+        graph = build_analysis_graph(**self.engines(), alert_manager=AlertManager())
+        run = StageExecutor(max_workers=2).run(graph, {
+            "ohlcv": df, "htf1_df": None, "htf2_df": None, "trades": None, "orderbook": None, "activity_df": None, "data_quality": None
+        }, targets=("decision",))
+        assert "decision" in run
+        assert "alerts" not in run and "htf1_phases" not in run
+        assert run["htf1_structure"] == {"trend": "unknown"}
+
+    def test_activity_bars_in_report(self):
+        """Тест: activity-бары проходят через стадию структуры в отчёт /analysis"""
+        df = make_ohlcv(150, seed=2)
+        bars = make_ohlcv(120, seed=9)
+        bars["buy_volume"], bars["sell_volume"], bars["trades"] = bars["volume"] * 0.6, bars["volume"] * 0.4, 50.0
+        inputs = {"ohlcv": df, "htf1_df": None, "htf2_df": None, "trades": None, "orderbook": None,
+                  "activity_df": bars, "data_quality": None}
+        graph = build_analysis_graph(**self.engines())
+
+        run = StageExecutor(max_workers=2).run(graph, inputs, targets=REPORT_TARGETS)
+        activity = run["deep_report"]["activity_bars"]
+        assert run["activity_structure"]["trend"] == activity["trend"] != "unknown"
+        assert activity["bars"] == 120
+        assert activity["buy_share"] == pytest.approx(0.6)
+        assert activity["avg_trades"] == 50.0
+
+        run = StageExecutor(max_workers=2).run(graph, dict(inputs, activity_df=None), targets=REPORT_TARGETS)
+        assert run["deep_report"]["activity_bars"] is None
+
+
+class BusySession:
+    """Сессия-заглушка: CPU-работа на чистом Python"""
+
+    def run(self, seconds, targets=None, snapshot_id=None):
+        deadline = time.perf_counter() + seconds
+        count = 0
+        while time.perf_counter() < deadline:
+            count += 1
+        return threading.get_ident(), count
+
+    def close(self):
+        pass
+
+
+def analysis_inputs(n=300, seed=5):
+    df = make_ohlcv(n, seed=seed)
+    return {
+        "ohlcv": df.iloc[-100:], "htf1_df": resample_ohlcv(df, "1h"), "htf2_df": resample_ohlcv(df, "4h"),
+        "trades": None, "orderbook": None, "activity_df": None, "data_quality": None
+    }
+
+
+class TestAnalysisWorker:
+    @pytest.fixture(autouse=True)
+    def quiet(self):
+        logging.disable(logging.WARNING)
+        yield
+        logging.disable(logging.NOTSET)
+
+    def test_loop_stays_responsive(self):
+        """Тест: пока воркер считает, event loop продолжает обслуживать корутины"""
+        async def scenario():
+            worker = AnalysisWorker(BusySession, mode="thread")
+            monitor = LoopLagMonitor(interval=0.01).start()
+            thread_id, _ = await worker.run(0.3)
+            samples = len(monitor.samples)
+            await monitor.stop()
+            worker.shutdown()
+            return thread_id, samples
+
+        thread_id, samples = asyncio.run(scenario())
+        assert thread_id != threading.get_ident()
+        assert samples >= 10
+
+    def test_calls_are_serialized(self):
+        """Тест: одновременные вызовы выполняются по очереди в одном потоке"""
+        async def scenario():
+            worker = AnalysisWorker(BusySession, mode="thread")
+            started = time.perf_counter()
+            results = await asyncio.gather(worker.run(0.1), worker.run(0.1))
+            elapsed = time.perf_counter() - started
+            worker.shutdown()
+            return results, elapsed, worker.stats()
+
+        results, elapsed, stats = asyncio.run(scenario())
+        assert results[0][0] == results[1][0]
+        assert elapsed >= 0.2
+        assert stats["completed"] == 2 and stats["pending"] == 0
+
+    def test_session_report(self):
+        """Тест: сессия в потоке считает решение и глубокий отчёт, кэш общий между вызовами"""
+        inputs = analysis_inputs()
+
+        async def scenario():
+            worker = AnalysisWorker(AnalysisSession, mode="thread")
+            first = await worker.run(inputs, targets=REPORT_TARGETS)
+            second = await worker.run(inputs, targets=("decision",))
+            cache = await worker.call("cache_stats")
+            worker.shutdown()
+            return first, second, cache
+
+        first, second, cache = asyncio.run(scenario())
+        assert first.ok
+        assert "liquidity_analysis" in first["deep_report"]
+        assert "alerts" not in first
+        assert second["decision"]["signal"] == first["decision"]["signal"]
+        assert cache["hits"] > 0
+        # Метрики кэша приходят с прогоном (для /health без вызова воркера)
+        assert second.summary()["cache"] == cache
+        assert first.cache_stats["hits"] < second.cache_stats["hits"]
+
+    def test_process_mode_matches_thread(self):
+        """Тест: в отдельном процессе результат тот же, что и в потоке"""
+        inputs = analysis_inputs(seed=8)
+
+        async def scenario(mode):
+            worker = AnalysisWorker(functools.partial(AnalysisSession), mode=mode)
+            run = await worker.run(inputs, targets=("decision",))
+            worker.shutdown()
+            return run
+
+        in_thread = asyncio.run(scenario("thread"))
+        in_process = asyncio.run(scenario("process"))
+        assert in_process.ok
+        assert in_process["structure"] == in_thread["structure"]
+        assert in_process["decision"]["signal"] == in_thread["decision"]["signal"]
+        assert in_process["decision"]["confidence"] == in_thread["decision"]["confidence"]
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            AnalysisWorker(BusySession, mode="inline")
+
+    @pytest.mark.parametrize("mode", ["thread", "process"])
+    def test_ta_state_saved_on_shutdown(self, mode, tmp_path):
+        """Тест: состояние TA пишется не на каждом прогоне, а по интервалу и при остановке воркера"""
+        path = tmp_path / "ta_indicators.json"
+        config = SimpleNamespace(TA_STATE_SAVE_INTERVAL=3600.0)
+
+        async def scenario():
+            worker = AnalysisWorker(functools.partial(AnalysisSession, config, symbol="BTC-USDT",
+                                                      state_path=str(path)), mode=mode)
+            await worker.run(analysis_inputs(), targets=("decision",))
+            await worker.run(analysis_inputs(seed=6), targets=("decision",))
+            saved_before_shutdown = path.exists()
+            worker.shutdown()
+            return saved_before_shutdown
+
+        assert asyncio.run(scenario()) is False
+        assert path.exists()
+
+    def test_ta_state_saved_by_interval(self, tmp_path):
+        """Тест: по истечении интервала состояние сохраняется прямо после прогона"""
+        path = tmp_path / "ta_indicators.json"
+        session = AnalysisSession(SimpleNamespace(TA_STATE_SAVE_INTERVAL=0.0), symbol="BTC-USDT",
+                                  state_path=str(path))
+        session.run(analysis_inputs(), targets=("decision",))
+
+        assert path.exists()
+        assert session.save_state() is False  # Новых прогонов с TA не было
+        session.close()
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def fake_snapshot(captured_at, version=1):
+    return MarketSnapshot(symbol="BTC-USDT", captured_at=int(captured_at * 1000), ohlcv_version=version)
+
+
+class TestLatestResults:
+    @staticmethod
+    def counting_compute(clock, delay=0.05):
+        calls = []
+
+        async def compute(targets):
+            calls.append(targets)
+            await asyncio.sleep(delay)
+            return fake_snapshot(clock(), version=len(calls)), {name: len(calls) for name in targets}
+        return compute, calls
+
+    def test_fresh_result_served_without_compute(self):
+        """Тест: прогон основного цикла моложе SLA отдаётся без пересчёта, старше — пересчёт"""
+        clock = FakeClock()
+        compute, calls = self.counting_compute(clock)
+        results = LatestResults(compute, clock=clock)
+        results.publish(fake_snapshot(clock.now - 10), {"decision": "main", "alerts": []}, ("decision", "alerts"))
+
+        served = asyncio.run(results.get(("decision",), max_age=30))
+        assert served.source == "cache" and served.run["decision"] == "main"
+        assert served.age_seconds == pytest.approx(10)
+        assert calls == []
+
+        clock.now += 30
+        served = asyncio.run(results.get(("decision",), max_age=30))
+        assert served.source == "computed" and calls == [("decision",)]
+        assert results.latest(("decision",)) == (served.snapshot, served.run)
+
+    def test_concurrent_requests_coalesce(self):
+        """Тест: команды во время пересчёта ждут тот же расчёт"""
+        clock = FakeClock()
+        compute, calls = self.counting_compute(clock)
+        results = LatestResults(compute, clock=clock)
+
+        async def scenario():
+            return await asyncio.gather(
+                results.get(REPORT_TARGETS, max_age=60),
+                results.get(("decision",), max_age=60),
+                results.get(REPORT_TARGETS, max_age=60)
+            )
+
+        served = asyncio.run(scenario())
+        assert len(calls) == 1
+        assert [item.source for item in served] == ["computed", "coalesced", "coalesced"]
+        assert all(item.run is served[0].run for item in served)
+        assert results.stats() == {"cache": 0, "computed": 1, "coalesced": 2, "inflight": 0}
+
+    def test_narrower_inflight_not_joined(self):
+        """Тест: расчёт /signal не покрывает /analysis — отдельный расчёт"""
+        clock = FakeClock()
+        compute, calls = self.counting_compute(clock)
+        results = LatestResults(compute, clock=clock)
+
+        async def scenario():
+            return await asyncio.gather(results.get(("decision",)), results.get(REPORT_TARGETS))
+
+        asyncio.run(scenario())
+        assert sorted(calls) == [("decision",), ("decision", "deep_report")]
+
+    def test_failure_reaches_all_waiters(self):
+        """Тест: ошибка расчёта получают все ожидающие, следующий запрос считает заново"""
+        async def failing(targets):
+            await asyncio.sleep(0.02)
+            raise RuntimeError("нет данных")
+
+        results = LatestResults(failing)
+
+        async def scenario():
+            return await asyncio.gather(results.get(("decision",)), results.get(("decision",)), return_exceptions=True)
+
+        errors = asyncio.run(scenario())
+        assert all(isinstance(error, RuntimeError) for error in errors)
+        assert results.stats()["inflight"] == 0
@@ -0,0 +1,62 @@
+# tests/test_result_cache.py
+
+"""
+Unit тесты для AnalysisCache
+"""
+
+import pytest
+from modules.utils.result_cache import AnalysisCache, window_key
+from modules.market_structure.market_structure_engine import MarketStructureEngine
+from tests.helpers import make_ohlcv
+
+
+class TestAnalysisCache:
+    def test_same_window_hits(self):
+        """Тест: одинаковое окно (даже другой объект DataFrame) берётся из кэша"""
+        cache = AnalysisCache()
+        df = make_ohlcv(100)
+        calls = []
+
+        first = cache.get_or_compute("structure", df, lambda: calls.append(1) or {"n": 1}, "BTC-USDT", "15m")
+        second = cache.get_or_compute("structure", df.copy(), lambda: calls.append(1) or {"n": 2}, "BTC-USDT", "15m")
+
+        assert first is second
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["by_name"]["structure"] == {"hits": 1, "misses": 1}
+
+    def test_forming_candle_change_misses(self):
+        """Тест: изменение формирующейся свечи, нового окна или интервала — промах"""
+        df = make_ohlcv(100)
+        changed = df.copy()
+        changed.loc[changed.index[-1], "close"] += 0.5
+
+        assert window_key(df, "BTC-USDT", "15m") != window_key(changed, "BTC-USDT", "15m")
+        assert window_key(df, "BTC-USDT", "15m") != window_key(df.iloc[1:], "BTC-USDT", "15m")
+        assert window_key(df, "BTC-USDT", "15m") != window_key(df, "BTC-USDT", "1h")
+        assert window_key(df, "BTC-USDT", "15m") == window_key(df.copy(), "BTC-USDT", "15m")
+
+    def test_lru_eviction(self):
+        """Тест: вытесняется давно не использованный результат"""
+        cache = AnalysisCache(maxsize=2)
+        windows = [make_ohlcv(50, seed=seed) for seed in range(3)]
+        cache.get_or_compute("ta", windows[0], lambda: 0)
+        cache.get_or_compute("ta", windows[1], lambda: 1)
+        cache.get_or_compute("ta", windows[0], lambda: 0)  # windows[0] становится свежим
+        cache.get_or_compute("ta", windows[2], lambda: 2)  # вытесняет windows[1]
+
+        assert len(cache) == 2
+        assert cache.evictions == 1
+        assert cache.get_or_compute("ta", windows[0], lambda: "recomputed") == 0
+        assert cache.get_or_compute("ta", windows[1], lambda: "recomputed") == "recomputed"
+
+    def test_cached_engine_result_identical(self):
+        """Тест: результат из кэша совпадает с прямым вызовом движка"""
+        cache = AnalysisCache()
+        engine = MarketStructureEngine(incremental=False)
+        df = make_ohlcv(200)
+
+        cached = cache.get_or_compute("structure", df, lambda: engine.analyze(df))
+
+        assert cached == engine.analyze(df)
+        assert cache.stats()["hit_rate"] == 0.0
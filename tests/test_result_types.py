@@ -0,0 +1,88 @@
+# tests/test_result_types.py
+
+"""
+Unit тесты для ResultRecord
+"""
+
+import copy
+import pickle
+
+import pytest
+from modules.utils.result_types import ResultRecord, Lazy
+from modules.ta_engine.ta_engine import TAEngine
+from modules.ta_engine.ta_result import TAResult
+from tests.helpers import make_ohlcv
+
+
+class Sample(ResultRecord):
+    FIELDS = ("trend", "levels", "history")
+    LAZY = ("history",)
+
+
+class TestResultRecord:
+    def test_dict_compatible(self):
+        """Тест: get, [], in, итерация и сравнение — как у dict"""
+        record = Sample(trend="bullish", levels=[1, 2])
+        plain = {"trend": "bullish", "levels": [1, 2], "history": None}
+
+        assert record["trend"] == record.trend == "bullish"
+        assert record.get("levels") == [1, 2]
+        assert record.get("missing", "default") == "default"
+        assert "trend" in record and "missing" not in record
+        assert list(record) == list(plain) and len(record) == 3
+        assert record == plain and record.to_dict() == plain
+        with pytest.raises(KeyError):
+            record["missing"]
+
+    def test_frozen(self):
+        """Тест: поля не меняются, replace() даёт копию"""
+        record = Sample(trend="bullish")
+        with pytest.raises(AttributeError):
+            record.trend = "bearish"
+        with pytest.raises(AttributeError):
+            record.extra = 1
+        with pytest.raises(TypeError):
+            record["trend"] = "bearish"
+        with pytest.raises(TypeError):
+            Sample(unknown=1)
+
+        changed = record.replace(trend="bearish")
+        assert changed.trend == "bearish" and record.trend == "bullish"
+        assert not hasattr(record, "__dict__")
+
+    def test_lazy_field(self):
+        """Тест: ленивое поле считается один раз и только при обращении"""
+        calls = []
+        record = Sample(trend="neutral", history=Lazy(lambda: calls.append(1) or ("a", "b")))
+
+        assert calls == []
+        assert record["history"] == ("a", "b")
+        assert record.history == ("a", "b")
+        assert record.get("history") == ("a", "b")
+        assert calls == [1]
+
+    def test_pickle_roundtrip(self):
+        """Тест: pickle и deepcopy сохраняют тип, ленивые поля вычисляются до сериализации"""
+        record = Sample(trend="bullish", levels=[1.5, 2.5], history=Lazy(lambda: ("x",)))
+
+        restored = pickle.loads(pickle.dumps(record))
+        assert type(restored) is Sample
+        assert restored == record and restored.history == ("x",)
+        assert copy.deepcopy(record) == record
+
+    def test_lazy_must_be_declared(self):
+        with pytest.raises(ValueError):
+            class Broken(ResultRecord):
+                FIELDS = ("a",)
+                LAZY = ("b",)
+
+
+class TestTAResult:
+    def test_engine_returns_record(self):
+        """Тест: TAEngine отдаёт TAResult, который переживает pickle"""
+        result = TAEngine(incremental=False).analyze(make_ohlcv(120, seed=4))
+
+        assert isinstance(result, TAResult)
+        assert set(result) == {"ema_fast", "ema_slow", "rsi", "trend", "patterns",
+                               "overbought", "oversold", "atr", "atr_pct"}
+        assert pickle.loads(pickle.dumps(result)) == result
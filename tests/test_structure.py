@@ -0,0 +1,271 @@
+# tests/test_structure.py
+
+"""
+Unit тесты для Market Structure модулей
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from modules.market_structure.swings import detect_swings
+from modules.market_structure.fvg import detect_fvg
+from modules.market_structure.orderblocks import detect_orderblocks
+from modules.market_structure.incremental_structure import IncrementalMarketStructure
+from modules.market_structure.market_structure_engine import MarketStructureEngine
+from modules.market_structure.mitigation import ZoneMitigationTracker, compute_mitigation, active_zones
+from modules.ai_explanations.deep_analyzer import DeepMarketAnalyzer
+from tests.helpers import make_ohlcv
+
+
+def reference_detect_swings(df, lookback=2, volume_threshold=1.2):
+    """Исходная реализация с двойным циклом по iloc (эталон для parity)"""
+    result = {"highs": [], "lows": []}
+    if len(df) < lookback * 2 + 1:
+        return result
+    avg_volume = df['volume'].mean() if 'volume' in df.columns else 0
+    for i in range(lookback, len(df) - lookback):
+        for column, key, beats in (("high", "highs", lambda a, b: a <= b), ("low", "lows", lambda a, b: a >= b)):
+            is_swing = True
+            for offset in range(1, lookback + 1):
+                if beats(df[column].iloc[i], df[column].iloc[i - offset]) or \
+                   beats(df[column].iloc[i], df[column].iloc[i + offset]):
+                    is_swing = False
+                    break
+            if not is_swing:
+                continue
+            swing_volume = df['volume'].iloc[i] if 'volume' in df.columns else avg_volume
+            volume_significance = swing_volume / avg_volume if avg_volume > 0 else 1.0
+            candle_range = df['high'].iloc[i] - df['low'].iloc[i]
+            avg_range = (df['high'] - df['low']).mean()
+            range_significance = candle_range / avg_range if avg_range > 0 else 1.0
+            swing_data = {
+                "index": i,
+                "price": df[column].iloc[i],
+                "significance": (volume_significance + range_significance) / 2,
+                "volume": swing_volume,
+                "candle_range": candle_range
+            }
+            if 'timestamp' in df.columns:
+                swing_data["timestamp"] = df['timestamp'].iloc[i]
+            if volume_significance >= volume_threshold or range_significance >= 1.5:
+                result[key].append(swing_data)
+    return result
+
+
+class TestDetectSwings:
+    @pytest.mark.parametrize("lookback", [1, 2, 3, 5, 10])
+    def test_parity_with_reference(self, lookback):
+        """Тест: векторная версия совпадает с построчной при любом lookback"""
+        df = make_ohlcv(500, seed=lookback)
+        actual = detect_swings(df, lookback=lookback)
+        expected = reference_detect_swings(df, lookback=lookback)
+
+        assert len(expected["highs"]) > 0 and len(expected["lows"]) > 0
+        assert actual == expected
+
+    def test_parity_without_volume_and_with_nan(self):
+        """Тест: parity без колонки volume и с NaN в ценах"""
+        df = make_ohlcv(200, seed=13).drop(columns=["volume"])
+        df.loc[50, "high"] = np.nan
+        df.loc[120, "low"] = np.nan
+
+        assert detect_swings(df, lookback=2) == reference_detect_swings(df, lookback=2)
+
+    def test_equal_highs_are_not_swings(self):
+        """Тест: равные соседние high не образуют swing high"""
+        df = pd.DataFrame({
+            "high": [1.0, 2.0, 3.0, 3.0, 2.0, 1.0],
+            "low": [0.5, 1.5, 2.5, 2.5, 1.5, 0.5],
+            "volume": [1.0] * 6
+        })
+        assert detect_swings(df, lookback=1)["highs"] == []
+
+    def test_short_dataframe(self):
+        """Тест: меньше 2 * lookback + 1 свечей → нет свингов"""
+        assert detect_swings(make_ohlcv(4), lookback=2) == {"highs": [], "lows": []}
+
+
+class TestIncrementalMarketStructure:
+    def test_matches_batch_on_closed_candles(self):
+        """Тест: swing'и/FVG/OB совпадают с пакетными детекторами по закрытым свечам"""
+        df = make_ohlcv(400, seed=31)
+        closed = df.iloc[:-1].reset_index(drop=True)
+        state = IncrementalMarketStructure(volume_threshold=0.0)
+        state.update(df)
+        result = state.analyze()
+
+        batch_swings = detect_swings(closed, volume_threshold=0.0)
+        assert [(s["index"], s["price"]) for s in result["swings"]["highs"]] == \
+            [(s["index"], s["price"]) for s in batch_swings["highs"]]
+        assert [(s["index"], s["price"]) for s in result["swings"]["lows"]] == \
+            [(s["index"], s["price"]) for s in batch_swings["lows"]]
+        assert result["fvg"] == detect_fvg(closed)
+        assert result["orderblocks"] == detect_orderblocks(batch_swings, closed)
+
+    def test_stepwise_equals_one_shot(self):
+        """Тест: поштучные обновления скользящего окна = одно обновление всей истории"""
+        df = make_ohlcv(600, seed=32)
+        stepwise = IncrementalMarketStructure()
+        for end in range(150, len(df) + 1):
+            stepwise.update(df.iloc[end - 150:end].reset_index(drop=True))
+
+        one_shot = IncrementalMarketStructure()
+        one_shot.update(df)
+        full = one_shot.analyze()
+        window = stepwise.analyze()
+
+        offset = len(df) - 150
+        expected_highs = [dict(s, index=s["index"] - offset) for s in full["swings"]["highs"]
+                          if s["index"] - offset >= 2]
+        assert window["swings"]["highs"] == expected_highs
+        assert window["trend"] == full["trend"]
+        assert all(0 <= fvg["index"] < 150 for fvg in window["fvg"])
+
+    def test_analyze_cached_between_closes(self):
+        """Тест: без новой закрытой свечи analyze отдаёт тот же объект"""
+        df = make_ohlcv(200, seed=33)
+        state = IncrementalMarketStructure()
+        state.update(df)
+        first = state.analyze()
+        forming = df.copy()
+        forming.loc[forming.index[-1], "close"] += 1.0
+        state.update(forming)
+
+        assert state.analyze() is first
+
+    def test_engine_keeps_state_per_interval(self):
+        """Тест: движок ведёт отдельные состояния для разных таймфреймов"""
+        engine = MarketStructureEngine(incremental=True)
+        ltf = make_ohlcv(120, seed=34)
+        htf = make_ohlcv(120, seed=35)
+        htf["timestamp"] = htf["timestamp"] * 4
+
+        engine.analyze(ltf)
+        engine.analyze(htf)
+
+        assert len(engine.states) == 2
+        assert set(engine.analyze(ltf)) == {"trend", "swings", "range", "fvg", "orderblocks",
+                                            "fvg_active", "orderblocks_active"}
+
+    def test_engine_states_keyed_by_series_and_bounded(self):
+        """Тест: с id серии нерегулярные бары идут в одно состояние, без id — число состояний ограничено"""
+        df = make_ohlcv(120, seed=36)
+        keyed, unkeyed = MarketStructureEngine(incremental=True), MarketStructureEngine(incremental=True)
+        for gap in range(40):
+            irregular = df.copy()
+            irregular.loc[irregular.index[-1], "timestamp"] += gap * 1000
+            keyed.analyze(irregular, series=("BTC-USDT", "15m"))
+            unkeyed.analyze(irregular)
+
+        assert list(keyed.states) == [("BTC-USDT", "15m")]
+        assert len(unkeyed.states) == MarketStructureEngine.MAX_SERIES
+
+    def test_batch_is_default_and_incremental_skips_forming_candle(self):
+        """Тест: по умолчанию пакетный режим; инкрементальный не видит формирующуюся свечу"""
+        df = make_ohlcv(120, seed=37)
+        # Гэп вверх на последней свече: FVG на предпоследней свече видит только пакетный режим
+        gap = df['high'].iloc[-3] + 5.0 - df['low'].iloc[-1]
+        df.loc[df.index[-1], ["open", "high", "low", "close"]] += gap
+
+        assert MarketStructureEngine().incremental is False
+        batch = MarketStructureEngine().analyze(df)
+        incremental = MarketStructureEngine(incremental=True).analyze(df)
+
+        assert any(fvg["index"] == len(df) - 2 and fvg["type"] == "bullish" for fvg in batch["fvg"])
+        assert all(fvg["index"] < len(df) - 2 for fvg in incremental["fvg"])
+
+        # Значимость swing'а: скользящая статистика на момент подтверждения, а не среднее окна
+        batch_sig = {s["index"]: s["significance"] for s in batch["swings"]["highs"]}
+        common = [s for s in incremental["swings"]["highs"] if s["index"] in batch_sig]
+        assert common
+        assert any(s["significance"] != pytest.approx(batch_sig[s["index"]]) for s in common)
+
+
+def reference_detect_fvg(df):
+    """Исходный цикл detect_fvg (эталон для parity)"""
+    gaps = []
+    for i in range(1, len(df) - 1):
+        if df['high'][i - 1] < df['low'][i + 1]:
+            gaps.append({"index": i, "type": "bullish", "low": df['high'][i - 1], "high": df['low'][i + 1]})
+        if df['low'][i - 1] > df['high'][i + 1]:
+            gaps.append({"index": i, "type": "bearish", "low": df['high'][i + 1], "high": df['low'][i - 1]})
+    return gaps
+
+
+def reference_detect_orderblocks(df):
+    """Исходный цикл detect_orderblocks (эталон для parity)"""
+    ob_list = []
+    for i in range(3, len(df) - 3):
+        if df['close'][i] < df['open'][i] and df['close'][i + 1] > df['open'][i + 1]:
+            ob_list.append({"index": i, "type": "bullish", "low": df['low'][i], "high": df['high'][i]})
+        if df['close'][i] > df['open'][i] and df['close'][i + 1] < df['open'][i + 1]:
+            ob_list.append({"index": i, "type": "bearish", "low": df['low'][i], "high": df['high'][i]})
+    return ob_list
+
+
+class TestFvgOrderblocks:
+    @pytest.mark.parametrize("n", [0, 3, 7, 300])
+    def test_parity_with_reference(self, n):
+        """Тест: векторные FVG / OB совпадают с исходными циклами"""
+        df = make_ohlcv(n, seed=41)
+        assert detect_fvg(df) == reference_detect_fvg(df)
+        assert detect_orderblocks({}, df) == reference_detect_orderblocks(df)
+
+
+class TestMitigation:
+    def test_partial_and_full_fill(self):
+        """Тест: бычий FVG частично заполняется, затем закрывается полностью"""
+        tracker = ZoneMitigationTracker()
+        tracker.add("fvg:1", {"index": 1, "type": "bullish", "low": 100.0, "high": 104.0})
+        tracker.update(110.0, 105.0)
+        assert tracker.active()[0]["status"] == "active"
+
+        tracker.update(106.0, 103.0)
+        zone = tracker.active()[0]
+        assert zone["status"] == "partial"
+        assert zone["fill_pct"] == pytest.approx(0.25)
+
+        assert tracker.update(104.0, 99.0) == ["fvg:1"]
+        assert tracker.active() == []
+
+    def test_bearish_zone_and_range_query(self):
+        """Тест: медвежья зона заполняется ростом, выборка по диапазону цен"""
+        tracker = ZoneMitigationTracker()
+        tracker.add("ob:1", {"index": 1, "type": "bearish", "low": 110.0, "high": 112.0})
+        tracker.add("ob:2", {"index": 2, "type": "bearish", "low": 120.0, "high": 122.0})
+        tracker.update(112.5, 108.0)
+
+        assert [z["id"] for z in tracker.active()] == ["ob:2"]
+        assert tracker.active(low=100.0, high=115.0) == []
+
+    def test_incremental_matches_batch(self):
+        """Тест: инкрементальный трекер и пакетная митигация дают одинаковые активные зоны"""
+        df = make_ohlcv(500, seed=42)
+        state = IncrementalMarketStructure()
+        state.update(df)
+        result = state.analyze()
+
+        closed = df.iloc[:-1].reset_index(drop=True)
+        batch_fvg = active_zones(compute_mitigation(detect_fvg(closed), closed))
+        assert len(result["fvg_active"]) < len(result["fvg"])
+        assert [(z["index"], z["status"]) for z in result["fvg_active"]] == \
+            [(z["index"], z["status"]) for z in batch_fvg]
+        for inc, batch in zip(result["fvg_active"], batch_fvg):
+            assert inc["fill_pct"] == pytest.approx(batch["fill_pct"])
+
+    def test_deep_analyzer_reads_active_zones(self):
+        """Тест: отчёт /analysis берёт незаполненные зоны из fvg_active / orderblocks_active"""
+        structure = {
+            "fvg": [{"index": 1, "type": "bullish", "low": 90.0, "high": 95.0}],
+            "fvg_active": [{"index": 5, "type": "bullish", "low": 97.0, "high": 98.0,
+                            "status": "partial", "fill_pct": 0.5}],
+            "orderblocks_active": [{"index": 7, "type": "bearish", "low": 101.0, "high": 102.0,
+                                    "status": "active", "fill_pct": 0.0},
+                                   {"index": 8, "type": "bearish", "low": 150.0, "high": 151.0,
+                                    "status": "active", "fill_pct": 0.0}]
+        }
+        zones = DeepMarketAnalyzer().analyze_liquidity_zones({}, structure, 100.0)["imbalance_zones"]
+
+        assert [(z["source"], z["role"], z["status"]) for z in zones] == \
+            [("orderblock", "above", "active"), ("fvg", "below", "partial")]
+        assert zones[0]["distance_pct"] == pytest.approx(1.0)
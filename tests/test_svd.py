@@ -0,0 +1,173 @@
+# tests/test_svd.py
+
+"""
+Unit тесты для SVD модулей
+"""
+
+import pickle
+from types import SimpleNamespace
+
+import pytest
+from modules.svd.vpin import VPINCalculator
+from modules.svd.svd_engine import SVDEngine
+from modules.svd.svd_result import SVDResult
+from modules.svd.svd_score import svd_confidence_score, scale_tiers, SCORE_TIERS
+
+
+def make_trades(n, buy_ratio=0.5, start_ts=1_700_000_000_000, volume=1.0):
+    trades = []
+    for i in range(n):
+        side = "buy" if (i % 100) < buy_ratio * 100 else "sell"
+        trades.append({"price": 100.0, "volume": volume, "side": side, "timestamp": start_ts + i})
+    return trades
+
+
+class TestVPIN:
+    def test_balanced_flow_low_vpin(self):
+        """Тест: сбалансированный поток → VPIN около 0"""
+        calc = VPINCalculator(bucket_volume=100, num_buckets=10)
+        trades = []
+        for i in range(3000):
+            trades.append({"price": 100.0, "volume": 1.0, "side": "buy" if i % 2 else "sell", "timestamp": i})
+        state = calc.update(trades)
+
+        assert state["vpin"] is not None
+        assert state["vpin"] < 0.05
+
+    def test_one_sided_flow_high_vpin(self):
+        """Тест: односторонний поток → VPIN = 1"""
+        calc = VPINCalculator(bucket_volume=100, num_buckets=10)
+        state = calc.update(make_trades(2000, buy_ratio=1.0))
+
+        assert state["vpin"] == pytest.approx(1.0)
+
+    def test_trade_split_across_buckets(self):
+        """Тест: крупная сделка делится между корзинами"""
+        calc = VPINCalculator(bucket_volume=10, num_buckets=2)
+        calc.add_trade({"price": 1.0, "volume": 25.0, "side": "buy", "timestamp": 1})
+
+        assert calc.buckets_closed == 2
+        assert calc.get_vpin() == pytest.approx(1.0)
+
+    def test_overlapping_snapshots_not_double_counted(self):
+        """Тест: пересекающиеся снапшоты буфера не считаются дважды"""
+        trades = make_trades(1000)
+        incremental = VPINCalculator(bucket_volume=20, num_buckets=5)
+        for end in range(100, 1001, 100):
+            incremental.update(trades[max(0, end - 300):end])
+
+        full = VPINCalculator(bucket_volume=20, num_buckets=5)
+        full.update(trades)
+
+        assert incremental.buckets_closed == full.buckets_closed
+        assert incremental.get_vpin() == pytest.approx(full.get_vpin())
+
+    def test_rolling_cdf_and_toxicity(self):
+        """Тест: всплеск дисбаланса даёт высокий CDF и флаг toxic"""
+        calc = VPINCalculator(bucket_volume=10, num_buckets=5, toxic_cdf=0.9)
+        calc.update(make_trades(5000, buy_ratio=0.5))
+        state = calc.update(make_trades(200, buy_ratio=1.0, start_ts=1_800_000_000_000))
+
+        assert state["vpin_cdf"] >= 0.9
+        assert state["toxic"] is True
+
+    def test_not_toxic_during_warmup(self):
+        """Тест: сразу после прогрева (1–2 значения в истории) CDF нет и toxic = False"""
+        calc = VPINCalculator(bucket_volume=10, num_buckets=5)
+        state = calc.update(make_trades(60, buy_ratio=1.0))
+
+        assert 1 <= state["history_size"] < calc.min_history
+        assert state["vpin_cdf"] is None
+        assert state["toxic"] is False
+
+        state = calc.update(make_trades(10 * (calc.min_history + 5), buy_ratio=1.0, start_ts=1_800_000_000_000))
+        assert state["history_size"] >= calc.min_history
+        assert state["vpin_cdf"] is not None
+
+    def test_unknown_side_split_evenly(self):
+        """Тест: сделки без стороны не считаются продажами"""
+        calc = VPINCalculator(bucket_volume=10, num_buckets=2)
+        for i in range(20):
+            calc.add_trade({"price": 1.0, "volume": 1.0, "side": "", "timestamp": i})
+
+        assert calc.buckets_closed == 2
+        assert calc.get_vpin() == pytest.approx(0.0)
+
+    def test_auto_bucket_volume(self):
+        """Тест: автооценка bucket_volume по прогреву"""
+        calc = VPINCalculator(warmup_trades=50, trades_per_bucket=10)
+        calc.update(make_trades(60, volume=2.0))
+
+        assert calc.bucket_volume == pytest.approx(20.0)
+
+
+class TestSVDEngineVPIN:
+    def test_vpin_in_svd_data(self):
+        """Тест: VPIN присутствует в svd_data"""
+        engine = SVDEngine()
+        orderbook = {"bids": [(99.9, 5.0)] * 20, "asks": [(100.1, 5.0)] * 20, "avg_bid": 5.0, "avg_ask": 5.0}
+        result = engine.analyze(make_trades(500), orderbook)
+
+        assert "vpin" in result
+        assert set(result["vpin"]) >= {"vpin", "vpin_cdf", "toxic"}
+
+
+class TestSVDScoreTiers:
+    def test_default_tiers(self):
+        """Тест: ступени по умолчанию дают исходные баллы"""
+        assert scale_tiers() == SCORE_TIERS
+        for delta, points in ((150000, 3), (60000, 2.5), (30000, 2), (6000, 1), (10, 0.5), (0, 0)):
+            assert svd_confidence_score(delta, {}, {}, {}) == points
+        for velocity, points in ((150, 3), (60, 2), (30, 1.5), (6, 1), (1, 0.5), (0, 0)):
+            assert svd_confidence_score(0, {}, {}, {"velocity": velocity}) == points
+
+    def test_scaled_tiers(self):
+        """Тест: масштаб сдвигает пороги дельты и скорости"""
+        tiers = scale_tiers(delta_scale=2.0, velocity_scale=0.5)
+        assert svd_confidence_score(60000, {}, {}, {}, tiers=tiers) == 2
+        assert svd_confidence_score(0, {}, {}, {"velocity": 30}, tiers=tiers) == 2
+
+    def test_engine_reads_config(self):
+        """Тест: пороги CVD и ступени score берутся из config"""
+        config = SimpleNamespace(SVD_CVD_THRESHOLD=8.0, SVD_CVD_SLOPE_THRESHOLD=1.0,
+                                 SVD_CVD_REVERSAL_THRESHOLD=2.0, SVD_DELTA_TIER_SCALE=2.0)
+        engine = SVDEngine(config)
+
+        assert (engine.cvd_threshold, engine.cvd_slope_threshold, engine.cvd_reversal_threshold) == (8.0, 1.0, 2.0)
+        assert engine.score_tiers == scale_tiers(delta_scale=2.0)
+        assert SVDEngine().cvd_threshold == 5.0
+
+
+class TestSVDResult:
+    @staticmethod
+    def orderbook(wall=False):
+        bids = [(99.9 - 0.1 * k, 50.0 if wall and k == 0 else 5.0) for k in range(20)]
+        return {"bids": bids, "asks": [(100.1 + 0.1 * k, 5.0) for k in range(20)], "avg_bid": 5.0, "avg_ask": 5.0}
+
+    def test_record_matches_dict_contract(self):
+        """Тест: SVDResult читается как прежний dict и переживает pickle"""
+        engine = SVDEngine()
+        result = engine.analyze(make_trades(200), self.orderbook())
+
+        assert isinstance(result, SVDResult)
+        assert len(result) == 34
+        assert result.get("intent") == result["intent"] == result.intent
+        assert result["expected_next_phases"] == engine.phase_tracker.get_expected_next_phase()
+        with pytest.raises(AttributeError):
+            result.intent = "accumulating"
+
+        restored = pickle.loads(pickle.dumps(result))
+        assert restored == result
+        assert len(pickle.dumps(result)) < len(pickle.dumps(result.to_dict()))
+
+    def test_histories_shared_not_copied(self):
+        """Тест: история спуфов — снимок-кортеж, общий между циклами до нового события"""
+        engine = SVDEngine()
+        first = engine.analyze(make_trades(200), self.orderbook(wall=True))
+        confirmed = engine.analyze(make_trades(200, start_ts=1_700_000_000_500), self.orderbook())
+        quiet = engine.analyze(make_trades(200, start_ts=1_700_000_001_000), self.orderbook())
+
+        assert first["spoof_events"] == ()
+        assert confirmed["spoof_confirmed"] and len(confirmed["spoof_events"]) == 1
+        assert quiet["spoof_events"] is confirmed["spoof_events"]
+        assert quiet["phase_info"]["phase_history"] is engine.phase_tracker.phase_history
@@ -0,0 +1,300 @@
+# tests/test_ta_engine.py
+
+"""
+Unit тесты для TAEngine и инкрементальных индикаторов
+"""
+
+import json
+import math
+
+import pytest
+import numpy as np
+import pandas as pd
+from modules.ta_engine import TAEngine, IndicatorBank, calculate_ema, calculate_rsi
+from modules.ta_engine.atr import calculate_atr, calculate_atr_pct
+from modules.ta_engine.batch import analyze_batch, stack_ohlcv
+from modules.ta_engine.patterns import detect_patterns
+from modules.ta_engine.pattern_scanner import scan_patterns, PATTERN_COLUMNS
+from tests.helpers import make_ohlcv
+
+
+def reference_wilder_rsi(closes, period=14):
+    """Учебный RSI Уайлдера (построчно)"""
+    rsi = [math.nan] * len(closes)
+    gains = losses = 0.0
+    for i in range(1, len(closes)):
+        delta = closes[i] - closes[i - 1]
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        if i <= period:
+            gains += gain
+            losses += loss
+            if i < period:
+                continue
+            avg_gain, avg_loss = gains / period, losses / period
+        else:
+            avg_gain = (avg_gain * (period - 1) + gain) / period
+            avg_loss = (avg_loss * (period - 1) + loss) / period
+        rsi[i] = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+    return rsi
+
+
+def batch_values(df):
+    return {
+        "ema_20": calculate_ema(df, 20).iloc[-1],
+        "ema_50": calculate_ema(df, 50).iloc[-1],
+        "rsi": calculate_rsi(df, 14).iloc[-1],
+        "atr": calculate_atr(df, 14).iloc[-1],
+        "atr_pct": calculate_atr_pct(df, 14).iloc[-1]
+    }
+
+
+def assert_values_close(actual, expected):
+    for name, value in expected.items():
+        np.testing.assert_allclose(actual[name], value, rtol=1e-9, equal_nan=True, err_msg=name)
+
+
+class TestIndicatorBank:
+    def test_wilder_rsi_matches_reference(self):
+        """Тест: calculate_rsi — RSI Уайлдера"""
+        df = make_ohlcv(300, seed=5)
+        expected = reference_wilder_rsi(df["close"].tolist())
+
+        np.testing.assert_allclose(calculate_rsi(df, 14).to_numpy(), expected, rtol=1e-9, equal_nan=True)
+
+    def test_growing_window_matches_batch(self):
+        """Тест: при прогреве с начала df значения совпадают с пакетными (включая прогрев ATR/RSI)"""
+        df = make_ohlcv(120, seed=6)
+        bank = IndicatorBank()
+        for end in range(2, len(df) + 1):
+            window = df.iloc[:end]
+            bank.update(window)
+            assert_values_close(bank.values(), batch_values(window))
+
+    def test_sliding_window_keeps_full_history(self):
+        """Тест: на скользящем окне банк продолжает серию — как пакетный расчёт по всей истории"""
+        full = make_ohlcv(400, seed=7)
+        bank = IndicatorBank()
+        for end in range(100, len(full) + 1):
+            bank.update(full.iloc[end - 100:end])
+        assert bank.closed_count == len(full) - 1
+        assert_values_close(bank.values(), batch_values(full))
+
+    def test_forming_candle_is_tentative(self):
+        """Тест: формирующаяся свеча не меняет состояние"""
+        df = make_ohlcv(100, seed=8)
+        tentative = df.copy()
+        tentative.loc[tentative.index[-1], ["high", "close"]] = [df["high"].iloc[-1] + 5, df["close"].iloc[-1] + 4]
+        bank = IndicatorBank()
+
+        bank.update(tentative)
+        state = bank.to_dict()
+        bank.update(df)
+
+        assert bank.to_dict() == state
+        assert_values_close(bank.values(), batch_values(df))
+
+    def test_persistence_roundtrip(self):
+        """Тест: восстановленный из JSON банк продолжает расчёт без прогрева"""
+        full = make_ohlcv(300, seed=9)
+        bank = IndicatorBank()
+        bank.update(full.iloc[:200])
+
+        restored = IndicatorBank.from_dict(json.loads(json.dumps(bank.to_dict())))
+        restored.update(full.iloc[150:])
+
+        assert restored.closed_count == len(full) - 1
+        assert_values_close(restored.values(), batch_values(full))
+
+
+class TestTAEngine:
+    def test_incremental_matches_batch(self):
+        """Тест: инкрементальный и пакетный режимы дают одинаковый результат на одном окне"""
+        df = make_ohlcv(200, seed=10)
+        incremental = TAEngine().analyze(df)
+        batch = TAEngine(incremental=False).analyze(df)
+
+        for key in ["ema_fast", "ema_slow", "rsi", "atr", "atr_pct"]:
+            np.testing.assert_allclose(incremental[key], batch[key], rtol=1e-9, err_msg=key)
+        for key in ["trend", "overbought", "oversold", "patterns"]:
+            assert incremental[key] == batch[key]
+
+    def test_save_and_load_state(self, tmp_path):
+        """Тест: состояние банков сохраняется и загружается"""
+        df = make_ohlcv(200, seed=11)
+        engine = TAEngine(symbol="BTC-USDT")
+        engine.analyze(df, series=("BTC-USDT", "15m"))
+        path = str(tmp_path / "ta.json")
+
+        assert engine.save_state(path)
+        loaded = TAEngine(symbol="BTC-USDT")
+        assert loaded.load_state(path)
+        assert list(loaded.banks) == [("BTC-USDT", "15m")]
+        assert loaded.analyze(df, series=("BTC-USDT", "15m")) == engine.analyze(df, series=("BTC-USDT", "15m"))
+        assert not TAEngine().load_state(str(tmp_path / "missing.json"))
+
+    def test_state_of_other_symbol_not_loaded(self, tmp_path):
+        """Тест: состояние, сохранённое для другой пары, не загружается"""
+        engine = TAEngine(symbol="BTC-USDT")
+        engine.analyze(make_ohlcv(200, seed=12))
+        path = str(tmp_path / "ta.json")
+        engine.save_state(path)
+
+        other = TAEngine(symbol="ETH-USDT")
+        assert not other.load_state(path)
+        assert len(other.banks) == 0
+
+    def test_banks_keyed_by_symbol_and_interval(self):
+        """Тест: одинаковый интервал разных пар ведётся в разных банках"""
+        engine = TAEngine()
+        btc, eth = make_ohlcv(120, seed=13), make_ohlcv(120, seed=14)
+        engine.analyze(btc, series=("BTC-USDT", "15m"))
+        engine.analyze(eth, series=("ETH-USDT", "15m"))
+
+        assert set(engine.banks) == {("BTC-USDT", "15m"), ("ETH-USDT", "15m")}
+        assert engine.analyze(eth, series=("ETH-USDT", "15m")) == TAEngine().analyze(eth)
+
+
+def make_pattern_frames():
+    """Символы с паттернами в последних свечах (engulfing / hammer / doji) и без"""
+    frames = {f"SYM{i}": make_ohlcv(120, seed=20 + i) for i in range(8)}
+    for symbol, (o1, c1, o2, c2) in {"SYM0": (101, 100, 99.5, 101.5), "SYM1": (100, 101, 101.5, 99.5)}.items():
+        df = frames[symbol]
+        df.loc[df.index[-3], ["open", "close", "high", "low"]] = [o1, c1, max(o1, c1) + 0.1, min(o1, c1) - 0.1]
+        df.loc[df.index[-2], ["open", "close", "high", "low"]] = [o2, c2, max(o2, c2) + 0.1, min(o2, c2) - 0.1]
+    hammer = frames["SYM2"]
+    hammer.loc[hammer.index[-1], ["open", "close", "high", "low"]] = [100.0, 100.05, 100.1, 98.0]
+    doji = frames["SYM3"]
+    doji.loc[doji.index[-1], ["open", "close", "high", "low"]] = [100.0, 100.01, 101.0, 99.0]
+    return frames
+
+
+class TestBatchTA:
+    def test_matches_per_symbol_engine(self):
+        """Тест: пакетный TA по матрицам идентичен TAEngine.analyze по каждому символу"""
+        frames = make_pattern_frames()
+        engine = TAEngine(incremental=False)
+
+        results = engine.analyze_batch(frames)
+
+        assert list(results) == list(frames)
+        for symbol, df in frames.items():
+            assert results[symbol] == engine.analyze(df), symbol
+        assert {p["type"] for p in results["SYM0"]["patterns"]} >= {"bullish_engulfing"}
+        assert {p["type"] for p in results["SYM2"]["patterns"]} >= {"hammer"}
+
+    def test_short_windows(self):
+        """Тест: окна короче периодов RSI/ATR обрабатываются как в TAEngine"""
+        frames = {f"SYM{i}": make_ohlcv(10, seed=i) for i in range(3)}
+        symbols, m = stack_ohlcv(frames)
+        results = analyze_batch(m["open"], m["high"], m["low"], m["close"], symbols)
+        engine = TAEngine(incremental=False)
+
+        for symbol, df in frames.items():
+            expected = engine.analyze(df)
+            assert math.isnan(results[symbol]["rsi"]) and math.isnan(expected["rsi"])
+            assert results[symbol]["atr"] == expected["atr"] == 0
+            assert results[symbol]["trend"] == expected["trend"]
+
+    def test_short_and_empty_symbols_skipped(self):
+        """Тест: пустой и короткий символ пропускаются и не обрезают окно остальных"""
+        frames = make_pattern_frames()
+        frames["SHORT"] = make_ohlcv(5, seed=40)
+        frames["EMPTY"] = make_ohlcv(5, seed=41).iloc[:0]
+        engine = TAEngine(incremental=False)
+
+        results = engine.analyze_batch(frames)
+
+        assert "SHORT" not in results and "EMPTY" not in results
+        for symbol in make_pattern_frames():
+            assert results[symbol] == engine.analyze(frames[symbol]), symbol
+
+    def test_empty_matrices(self):
+        """Тест: матрицы без свечей дают пустой результат, а не IndexError"""
+        symbols, m = stack_ohlcv({"EMPTY": make_ohlcv(5).iloc[:0]})
+        assert symbols == []
+        assert analyze_batch(m["open"], m["high"], m["low"], m["close"], symbols) == {}
+        assert analyze_batch(*(np.empty((2, 0)),) * 4) == {}
+
+
+def reference_detect_patterns(df):
+    """Исходная построчная версия detect_patterns"""
+    patterns = []
+    if len(df) < 3:
+        return patterns
+    c1, c2, c3 = df.iloc[-3], df.iloc[-2], df.iloc[-1]
+    if c1['close'] < c1['open'] and c2['open'] < c1['close'] and c2['close'] > c1['open']:
+        patterns.append({"type": "bullish_engulfing", "strength": "medium"})
+    if c1['close'] > c1['open'] and c2['open'] > c1['close'] and c2['close'] < c1['open']:
+        patterns.append({"type": "bearish_engulfing", "strength": "medium"})
+    body = abs(c3['close'] - c3['open'])
+    total_range = c3['high'] - c3['low']
+    if total_range > 0:
+        body_ratio = body / total_range
+        lower_wick = min(c3['open'], c3['close']) - c3['low']
+        if body_ratio < 0.3 and lower_wick > total_range * 0.6:
+            patterns.append({"type": "hammer", "strength": "medium"})
+        if body_ratio < 0.1:
+            patterns.append({"type": "doji", "strength": "low"})
+    return patterns
+
+
+def make_candles(rows):
+    """DataFrame из списка (open, high, low, close)"""
+    return pd.DataFrame(rows, columns=["open", "high", "low", "close"]).assign(volume=1.0)
+
+
+def make_noisy_candles(n, seed=30):
+    """Свечи с независимыми open/close — много паттернов всех типов"""
+    rng = np.random.default_rng(seed)
+    open_ = 100 + rng.normal(0, 1, n)
+    close = 100 + rng.normal(0, 1, n)
+    high = np.maximum(open_, close) + rng.exponential(0.5, n)
+    low = np.minimum(open_, close) - rng.exponential(0.5, n)
+    return make_candles(np.column_stack([open_, high, low, close]))
+
+
+class TestPatternScanner:
+    def test_detect_patterns_matches_reference(self):
+        """Тест: detect_patterns по хвосту сканера совпадает с исходной версией на каждом окне"""
+        df = make_noisy_candles(600)
+        found = 0
+        for end in range(1, len(df) + 1):
+            window = df.iloc[:end]
+            expected = reference_detect_patterns(window)
+            assert detect_patterns(window) == expected
+            found += len(expected)
+        assert found > 0
+
+    def test_full_history_flags_consistent_with_tail(self):
+        """Тест: флаги по всей истории совпадают с покадровым расчётом по хвосту"""
+        df = make_noisy_candles(400, seed=31)
+        flags = scan_patterns(df)
+
+        assert list(flags.columns) == list(PATTERN_COLUMNS)
+        assert (flags.dtypes == np.int8).all()
+        for i in range(2, len(df)):
+            tail = scan_patterns(df.iloc[i - 2:i + 1])
+            assert flags.iloc[i].tolist() == tail.iloc[-1].tolist()
+        assert flags.sum().min() > 0  # каждый паттерн встречается
+        assert flags.iloc[0][["bullish_engulfing", "inside_bar", "bullish_three_bar_reversal"]].sum() == 0
+
+    def test_named_patterns(self):
+        """Тест: паттерны на эталонных свечах"""
+        df = make_candles([
+            (102.0, 102.5, 99.5, 100.0),   # 0 медвежья
+            (100.0, 100.2, 97.0, 98.0),    # 1 минимум
+            (98.5, 101.5, 98.2, 101.0),    # 2 закрытие выше high[1] — бычий разворот
+            (101.0, 101.2, 99.0, 100.0),   # 3
+            (100.5, 101.0, 99.5, 100.2),   # 4 inside bar
+            (100.0, 103.0, 98.0, 100.1),   # 5 outside bar
+            (100.0, 100.3, 96.0, 100.2),   # 6 бычий pin bar / hammer
+            (100.2, 104.0, 99.9, 100.0),   # 7 медвежий pin bar / shooting star
+        ])
+        flags = scan_patterns(df)
+
+        assert flags.loc[2, "bullish_three_bar_reversal"] == 1
+        assert flags.loc[4, "inside_bar"] == 1
+        assert flags.loc[5, "outside_bar"] == 1
+        assert flags.loc[6, ["bullish_pin_bar", "hammer"]].tolist() == [1, 1]
+        assert flags.loc[7, ["bearish_pin_bar", "shooting_star"]].tolist() == [1, 1]
+        assert flags.loc[6, "bearish_pin_bar"] == 0
@@ -0,0 +1,105 @@
+# tests/test_trend_strength.py
+
+"""
+Unit тесты для trend_strength
+"""
+
+import pytest
+import numpy as np
+from modules.utils.trend_strength import (
+    TrendStrengthEngine,
+    calculate_trend_strength,
+    analyze_pullback_vs_reversal,
+    trend_strength_history
+)
+from tests.helpers import make_ohlcv
+
+
+def reference_single_period(df, lookback):
+    """Исходный расчёт одного периода (срез + diff + mean)"""
+    recent = df.iloc[-lookback:]
+    first_close = recent["close"].iloc[0]
+    last_close = recent["close"].iloc[-1]
+    price_change_pct = ((last_close - first_close) / first_close) * 100
+    if price_change_pct > 1.0:
+        direction = "up"
+    elif price_change_pct < -1.0:
+        direction = "down"
+    else:
+        direction = "neutral"
+    price_diffs = np.diff(recent["close"].values)
+    if direction == "up":
+        trend_candles = np.sum(price_diffs > 0)
+    elif direction == "down":
+        trend_candles = np.sum(price_diffs < 0)
+    else:
+        trend_candles = 0
+    consistency = trend_candles / len(price_diffs) if len(price_diffs) > 0 else 0.0
+    volume_confirmation = recent["volume"].iloc[-5:].mean() > recent["volume"].mean() * 1.1
+    momentum_score = min(abs(price_change_pct) / 5.0, 1.0)
+    strength = momentum_score * 0.5 + consistency * 0.3 + (0.2 if volume_confirmation else 0.0)
+    return {
+        "direction": direction,
+        "strength": min(strength, 1.0),
+        "momentum": price_change_pct,
+        "consistency": consistency,
+        "volume_confirmation": volume_confirmation
+    }
+
+
+def assert_period_equal(actual, expected):
+    assert actual["direction"] == expected["direction"]
+    assert actual["volume_confirmation"] == expected["volume_confirmation"]
+    for key in ("strength", "momentum", "consistency"):
+        assert actual[key] == pytest.approx(expected[key], rel=1e-12, abs=1e-12), key
+
+
+def make_trending_ohlcv(n, seed):
+    """Свечи с выраженными трендами, чтобы встречались все направления"""
+    df = make_ohlcv(n, seed=seed)
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.choice([-0.3, 0.0, 0.3], size=n // 50 + 1), 50)[:n]
+    df["close"] = 100 + np.cumsum(drift + rng.normal(0, 0.4, n))
+    df["high"] = df["close"] + 0.5
+    df["low"] = df["close"] - 0.5
+    return df
+
+
+class TestTrendStrength:
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_matches_reference(self, seed):
+        """Тест: все периоды совпадают с исходным расчётом по срезам"""
+        df = make_trending_ohlcv(300, seed)
+        result = calculate_trend_strength(df, lookback=20, multi_period=True)
+
+        assert_period_equal(result, reference_single_period(df, 20))
+        assert set(result["multi_period"]) == {"20candles", "50candles", "100candles"}
+        for period in (20, 50, 100):
+            assert_period_equal(result["multi_period"][f"{period}candles"], reference_single_period(df, period))
+
+    def test_history_matches_per_candle(self):
+        """Тест: пакетная история совпадает с расчётом на каждом префиксе"""
+        df = make_trending_ohlcv(400, seed=4)
+        history = trend_strength_history(df, lookbacks=(20, 50))
+        directions = set()
+
+        for end in range(len(df)):
+            for lookback in (20, 50):
+                row = {key: history[f"{key}_{lookback}"].iloc[end] for key in
+                       ("direction", "strength", "momentum", "consistency", "volume_confirmation")}
+                if end < lookback - 1:
+                    assert row["direction"] == "neutral" and np.isnan(row["strength"])
+                    continue
+                assert_period_equal(row, reference_single_period(df.iloc[:end + 1], lookback))
+                directions.add(row["direction"])
+        assert directions == {"up", "down", "neutral"}
+
+    def test_pullback_with_shared_engine(self):
+        """Тест: pullback/reversal через общий движок совпадает с отдельным вызовом"""
+        df = make_trending_ohlcv(200, seed=5)
+        engine = TrendStrengthEngine(df)
+
+        for direction in ("up", "down", "neutral"):
+            assert analyze_pullback_vs_reversal(df, direction, engine=engine) == \
+                analyze_pullback_vs_reversal(df, direction)
+        assert calculate_trend_strength(df.iloc[:10])["direction"] == "neutral"